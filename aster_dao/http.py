@@ -5,6 +5,29 @@ from typing import Any, Dict, Optional, Tuple, List
 
 import requests
 
+from common.deadline import Deadline, DeadlineExceeded, EndpointTimeout, TimeoutPolicy, call_deadline, scoped
+from common.log import enable_debug, get_logger
+from common.tracing import span
+from common.transport import HttpTransport, Transport
+
+log = get_logger("aster.http")
+
+# Per-endpoint (connect, read, budget) in seconds: order entry/cancel short, history long.
+DEFAULT_TIMEOUTS = TimeoutPolicy(EndpointTimeout(3.0, 10.0, 15.0), [
+	("POST", "/api/v1/order", EndpointTimeout(1.0, 2.5, 3.5)),
+	("DELETE", "/api/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+	("DELETE", "/api/v1/allOpenOrders", EndpointTimeout(1.0, 2.5, 3.5)),
+	("GET", "/api/v1/openOrders", EndpointTimeout(1.0, 3.0, 4.0)),
+	("GET", "/api/v1/time", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/ticker/bookTicker", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/depth", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/userTrades", EndpointTimeout(3.0, 30.0, 90.0)),
+	("GET", "/api/v1/allOrders", EndpointTimeout(3.0, 30.0, 90.0)),
+	("GET", "/api/v1/klines", EndpointTimeout(3.0, 20.0, 60.0)),
+	("GET", "/api/v1/aggTrades", EndpointTimeout(3.0, 20.0, 60.0)),
+])
+
 
 class AsterClient:
 	"""Low-level HTTP client handling signing and requests for Aster Spot API."""
@@ -14,37 +37,47 @@ class AsterClient:
 		api_key: Optional[str] = None,
 		api_secret: Optional[str] = None,
 		base_url: str = "https://sapi.asterdex.com",
-		timeout_seconds: int = 15,
+		timeout_seconds: Optional[float] = None,
 		auto_time_sync: bool = True,
 		debug: bool = False,
+		transport: Optional[Transport] = None,
+		timeouts: Optional[TimeoutPolicy] = None,
 	):
 		self.api_key = api_key
 		self.api_secret = api_secret
 		self.base_url = base_url.rstrip("/")
-		self.session = requests.Session()
-		self.timeout_seconds = timeout_seconds
+		# 传输层可替换为录制/回放实现，默认直接访问交易所
+		self.transport = transport or HttpTransport()
+		self.session = self.transport.session
+		# timeout_seconds only replaces the fallback for endpoints without their own entry
+		self.timeouts = timeouts or DEFAULT_TIMEOUTS
+		if timeout_seconds is not None:
+			fallback = EndpointTimeout(min(3.0, timeout_seconds), timeout_seconds, timeout_seconds)
+			self.timeouts = TimeoutPolicy(fallback, self.timeouts.rules)
+		self.timeout_seconds = self.timeouts.default.read
 		self.time_offset_ms = 0
 		self.auto_time_sync = auto_time_sync
 		self.debug = debug
+		if debug:
+			enable_debug("aster.http")
 		if self.auto_time_sync:
 			try:
 				self.sync_time()
 			except Exception as e:
-				if self.debug:
-					print(f"[AsterClient] time sync failed: {e}")
+				log.warning("time sync failed: %s", e)
 				# ignore sync failure; will retry on demand
 
 	def sync_time(self) -> None:
 		"""Sync local offset with server time to avoid INVALID_TIMESTAMP (-1021)."""
 		url = f"{self.base_url}/api/v1/time"
-		resp = self.session.get(url, timeout=self.timeout_seconds)
+		spec = self.timeouts.lookup("GET", "/api/v1/time")
+		resp = self.transport.request("GET", url, timeout=call_deadline(spec).timeout(spec.connect, spec.read, "time sync"))
 		resp.raise_for_status()
 		data = resp.json()
 		server_time = int(data.get("serverTime"))
 		local_time = int(time.time() * 1000)
 		self.time_offset_ms = server_time - local_time
-		if self.debug:
-			print(f"[AsterClient] time sync: server={server_time}, local={local_time}, offset={self.time_offset_ms}ms")
+		log.debug("time sync: server=%s, local=%s, offset=%sms", server_time, local_time, self.time_offset_ms)
 
 	def _headers(self, needs_key: bool) -> Dict[str, str]:
 		headers: Dict[str, str] = {
@@ -105,39 +138,43 @@ class AsterClient:
 		signed: bool = False,
 		use_query: bool = True,
 		_retry: bool = False,
+		_deadline: Optional[Deadline] = None,
 	) -> Any:
 		"""Generic request wrapper with optional signed HMAC and -1021 retry.
-		Ensures the exact same parameter sequence is used for signing and sending."""
+		Ensures the exact same parameter sequence is used for signing and sending.
+		Timeouts come from self.timeouts per endpoint; the retry shares the call's deadline."""
+		spec = self.timeouts.lookup(method, path)
+		dl = call_deadline(spec, _deadline)
+		timeout = dl.timeout(spec.connect, spec.read, f"{method.upper()} {path}")
 		seq, needs_key, debug_sign = self._prepare(signed, params)
 		encoded = self._encode_sequence(seq)
 		url = f"{self.base_url}{path}"
 		headers = self._headers(needs_key)
 		method_upper = method.upper()
 
-		if self.debug:
-			print(f"[AsterClient] {method_upper} {path}")
-			if signed:
-				print(f"[AsterClient] signing_string: {debug_sign}")
-			print(f"[AsterClient] sending as {'query' if (method_upper in ('GET','DELETE') or use_query) else 'body'}: {encoded}")
-
-		if method_upper in ("GET", "DELETE") or use_query:
-			# pass as ordered list of tuples to preserve order
-			resp = self.session.request(
-				method_upper,
-				url,
-				params=seq,
-				headers=headers,
-				timeout=self.timeout_seconds,
-			)
-		else:
-			# Send as body (form-encoded)
-			resp = self.session.request(
-				method_upper,
-				url,
-				data=encoded,
-				headers=headers,
-				timeout=self.timeout_seconds,
-			)
+		log.debug("%s %s signing_string: %s sending as %s: %s", method_upper, path, debug_sign,
+				  "query" if (method_upper in ("GET", "DELETE") or use_query) else "body", encoded)
+
+		with span(f"{method_upper} {path}", cat="http", venue="aster") as sp:
+			if method_upper in ("GET", "DELETE") or use_query:
+				# pass as ordered list of tuples to preserve order
+				resp = self.transport.request(
+					method_upper,
+					url,
+					params=seq,
+					headers=headers,
+					timeout=timeout,
+				)
+			else:
+				# Send as body (form-encoded)
+				resp = self.transport.request(
+					method_upper,
+					url,
+					data=encoded,
+					headers=headers,
+					timeout=timeout,
+				)
+			sp.set(status=resp.status_code)
 
 		if resp.status_code >= 400:
 			# Raise detailed error with payload when possible
@@ -146,8 +183,7 @@ class AsterClient:
 				payload = resp.json()
 			except Exception:
 				payload = {"text": resp.text}
-			if self.debug:
-				print(f"[AsterClient] HTTP {resp.status_code} error payload: {payload}")
+			log.debug("HTTP %s error payload: %s", resp.status_code, payload)
 			# If timestamp invalid, re-sync and retry once
 			if (
 				signed
@@ -156,13 +192,14 @@ class AsterClient:
 				and payload.get("code") == -1021
 			):
 				try:
-					if self.debug:
-						print("[AsterClient] detected -1021, resyncing time and retrying once...")
-					self.sync_time()
-					return self.request(method, path, params=params, signed=signed, use_query=use_query, _retry=True)
+					log.debug("detected -1021, resyncing time and retrying once...")
+					with scoped(dl):
+						self.sync_time()
+					return self.request(method, path, params=params, signed=signed, use_query=use_query, _retry=True, _deadline=dl)
+				except DeadlineExceeded:
+					raise
 				except Exception as e:
-					if self.debug:
-						print(f"[AsterClient] retry failed to resync: {e}")
+					log.warning("retry failed to resync: %s", e)
 			raise requests.HTTPError(f"HTTP {resp.status_code}: {payload}")
 
 		if resp.headers.get("Content-Type", "").startswith("application/json"):
@@ -1,5 +1,7 @@
 from typing import Any, Dict, List, Optional
 
+from common.tracing import traced
+
 from .http import AsterClient
 
 
@@ -78,12 +80,14 @@ class MarketDataDAO:
 			params["symbol"] = symbol
 		return self.client.request("GET", "/api/v1/ticker/24hr", params=params or None)
 
+	@traced("aster.market.ticker_price")
 	def ticker_price(self, symbol: Optional[str] = None) -> Any:
 		params: Dict[str, Any] = {}
 		if symbol:
 			params["symbol"] = symbol
 		return self.client.request("GET", "/api/v1/ticker/price", params=params or None)
 
+	@traced("aster.market.book_ticker")
 	def book_ticker(self, symbol: Optional[str] = None) -> Any:
 		params: Dict[str, Any] = {}
 		if symbol:
@@ -1,5 +1,7 @@
 from typing import Any, Dict, List, Optional
 
+from common.tracing import traced
+
 from .http import AsterClient
 
 
@@ -7,6 +9,7 @@ class TradeDAO:
 	def __init__(self, client: AsterClient):
 		self.client = client
 
+	@traced("aster.trade.place_order")
 	def place_order(
 		self,
 		symbol: str,
@@ -41,6 +44,7 @@ class TradeDAO:
 			params["recvWindow"] = recvWindow
 		return self.client.request("POST", "/api/v1/order", params=params, signed=True)
 
+	@traced("aster.trade.cancel_order")
 	def cancel_order(
 		self,
 		symbol: str,
@@ -57,6 +61,7 @@ class TradeDAO:
 			params["recvWindow"] = recvWindow
 		return self.client.request("DELETE", "/api/v1/order", params=params, signed=True)
 
+	@traced("aster.trade.get_order")
 	def get_order(
 		self,
 		symbol: str,
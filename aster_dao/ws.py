@@ -4,13 +4,19 @@ from typing import Any, AsyncIterable, Iterable, List, Optional
 
 import websockets
 
+from common.ws_manager import CombinedStreamProtocol, WSConnectionManager, find_shared_manager, shared_manager
+
 
 class WebSocketClient:
 	"""Minimal websocket client for Aster market/user streams.
 
+	subscribe()/unsubscribe() share one long-lived combined-stream connection per
+	base URL (see common.ws_manager), so unsubscribing acts on the same socket that
+	carries the subscription and adding a stream costs no new handshake.
+
 	Example:
 		ws = WebSocketClient()
-		async for msg in ws.connect_and_iter("wss://sstream.asterdex.com/ws/btcusdt@trade"):
+		async for msg in ws.subscribe(["btcusdt@trade"]):
 			print(msg)
 	"""
 
@@ -29,20 +35,36 @@ class WebSocketClient:
 				except Exception:
 					yield raw
 
-	async def subscribe(self, streams: Iterable[str], id_: int = 1, combined: bool = False) -> AsyncIterable[Any]:
-		path = "/stream" if combined else "/ws"
-		# For combined true, server expects /stream?streams=a/b; we use /ws and send command instead.
-		async with await self.connect(path) as ws:
-			payload = {"method": "SUBSCRIBE", "params": list(streams), "id": id_}
-			await ws.send(json.dumps(payload))
-			async for raw in ws:
-				try:
-					yield json.loads(raw)
-				except Exception:
-					yield raw
+	async def manager(self) -> WSConnectionManager:
+		"""Shared persistent connection for this base URL (started on first use)."""
+		mgr = shared_manager(self.base_ws_url, CombinedStreamProtocol, ping_interval=150, name="AsterWS")
+		await mgr.start()
+		return mgr
+
+	async def subscribe(self, streams: Iterable[str], id_: int = 1, combined: bool = False,
+						maxsize: int = 0, typed: bool = False, policy: Optional[str] = None) -> AsyncIterable[Any]:
+		"""Subscribe on the shared connection and iterate messages.
+
+		Yields {"stream", "data"} envelopes when combined=True, otherwise the bare
+		event payload. Request ids are assigned by the connection manager; id_ is
+		kept for backwards compatibility. Leaving the loop releases the subscription.
+		typed=True decodes bookTicker/trade/depth payloads into common.ws_decode events;
+		policy selects latest/ring/lossless delivery (common.delivery).
+		"""
+		mgr = await self.manager()
+		sub = await mgr.subscribe(*streams, maxsize=maxsize, typed=typed, policy=policy)
+		try:
+			async for stream, data in sub:
+				yield {"stream": stream, "data": data} if combined else data
+		finally:
+			await mgr.unsubscribe(sub)
 
 	async def unsubscribe(self, streams: Iterable[str], id_: int = 1) -> Any:
-		async with await self.connect("/ws") as ws:
-			payload = {"method": "UNSUBSCRIBE", "params": list(streams), "id": id_}
-			await ws.send(json.dumps(payload))
-			return await ws.recv()
+		"""Unsubscribe streams (for every local subscriber) on the shared connection; returns the server ack."""
+		mgr = await self.manager()
+		return await mgr.unsubscribe_streams(list(streams))
+
+	async def close(self) -> None:
+		mgr = find_shared_manager(self.base_ws_url, CombinedStreamProtocol)
+		if mgr is not None:
+			await mgr.close()
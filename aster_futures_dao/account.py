@@ -1,4 +1,7 @@
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Iterator
+
+from common.tracing import traced
 
 
 class AccountDAO:
@@ -118,6 +121,7 @@ class AccountDAO:
             params["recvWindow"] = recv_window
         return self.client.request("GET", "/fapi/v1/positionMargin/history", params=params, signed=True)
     
+    @traced("aster_futures.account.get_position_risk")
     def get_position_risk(self, symbol: Optional[str] = None, recv_window: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         用户持仓风险V2
@@ -192,6 +196,99 @@ class AccountDAO:
             params["recvWindow"] = recv_window
         return self.client.request("GET", "/fapi/v1/income", params=params, signed=True)
     
+    # ---- 分页生成器：成交按 fromId、资金流水按 time 游标逐页返回，用于增量同步（aster_futures_dao.history） ----
+    # limiter 为带 acquire(weight) 的限速器（如 common.ratelimit.TokenBucket）
+    
+    USER_TRADES_WEIGHT = 5
+    INCOME_WEIGHT = 30
+    USER_TRADES_MAX_SPAN_MS = 7 * 86400 * 1000
+    
+    def iter_user_trades(self, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                         from_id: Optional[int] = None, limit: int = 1000, limiter: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        逐页获取账户成交历史
+        
+        只给 start_time 时按 startTime/endTime（跨度不超过7天）逐段找到第一页，之后按 fromId 游标翻页；
+        成交时间超过 end_time 的行被截掉。
+        
+        Args:
+            symbol: 交易对
+            start_time: 起始时间（毫秒，含）
+            end_time: 结束时间（毫秒，含），默认当前时间
+            from_id: 起始成交ID（含），优先于 start_time
+            limit: 每页数量，最大1000
+            limiter: 限速器
+        """
+        if from_id is None and start_time is None:
+            raise ValueError("start_time 和 from_id 至少指定一个")
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        while True:
+            if limiter is not None:
+                limiter.acquire(self.USER_TRADES_WEIGHT)
+            if from_id is None:
+                if start_time > end_time:
+                    return
+                stop = min(start_time + self.USER_TRADES_MAX_SPAN_MS - 1, end_time)
+                page = self.get_user_trades(symbol, start_time=start_time, end_time=stop, limit=limit)
+                if not page:
+                    start_time = stop + 1
+                    continue
+            else:
+                page = self.get_user_trades(symbol, from_id=from_id, limit=limit)
+                if not page:
+                    return
+            if int(page[-1]["time"]) > end_time:
+                page = [row for row in page if int(row["time"]) <= end_time]
+                if page:
+                    yield page
+                return
+            yield page
+            if from_id is not None and len(page) < limit:
+                return
+            from_id = int(page[-1]["id"]) + 1
+    
+    def iter_income_history(self, start_time: int, end_time: Optional[int] = None, symbol: Optional[str] = None,
+                            income_type: Optional[str] = None, limit: int = 1000,
+                            limiter: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        逐页获取账户损益资金流水（按 time 游标）
+        
+        同一毫秒可能有多条流水被分到两页，下一页从上一页最后的时间（含）开始，并去掉边界上已返回的 tranId。
+        
+        Args:
+            start_time: 起始时间（毫秒，含）
+            end_time: 结束时间（毫秒，含），默认当前时间
+            symbol: 交易对
+            income_type: 收益类型
+            limit: 每页数量，最大1000
+            limiter: 限速器
+        """
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        cursor = start_time
+        boundary: set = set()
+        while cursor <= end_time:
+            if limiter is not None:
+                limiter.acquire(self.INCOME_WEIGHT)
+            page = self.get_income_history(symbol=symbol, income_type=income_type, start_time=cursor,
+                                           end_time=end_time, limit=limit)
+            if not page:
+                return
+            full = len(page) >= limit
+            page = [row for row in page if (row.get("incomeType"), str(row.get("tranId"))) not in boundary]
+            last = int(page[-1]["time"]) if page else cursor
+            if page:
+                yield page
+            if not full:
+                return
+            if last == cursor and not page:
+                # 整页都是同一毫秒且都已返回过，跳过该毫秒避免死循环
+                cursor += 1
+                boundary = set()
+                continue
+            boundary = {(row.get("incomeType"), str(row.get("tranId"))) for row in page if int(row["time"]) == last} | (
+                boundary if last == cursor else set())
+            cursor = last
+    
     def get_leverage_bracket(self, symbol: Optional[str] = None, recv_window: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         杠杆分层标准
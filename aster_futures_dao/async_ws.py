@@ -0,0 +1,137 @@
+from typing import Iterable, Optional
+
+from common.market_table import ARRAY_STREAMS, MarketTable
+from common.ws_manager import CombinedStreamProtocol, Subscription, WSConnectionManager
+
+# 兼容旧名称：订阅队列现由 common.ws_manager 提供
+StreamQueue = Subscription
+
+
+class AsyncAsterFuturesWS(WSConnectionManager):
+    """
+    Aster Futures 异步 WebSocket 客户端
+
+    所有订阅复用一个组合流连接（/stream?streams=a/b/c），断线后按带抖动的指数退避重连，
+    重连时自动恢复全部订阅；消息分发到各订阅者的 asyncio 队列，不使用线程和回调。
+    连接、回执跟踪和扇出由 common.ws_manager.WSConnectionManager 实现。
+
+    示例:
+        ws = AsyncAsterFuturesWS()
+        await ws.start()
+        q = await ws.subscribe_book_ticker("ASTERUSDT")
+        async for stream, data in q:
+            ...
+
+    Args:
+        base_url: WebSocket 地址（不含 /ws、/stream 路径）
+        debug: 是否打印调试日志
+        backoff_initial: 首次重连等待时间（秒）
+        backoff_max: 重连等待时间上限（秒）
+        ack_timeout: 等待 SUBSCRIBE/UNSUBSCRIBE 回执的超时时间（秒）
+        max_url_streams: 连接时放在 URL 中的流数量上限，其余通过 SUBSCRIBE 补订
+        ping_interval: websockets 心跳间隔（秒）
+        rotate_after: 连接建立多久后先建后断地轮换（秒），建议小于交易所 24 小时强制断开的时间；None 不轮换
+        rotation_overlap: 轮换时新旧连接的重叠时间（秒），重叠期间的重复消息按更新/成交 id 去重
+        dedup_grace: 旧连接关闭后继续去重的时间（秒）
+    """
+
+    def __init__(self, base_url: str = "wss://fstream.asterdex.com", debug: bool = False,
+                 backoff_initial: float = 0.5, backoff_max: float = 30.0, ack_timeout: float = 10.0,
+                 max_url_streams: int = 100, ping_interval: Optional[float] = 60.0,
+                 rotate_after: Optional[float] = None, rotation_overlap: float = 2.0, dedup_grace: float = 2.0):
+        base = base_url.rstrip("/")
+        for suffix in ("/ws", "/stream"):
+            if base.endswith(suffix):
+                base = base[: -len(suffix)]
+        super().__init__(base, CombinedStreamProtocol(max_url_streams), debug=debug,
+                         backoff_initial=backoff_initial, backoff_max=backoff_max, ack_timeout=ack_timeout,
+                         ping_interval=ping_interval, name="AsyncAsterFuturesWS", rotate_after=rotate_after,
+                         rotation_overlap=rotation_overlap, dedup_grace=dedup_grace)
+        self.max_url_streams = max_url_streams
+
+    async def subscribe(self, *streams: str, maxsize: int = 0, queue: Optional[StreamQueue] = None,
+                        typed: bool = False, policy: Optional[str] = None,
+                        symbols: Optional[Iterable[str]] = None) -> StreamQueue:
+        """
+        订阅一个或多个数据流，返回接收这些流消息的队列
+
+        同一个流可以有多个订阅者，各自拥有独立队列。未连接时只登记订阅，连接建立后自动生效。
+
+        Args:
+            streams: 数据流名称，如 "asterusdt@bookTicker"
+            maxsize: 队列长度上限，0 表示不限
+            queue: 复用已有队列（把新的流加到同一个队列）
+            typed: 是否把 bookTicker/trade/depth 解码为 common.ws_decode 中的事件对象
+            policy: 投递策略 latest / ring / lossless（见 common.delivery），默认由 maxsize 决定
+            symbols: 全市场数组流只投递这些交易对（其余元素不解析）
+        """
+        return await super().subscribe(*streams, maxsize=maxsize, subscription=queue, typed=typed, policy=policy,
+                                       symbols=[s.upper() for s in symbols] if symbols else None)
+
+    async def subscribe_ticker(self, symbol: str, maxsize: int = 0) -> StreamQueue:
+        """订阅24hr价格变动数据流"""
+        return await self.subscribe(f"{symbol.lower()}@ticker", maxsize=maxsize)
+
+    async def subscribe_depth(self, symbol: str, levels: int = 5, maxsize: int = 0, typed: bool = False,
+                              policy: Optional[str] = None) -> StreamQueue:
+        """订阅深度数据流"""
+        return await self.subscribe(f"{symbol.lower()}@depth{levels}", maxsize=maxsize, typed=typed, policy=policy)
+
+    async def subscribe_trades(self, symbol: str, maxsize: int = 0, typed: bool = False,
+                               policy: Optional[str] = None) -> StreamQueue:
+        """订阅交易数据流"""
+        return await self.subscribe(f"{symbol.lower()}@trade", maxsize=maxsize, typed=typed, policy=policy)
+
+    async def subscribe_agg_trades(self, symbol: str, maxsize: int = 0) -> StreamQueue:
+        """订阅归集交易数据流"""
+        return await self.subscribe(f"{symbol.lower()}@aggTrade", maxsize=maxsize)
+
+    async def subscribe_kline(self, symbol: str, interval: str, maxsize: int = 0) -> StreamQueue:
+        """订阅K线数据流"""
+        return await self.subscribe(f"{symbol.lower()}@kline_{interval}", maxsize=maxsize)
+
+    async def subscribe_mini_ticker(self, symbol: str, maxsize: int = 0) -> StreamQueue:
+        """订阅精简ticker数据流"""
+        return await self.subscribe(f"{symbol.lower()}@miniTicker", maxsize=maxsize)
+
+    async def subscribe_book_ticker(self, symbol: str, maxsize: int = 0, typed: bool = False,
+                                    policy: Optional[str] = None) -> StreamQueue:
+        """订阅最优挂单数据流"""
+        return await self.subscribe(f"{symbol.lower()}@bookTicker", maxsize=maxsize, typed=typed, policy=policy)
+
+    async def subscribe_mark_price(self, symbol: str, maxsize: int = 0) -> StreamQueue:
+        """订阅标记价格数据流"""
+        return await self.subscribe(f"{symbol.lower()}@markPrice", maxsize=maxsize)
+
+    async def subscribe_all_mark_price(self, maxsize: int = 0, symbols: Optional[Iterable[str]] = None) -> StreamQueue:
+        """订阅全市场标记价格数据流（指定 symbols 时只解析并投递这些交易对）"""
+        return await self.subscribe("!markPrice@arr", maxsize=maxsize, symbols=symbols)
+
+    async def subscribe_all_mini_ticker(self, maxsize: int = 0, symbols: Optional[Iterable[str]] = None) -> StreamQueue:
+        """订阅全市场精简ticker数据流（指定 symbols 时只解析并投递这些交易对）"""
+        return await self.subscribe("!miniTicker@arr", maxsize=maxsize, symbols=symbols)
+
+    async def subscribe_all_ticker(self, maxsize: int = 0, symbols: Optional[Iterable[str]] = None) -> StreamQueue:
+        """订阅全市场ticker数据流（指定 symbols 时只解析并投递这些交易对）"""
+        return await self.subscribe("!ticker@arr", maxsize=maxsize, symbols=symbols)
+
+    async def market_table(self, stream: str = "!markPrice@arr") -> MarketTable:
+        """
+        订阅全市场数组流并维护列式快照表（NumPy），每帧推送原地更新
+
+        Args:
+            stream: !markPrice@arr / !ticker@arr / !miniTicker@arr
+        """
+        if stream not in ARRAY_STREAMS:
+            raise ValueError(f"不支持的全市场数组流: {stream}")
+        table = MarketTable(ARRAY_STREAMS[stream])
+        await self.subscribe_table(stream, table)
+        return table
+
+    async def subscribe_all_book_ticker(self, maxsize: int = 0) -> StreamQueue:
+        """订阅全市场最优挂单数据流"""
+        return await self.subscribe("!bookTicker", maxsize=maxsize)
+
+    async def subscribe_user_data(self, listen_key: str, maxsize: int = 0) -> StreamQueue:
+        """订阅用户数据流（listenKey 由 POST /fapi/v1/listenKey 获取）"""
+        return await self.subscribe(listen_key, maxsize=maxsize)
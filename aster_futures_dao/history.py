@@ -0,0 +1,146 @@
+"""
+Aster 合约账户历史增量同步（资金流水、成交）到本地账本 common.ledger.LedgerStore
+
+    aster_income: 资金流水（资金费、手续费、已实现盈亏、划转...），主键 (tran_id, income_type)
+                  —— tranId 只在同一种流水类型内唯一
+    aster_trades: 账户成交，主键 (symbol, id)
+
+资金流水按 time 游标、成交按 fromId 游标增量拉取，sync_state 中记录每个数据流的高水位；
+资金费 / 手续费 / 已实现盈亏汇总直接查本地库（income_totals），不再访问交易所。
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+from common.ledger import LedgerStore
+
+from .account import AccountDAO
+
+INCOME_TABLE = "aster_income"
+TRADES_TABLE = "aster_trades"
+
+INCOME_COLUMNS = [
+    ("tran_id", "TEXT"), ("income_type", "TEXT"), ("symbol", "TEXT"), ("asset", "TEXT"), ("income", "REAL"),
+    ("info", "TEXT"), ("trade_id", "TEXT"), ("time", "INTEGER"), ("raw", "TEXT"),
+]
+TRADES_COLUMNS = [
+    ("symbol", "TEXT"), ("id", "INTEGER"), ("order_id", "INTEGER"), ("side", "TEXT"), ("position_side", "TEXT"),
+    ("price", "REAL"), ("qty", "REAL"), ("quote_qty", "REAL"), ("realized_pnl", "REAL"), ("commission", "REAL"),
+    ("commission_asset", "TEXT"), ("maker", "INTEGER"), ("buyer", "INTEGER"), ("time", "INTEGER"), ("raw", "TEXT"),
+]
+
+
+def _num(value: Any) -> Optional[float]:
+    return float(value) if value not in (None, "") else None
+
+
+def income_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "tran_id": str(r.get("tranId")), "income_type": r.get("incomeType"), "symbol": r.get("symbol") or "",
+        "asset": r.get("asset"), "income": _num(r.get("income")), "info": r.get("info"),
+        "trade_id": str(r.get("tradeId") or ""), "time": int(r["time"]), "raw": r,
+    }
+
+
+def trade_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "symbol": r.get("symbol"), "id": int(r["id"]), "order_id": r.get("orderId"), "side": r.get("side"),
+        "position_side": r.get("positionSide"), "price": _num(r.get("price")), "qty": _num(r.get("qty")),
+        "quote_qty": _num(r.get("quoteQty")), "realized_pnl": _num(r.get("realizedPnl")),
+        "commission": _num(r.get("commission")), "commission_asset": r.get("commissionAsset"),
+        "maker": r.get("maker"), "buyer": r.get("buyer"), "time": int(r["time"]), "raw": r,
+    }
+
+
+def income_totals(store: LedgerStore, symbol: Optional[str] = None, start_ms: Optional[int] = None,
+                  end_ms: Optional[int] = None, income_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    本地资金流水汇总（按交易对、类型、资产），走 (symbol, income_type, time) 索引
+
+    Returns:
+        [{"symbol", "income_type", "asset", "n", "total"}]
+    """
+    where, params = [], []
+    if symbol is not None:
+        where.append("symbol = ?")
+        params.append(symbol)
+    if income_types:
+        where.append(f"income_type IN ({', '.join('?' * len(income_types))})")
+        params.extend(income_types)
+    if start_ms is not None:
+        where.append("time >= ?")
+        params.append(start_ms)
+    if end_ms is not None:
+        where.append("time <= ?")
+        params.append(end_ms)
+    sql = (f"SELECT symbol, income_type, asset, count(*) AS n, sum(income) AS total FROM {INCOME_TABLE}"
+           f"{' WHERE ' + ' AND '.join(where) if where else ''} GROUP BY symbol, income_type, asset "
+           "ORDER BY symbol, income_type")
+    return [dict(r) for r in store.query(sql, params)]
+
+
+class AccountHistorySync:
+    """
+    Aster 合约账户历史增量同步
+
+    Args:
+        account: AccountDAO 或 AsterFuturesClient
+        store: 本地账本
+        limiter: 限速器（common.ratelimit.TokenBucket），None 表示不限速
+        initial_lookback_ms: 首次同步且未指定 since_ms 时回溯的时长，默认90天
+        overlap_ms: 资金流水增量同步时从高水位往前重叠的时长（补上晚到的流水，重复行按主键去掉）
+    """
+
+    def __init__(self, account: Any, store: LedgerStore, limiter: Any = None,
+                 initial_lookback_ms: int = 90 * 86400 * 1000, overlap_ms: int = 60_000):
+        self.account = account if isinstance(account, AccountDAO) else AccountDAO(account)
+        self.store = store
+        self.limiter = limiter
+        self.initial_lookback_ms = initial_lookback_ms
+        self.overlap_ms = overlap_ms
+        store.ensure_table(INCOME_TABLE, INCOME_COLUMNS, key=["tran_id", "income_type"],
+                           indexes=[("symbol", "income_type", "time"), ("income_type", "time"), ("time",)])
+        store.ensure_table(TRADES_TABLE, TRADES_COLUMNS, key=["symbol", "id"],
+                           indexes=[("symbol", "time"), ("order_id",), ("time",)])
+
+    def _start(self, since_ms: Optional[int]) -> int:
+        if since_ms is not None:
+            return since_ms
+        return int(time.time() * 1000) - self.initial_lookback_ms
+
+    def sync_income(self, symbol: Optional[str] = None, income_type: Optional[str] = None,
+                    since_ms: Optional[int] = None) -> Dict[str, Any]:
+        """同步资金流水：从高水位（减去 overlap_ms）按时间往后翻页"""
+        key = f"aster.income:{symbol or '*'}:{income_type or '*'}"
+        hwm = self.store.state(key)["hwm"]
+        start = hwm - self.overlap_ms if hwm is not None else self._start(since_ms)
+        pages = fetched = added = 0
+        for page in self.account.iter_income_history(start, symbol=symbol, income_type=income_type,
+                                                     limiter=self.limiter):
+            pages += 1
+            fetched += len(page)
+            added += self.store.upsert(INCOME_TABLE, [income_row(r) for r in page])
+            # 按时间升序翻页，每页写入后即可推进高水位
+            self.store.set_state(key, hwm=int(page[-1]["time"]))
+        self.store.set_state(key, added=added)
+        return {"stream": key, "pages": pages, "fetched": fetched, "added": added, "hwm": self.store.state(key)["hwm"]}
+
+    def sync_trades(self, symbol: str, since_ms: Optional[int] = None) -> Dict[str, Any]:
+        """同步账户成交：已有记录时从最大成交ID + 1 开始按 fromId 翻页，否则从 since_ms 按时间找第一页"""
+        key = f"aster.trades:{symbol}"
+        state = self.store.state(key)
+        from_id = int(state["cursor"]) + 1 if state["cursor"] is not None else None
+        start = None if from_id is not None else self._start(since_ms)
+        pages = fetched = added = 0
+        for page in self.account.iter_user_trades(symbol, start_time=start, from_id=from_id, limiter=self.limiter):
+            pages += 1
+            fetched += len(page)
+            added += self.store.upsert(TRADES_TABLE, [trade_row(r) for r in page])
+            self.store.set_state(key, hwm=int(page[-1]["time"]), cursor=str(page[-1]["id"]))
+        self.store.set_state(key, added=added)
+        state = self.store.state(key)
+        return {"stream": key, "pages": pages, "fetched": fetched, "added": added, "hwm": state["hwm"],
+                "cursor": state["cursor"]}
+
+    def income_totals(self, symbol: Optional[str] = None, start_ms: Optional[int] = None,
+                      end_ms: Optional[int] = None, income_types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return income_totals(self.store, symbol, start_ms, end_ms, income_types)
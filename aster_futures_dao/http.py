@@ -1,8 +1,37 @@
 import time
 import hmac
 import hashlib
+import logging
 import requests
 from typing import Dict, Any, Optional
+from urllib.parse import urlencode
+
+from common.deadline import Deadline, EndpointTimeout, TimeoutPolicy, call_deadline, scoped
+from common.log import enable_debug, get_logger
+from common.tracing import span
+from common.transport import HttpTransport, Transport
+
+log = get_logger("aster_futures.http")
+
+# 按接口的超时（连接、读取、单次调用含重试的总预算，秒）：下单/撤单/查单短，历史查询长
+DEFAULT_TIMEOUTS = TimeoutPolicy(EndpointTimeout(3.0, 10.0, 15.0), [
+    ("POST", "/fapi/v1/order", EndpointTimeout(1.0, 2.5, 3.5)),
+    ("DELETE", "/fapi/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+    ("GET", "/fapi/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+    ("*", "/fapi/v1/batchOrders", EndpointTimeout(1.0, 3.0, 4.0)),
+    ("DELETE", "/fapi/v1/allOpenOrders", EndpointTimeout(1.0, 2.5, 3.5)),
+    ("GET", "/fapi/v1/openOrders", EndpointTimeout(1.0, 3.0, 4.0)),
+    ("GET", "/fapi/v2/positionRisk", EndpointTimeout(1.0, 3.0, 4.0)),
+    ("GET", "/fapi/v1/time", EndpointTimeout(1.0, 2.0, 3.0)),
+    ("GET", "/fapi/v1/ticker/bookTicker", EndpointTimeout(1.0, 2.0, 3.0)),
+    ("GET", "/fapi/v1/depth", EndpointTimeout(1.0, 2.0, 3.0)),
+    ("GET", "/fapi/v1/userTrades", EndpointTimeout(3.0, 30.0, 90.0)),
+    ("GET", "/fapi/v1/income", EndpointTimeout(3.0, 30.0, 90.0)),
+    ("GET", "/fapi/v1/allOrders", EndpointTimeout(3.0, 30.0, 90.0)),
+    ("GET", "/fapi/v1/klines", EndpointTimeout(3.0, 20.0, 60.0)),
+    ("GET", "/fapi/v1/aggTrades", EndpointTimeout(3.0, 20.0, 60.0)),
+    ("GET", "/fapi/v1/fundingRate", EndpointTimeout(3.0, 20.0, 60.0)),
+])
 
 
 class AsterFuturesClient:
@@ -11,16 +40,22 @@ class AsterFuturesClient:
     支持合约交易的HTTP请求和签名
     """
     
-    def __init__(self, api_key: str, api_secret: str, base_url: str = "https://fapi.asterdex.com", debug: bool = False):
+    def __init__(self, api_key: str, api_secret: str, base_url: str = "https://fapi.asterdex.com", debug: bool = False,
+                 transport: Optional[Transport] = None, timeouts: Optional[TimeoutPolicy] = None):
         self.api_key = api_key
         self.api_secret = api_secret
         self.base_url = base_url.rstrip('/')
         self.debug = debug
-        self.session = requests.Session()
-        self.session.headers.update({
+        if debug:
+            enable_debug("aster_futures.http")
+        # 传输层可替换为录制/回放实现；传输层可能被多个客户端共享，所以请求头按请求传递
+        self.transport = transport or HttpTransport()
+        self.session = self.transport.session
+        self.timeouts = timeouts or DEFAULT_TIMEOUTS
+        self.headers = {
             'X-MBX-APIKEY': self.api_key,
             'Content-Type': 'application/x-www-form-urlencoded'
-        })
+        }
         
         # 时间同步相关
         self._time_offset = 0
@@ -29,13 +64,14 @@ class AsterFuturesClient:
     def _get_server_time(self) -> int:
         """获取服务器时间"""
         try:
-            resp = self.session.get(f"{self.base_url}/fapi/v1/time", timeout=10)
+            spec = self.timeouts.lookup("GET", "/fapi/v1/time")
+            timeout = call_deadline(spec).timeout(spec.connect, spec.read, "GET /fapi/v1/time")
+            resp = self.transport.request("GET", f"{self.base_url}/fapi/v1/time", headers=self.headers, timeout=timeout)
             resp.raise_for_status()
             data = resp.json()
             return int(data.get('serverTime', 0))
         except Exception as e:
-            if self.debug:
-                print(f"[AsterFuturesClient] 获取服务器时间失败: {e}")
+            log.warning("获取服务器时间失败: %s", e)
             return int(time.time() * 1000)
     
     def _sync_time(self):
@@ -45,11 +81,9 @@ class AsterFuturesClient:
             local_time = int(time.time() * 1000)
             self._time_offset = server_time - local_time
             self._last_sync_time = local_time
-            if self.debug:
-                print(f"[AsterFuturesClient] 时间同步: server={server_time}, local={local_time}, offset={self._time_offset}ms")
+            log.debug("时间同步: server=%s, local=%s, offset=%sms", server_time, local_time, self._time_offset)
         except Exception as e:
-            if self.debug:
-                print(f"[AsterFuturesClient] 时间同步失败: {e}")
+            log.warning("时间同步失败: %s", e)
     
     def _get_timestamp(self) -> int:
         """获取当前时间戳（毫秒）"""
@@ -83,31 +117,25 @@ class AsterFuturesClient:
             'recvWindow', 'timestamp'
         ]
         
-        # 按指定顺序构建查询字符串
-        query_parts = []
-        for key in param_order:
-            if key in filtered_params:
-                query_parts.append(f"{key}={filtered_params[key]}")
+        # 按指定顺序重建参数，其他参数按字母顺序排在后面
+        ordered = {key: filtered_params[key] for key in param_order if key in filtered_params}
+        for key in sorted(k for k in filtered_params if k not in param_order):
+            ordered[key] = filtered_params[key]
         
-        # 添加其他参数（按字母顺序）
-        remaining_params = {k: v for k, v in filtered_params.items() if k not in param_order}
-        for key in sorted(remaining_params.keys()):
-            query_parts.append(f"{key}={remaining_params[key]}")
-        
-        query_string = '&'.join(query_parts)
+        # 签名原文必须与实际发送的内容逐字节一致：requests 按字典顺序并以 urlencode 编码发送
+        query_string = urlencode(ordered)
         
         # 创建签名
         signature = self._create_signature(query_string)
+        params = ordered
         params['signature'] = signature
         
-        if self.debug:
-            print(f"[AsterFuturesClient] 签名查询字符串: {query_string}")
-            print(f"[AsterFuturesClient] 签名: {signature}")
+        log.debug("签名查询字符串: %s 签名: %s", query_string, signature)
         
         return params
     
     def request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, 
-                signed: bool = False, _retry: int = 0) -> Any:
+                signed: bool = False, _retry: int = 0, _deadline: Optional[Deadline] = None) -> Any:
         """
         发送HTTP请求
         
@@ -117,14 +145,21 @@ class AsterFuturesClient:
             params: 请求参数
             signed: 是否需要签名
             _retry: 重试次数（内部使用）
+            _deadline: 本次调用的截止时间（内部使用，重试沿用，只能使用剩余预算）
+
+        超时按接口取（self.timeouts），并受调用方 common.deadline.deadline() 的限制；预算用完时抛 DeadlineExceeded
         """
         if params is None:
             params = {}
+        spec = self.timeouts.lookup(method, path)
+        dl = call_deadline(spec, _deadline)
         
         # 同步时间（每5分钟同步一次）
         current_time = int(time.time() * 1000)
         if current_time - self._last_sync_time > 300000:  # 5分钟
-            self._sync_time()
+            with scoped(dl):
+                self._sync_time()
+        timeout = dl.timeout(spec.connect, spec.read, f"{method.upper()} {path}")
         
         # 准备参数
         if signed:
@@ -132,21 +167,18 @@ class AsterFuturesClient:
         
         url = f"{self.base_url}{path}"
         
-        if self.debug:
-            print(f"[AsterFuturesClient] {method} {url}")
-            print(f"[AsterFuturesClient] 参数: {params}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s %s 参数: %s", method, url, dict(params))
         
         try:
-            if method.upper() == 'GET':
-                resp = self.session.get(url, params=params, timeout=30)
-            elif method.upper() == 'POST':
-                resp = self.session.post(url, data=params, timeout=30)
-            elif method.upper() == 'DELETE':
-                resp = self.session.delete(url, data=params, timeout=30)
-            elif method.upper() == 'PUT':
-                resp = self.session.put(url, data=params, timeout=30)
-            else:
-                raise ValueError(f"不支持的HTTP方法: {method}")
+            with span(f"{method.upper()} {path}", cat="http", venue="aster_futures", retry=_retry) as sp:
+                if method.upper() == 'GET':
+                    resp = self.transport.request('GET', url, params=params, headers=self.headers, timeout=timeout)
+                elif method.upper() in ('POST', 'DELETE', 'PUT'):
+                    resp = self.transport.request(method.upper(), url, data=params, headers=self.headers, timeout=timeout)
+                else:
+                    raise ValueError(f"不支持的HTTP方法: {method}")
+                sp.set(status=resp.status_code)
             
             resp.raise_for_status()
             return resp.json()
@@ -160,17 +192,17 @@ class AsterFuturesClient:
                     
                     # 处理时间戳错误
                     if error_code == -1021 and _retry < 2:  # INVALID_TIMESTAMP
-                        if self.debug:
-                            print(f"[AsterFuturesClient] 检测到时间戳错误，重新同步时间...")
-                        self._sync_time()
-                        return self.request(method, path, params, signed, _retry + 1)
+                        log.debug("检测到时间戳错误，重新同步时间...")
+                        with scoped(dl):
+                            self._sync_time()
+                        return self.request(method, path, params, signed, _retry + 1, dl)
                     
                     # 处理签名错误
                     elif error_code == -1022 and _retry < 2:  # INVALID_SIGNATURE
-                        if self.debug:
-                            print(f"[AsterFuturesClient] 检测到签名错误，重新同步时间...")
-                        self._sync_time()
-                        return self.request(method, path, params, signed, _retry + 1)
+                        log.debug("检测到签名错误，重新同步时间...")
+                        with scoped(dl):
+                            self._sync_time()
+                        return self.request(method, path, params, signed, _retry + 1, dl)
                     
                     raise requests.HTTPError(f"HTTP {resp.status_code}: {error_data}")
                 except ValueError:
@@ -179,6 +211,5 @@ class AsterFuturesClient:
                 raise requests.HTTPError(f"HTTP {resp.status_code}: {resp.text}")
         
         except Exception as e:
-            if self.debug:
-                print(f"[AsterFuturesClient] 请求异常: {e}")
+            log.debug("请求异常: %s", e)
             raise
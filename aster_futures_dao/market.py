@@ -1,4 +1,5 @@
-from typing import Dict, Any, Optional, List
+import time
+from typing import Dict, Any, Optional, List, Iterator, Callable
 
 
 class MarketDataDAO:
@@ -223,3 +224,163 @@ class MarketDataDAO:
         if symbol is not None:
             params["symbol"] = symbol
         return self.client.request("GET", "/fapi/v1/ticker/bookTicker", params=params)
+    
+    # ---- 分页生成器：按 startTime / fromId 游标逐页返回，用于长时间范围的回补 ----
+    # limiter 为带 acquire(weight) 的限速器（如 common.ratelimit.TokenBucket），每页请求前按接口权重取令牌
+    
+    AGG_TRADES_WEIGHT = 20
+    HISTORICAL_TRADES_WEIGHT = 20
+    FUNDING_RATE_WEIGHT = 1
+    AGG_TRADES_MAX_SPAN_MS = 3600 * 1000
+    
+    @staticmethod
+    def kline_weight(limit: int) -> int:
+        """K线类接口（klines / markPriceKlines / indexPriceKlines）按 limit 计的请求权重"""
+        if limit < 100:
+            return 1
+        if limit < 500:
+            return 2
+        if limit <= 1000:
+            return 5
+        return 10
+    
+    def _iter_kline_pages(self, fetch: Callable[..., List[List]], start_time: int, end_time: Optional[int],
+                          limit: int, limiter: Any) -> Iterator[List[List]]:
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        cursor = start_time
+        while cursor <= end_time:
+            if limiter is not None:
+                limiter.acquire(self.kline_weight(limit))
+            page = fetch(start_time=cursor, end_time=end_time, limit=limit)
+            if not page:
+                return
+            yield page
+            if len(page) < limit:
+                return
+            cursor = int(page[-1][0]) + 1
+    
+    def iter_klines(self, symbol: str, interval: str, start_time: int, end_time: Optional[int] = None,
+                    limit: int = 1500, limiter: Any = None) -> Iterator[List[List]]:
+        """
+        逐页获取K线（按开盘时间游标）
+        
+        Args:
+            symbol: 交易对
+            interval: K线间隔
+            start_time: 起始时间（毫秒，含）
+            end_time: 结束时间（毫秒，含），默认当前时间
+            limit: 每页数量，最大1500
+            limiter: 限速器
+        """
+        fetch = lambda **kw: self.klines(symbol, interval, **kw)
+        return self._iter_kline_pages(fetch, start_time, end_time, limit, limiter)
+    
+    def iter_mark_price_klines(self, symbol: str, interval: str, start_time: int, end_time: Optional[int] = None,
+                               limit: int = 1500, limiter: Any = None) -> Iterator[List[List]]:
+        """逐页获取标记价格K线，参数同 iter_klines"""
+        fetch = lambda **kw: self.mark_price_klines(symbol, interval, **kw)
+        return self._iter_kline_pages(fetch, start_time, end_time, limit, limiter)
+    
+    def iter_index_price_klines(self, pair: str, interval: str, start_time: int, end_time: Optional[int] = None,
+                                limit: int = 1500, limiter: Any = None) -> Iterator[List[List]]:
+        """逐页获取价格指数K线，参数同 iter_klines"""
+        fetch = lambda **kw: self.index_price_klines(pair, interval, **kw)
+        return self._iter_kline_pages(fetch, start_time, end_time, limit, limiter)
+    
+    def iter_agg_trades(self, symbol: str, start_time: Optional[int] = None, end_time: Optional[int] = None,
+                        from_id: Optional[int] = None, limit: int = 1000, limiter: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        逐页获取归集交易
+        
+        只给 start_time 时先按 startTime/endTime（跨度不超过1小时）找到第一页，之后按 fromId 游标翻页；
+        成交时间超过 end_time 的行被截掉。
+        
+        Args:
+            symbol: 交易对
+            start_time: 起始时间（毫秒，含）
+            end_time: 结束时间（毫秒，含），默认当前时间
+            from_id: 起始归集成交id（含），优先于 start_time
+            limit: 每页数量，最大1000
+            limiter: 限速器
+        """
+        if from_id is None and start_time is None:
+            raise ValueError("start_time 和 from_id 至少指定一个")
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        while True:
+            if limiter is not None:
+                limiter.acquire(self.AGG_TRADES_WEIGHT)
+            if from_id is None:
+                if start_time > end_time:
+                    return
+                stop = min(start_time + self.AGG_TRADES_MAX_SPAN_MS - 1, end_time)
+                page = self.agg_trades(symbol, start_time=start_time, end_time=stop, limit=limit)
+                if not page:
+                    # 这一小时内没有成交，继续下一小时
+                    start_time = stop + 1
+                    continue
+            else:
+                page = self.agg_trades(symbol, from_id=from_id, limit=limit)
+                if not page:
+                    return
+            if int(page[-1]["T"]) > end_time:
+                page = [row for row in page if int(row["T"]) <= end_time]
+                if page:
+                    yield page
+                return
+            yield page
+            if from_id is not None and len(page) < limit:
+                return
+            from_id = int(page[-1]["a"]) + 1
+    
+    def iter_historical_trades(self, symbol: str, from_id: int, end_id: Optional[int] = None, limit: int = 1000,
+                               limiter: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        逐页获取历史成交（按成交id游标）
+        
+        Args:
+            symbol: 交易对
+            from_id: 起始成交id（含）
+            end_id: 结束成交id（不含），默认直到最新成交
+            limit: 每页数量，最大1000
+            limiter: 限速器
+        """
+        while end_id is None or from_id < end_id:
+            if limiter is not None:
+                limiter.acquire(self.HISTORICAL_TRADES_WEIGHT)
+            page = self.historical_trades(symbol, limit=limit, from_id=from_id)
+            if not page:
+                return
+            if end_id is not None and int(page[-1]["id"]) >= end_id:
+                page = [row for row in page if int(row["id"]) < end_id]
+                if page:
+                    yield page
+                return
+            yield page
+            if len(page) < limit:
+                return
+            from_id = int(page[-1]["id"]) + 1
+    
+    def iter_funding_rate(self, symbol: str, start_time: int, end_time: Optional[int] = None, limit: int = 1000,
+                          limiter: Any = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        逐页获取资金费率历史（按 fundingTime 游标）
+        
+        Args:
+            symbol: 交易对
+            start_time: 起始时间（毫秒，含）
+            end_time: 结束时间（毫秒，含），默认当前时间
+            limit: 每页数量，最大1000
+            limiter: 限速器
+        """
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        cursor = start_time
+        while cursor <= end_time:
+            if limiter is not None:
+                limiter.acquire(self.FUNDING_RATE_WEIGHT)
+            page = self.funding_rate(symbol, start_time=cursor, end_time=end_time, limit=limit)
+            if not page:
+                return
+            yield page
+            if len(page) < limit:
+                return
+            cursor = int(page[-1]["fundingTime"]) + 1
@@ -1,5 +1,8 @@
+import json
 from typing import Dict, Any, Optional, List
 
+from common.tracing import traced
+
 
 class TradeDAO:
     """
@@ -60,6 +63,7 @@ class TradeDAO:
             params["recvWindow"] = recv_window
         return self.client.request("GET", "/fapi/v1/multiAssetsMargin", params=params, signed=True)
     
+    @traced("aster_futures.trade.place_order")
     def place_order(self, symbol: str, side: str, order_type: str, quantity: Optional[float] = None,
                    price: Optional[float] = None, position_side: Optional[str] = None,
                    reduce_only: Optional[bool] = None, new_client_order_id: Optional[str] = None,
@@ -176,6 +180,7 @@ class TradeDAO:
         
         return self.client.request("POST", "/fapi/v1/order/test", params=params, signed=True)
     
+    @traced("aster_futures.trade.batch_orders")
     def batch_orders(self, batch_orders: List[Dict[str, Any]], recv_window: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         批量下单
@@ -184,7 +189,8 @@ class TradeDAO:
             batch_orders: 批量订单列表
             recv_window: 接收窗口时间
         """
-        params = {"batchOrders": batch_orders}
+        # batchOrders 以 JSON 字符串形式提交
+        params = {"batchOrders": json.dumps(batch_orders, separators=(",", ":"))}
         if recv_window is not None:
             params["recvWindow"] = recv_window
         return self.client.request("POST", "/fapi/v1/batchOrders", params=params, signed=True)
@@ -208,6 +214,7 @@ class TradeDAO:
             params["recvWindow"] = recv_window
         return self.client.request("POST", "/fapi/v1/transfer", params=params, signed=True)
     
+    @traced("aster_futures.trade.get_order")
     def get_order(self, symbol: str, order_id: Optional[int] = None, 
                   orig_client_order_id: Optional[str] = None, recv_window: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -228,6 +235,7 @@ class TradeDAO:
             params["recvWindow"] = recv_window
         return self.client.request("GET", "/fapi/v1/order", params=params, signed=True)
     
+    @traced("aster_futures.trade.cancel_order")
     def cancel_order(self, symbol: str, order_id: Optional[int] = None, 
                      orig_client_order_id: Optional[str] = None, recv_window: Optional[int] = None) -> Dict[str, Any]:
         """
@@ -248,6 +256,7 @@ class TradeDAO:
             params["recvWindow"] = recv_window
         return self.client.request("DELETE", "/fapi/v1/order", params=params, signed=True)
     
+    @traced("aster_futures.trade.cancel_all_orders")
     def cancel_all_orders(self, symbol: str, recv_window: Optional[int] = None) -> Dict[str, Any]:
         """
         撤销全部订单
@@ -319,6 +328,7 @@ class TradeDAO:
             params["recvWindow"] = recv_window
         return self.client.request("GET", "/fapi/v1/openOrder", params=params, signed=True)
     
+    @traced("aster_futures.trade.get_open_orders")
     def get_open_orders(self, symbol: Optional[str] = None, recv_window: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         查看当前全部挂单
@@ -1,19 +1,51 @@
 import websocket
 import json
+import logging
 import threading
 import time
 from typing import Callable, Dict, Any, Optional
 
+from common import ws_decode
+from common.delivery import OverlapDeduplicator, StreamWorker, event_id
+from common.log import enable_debug, get_logger
+from common.market_table import ARRAY_STREAMS, MarketTable
+from common.ws_decode import StreamDecoder, select_array_items, split_envelope
+
+log = get_logger("aster_futures.ws")
+
 
 class AsterFuturesWS:
     """
     Aster Futures WebSocket客户端
     提供合约WebSocket数据流订阅功能
+    
+    基于线程和回调；多流复用、自动恢复订阅的 asyncio 版本见 async_ws.AsyncAsterFuturesWS
+
+    typed_events=True 时 bookTicker/trade/depth 处理器收到 common.ws_decode 中的事件对象，否则收到 dict
+
+    默认（delivery=False）在 socket 线程内直接调用处理器，逐条投递、不丢消息。
+    delivery=True 时每个流的处理器在独立的消费线程中执行，socket 线程只负责入队，
+    慢处理器不会拖慢接收；积压按流的投递策略处理（common.delivery）：报价/深度只保留最新值，
+    成交为有界环形缓冲（丢最旧的并计数），用户数据流不丢消息。metrics() 返回各流的排队延迟和丢弃数。
+    处理器需要线程安全、且能接受报价被合并时再开启。
+
+    rotate() 先建后断地轮换连接：新连接建立并订阅全部流，与旧连接重叠 rotation_overlap 秒后再关闭旧连接，
+    重叠期间按更新/成交 id（其他流按消息原文）去重。rotate_interval 指定时后台线程定时轮换，
+    赶在交易所 24 小时强制断开之前换好连接，避免断线重连造成的数据缺口。
     """
     
-    def __init__(self, base_url: str = "wss://fstream.asterdex.com", debug: bool = False):
+    def __init__(self, base_url: str = "wss://fstream.asterdex.com", debug: bool = False, typed_events: bool = False,
+                 delivery: bool = False, rotate_interval: Optional[float] = None, rotation_overlap: float = 2.0,
+                 dedup_grace: float = 2.0):
         self.base_url = base_url
         self.debug = debug
+        if debug:
+            enable_debug("aster_futures.ws")
+        self.decoder = StreamDecoder() if typed_events else None
+        self.delivery = delivery
+        self.workers: Dict[str, StreamWorker] = {}
+        # 全市场数组流的交易对过滤：stream -> 交易对集合
+        self.symbol_filters: Dict[str, frozenset] = {}
         self.ws = None
         self.connected = False
         self.subscriptions = set()
@@ -21,64 +53,109 @@ class AsterFuturesWS:
         self.heartbeat_thread = None
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
+        # 先建后断轮换
+        self.rotate_interval = rotate_interval
+        self.rotation_overlap = rotation_overlap
+        self.dedup_grace = dedup_grace
+        self.dedup = OverlapDeduplicator()
+        self.rotations = 0
+        self._rotate_lock = threading.Lock()
+        # 保护 self.ws 的替换：轮换切换与断线重连不能同时换连接
+        self._ws_lock = threading.Lock()
+        self._opening: Dict[Any, threading.Event] = {}
+        self._rotation_thread = None
+        self._stop_rotation = threading.Event()
         
-    def _log(self, message: str):
-        """调试日志"""
-        if self.debug:
-            print(f"[AsterFuturesWS] {message}")
+    def _log(self, message: str, *args: Any, level: int = logging.DEBUG):
+        """日志（组件 aster_futures.ws，参数在日志线程中格式化）"""
+        log.log(level, message, *args)
     
     def _on_message(self, ws, message: str):
         """处理接收到的消息"""
         try:
-            data = json.loads(message)
-            self._log(f"收到消息: {data}")
+            # 快速路径：组合流消息先取出 stream 名，没有处理器的流不解析 payload
+            stream, body = split_envelope(message)
+            if stream is not None:
+                if stream not in self.message_handlers:
+                    self._log("未找到处理器: %s", stream)
+                    return
+                symbols = self.symbol_filters.get(stream)
+                if symbols is not None and body.startswith("["):
+                    # 只解析需要的交易对，其余元素不构造 dict
+                    payload = select_array_items(body, symbols)
+                    if not payload or self._duplicate(stream, payload, body):
+                        return
+                    self._handle_stream_data(stream, payload)
+                    return
+                payload = ws_decode.loads(body)
+                if self._duplicate(stream, payload, body):
+                    return
+                if self.decoder is not None:
+                    payload = self.decoder.decode(stream, payload)
+                self._handle_stream_data(stream, payload)
+                return
+
+            data = ws_decode.loads(message)
+            self._log("收到消息: %s", data)
             
             # 处理订阅确认
             if 'result' in data and 'id' in data:
                 if data['result'] is None:
-                    self._log(f"订阅成功: {data['id']}")
+                    self._log("订阅成功: %s", data['id'])
                 else:
-                    self._log(f"订阅失败: {data}")
+                    self._log("订阅失败: %s", data, level=logging.WARNING)
                 return
             
             # 处理数据流消息
             if 'stream' in data and 'data' in data:
                 stream = data['stream']
                 payload = data['data']
+                if self._duplicate(stream, payload, message):
+                    return
+                if self.decoder is not None:
+                    payload = self.decoder.decode(stream, payload)
                 self._handle_stream_data(stream, payload)
             else:
                 # 直接处理数据
                 self._handle_stream_data('direct', data)
                 
-        except json.JSONDecodeError as e:
-            self._log(f"JSON解析错误: {e}")
+        except ValueError as e:
+            self._log("JSON解析错误: %s", e, level=logging.WARNING)
         except Exception as e:
-            self._log(f"消息处理错误: {e}")
+            self._log("消息处理错误: %s", e, level=logging.WARNING)
     
+    def _duplicate(self, stream: str, payload: Any, raw: Any) -> bool:
+        """轮换重叠期间，新旧连接都会推送同一事件，只投递第一条"""
+        return self.dedup.active and self.dedup.seen(event_id(stream, payload, raw))
+
     def _handle_stream_data(self, stream: str, data: Any):
         """处理数据流数据"""
         if stream in self.message_handlers:
             try:
                 self.message_handlers[stream](data)
             except Exception as e:
-                self._log(f"消息处理器错误: {e}")
+                self._log("消息处理器错误: %s", e, level=logging.WARNING)
         else:
-            self._log(f"未找到处理器: {stream}")
+            self._log("未找到处理器: %s", stream)
     
     def _on_error(self, ws, error):
         """处理WebSocket错误"""
-        self._log(f"WebSocket错误: {error}")
-        self.connected = False
+        self._log("WebSocket错误: %s", error, level=logging.WARNING)
+        if ws is self.ws:
+            self.connected = False
     
     def _on_close(self, ws, close_status_code, close_msg):
         """处理WebSocket关闭"""
-        self._log(f"WebSocket关闭: {close_status_code} - {close_msg}")
+        self._log("WebSocket关闭: %s - %s", close_status_code, close_msg)
+        if ws is not self.ws:
+            # 轮换下来的旧连接或轮换失败的新连接，当前连接不受影响
+            return
         self.connected = False
         
         # 自动重连
         if self.reconnect_attempts < self.max_reconnect_attempts:
             self.reconnect_attempts += 1
-            self._log(f"尝试重连 ({self.reconnect_attempts}/{self.max_reconnect_attempts})")
+            self._log("尝试重连 (%s/%s)", self.reconnect_attempts, self.max_reconnect_attempts)
             time.sleep(5)
             self.connect()
         else:
@@ -86,31 +163,107 @@ class AsterFuturesWS:
     
     def _on_open(self, ws):
         """处理WebSocket连接打开"""
+        opened = self._opening.get(ws)
+        if opened is not None:
+            # 轮换中的新连接，由 rotate() 负责订阅
+            opened.set()
+            return
         self._log("WebSocket连接已建立")
         self.connected = True
         self.reconnect_attempts = 0
         
         # 重新订阅所有流
         if self.subscriptions:
-            self._log(f"重新订阅 {len(self.subscriptions)} 个流")
+            self._log("重新订阅 %s 个流", len(self.subscriptions))
             self._subscribe_streams(list(self.subscriptions))
     
-    def _subscribe_streams(self, streams: list):
-        """订阅数据流"""
-        if not self.connected or not self.ws:
-            self._log("WebSocket未连接，无法订阅")
-            return
+    def _subscribe_streams(self, streams: list, ws=None, method: str = "SUBSCRIBE"):
+        """订阅数据流（ws 默认为当前连接；显式传入时不检查当前连接状态，用于轮换中的新连接）"""
+        if ws is None:
+            if not self.connected or not self.ws:
+                self._log("WebSocket未连接，无法订阅")
+                return
+            ws = self.ws
         
         # 构建订阅消息
         message = {
-            "method": "SUBSCRIBE",
+            "method": method,
             "params": streams,
             "id": int(time.time() * 1000)
         }
         
-        self._log(f"发送订阅消息: {message}")
-        self.ws.send(json.dumps(message))
+        self._log("发送订阅消息: %s", message)
+        ws.send(json.dumps(message))
     
+    def _new_app(self) -> websocket.WebSocketApp:
+        return websocket.WebSocketApp(
+            self.base_url,
+            on_message=self._on_message,
+            on_error=self._on_error,
+            on_close=self._on_close,
+            on_open=self._on_open
+        )
+
+    def rotate(self, timeout: float = 10, overlap: Optional[float] = None):
+        """
+        先建后断地轮换连接
+
+        1. 建立新连接并订阅当前全部流
+        2. 新旧连接同时接收 overlap 秒（默认 rotation_overlap），重复消息按事件 id 去重
+        3. 补订/退订轮换期间变化的流，切换到新连接后关闭旧连接
+
+        新连接建立失败时抛出异常，旧连接继续使用。重叠期间旧连接断开并已重连到另一条连接时，
+        放弃本次轮换并关闭新连接；旧连接断开但尚未重连时，直接切换到新连接（重连随之跳过）。
+        listenKey 用户数据流的续期仍由调用方负责。
+        """
+        if not self.connected or not self.ws:
+            raise Exception("WebSocket未连接，无法轮换")
+        with self._rotate_lock:
+            start_ws = self.ws
+            self.dedup.start()
+            new_ws = self._new_app()
+            opened = self._opening[new_ws] = threading.Event()
+            try:
+                self._log("开始轮换连接")
+                wst = threading.Thread(target=new_ws.run_forever, daemon=True)
+                wst.start()
+                if not opened.wait(timeout):
+                    new_ws.close()
+                    raise Exception("轮换连接超时")
+                sent = set(self.subscriptions)
+                if sent:
+                    self._subscribe_streams(sorted(sent), ws=new_ws)
+                time.sleep(self.rotation_overlap if overlap is None else overlap)
+                # 重叠期间 subscribe()/unsubscribe() 只作用于旧连接，切换前在新连接上补齐
+                current = set(self.subscriptions)
+                if current - sent:
+                    self._subscribe_streams(sorted(current - sent), ws=new_ws)
+                if sent - current:
+                    self._subscribe_streams(sorted(sent - current), ws=new_ws, method="UNSUBSCRIBE")
+                with self._ws_lock:
+                    if self.ws is not start_ws:
+                        new_ws.close()
+                        raise Exception("轮换期间连接已被重连替换，放弃轮换")
+                    old_ws, self.ws = self.ws, new_ws
+                    # 旧连接可能已在重叠期间断开（connected=False 且重连在等待中）：新连接已订阅，直接接管
+                    self.connected = True
+                    self.reconnect_attempts = 0
+                self.rotations += 1
+                self._log("轮换完成（第 %s 次），关闭旧连接", self.rotations)
+                old_ws.close()
+            finally:
+                self._opening.pop(new_ws, None)
+                self.dedup.finish(self.dedup_grace)
+
+    def _rotation_loop(self):
+        while not self._stop_rotation.wait(self.rotate_interval):
+            if not self.connected:
+                continue
+            try:
+                self.rotate()
+            except Exception as e:
+                self._log("轮换失败: %s", e, level=logging.WARNING)
+
     def connect(self):
         """连接WebSocket"""
         if self.connected:
@@ -118,14 +271,13 @@ class AsterFuturesWS:
             return
         
         try:
-            self._log(f"连接到 {self.base_url}")
-            self.ws = websocket.WebSocketApp(
-                self.base_url,
-                on_message=self._on_message,
-                on_error=self._on_error,
-                on_close=self._on_close,
-                on_open=self._on_open
-            )
+            with self._ws_lock:
+                if self.connected:
+                    # 等待重连期间轮换已切换到新连接
+                    self._log("WebSocket已连接")
+                    return
+                self._log("连接到 %s", self.base_url)
+                self.ws = self._new_app()
             
             # 在新线程中运行WebSocket
             wst = threading.Thread(target=self.ws.run_forever)
@@ -140,30 +292,46 @@ class AsterFuturesWS:
             
             if not self.connected:
                 raise Exception("连接超时")
+
+            if self.rotate_interval and self._rotation_thread is None:
+                self._stop_rotation.clear()
+                self._rotation_thread = threading.Thread(target=self._rotation_loop, name="ws-rotation", daemon=True)
+                self._rotation_thread.start()
                 
         except Exception as e:
-            self._log(f"连接失败: {e}")
+            self._log("连接失败: %s", e, level=logging.WARNING)
             raise
     
     def disconnect(self):
         """断开WebSocket连接"""
+        self._stop_rotation.set()
+        self._rotation_thread = None
         if self.ws:
             self._log("断开WebSocket连接")
             self.ws.close()
             self.connected = False
     
-    def subscribe(self, stream: str, handler: Callable[[Any], None]):
+    def subscribe(self, stream: str, handler: Callable[[Any], None], policy: Optional[str] = None, maxsize: int = 0):
         """
         订阅数据流
         
         Args:
             stream: 数据流名称，如 "btcusdt@ticker"
             handler: 消息处理函数
+            policy: 投递策略 latest / ring / lossless，默认按流类型推断（delivery=False 时忽略）
+            maxsize: ring 策略的缓冲长度，0 表示默认值
         """
-        self._log(f"订阅数据流: {stream}")
+        self._log("订阅数据流: %s", stream)
         
         # 添加处理器
-        self.message_handlers[stream] = handler
+        if self.delivery:
+            self._stop_worker(stream)
+            worker = StreamWorker(stream, handler, policy, maxsize,
+                                  on_error=lambda s, e: self._log("消息处理器错误 %s: %s", s, e, level=logging.WARNING))
+            self.workers[stream] = worker
+            self.message_handlers[stream] = worker.submit
+        else:
+            self.message_handlers[stream] = handler
         self.subscriptions.add(stream)
         
         # 如果已连接，立即订阅
@@ -182,10 +350,12 @@ class AsterFuturesWS:
         Args:
             stream: 数据流名称
         """
-        self._log(f"取消订阅数据流: {stream}")
+        self._log("取消订阅数据流: %s", stream)
         
         if stream in self.message_handlers:
             del self.message_handlers[stream]
+        self.symbol_filters.pop(stream, None)
+        self._stop_worker(stream)
         self.subscriptions.discard(stream)
         
         if self.connected and self.ws:
@@ -196,6 +366,15 @@ class AsterFuturesWS:
             }
             self.ws.send(json.dumps(message))
     
+    def _stop_worker(self, stream: str):
+        worker = self.workers.pop(stream, None)
+        if worker is not None:
+            worker.stop()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各流的投递指标：策略、排队深度、丢弃/合并条数、排队延迟（毫秒）"""
+        return {stream: worker.metrics() for stream, worker in list(self.workers.items())}
+
     def subscribe_ticker(self, symbol: str, handler: Callable[[Any], None]):
         """订阅24hr价格变动数据流"""
         stream = f"{symbol.lower()}@ticker"
@@ -236,20 +415,37 @@ class AsterFuturesWS:
         stream = f"{symbol.lower()}@markPrice"
         self.subscribe(stream, handler)
     
-    def subscribe_all_mark_price(self, handler: Callable[[Any], None]):
-        """订阅全市场标记价格数据流"""
-        stream = "!markPrice@arr"
+    def _subscribe_array(self, stream: str, handler: Callable[[Any], None], symbols: Optional[list]):
+        if symbols:
+            self.symbol_filters[stream] = frozenset(s.upper() for s in symbols)
+        else:
+            self.symbol_filters.pop(stream, None)
         self.subscribe(stream, handler)
+
+    def subscribe_all_mark_price(self, handler: Callable[[Any], None], symbols: Optional[list] = None):
+        """订阅全市场标记价格数据流（指定 symbols 时只解析并回调这些交易对）"""
+        self._subscribe_array("!markPrice@arr", handler, symbols)
     
-    def subscribe_all_mini_ticker(self, handler: Callable[[Any], None]):
-        """订阅全市场精简ticker数据流"""
-        stream = "!miniTicker@arr"
-        self.subscribe(stream, handler)
+    def subscribe_all_mini_ticker(self, handler: Callable[[Any], None], symbols: Optional[list] = None):
+        """订阅全市场精简ticker数据流（指定 symbols 时只解析并回调这些交易对）"""
+        self._subscribe_array("!miniTicker@arr", handler, symbols)
     
-    def subscribe_all_ticker(self, handler: Callable[[Any], None]):
-        """订阅全市场ticker数据流"""
-        stream = "!ticker@arr"
-        self.subscribe(stream, handler)
+    def subscribe_all_ticker(self, handler: Callable[[Any], None], symbols: Optional[list] = None):
+        """订阅全市场ticker数据流（指定 symbols 时只解析并回调这些交易对）"""
+        self._subscribe_array("!ticker@arr", handler, symbols)
+
+    def market_table(self, stream: str = "!markPrice@arr") -> MarketTable:
+        """
+        订阅全市场数组流并维护列式快照表（NumPy），每帧推送原地更新
+
+        同一个流只能有一个处理器，表会替换该流已有的回调
+        """
+        if stream not in ARRAY_STREAMS:
+            raise ValueError(f"不支持的全市场数组流: {stream}")
+        table = MarketTable(ARRAY_STREAMS[stream])
+        self.symbol_filters.pop(stream, None)
+        self.subscribe(stream, table.update, policy="lossless")
+        return table
     
     def subscribe_all_book_ticker(self, handler: Callable[[Any], None]):
         """订阅全市场最优挂单数据流"""
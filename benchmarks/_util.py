@@ -0,0 +1,42 @@
+import json
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def git_revision() -> Optional[str]:
+	try:
+		out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=5)
+		return out.stdout.strip() or None
+	except Exception:
+		return None
+
+
+def bench_meta(name: str) -> Dict[str, Any]:
+	"""压测结果的公共元数据，便于跨版本对比"""
+	return {
+		"benchmark": name,
+		"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+		"git": git_revision(),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+	}
+
+
+def write_json(path: str, data: Dict[str, Any]) -> Path:
+	out = Path(path)
+	out.parent.mkdir(parents=True, exist_ok=True)
+	out.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+	return out
+
+
+def load_json(path: str) -> Dict[str, Any]:
+	return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def pct_change(prev: float, cur: float) -> float:
+	return (cur - prev) / prev * 100.0 if prev else 0.0
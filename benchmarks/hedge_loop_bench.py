@@ -0,0 +1,321 @@
+"""
+对冲循环压测：在本地模拟交易所上并发运行 N 组对冲，统计吞吐与延迟
+
+用法:
+	python benchmarks/hedge_loop_bench.py --pairs 4 --cycles 5 --latency-ms 30 --output logs/bench.json
+	python benchmarks/hedge_loop_bench.py --pairs 4 --cycles 5 --compare logs/bench_prev.json
+
+输出指标:
+	cycles_per_sec        完成的对冲轮数 / 墙钟时间
+	fill_to_hedge_ms      BP 挂单成交（交易所侧）到 Aster 对冲单到达交易所的延迟 p50/p99
+	rest_calls_per_cycle  每轮 REST 请求数（按接口拆分）
+	cpu_ms_per_cycle      每轮客户端线程 CPU 时间；process_cpu_ms_per_cycle 含模拟交易所本身
+
+--journal logs/bench_journal.db 同时开启交易日志（common.journal），对比开启前后的 fill_to_hedge_ms 可确认日志不影响下单路径。
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "scripts", ROOT / "benchmarks"):
+	if str(p) not in sys.path:
+		sys.path.insert(0, str(p))
+
+from aster_futures_dao.http import AsterFuturesClient
+from aster_futures_dao.trade import TradeDAO
+from bp_dao.http import BackpackClient
+from bp_dao.markets import MarketsDAO
+from bp_dao.order import OrderDAO
+from common.journal import SQLiteJournalSink, TradeJournal, get_journal, set_journal
+from common.log import setup_logging, shutdown_logging
+from common.transport import HttpTransport
+from mock_exchange import MockExchange
+from mock_exchange.auth import generate_backpack_keypair
+
+from _util import bench_meta, load_json, pct_change, write_json
+
+
+class CountingTransport(HttpTransport):
+	"""统计每个接口的 REST 调用次数（客户端侧，含公开接口）"""
+
+	def __init__(self):
+		super().__init__()
+		self.counts: Counter = Counter()
+		self._lock = threading.Lock()
+
+	def request(self, method: str, url: str, **kwargs: Any):
+		with self._lock:
+			self.counts[f"{method.upper()} {urlsplit(url).path}"] += 1
+		return super().request(method, url, **kwargs)
+
+
+class Pair:
+	"""一组对冲账户（BP + Aster 合约各一个），每组在独立线程中运行"""
+
+	def __init__(self, index: int, ex: MockExchange, args: argparse.Namespace):
+		self.index = index
+		self.aster_key = f"bench-aster-{index}"
+		self.aster_secret = os.urandom(16).hex()
+		self.bp_public, self.bp_secret = generate_backpack_keypair()
+		ex.aster.api_keys[self.aster_key] = self.aster_secret
+		ex.bp.public_keys.append(self.bp_public)
+		self.transport = CountingTransport()
+		self.bp_client = BackpackClient(self.bp_public, self.bp_secret, base_url=ex.http_url, default_window_ms=5000,
+										transport=self.transport)
+		self.aster_client = AsterFuturesClient(self.aster_key, self.aster_secret, base_url=ex.http_url, transport=self.transport)
+		self.bp_markets = MarketsDAO(self.bp_client)
+		self.bp_orders = OrderDAO(self.bp_client)
+		self.aster_trade = TradeDAO(self.aster_client)
+		self.args = args
+		self.cycles_done = 0
+		self.cycle_seconds: List[float] = []
+		self.thread_cpu = 0.0
+		self.errors: List[str] = []
+
+
+def _run_futures_loop_cycle(pair: Pair, cycle: int, ctx: Dict[str, Any]) -> None:
+	import hedge_bp_aster_futures_loop as loop
+
+	args = pair.args
+	loop.execute_hedge_cycle(
+		pair.bp_markets, pair.bp_orders, pair.aster_trade, ctx["bp_symbol"], ctx["aster_symbol"],
+		args.quantity, Decimal(str(args.offset_percent)) / Decimal("100"), ctx["price_increment"], ctx["price_decimals"],
+		0, 5000, cycle, ctx["trade_cfg"], args.order_wait_seconds, args.monitor_timeout_seconds,
+	)
+
+
+# 可压测的对冲引擎：名称 -> 执行一轮的函数 (pair, cycle, ctx)
+ENGINES: Dict[str, Callable[[Pair, int, Dict[str, Any]], None]] = {
+	"futures_loop": _run_futures_loop_cycle,
+}
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+	if not values:
+		return None
+	ordered = sorted(values)
+	k = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+	return ordered[k]
+
+
+def _worker(pair: Pair, engine: Callable[..., None], ctx: Dict[str, Any], deadline: float) -> None:
+	cpu_start = time.thread_time()
+	for cycle in range(1, pair.args.cycles + 1):
+		if time.monotonic() >= deadline:
+			break
+		started = time.monotonic()
+		try:
+			with get_journal().cycle(f"pair{pair.index}-cycle{cycle}"):
+				engine(pair, cycle, ctx)
+			pair.cycles_done += 1
+		except Exception as e:
+			pair.errors.append(f"cycle {cycle}: {type(e).__name__}: {e}")
+		pair.cycle_seconds.append(time.monotonic() - started)
+	pair.thread_cpu = time.thread_time() - cpu_start
+
+
+def fill_to_hedge_latencies(events: List[tuple], pair: Pair) -> Dict[str, Any]:
+	"""
+	按交易所事件计算成交到对冲的延迟：BP 挂单完全成交时刻 -> 下一笔 Aster 市价单到达交易所的时刻
+
+	两侧时间戳都来自模拟交易所进程内的单调时钟，不受客户端时钟影响
+	"""
+	fills = [t for _, t, kind, d in events
+			 if kind == "fill" and d.get("venue") == "bp" and d.get("account") == pair.bp_public and d.get("status") == "FILLED"]
+	hedges = [t for _, t, kind, d in events
+			  if kind == "order" and d.get("venue") == "aster" and d.get("account") == pair.aster_key and d.get("type") == "MARKET"]
+	latencies: List[float] = []
+	unhedged = 0
+	j = 0
+	for i, fill_t in enumerate(fills):
+		next_fill_t = fills[i + 1] if i + 1 < len(fills) else math.inf
+		while j < len(hedges) and hedges[j] < fill_t:
+			j += 1
+		if j < len(hedges) and hedges[j] < next_fill_t:
+			latencies.append((hedges[j] - fill_t) * 1000.0)
+			j += 1
+		else:
+			unhedged += 1
+	return {"latencies_ms": latencies, "fills": len(fills), "unhedged": unhedged}
+
+
+def _stats(values: List[float]) -> Dict[str, Optional[float]]:
+	return {
+		"count": len(values),
+		"mean": round(sum(values) / len(values), 3) if values else None,
+		"p50": round(percentile(values, 50), 3) if values else None,
+		"p99": round(percentile(values, 99), 3) if values else None,
+		"max": round(max(values), 3) if values else None,
+	}
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+	ex = MockExchange(
+		latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, tick_interval=args.tick_interval,
+		volatility_bps=args.volatility_bps, seed=args.seed,
+	).start_in_thread()
+	pairs = [Pair(i, ex, args) for i in range(args.pairs)]
+
+	import hedge_bp_aster_futures_loop as loop
+	probe = pairs[0]
+	price_increment, price_decimals = loop.get_bp_price_increment_and_decimals(probe.bp_markets, args.bp_symbol)
+	ctx = {
+		"bp_symbol": args.bp_symbol,
+		"aster_symbol": args.aster_symbol,
+		"price_increment": price_increment,
+		"price_decimals": price_decimals,
+		"trade_cfg": {"between_legs_sleep": args.between_legs_sleep, "poll_interval_seconds": args.poll_interval},
+	}
+	for pair in pairs:
+		pair.transport.counts.clear()
+	engine = ENGINES[args.engine]
+	journal = set_journal(TradeJournal(SQLiteJournalSink(args.journal) if args.journal else None)).start()
+
+	deadline = time.monotonic() + args.max_seconds
+	process_cpu_start = time.process_time()
+	wall_start = time.monotonic()
+	# 对冲脚本的日志照常经过队列（计入开销），不加 --verbose 时后台线程不输出
+	log_sink = setup_logging({"console": args.verbose})
+	threads = [threading.Thread(target=_worker, args=(p, engine, ctx, deadline), name=f"pair-{p.index}") for p in pairs]
+	for th in threads:
+		th.start()
+	for th in threads:
+		th.join()
+	wall = time.monotonic() - wall_start
+	process_cpu = time.process_time() - process_cpu_start
+	ex.stop_thread()
+	log_metrics = log_sink.metrics()
+	shutdown_logging()
+	journal.close()
+	set_journal(TradeJournal())
+	events = list(ex.engine.event_log)
+
+	cycles = sum(p.cycles_done for p in pairs)
+	all_latencies: List[float] = []
+	unhedged = 0
+	rest_total: Counter = Counter()
+	pair_results = []
+	for pair in pairs:
+		transport = pair.transport
+		lat = fill_to_hedge_latencies(events, pair)
+		all_latencies.extend(lat["latencies_ms"])
+		unhedged += lat["unhedged"]
+		rest_total.update(transport.counts)
+		pair_results.append({
+			"pair": pair.index,
+			"cycles": pair.cycles_done,
+			"fill_to_hedge_ms": _stats(lat["latencies_ms"]),
+			"bp_fills": lat["fills"],
+			"unhedged_fills": lat["unhedged"],
+			"rest_calls": sum(transport.counts.values()),
+			"cpu_ms": round(pair.thread_cpu * 1000.0, 3),
+			"errors": pair.errors,
+		})
+	per_cycle = (lambda v: round(v / cycles, 3) if cycles else None)
+	return {
+		"meta": bench_meta("hedge_loop"),
+		"params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")},
+		"summary": {
+			"pairs": len(pairs),
+			"cycles_completed": cycles,
+			"wall_seconds": round(wall, 3),
+			"cycles_per_sec": round(cycles / wall, 4) if wall > 0 else None,
+			"cycle_seconds": _stats([s for p in pairs for s in p.cycle_seconds]),
+			"fill_to_hedge_ms": _stats(all_latencies),
+			"unhedged_fills": unhedged,
+			"rest_calls_per_cycle": per_cycle(sum(rest_total.values())),
+			"rest_calls_by_endpoint_per_cycle": {k: per_cycle(v) for k, v in sorted(rest_total.items())},
+			"cpu_ms_per_cycle": per_cycle(sum(p.thread_cpu for p in pairs) * 1000.0),
+			"process_cpu_ms_per_cycle": per_cycle(process_cpu * 1000.0),
+			"errors": sum(len(p.errors) for p in pairs),
+			"journal": journal.metrics() if args.journal else None,
+			"log": log_metrics,
+		},
+		"pairs": pair_results,
+	}
+
+
+# 对比时关注的指标：(路径, 越大越好)
+COMPARE_KEYS = [
+	(("cycles_per_sec",), True),
+	(("fill_to_hedge_ms", "p50"), False),
+	(("fill_to_hedge_ms", "p99"), False),
+	(("rest_calls_per_cycle",), False),
+	(("cpu_ms_per_cycle",), False),
+	(("process_cpu_ms_per_cycle",), False),
+]
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+	lines = [f"对比基线: git={previous.get('meta', {}).get('git')} -> {current['meta'].get('git')}"]
+	for path, higher_is_better in COMPARE_KEYS:
+		cur: Any = current["summary"]
+		prev: Any = previous.get("summary", {})
+		for key in path:
+			cur = cur.get(key) if isinstance(cur, dict) else None
+			prev = prev.get(key) if isinstance(prev, dict) else None
+		name = ".".join(path)
+		if cur is None or prev is None:
+			lines.append(f"  {name}: {prev} -> {cur}")
+			continue
+		delta = pct_change(prev, cur)
+		better = (delta > 0) == higher_is_better if delta else None
+		mark = "" if better is None else ("  (更好)" if better else "  (更差)")
+		lines.append(f"  {name}: {prev} -> {cur} ({delta:+.1f}%){mark}")
+	return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="对冲循环压测（本地模拟交易所）")
+	ap.add_argument("--engine", default="futures_loop", choices=sorted(ENGINES))
+	ap.add_argument("--pairs", type=int, default=4, help="并发对冲组数")
+	ap.add_argument("--cycles", type=int, default=3, help="每组运行轮数")
+	ap.add_argument("--max-seconds", type=float, default=300.0, help="总时长上限（秒）")
+	ap.add_argument("--latency-ms", type=float, default=30.0, help="注入的 REST 往返延迟")
+	ap.add_argument("--jitter-ms", type=float, default=5.0)
+	ap.add_argument("--tick-interval", type=float, default=0.05, help="模拟交易所价格步间隔（秒）")
+	ap.add_argument("--volatility-bps", type=float, default=5.0)
+	ap.add_argument("--seed", type=int, default=42)
+	ap.add_argument("--bp-symbol", default="ASTER_USDC_PERP")
+	ap.add_argument("--aster-symbol", default="ASTERUSDT")
+	ap.add_argument("--quantity", default="10")
+	ap.add_argument("--offset-percent", type=float, default=0.02, help="挂单价格偏移百分比")
+	ap.add_argument("--poll-interval", type=float, default=0.2, help="BP 订单状态轮询间隔（秒）")
+	ap.add_argument("--between-legs-sleep", type=float, default=0.0)
+	ap.add_argument("--order-wait-seconds", type=float, default=5.0)
+	ap.add_argument("--monitor-timeout-seconds", type=float, default=60.0)
+	ap.add_argument("--output", default="logs/hedge_loop_bench.json", help="结果 JSON 路径")
+	ap.add_argument("--compare", help="与之前的结果 JSON 对比")
+	ap.add_argument("--journal", help="同时写交易日志到该 SQLite 文件")
+	ap.add_argument("--verbose", action="store_true", help="输出对冲脚本的日志")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run_benchmark(args)
+	out = write_json(args.output, result)
+
+	s = result["summary"]
+	print(f"pairs={s['pairs']} cycles={s['cycles_completed']} wall={s['wall_seconds']}s cycles/s={s['cycles_per_sec']}")
+	print(f"fill->hedge p50={s['fill_to_hedge_ms']['p50']}ms p99={s['fill_to_hedge_ms']['p99']}ms unhedged={s['unhedged_fills']}")
+	print(f"REST/cycle={s['rest_calls_per_cycle']} CPU/cycle={s['cpu_ms_per_cycle']}ms (含模拟交易所 {s['process_cpu_ms_per_cycle']}ms) errors={s['errors']}")
+	if s["journal"]:
+		j = s["journal"]
+		print(f"journal: {j['written']} 条，{j['batches']} 批，写入 {j['write_seconds']}s，丢弃 {j['dropped']}")
+	print(f"结果已写入 {out}")
+	if args.compare:
+		print("\n".join(compare(result, load_json(args.compare))))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,127 @@
+"""
+行情录制基准：热路径（record 入队）与后台写线程（解析、转列、压缩、写盘）的每秒消息数
+
+语料与 ws_decode_bench 相同（Aster bookTicker/trade/depth20 + Backpack bookTicker/depth + markPrice），
+按 RecorderSink 的方式传入 payload 原文。writer_msgs_per_sec 为单核上写线程能持续处理的消息速率，
+需要高于全市场推送速率（Aster !bookTicker 全市场峰值约数千条/秒）。
+
+用法:
+	python benchmarks/recorder_bench.py --output logs/recorder_bench.json
+	python benchmarks/recorder_bench.py --codec zlib --compare logs/recorder_bench.json
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks"):
+	if str(p) not in sys.path:
+		sys.path.insert(0, str(p))
+
+from common.recorder import _CODECS, DEFAULT_CODEC, MarketRecorder, SegmentReader
+from common.ws_decode import split_envelope
+
+from _util import bench_meta, load_json, pct_change, write_json
+from ws_decode_bench import make_corpus
+
+
+def measure(frames: List[tuple], codec: str, block_rows: int) -> Dict[str, Any]:
+	out_dir = Path(tempfile.mkdtemp(prefix="recorder_bench_"))
+	try:
+		# 不启动写线程，分别计时入队与写入
+		recorder = MarketRecorder(out_dir, codec=codec, block_rows=block_rows, max_pending=len(frames) + 1)
+		t0 = time.perf_counter()
+		for venue, stream, body in frames:
+			recorder.record(venue, stream, body)
+		enqueue = time.perf_counter() - t0
+		c0, w0 = time.process_time(), time.perf_counter()
+		recorder.flush()
+		recorder.close()
+		cpu, wall = time.process_time() - c0, time.perf_counter() - w0
+		m = recorder.metrics()
+		r0 = time.perf_counter()
+		rows = 0
+		for path in recorder.segments:
+			with SegmentReader(path) as reader:
+				for block in reader.blocks:
+					rows += len(reader.read(block)["recv_ns"])
+		read = time.perf_counter() - r0
+	finally:
+		shutil.rmtree(out_dir, ignore_errors=True)
+	n = len(frames)
+	return {
+		"codec": codec,
+		"enqueue_msgs_per_sec": round(n / enqueue, 1) if enqueue else 0.0,
+		"writer_msgs_per_sec": round(n / wall, 1) if wall else 0.0,
+		"writer_cpu_us_per_msg": round(cpu / n * 1e6, 3),
+		"rows": m["rows"],
+		"bytes_per_msg": round(m["bytes_written"] / n, 2),
+		"compression_ratio": m["compression_ratio"],
+		"read_rows_per_sec": round(rows / read, 1) if read else 0.0,
+	}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	frames = []
+	for raw in make_corpus(args.messages):
+		stream, body = split_envelope(raw)
+		frames.append(("bp" if "." in stream else "aster", stream, body))
+	codecs = args.codec or [c for c in _CODECS if c != "none"] + ["none"]
+	results = []
+	for codec in codecs:
+		best: Optional[Dict[str, Any]] = None
+		for _ in range(args.repeats):
+			row = measure(frames, codec, args.block_rows)
+			if best is None or row["writer_cpu_us_per_msg"] < best["writer_cpu_us_per_msg"]:
+				best = row
+		results.append(best)
+		print(f"{codec:<6} 入队 {best['enqueue_msgs_per_sec']:>12,.0f} msg/s  写线程 {best['writer_msgs_per_sec']:>10,.0f} msg/s "
+			  f"({best['writer_cpu_us_per_msg']:.2f} us/msg)  {best['bytes_per_msg']:.1f} B/msg  "
+			  f"压缩比 {best['compression_ratio']}  读取 {best['read_rows_per_sec']:,.0f} 行/s")
+	return {
+		"meta": bench_meta("recorder"),
+		"params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+		"default_codec": DEFAULT_CODEC,
+		"results": results,
+	}
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+	prev_rows = {r["codec"]: r for r in previous.get("results", [])}
+	lines = [f"对比基线: git={previous.get('meta', {}).get('git')} -> {current['meta'].get('git')}"]
+	for row in current["results"]:
+		prev = prev_rows.get(row["codec"])
+		if prev is None:
+			lines.append(f"  {row['codec']}: 新增")
+			continue
+		lines.append(f"  {row['codec']:<6} 写线程 CPU/条 {pct_change(prev['writer_cpu_us_per_msg'], row['writer_cpu_us_per_msg']):+6.1f}%  "
+					 f"体积/条 {pct_change(prev['bytes_per_msg'], row['bytes_per_msg']):+6.1f}%")
+	return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="行情录制基准")
+	ap.add_argument("--messages", type=int, default=100000, help="合成消息条数")
+	ap.add_argument("--codec", nargs="*", help="只测这些压缩算法（默认全部可用的）")
+	ap.add_argument("--block-rows", type=int, default=65536)
+	ap.add_argument("--repeats", type=int, default=3)
+	ap.add_argument("--output", default="logs/recorder_bench.json")
+	ap.add_argument("--compare", help="与之前的结果 JSON 对比")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run(args)
+	out = write_json(args.output, result)
+	print(f"结果已写入 {out}")
+	if args.compare:
+		print("\n".join(compare(result, load_json(args.compare))))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,211 @@
+"""
+签名热路径微基准：吞吐（ops/s、每次耗时）与内存分配
+
+覆盖:
+	aster_spot.prepare           AsterClient._prepare（含 _encode_sequence + _hmac_sha256）
+	aster_spot.hmac              AsterClient._hmac_sha256
+	aster_futures.prepare_params AsterFuturesClient._prepare_params（param_order 线性扫描 + 剩余键排序 + 签名）
+	bp.sign                      BackpackClient._sign（键排序 + 拼接 + ED25519）
+	bp.sign_batch_orders         BackpackClient._sign_batch_orders（按批量大小）
+
+用法:
+	python benchmarks/signing_bench.py --output logs/signing_bench.json
+	python benchmarks/signing_bench.py --filter bp. --compare logs/signing_bench.json
+
+内存分配用 tracemalloc 统计：alloc_peak_bytes 为单次调用期间的临时内存峰值，
+retained_bytes_per_1k 为连续调用 1000 次后仍未释放的内存（用于发现缓存/泄漏）。
+"""
+import argparse
+import base64
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks"):
+	if str(p) not in sys.path:
+		sys.path.insert(0, str(p))
+
+from nacl import signing
+
+from aster_dao.http import AsterClient
+from aster_futures_dao.http import AsterFuturesClient
+from bp_dao.http import BackpackClient
+
+from _util import bench_meta, load_json, pct_change, write_json
+
+
+API_KEY = "a" * 64
+API_SECRET = "b" * 64
+
+# AsterFuturesClient.param_order 中的键（按该顺序出现时走快速路径），其余键按字母排序
+_FUTURES_KNOWN = [
+	("symbol", "ASTERUSDT"), ("side", "BUY"), ("type", "LIMIT"), ("quantity", "10"), ("price", "1.2345"),
+	("timeInForce", "GTC"), ("positionSide", "BOTH"), ("reduceOnly", "false"), ("newClientOrderId", "bench-0001"),
+	("recvWindow", 5000),
+]
+
+
+def make_params(n: int) -> Dict[str, Any]:
+	"""n 个参数：前面使用常见下单字段，超出部分用 extraNN 字段补齐"""
+	params: Dict[str, Any] = {}
+	for key, value in _FUTURES_KNOWN[:n]:
+		params[key] = value
+	for i in range(n - len(params)):
+		params[f"extra{i:02d}"] = f"value{i}"
+	return params
+
+
+def make_bp_order(i: int) -> Dict[str, Any]:
+	return {
+		"symbol": "ASTER_USDC_PERP",
+		"side": "Bid" if i % 2 else "Ask",
+		"orderType": "Limit",
+		"price": f"{1.2 + i * 0.0001:.4f}",
+		"quantity": "10",
+		"clientId": 1000 + i,
+		"reduceOnly": False,
+	}
+
+
+def build_cases(param_counts: List[int], batch_sizes: List[int]) -> List[Tuple[str, Dict[str, Any], Callable[[], Any]]]:
+	"""返回 (用例名, 维度, 无参可调用对象)；客户端在构造时不访问网络"""
+	spot = AsterClient(API_KEY, API_SECRET, base_url="http://127.0.0.1:9", auto_time_sync=False)
+	futures = AsterFuturesClient(API_KEY, API_SECRET, base_url="http://127.0.0.1:9")
+	# 跳过首次请求前的时间同步
+	futures._last_sync_time = int(time.time() * 1000)
+	key = signing.SigningKey.generate()
+	bp = BackpackClient(
+		base64.b64encode(bytes(key.verify_key)).decode(), base64.b64encode(bytes(key)).decode(),
+		base_url="http://127.0.0.1:9",
+	)
+	ts = int(time.time() * 1000)
+
+	cases: List[Tuple[str, Dict[str, Any], Callable[[], Any]]] = []
+	for n in param_counts:
+		params = make_params(n)
+		cases.append((f"aster_spot.prepare[n={n}]", {"params": n}, lambda p=params: spot._prepare(True, p)))
+		message = spot._encode_sequence(list(params.items()) + [("timestamp", ts), ("recvWindow", 5000)])
+		cases.append((f"aster_spot.hmac[n={n}]", {"params": n, "bytes": len(message)}, lambda m=message: spot._hmac_sha256(m)))
+		# _prepare_params 会修改传入的字典，每次传入副本（dict 拷贝开销一并计入）
+		cases.append((f"aster_futures.prepare_params[n={n}]", {"params": n},
+					  lambda p=params: futures._prepare_params(dict(p), signed=True)))
+		cases.append((f"bp.sign[n={n}]", {"params": n}, lambda p=params: bp._sign("orderExecute", p, ts, 5000)))
+	for b in batch_sizes:
+		orders = [make_bp_order(i) for i in range(b)]
+		cases.append((f"bp.sign_batch_orders[batch={b}]", {"batch": b},
+					  lambda o=orders: bp._sign_batch_orders("orderExecute", o, ts, 5000)))
+	return cases
+
+
+def measure_throughput(fn: Callable[[], Any], min_time: float, repeats: int) -> Dict[str, float]:
+	"""自动确定每轮调用次数，使每轮耗时不少于 min_time；取 repeats 轮中最快的一轮作为结果"""
+	number = 1
+	while True:
+		start = time.perf_counter()
+		for _ in range(number):
+			fn()
+		if time.perf_counter() - start >= min_time / 5:
+			break
+		number *= 2
+	per_call: List[float] = []
+	gc_was_enabled = gc.isenabled()
+	gc.disable()
+	try:
+		for _ in range(repeats):
+			start = time.perf_counter_ns()
+			for _ in range(number):
+				fn()
+			per_call.append((time.perf_counter_ns() - start) / number)
+	finally:
+		if gc_was_enabled:
+			gc.enable()
+	best = min(per_call)
+	return {
+		"ns_per_op": round(best, 1),
+		"ns_per_op_median": round(statistics.median(per_call), 1),
+		"ops_per_sec": round(1e9 / best, 1) if best else 0.0,
+		"loops": number,
+	}
+
+
+def measure_allocations(fn: Callable[[], Any], calls: int = 1000) -> Dict[str, int]:
+	fn()  # 预热：排除首次调用的缓存分配
+	tracemalloc.start()
+	try:
+		tracemalloc.reset_peak()
+		base, _ = tracemalloc.get_traced_memory()
+		fn()
+		_, peak = tracemalloc.get_traced_memory()
+		before, _ = tracemalloc.get_traced_memory()
+		for _ in range(calls):
+			fn()
+		after, _ = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+	return {
+		"alloc_peak_bytes": max(0, peak - base),
+		"retained_bytes_per_1k": max(0, after - before) * 1000 // calls,
+	}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	cases = build_cases(args.param_counts, args.batch_sizes)
+	results = []
+	for name, dims, fn in cases:
+		if args.filter and not any(f in name for f in args.filter):
+			continue
+		row: Dict[str, Any] = {"case": name, **dims}
+		row.update(measure_throughput(fn, args.min_time, args.repeats))
+		row.update(measure_allocations(fn))
+		results.append(row)
+		print(f"{name:<44} {row['ns_per_op'] / 1000:>9.2f} us/op {row['ops_per_sec']:>12,.0f} ops/s "
+			  f"peak {row['alloc_peak_bytes']:>7} B  retained/1k {row['retained_bytes_per_1k']:>6} B")
+	return {
+		"meta": bench_meta("signing"),
+		"params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+		"results": results,
+	}
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+	prev_rows = {r["case"]: r for r in previous.get("results", [])}
+	lines = [f"对比基线: git={previous.get('meta', {}).get('git')} -> {current['meta'].get('git')}"]
+	for row in current["results"]:
+		prev = prev_rows.get(row["case"])
+		if prev is None:
+			lines.append(f"  {row['case']}: 新增")
+			continue
+		d_time = pct_change(prev["ns_per_op"], row["ns_per_op"])
+		d_peak = pct_change(prev["alloc_peak_bytes"], row["alloc_peak_bytes"])
+		lines.append(f"  {row['case']:<44} 耗时 {d_time:+6.1f}%  峰值内存 {d_peak:+6.1f}%")
+	return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="签名热路径微基准")
+	ap.add_argument("--param-counts", type=int, nargs="+", default=[2, 5, 10, 20])
+	ap.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+	ap.add_argument("--min-time", type=float, default=0.2, help="每轮最短耗时（秒）")
+	ap.add_argument("--repeats", type=int, default=5)
+	ap.add_argument("--filter", nargs="*", help="只运行名称包含这些子串的用例，如 bp. aster_futures")
+	ap.add_argument("--output", default="logs/signing_bench.json")
+	ap.add_argument("--compare", help="与之前的结果 JSON 对比")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run(args)
+	out = write_json(args.output, result)
+	print(f"结果已写入 {out}")
+	if args.compare:
+		print("\n".join(compare(result, load_json(args.compare))))
+
+
+if __name__ == "__main__":
+	main()
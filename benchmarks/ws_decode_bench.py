@@ -0,0 +1,207 @@
+"""
+WS 消息解码基准：每秒可处理消息数与每条消息 CPU 时间
+
+用合成的组合流消息（Aster bookTicker/trade/depth20 + Backpack bookTicker/depth + 未订阅的 markPrice）
+对比以下解码路径:
+	legacy            旧的 AsterFuturesWS._on_message：标准库 json.loads 整条消息 + 无条件构造调试日志字符串
+	stdlib_full       标准库 json.loads 整条消息 + dict 分发（去掉日志字符串）
+	<backend>.dict    split_envelope 取 stream，未订阅的流跳过，payload 用该后端解析为 dict
+	<backend>.typed   同上，并解码为 __slots__ 事件对象（common.ws_decode）
+
+reduction_pct 为相对 legacy 的每条消息 CPU 时间降幅。
+
+用法:
+	python benchmarks/ws_decode_bench.py --output logs/ws_decode_bench.json
+	python benchmarks/ws_decode_bench.py --subscribed 0.5 --compare logs/ws_decode_bench.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+for p in (ROOT, ROOT / "benchmarks"):
+	if str(p) not in sys.path:
+		sys.path.insert(0, str(p))
+
+from common import ws_decode
+from common.ws_decode import StreamDecoder, split_envelope
+
+from _util import bench_meta, load_json, pct_change, write_json
+
+
+def _levels(rng: random.Random, mid: float, side: int, n: int) -> List[List[str]]:
+	return [[f"{mid + side * (i + 1) * 0.0001:.4f}", f"{rng.uniform(1, 5000):.2f}"] for i in range(n)]
+
+
+def make_corpus(n: int, seed: int = 7) -> List[str]:
+	"""生成 n 条组合流消息（紧凑 JSON，与交易所推送一致）"""
+	rng = random.Random(seed)
+	frames = []
+	now = int(time.time() * 1000)
+	for i in range(n):
+		mid = 1.5 + rng.uniform(-0.01, 0.01)
+		r = rng.random()
+		if r < 0.45:
+			stream, data = "asterusdt@bookTicker", {
+				"e": "bookTicker", "u": i, "s": "ASTERUSDT", "b": f"{mid - 0.0001:.4f}", "B": f"{rng.uniform(1, 900):.2f}",
+				"a": f"{mid + 0.0001:.4f}", "A": f"{rng.uniform(1, 900):.2f}", "T": now + i, "E": now + i,
+			}
+		elif r < 0.65:
+			stream, data = "asterusdt@trade", {
+				"e": "trade", "E": now + i, "T": now + i, "s": "ASTERUSDT", "t": i, "p": f"{mid:.4f}",
+				"q": f"{rng.uniform(1, 300):.2f}", "X": "MARKET", "m": rng.random() < 0.5,
+			}
+		elif r < 0.75:
+			stream, data = "asterusdt@depth20@100ms", {
+				"e": "depthUpdate", "E": now + i, "T": now + i, "s": "ASTERUSDT", "U": i, "u": i, "pu": i - 1,
+				"b": _levels(rng, mid, -1, 20), "a": _levels(rng, mid, 1, 20),
+			}
+		elif r < 0.85:
+			stream, data = "bookTicker.ASTER_USDC_PERP", {
+				"e": "bookTicker", "E": (now + i) * 1000, "s": "ASTER_USDC_PERP", "a": f"{mid + 0.0002:.4f}",
+				"A": f"{rng.uniform(1, 900):.2f}", "b": f"{mid - 0.0002:.4f}", "B": f"{rng.uniform(1, 900):.2f}",
+				"u": i, "T": (now + i) * 1000,
+			}
+		elif r < 0.90:
+			stream, data = "depth.ASTER_USDC_PERP", {
+				"e": "depth", "E": (now + i) * 1000, "s": "ASTER_USDC_PERP", "a": _levels(rng, mid, 1, 5),
+				"b": _levels(rng, mid, -1, 5), "U": i, "u": i, "T": (now + i) * 1000,
+			}
+		else:
+			stream, data = "btcusdt@markPrice", {
+				"e": "markPriceUpdate", "E": now + i, "s": "BTCUSDT", "p": "64000.10", "i": "64001.00",
+				"P": "64000.50", "r": "0.00010000", "T": now + 28800000,
+			}
+		frames.append(json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+	return frames
+
+
+def choose_subscribed(frames: List[str], fraction: float, seed: int = 11) -> set:
+	"""按流名称随机选出订阅的流（markPrice 始终不订阅，模拟共享连接上别人的流）"""
+	streams = sorted({split_envelope(f)[0] for f in frames} - {"btcusdt@markPrice"})
+	rng = random.Random(seed)
+	k = max(1, round(len(streams) * fraction))
+	return set(rng.sample(streams, k))
+
+
+def build_paths(subscribed: set) -> Dict[str, Callable[[str], Any]]:
+	handlers = {s: (lambda data: data) for s in subscribed}
+	sink: List[Any] = []
+
+	def legacy(raw: str) -> Any:
+		data = json.loads(raw)
+		sink.append(f"收到消息: {data}")
+		sink.clear()
+		if "result" in data and "id" in data:
+			return None
+		if "stream" in data and "data" in data:
+			h = handlers.get(data["stream"])
+			return h(data["data"]) if h else None
+		return None
+
+	def stdlib_full(raw: str) -> Any:
+		data = json.loads(raw)
+		h = handlers.get(data["stream"])
+		return h(data["data"]) if h else None
+
+	paths: Dict[str, Callable[[str], Any]] = {"legacy": legacy, "stdlib_full": stdlib_full}
+	decoder = StreamDecoder()
+	for backend in ws_decode.available_backends():
+		loads = ws_decode._BACKENDS[backend]
+
+		def fast_dict(raw: str, loads=loads) -> Any:
+			stream, body = split_envelope(raw)
+			h = handlers.get(stream)
+			return h(loads(body)) if h else None
+
+		def fast_typed(raw: str, loads=loads) -> Any:
+			stream, body = split_envelope(raw)
+			h = handlers.get(stream)
+			return h(decoder.decode(stream, loads(body))) if h else None
+
+		paths[f"{backend}.dict"] = fast_dict
+		paths[f"{backend}.typed"] = fast_typed
+	return paths
+
+
+def measure(fn: Callable[[str], Any], frames: List[str], repeats: int) -> Dict[str, float]:
+	"""取 repeats 轮中 CPU 时间最少的一轮"""
+	best_cpu = best_wall = float("inf")
+	for _ in range(repeats):
+		c0, w0 = time.process_time(), time.perf_counter()
+		for raw in frames:
+			fn(raw)
+		cpu, wall = time.process_time() - c0, time.perf_counter() - w0
+		best_cpu, best_wall = min(best_cpu, cpu), min(best_wall, wall)
+	n = len(frames)
+	return {
+		"msgs_per_sec": round(n / best_wall, 1) if best_wall else 0.0,
+		"cpu_us_per_msg": round(best_cpu / n * 1e6, 3),
+	}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	frames = make_corpus(args.messages)
+	subscribed = choose_subscribed(frames, args.subscribed)
+	paths = build_paths(subscribed)
+	results = []
+	for name, fn in paths.items():
+		if args.filter and not any(f in name for f in args.filter):
+			continue
+		row: Dict[str, Any] = {"path": name}
+		row.update(measure(fn, frames, args.repeats))
+		results.append(row)
+	legacy = next((r for r in results if r["path"] == "legacy"), None)
+	for row in results:
+		if legacy:
+			row["reduction_pct"] = round(-pct_change(legacy["cpu_us_per_msg"], row["cpu_us_per_msg"]), 1)
+		print(f"{row['path']:<16} {row['msgs_per_sec']:>14,.0f} msg/s {row['cpu_us_per_msg']:>8.2f} us/msg"
+			  + (f"  CPU {-row['reduction_pct']:+.1f}%" if legacy else ""))
+	return {
+		"meta": bench_meta("ws_decode"),
+		"params": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+		"default_backend": ws_decode.JSON_BACKEND,
+		"subscribed_streams": sorted(subscribed),
+		"results": results,
+	}
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]) -> List[str]:
+	prev_rows = {r["path"]: r for r in previous.get("results", [])}
+	lines = [f"对比基线: git={previous.get('meta', {}).get('git')} -> {current['meta'].get('git')}"]
+	for row in current["results"]:
+		prev = prev_rows.get(row["path"])
+		if prev is None:
+			lines.append(f"  {row['path']}: 新增")
+			continue
+		lines.append(f"  {row['path']:<16} CPU/条 {pct_change(prev['cpu_us_per_msg'], row['cpu_us_per_msg']):+6.1f}%  "
+					 f"吞吐 {pct_change(prev['msgs_per_sec'], row['msgs_per_sec']):+6.1f}%")
+	return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="WS 消息解码基准")
+	ap.add_argument("--messages", type=int, default=50000, help="合成消息条数")
+	ap.add_argument("--subscribed", type=float, default=1.0, help="订阅的流占比（其余流在快速路径中被跳过）")
+	ap.add_argument("--repeats", type=int, default=5)
+	ap.add_argument("--filter", nargs="*", help="只运行名称包含这些子串的路径，如 orjson legacy")
+	ap.add_argument("--output", default="logs/ws_decode_bench.json")
+	ap.add_argument("--compare", help="与之前的结果 JSON 对比")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run(args)
+	out = write_json(args.output, result)
+	print(f"结果已写入 {out}")
+	if args.compare:
+		print("\n".join(compare(result, load_json(args.compare))))
+
+
+if __name__ == "__main__":
+	main()
@@ -2,6 +2,7 @@ from .http import BackpackClient
 from .markets import MarketsDAO
 from .account import AccountDAO
 from .order import OrderDAO
+from .history import HistoryDAO, HistorySync
 from .ws import BackpackWS
 
 __all__ = [
@@ -9,5 +10,7 @@ __all__ = [
 	"MarketsDAO",
 	"AccountDAO",
 	"OrderDAO",
+	"HistoryDAO",
+	"HistorySync",
 	"BackpackWS",
 ]
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Optional
 
+from common.tracing import traced
+
 from .http import BackpackClient
 
 
@@ -15,6 +17,7 @@ class AccountDAO:
 		# GET /api/v1/balances, instruction: balanceQuery
 		return self.client.request("GET", "/api/v1/balances", instruction="balanceQuery", signed=True)
 
+	@traced("bp.account.positions")
 	def positions(self, symbol: Optional[str] = None) -> Any:
 		# GET /api/v1/position, instruction: positionQuery
 		params: Dict[str, Any] = {}
@@ -0,0 +1,281 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from common.ledger import LedgerStore, to_ms
+from common.tracing import traced
+
+from .http import BackpackClient
+
+PAGE_LIMIT = 1000
+
+
+class HistoryDAO:
+	"""Backpack history endpoints (/wapi/v1/history/*), offset-paginated."""
+
+	def __init__(self, client: BackpackClient):
+		self.client = client
+
+	@traced("bp.history.fills")
+	def fills(
+		self,
+		symbol: Optional[str] = None,
+		orderId: Optional[str] = None,
+		from_: Optional[int] = None,
+		to: Optional[int] = None,
+		fillType: Optional[str] = None,
+		limit: Optional[int] = None,
+		offset: Optional[int] = None,
+		sortDirection: Optional[str] = None,
+	) -> Any:
+		# GET /wapi/v1/history/fills, instruction: fillHistoryQueryAll; from/to in milliseconds
+		params: Dict[str, Any] = {}
+		if symbol is not None:
+			params["symbol"] = symbol
+		if orderId is not None:
+			params["orderId"] = orderId
+		if from_ is not None:
+			params["from"] = from_
+		if to is not None:
+			params["to"] = to
+		if fillType is not None:
+			params["fillType"] = fillType
+		if limit is not None:
+			params["limit"] = limit
+		if offset is not None:
+			params["offset"] = offset
+		if sortDirection is not None:
+			params["sortDirection"] = sortDirection
+		return self.client.request("GET", "/wapi/v1/history/fills", params=params or None, instruction="fillHistoryQueryAll", signed=True)
+
+	@traced("bp.history.orders")
+	def orders(
+		self,
+		symbol: Optional[str] = None,
+		orderId: Optional[str] = None,
+		limit: Optional[int] = None,
+		offset: Optional[int] = None,
+		sortDirection: Optional[str] = None,
+	) -> Any:
+		# GET /wapi/v1/history/orders, instruction: orderHistoryQueryAll
+		params: Dict[str, Any] = {}
+		if symbol is not None:
+			params["symbol"] = symbol
+		if orderId is not None:
+			params["orderId"] = orderId
+		if limit is not None:
+			params["limit"] = limit
+		if offset is not None:
+			params["offset"] = offset
+		if sortDirection is not None:
+			params["sortDirection"] = sortDirection
+		return self.client.request("GET", "/wapi/v1/history/orders", params=params or None, instruction="orderHistoryQueryAll", signed=True)
+
+	@traced("bp.history.funding")
+	def funding(
+		self,
+		symbol: Optional[str] = None,
+		subaccountId: Optional[int] = None,
+		limit: Optional[int] = None,
+		offset: Optional[int] = None,
+		sortDirection: Optional[str] = None,
+	) -> Any:
+		# GET /wapi/v1/history/funding, instruction: fundingHistoryQueryAll
+		params: Dict[str, Any] = {}
+		if symbol is not None:
+			params["symbol"] = symbol
+		if subaccountId is not None:
+			params["subaccountId"] = subaccountId
+		if limit is not None:
+			params["limit"] = limit
+		if offset is not None:
+			params["offset"] = offset
+		if sortDirection is not None:
+			params["sortDirection"] = sortDirection
+		return self.client.request("GET", "/wapi/v1/history/funding", params=params or None, instruction="fundingHistoryQueryAll", signed=True)
+
+	@traced("bp.history.settlement")
+	def settlement(
+		self,
+		source: Optional[str] = None,
+		limit: Optional[int] = None,
+		offset: Optional[int] = None,
+		sortDirection: Optional[str] = None,
+	) -> Any:
+		# GET /wapi/v1/history/settlement, instruction: settlementHistoryQueryAll
+		params: Dict[str, Any] = {}
+		if source is not None:
+			params["source"] = source
+		if limit is not None:
+			params["limit"] = limit
+		if offset is not None:
+			params["offset"] = offset
+		if sortDirection is not None:
+			params["sortDirection"] = sortDirection
+		return self.client.request("GET", "/wapi/v1/history/settlement", params=params or None, instruction="settlementHistoryQueryAll", signed=True)
+
+	def iter_pages(self, endpoint: str, limit: int = PAGE_LIMIT, **filters: Any) -> Iterator[List[Dict[str, Any]]]:
+		"""Yield pages of fills / orders / funding / settlement by offset until a short page."""
+		fetch: Callable[..., Any] = getattr(self, endpoint)
+		offset = 0
+		while True:
+			page = fetch(limit=limit, offset=offset, **filters) or []
+			if not page:
+				return
+			yield page
+			if len(page) < limit:
+				return
+			offset += len(page)
+
+
+def _num(value: Any) -> Optional[float]:
+	return float(value) if value not in (None, "") else None
+
+
+def _fill_row(r: Dict[str, Any]) -> Dict[str, Any]:
+	ts = to_ms(r.get("timestamp"))
+	trade_id = r.get("tradeId")
+	# 系统成交（强平、ADL 等）可能没有 tradeId，用订单id + 时间 + 价量组合去重
+	key = str(trade_id) if trade_id is not None else f"{r.get('orderId')}:{ts}:{r.get('side')}:{r.get('price')}:{r.get('quantity')}"
+	return {
+		"key": key, "trade_id": trade_id, "order_id": r.get("orderId"), "client_id": r.get("clientId"),
+		"symbol": r.get("symbol"), "side": r.get("side"), "price": _num(r.get("price")),
+		"quantity": _num(r.get("quantity")), "fee": _num(r.get("fee")), "fee_symbol": r.get("feeSymbol"),
+		"is_maker": r.get("isMaker"), "system_order_type": r.get("systemOrderType"), "ts": ts, "raw": r,
+	}
+
+
+def _order_row(r: Dict[str, Any]) -> Dict[str, Any]:
+	return {
+		"id": r.get("id"), "client_id": r.get("clientId"), "symbol": r.get("symbol"), "side": r.get("side"),
+		"order_type": r.get("orderType"), "status": r.get("status"), "price": _num(r.get("price")),
+		"quantity": _num(r.get("quantity")), "executed_quantity": _num(r.get("executedQuantity")),
+		"executed_quote_quantity": _num(r.get("executedQuoteQuantity")), "ts": to_ms(r.get("createdAt")), "raw": r,
+	}
+
+
+def _funding_row(r: Dict[str, Any]) -> Dict[str, Any]:
+	return {
+		"symbol": r.get("symbol"), "subaccount_id": r.get("subaccountId") or 0, "quantity": _num(r.get("quantity")),
+		"funding_rate": _num(r.get("fundingRate")), "ts": to_ms(r.get("intervalEndTimestamp")), "raw": r,
+	}
+
+
+def _settlement_row(r: Dict[str, Any]) -> Dict[str, Any]:
+	ts = to_ms(r.get("timestamp"))
+	return {
+		"key": f"{ts}:{r.get('source')}:{r.get('quantity')}:{r.get('subaccountId') or 0}", "source": r.get("source"),
+		"subaccount_id": r.get("subaccountId") or 0, "quantity": _num(r.get("quantity")), "ts": ts, "raw": r,
+	}
+
+
+# endpoint -> table layout; "replace" streams are upserted because the records change after first sight
+STREAMS: Dict[str, Dict[str, Any]] = {
+	"fills": {
+		"table": "bp_fills",
+		"columns": [("key", "TEXT"), ("trade_id", "INTEGER"), ("order_id", "TEXT"), ("client_id", "TEXT"),
+					("symbol", "TEXT"), ("side", "TEXT"), ("price", "REAL"), ("quantity", "REAL"), ("fee", "REAL"),
+					("fee_symbol", "TEXT"), ("is_maker", "INTEGER"), ("system_order_type", "TEXT"), ("ts", "INTEGER"),
+					("raw", "TEXT")],
+		"key": ["key"],
+		"indexes": [("symbol", "ts"), ("order_id",), ("ts",)],
+		"row": _fill_row,
+		"replace": False,
+		"symbol_filter": True,
+	},
+	"orders": {
+		"table": "bp_orders",
+		"columns": [("id", "TEXT"), ("client_id", "TEXT"), ("symbol", "TEXT"), ("side", "TEXT"), ("order_type", "TEXT"),
+					("status", "TEXT"), ("price", "REAL"), ("quantity", "REAL"), ("executed_quantity", "REAL"),
+					("executed_quote_quantity", "REAL"), ("ts", "INTEGER"), ("raw", "TEXT")],
+		"key": ["id"],
+		"indexes": [("symbol", "ts"), ("client_id",), ("status",)],
+		"row": _order_row,
+		"replace": True,
+		"symbol_filter": True,
+	},
+	"funding": {
+		"table": "bp_funding",
+		"columns": [("symbol", "TEXT"), ("subaccount_id", "INTEGER"), ("quantity", "REAL"), ("funding_rate", "REAL"),
+					("ts", "INTEGER"), ("raw", "TEXT")],
+		"key": ["symbol", "ts", "subaccount_id"],
+		"indexes": [("ts",)],
+		"row": _funding_row,
+		"replace": False,
+		"symbol_filter": True,
+	},
+	"settlement": {
+		"table": "bp_settlement",
+		"columns": [("key", "TEXT"), ("source", "TEXT"), ("subaccount_id", "INTEGER"), ("quantity", "REAL"),
+					("ts", "INTEGER"), ("raw", "TEXT")],
+		"key": ["key"],
+		"indexes": [("source", "ts"), ("ts",)],
+		"row": _settlement_row,
+		"replace": False,
+		"symbol_filter": False,
+	},
+}
+
+
+class HistorySync:
+	"""
+	Incremental sync of Backpack history into a LedgerStore.
+
+	Pages are read newest-first (sortDirection=Desc) and scanning stops once a page reaches the stream's
+	high-water mark (minus ``overlap_ms``, or ``order_lookback_ms`` for orders whose status keeps changing).
+	Rows are deduplicated by primary key, and the high-water mark only advances after a full scan so an
+	interrupted sync never skips older rows.
+	"""
+
+	def __init__(
+		self,
+		client: Union[BackpackClient, HistoryDAO],
+		store: LedgerStore,
+		page_limit: int = PAGE_LIMIT,
+		overlap_ms: int = 60_000,
+		order_lookback_ms: int = 86_400_000,
+	):
+		self.dao = client if isinstance(client, HistoryDAO) else HistoryDAO(client)
+		self.store = store
+		self.page_limit = page_limit
+		self.overlap_ms = overlap_ms
+		self.order_lookback_ms = order_lookback_ms
+		for spec in STREAMS.values():
+			store.ensure_table(spec["table"], spec["columns"], spec["key"], spec["indexes"])
+
+	@staticmethod
+	def state_key(stream: str, symbol: Optional[str] = None) -> str:
+		return f"bp.{stream}:{symbol or '*'}"
+
+	def sync(self, stream: str, symbol: Optional[str] = None, since_ms: Optional[int] = None) -> Dict[str, Any]:
+		"""Fetch records newer than the stored high-water mark (or since_ms on the first run)."""
+		spec = STREAMS[stream]
+		key = self.state_key(stream, symbol if spec["symbol_filter"] else None)
+		hwm = self.store.state(key)["hwm"]
+		if hwm is not None:
+			stop_before = hwm - (self.order_lookback_ms if stream == "orders" else self.overlap_ms)
+		else:
+			stop_before = since_ms
+		filters: Dict[str, Any] = {"sortDirection": "Desc"}
+		if spec["symbol_filter"] and symbol:
+			filters["symbol"] = symbol
+		if stream == "fills" and stop_before is not None:
+			filters["from_"] = stop_before
+		fetched = added = pages = 0
+		newest = hwm
+		for page in self.dao.iter_pages(stream, limit=self.page_limit, **filters):
+			pages += 1
+			rows = [spec["row"](r) for r in page]
+			if stop_before is not None:
+				rows = [r for r in rows if r["ts"] is None or r["ts"] >= stop_before]
+			fetched += len(page)
+			added += self.store.upsert(spec["table"], rows, replace=spec["replace"])
+			stamps = [r["ts"] for r in rows if r["ts"] is not None]
+			if stamps:
+				newest = max(newest or 0, max(stamps))
+			if len(rows) < len(page):
+				break
+		self.store.set_state(key, hwm=newest, added=added)
+		return {"stream": key, "pages": pages, "fetched": fetched, "added": added, "hwm": newest}
+
+	def sync_all(self, symbol: Optional[str] = None, streams: Optional[List[str]] = None,
+				 since_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+		return [self.sync(stream, symbol, since_ms) for stream in (streams or list(STREAMS))]
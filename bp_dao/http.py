@@ -1,4 +1,5 @@
 import base64
+import logging
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -6,6 +7,26 @@ import requests
 from nacl import signing
 from email.utils import parsedate_to_datetime
 
+from common.deadline import Deadline, EndpointTimeout, TimeoutPolicy, call_deadline, scoped
+from common.log import enable_debug, get_logger
+from common.tracing import span
+from common.transport import HttpTransport, Transport
+
+log = get_logger("bp.http")
+
+# Per-endpoint (connect, read, budget) in seconds: order entry/cancel short, history long.
+DEFAULT_TIMEOUTS = TimeoutPolicy(EndpointTimeout(3.0, 10.0, 15.0), [
+	("POST", "/api/v1/orders", EndpointTimeout(1.0, 2.5, 3.5)),
+	("DELETE", "/api/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+	("DELETE", "/api/v1/orders", EndpointTimeout(1.0, 2.5, 3.5)),
+	("GET", "/api/v1/order", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/orders", EndpointTimeout(1.0, 3.0, 4.0)),
+	("GET", "/api/v1/position", EndpointTimeout(1.0, 3.0, 4.0)),
+	("GET", "/api/v1/depth", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/api/v1/ticker", EndpointTimeout(1.0, 2.0, 3.0)),
+	("GET", "/wapi/v1/history/", EndpointTimeout(3.0, 30.0, 90.0)),
+])
+
 
 class BackpackClient:
 	"""HTTP client for Backpack Exchange with ED25519 signing."""
@@ -15,17 +36,28 @@ class BackpackClient:
 		api_public_key_b64: Optional[str] = None,
 		api_secret_key_b64: Optional[str] = None,
 		base_url: str = "https://api.backpack.exchange",
-		timeout_seconds: int = 15,
+		timeout_seconds: Optional[float] = None,
 		default_window_ms: int = 30000,
 		debug: bool = False,
+		transport: Optional[Transport] = None,
+		timeouts: Optional[TimeoutPolicy] = None,
 	):
 		self.api_public_key_b64 = api_public_key_b64
 		self.api_secret_key_b64 = api_secret_key_b64
 		self.base_url = base_url.rstrip("/")
-		self.session = requests.Session()
-		self.timeout_seconds = timeout_seconds
+		# 传输层可替换为录制/回放实现，默认直接访问交易所
+		self.transport = transport or HttpTransport()
+		self.session = self.transport.session
+		# timeout_seconds only replaces the fallback for endpoints without their own entry
+		self.timeouts = timeouts or DEFAULT_TIMEOUTS
+		if timeout_seconds is not None:
+			fallback = EndpointTimeout(min(3.0, timeout_seconds), timeout_seconds, timeout_seconds)
+			self.timeouts = TimeoutPolicy(fallback, self.timeouts.rules)
+		self.timeout_seconds = self.timeouts.default.read
 		self.default_window_ms = default_window_ms
 		self.debug = debug
+		if debug:
+			enable_debug("bp.http")
 		self._signing_key: Optional[signing.SigningKey] = None
 		self._time_offset_ms: int = 0
 		if self.api_secret_key_b64:
@@ -33,18 +65,18 @@ class BackpackClient:
 
 	def _sync_time_from_date_header(self) -> None:
 		try:
-			resp = self.session.get(f"{self.base_url}/api/v1/markets", timeout=self.timeout_seconds)
+			spec = self.timeouts.lookup("GET", "/api/v1/markets")
+			timeout = call_deadline(spec).timeout(spec.connect, spec.read, "time sync")
+			resp = self.transport.request("GET", f"{self.base_url}/api/v1/markets", timeout=timeout)
 			dh = resp.headers.get("Date")
 			if dh:
 				server_dt = parsedate_to_datetime(dh)
 				server_ms = int(server_dt.timestamp() * 1000)
 				local_ms = int(time.time() * 1000)
 				self._time_offset_ms = server_ms - local_ms
-				if self.debug:
-					print(f"[BackpackClient] time sync via Date header: server={server_ms}, local={local_ms}, offset={self._time_offset_ms}ms")
+				log.debug("time sync via Date header: server=%s, local=%s, offset=%sms", server_ms, local_ms, self._time_offset_ms)
 		except Exception as e:
-			if self.debug:
-				print(f"[BackpackClient] time sync failed: {e}")
+			log.warning("time sync failed: %s", e)
 
 	@staticmethod
 	def _alphabetical_qs(params: Dict[str, Any]) -> str:
@@ -53,6 +85,9 @@ class BackpackClient:
 			v = params[k]
 			if v is None:
 				continue
+			# 布尔值按 JSON 写法（true/false）参与签名，与请求体一致
+			if isinstance(v, bool):
+				v = "true" if v else "false"
 			pairs.append((k, v))
 		return "&".join([f"{k}={v}" for k, v in pairs])
 
@@ -65,9 +100,7 @@ class BackpackClient:
 		payload += f"&timestamp={timestamp_ms}&window={window_ms}"
 		sig = self._signing_key.sign(payload.encode("utf-8")).signature
 		sig_b64 = base64.b64encode(sig).decode("ascii")
-		if self.debug:
-			print(f"[BackpackClient] signing payload: {payload}")
-			print(f"[BackpackClient] signature(b64): {sig_b64}")
+		log.debug("signing payload: %s signature(b64): %s", payload, sig_b64)
 		return sig_b64
 
 	def _sign_batch_orders(self, instruction: str, orders: List[Dict[str, Any]], timestamp_ms: int, window_ms: int) -> str:
@@ -80,9 +113,7 @@ class BackpackClient:
 		payload = "&".join(parts) + f"&timestamp={timestamp_ms}&window={window_ms}"
 		sig = self._signing_key.sign(payload.encode("utf-8")).signature
 		sig_b64 = base64.b64encode(sig).decode("ascii")
-		if self.debug:
-			print(f"[BackpackClient] signing payload: {payload}")
-			print(f"[BackpackClient] signature(b64): {sig_b64}")
+		log.debug("signing payload: %s signature(b64): %s", payload, sig_b64)
 		return sig_b64
 
 	def _headers(self, signed: bool, timestamp_ms: Optional[int], window_ms: Optional[int], signature_b64: Optional[str]) -> Dict[str, str]:
@@ -110,8 +141,13 @@ class BackpackClient:
 		signed: bool = False,
 		_retry: int = 0,
 		_window_override: Optional[int] = None,
+		_deadline: Optional[Deadline] = None,
 	) -> Any:
 		url = f"{self.base_url}{path}"
+		# One deadline per call: retries reuse it, so they only get what is left of the budget
+		spec = self.timeouts.lookup(method, path)
+		dl = call_deadline(spec, _deadline)
+		timeout = dl.timeout(spec.connect, spec.read, f"{method.upper()} {path}")
 		# 使用本地当前时间毫秒作为 X-Timestamp（不使用偏移）
 		now_ms = int(time.time() * 1000)
 		window_ms = _window_override if _window_override is not None else (self.default_window_ms if signed else None)
@@ -129,25 +165,22 @@ class BackpackClient:
 				signature_b64 = self._sign(instruction, signing_params or {}, timestamp_ms or 0, window_ms or self.default_window_ms)
 
 		headers = self._headers(signed, timestamp_ms, window_ms, signature_b64)
-		if self.debug:
-			print(f"[BackpackClient] {method.upper()} {url}")
-			if params:
-				print(f"[BackpackClient] query params: {params}")
-			if json_body is not None:
-				print(f"[BackpackClient] json body: {json_body}")
+		if log.isEnabledFor(logging.DEBUG):
+			_dbg = dict(headers)
 			if signed:
-				_dbg = dict(headers)
 				_dbg["X-Signature"] = "<redacted>"
-				print(f"[BackpackClient] headers: {_dbg}")
-
-		resp = self.session.request(
-			method=method.upper(),
-			url=url,
-			params=params if method.upper() in ("GET",) else None,
-			json=json_body if method.upper() in ("POST", "PUT", "DELETE") else None,
-			headers=headers,
-			timeout=self.timeout_seconds,
-		)
+			log.debug("%s %s params=%s body=%s headers=%s", method.upper(), url, params, json_body, _dbg)
+
+		with span(f"{method.upper()} {path}", cat="http", venue="bp", instruction=instruction) as sp:
+			resp = self.transport.request(
+				method=method.upper(),
+				url=url,
+				params=params if method.upper() in ("GET",) else None,
+				json=json_body if method.upper() in ("POST", "PUT", "DELETE") else None,
+				headers=headers,
+				timeout=timeout,
+			)
+			sp.set(status=resp.status_code)
 		if resp.status_code >= 400:
 			try:
 				payload = resp.json()
@@ -157,14 +190,13 @@ class BackpackClient:
 			msg = str(payload.get("message", "")) if isinstance(payload, dict) else ""
 			if signed and _retry < 2 and ("expired" in msg.lower()):
 				if _retry == 0:
-					if self.debug:
-						print("[BackpackClient] expired -> syncing via Date header and retry...")
-					self._sync_time_from_date_header()
-					return self.request(method, path, instruction=instruction, params=params, json_body=json_body, signed=signed, _retry=_retry + 1)
+					log.debug("expired -> syncing via Date header and retry...")
+					with scoped(dl):
+						self._sync_time_from_date_header()
+					return self.request(method, path, instruction=instruction, params=params, json_body=json_body, signed=signed, _retry=_retry + 1, _deadline=dl)
 				else:
-					if self.debug:
-						print("[BackpackClient] expired again -> retry with window=60000 and fresh timestamp...")
-					return self.request(method, path, instruction=instruction, params=params, json_body=json_body, signed=signed, _retry=_retry + 1, _window_override=60000)
+					log.debug("expired again -> retry with window=60000 and fresh timestamp...")
+					return self.request(method, path, instruction=instruction, params=params, json_body=json_body, signed=signed, _retry=_retry + 1, _window_override=60000, _deadline=dl)
 			raise requests.HTTPError(f"HTTP {resp.status_code}: {payload}")
 		if resp.headers.get("Content-Type", "").startswith("application/json"):
 			return resp.json()
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Optional
 
+from common.tracing import traced
+
 from .http import BackpackClient
 
 
@@ -13,15 +15,18 @@ class MarketsDAO:
 			params["symbol"] = symbol
 		return self.client.request("GET", "/api/v1/markets", params=params or None)
 
+	@traced("bp.markets.market")
 	def market(self, symbol: str) -> Any:
 		return self.client.request("GET", "/api/v1/market", params={"symbol": symbol})
 
+	@traced("bp.markets.depth")
 	def depth(self, symbol: str, limit: Optional[int] = None) -> Any:
 		params: Dict[str, Any] = {"symbol": symbol}
 		if limit is not None:
 			params["limit"] = limit
 		return self.client.request("GET", "/api/v1/depth", params=params)
 
+	@traced("bp.markets.ticker")
 	def ticker(self, symbol: str) -> Any:
 		return self.client.request("GET", "/api/v1/ticker", params={"symbol": symbol})
 
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Optional, List
 
+from common.tracing import traced
+
 from .http import BackpackClient
 
 
@@ -7,6 +9,7 @@ class OrderDAO:
 	def __init__(self, client: BackpackClient):
 		self.client = client
 
+	@traced("bp.order.execute")
 	def execute(
 		self,
 		symbol: str,
@@ -40,6 +43,7 @@ class OrderDAO:
 		body: List[Dict[str, Any]] = [order]
 		return self.client.request("POST", "/api/v1/orders", instruction="orderExecute", json_body=body, signed=True)
 
+	@traced("bp.order.cancel")
 	def cancel(self, orderId: Optional[str] = None, clientId: Optional[str] = None, symbol: Optional[str] = None) -> Any:
 		# DELETE /api/v1/order, instruction: orderCancel, body requires one of orderId/clientId and symbol
 		body: Dict[str, Any] = {}
@@ -51,6 +55,7 @@ class OrderDAO:
 			body["symbol"] = symbol
 		return self.client.request("DELETE", "/api/v1/order", instruction="orderCancel", json_body=body, signed=True)
 
+	@traced("bp.order.get")
 	def get(self, orderId: Optional[str] = None, clientId: Optional[str] = None, symbol: Optional[str] = None) -> Any:
 		# GET /api/v1/order, instruction: orderQuery
 		params: Dict[str, Any] = {}
@@ -62,6 +67,7 @@ class OrderDAO:
 			params["symbol"] = symbol
 		return self.client.request("GET", "/api/v1/order", params=params or None, instruction="orderQuery", signed=True)
 
+	@traced("bp.order.get_open_orders")
 	def get_open_orders(self, symbol: Optional[str] = None, marketType: Optional[str] = None) -> Any:
 		# GET /api/v1/orders, instruction: orderQueryAll
 		params: Dict[str, Any] = {}
@@ -71,6 +77,7 @@ class OrderDAO:
 			params["marketType"] = marketType
 		return self.client.request("GET", "/api/v1/orders", params=params or None, instruction="orderQueryAll", signed=True)
 
+	@traced("bp.order.cancel_all_orders")
 	def cancel_all_orders(self, symbol: str, orderType: Optional[str] = None) -> Any:
 		# DELETE /api/v1/orders, instruction: orderCancelAll
 		body: Dict[str, Any] = {"symbol": symbol}
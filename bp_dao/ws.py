@@ -1,39 +1,91 @@
 import asyncio
-import json
-from typing import Any, AsyncIterable, Iterable, List, Optional
+from typing import Any, AsyncIterable, Callable, Iterable, List, Optional
 
 import websockets
 
+from common.ws_manager import BackpackProtocol, WSConnectionManager, find_shared_manager, shared_manager
+
 
 class BackpackWS:
-	def __init__(self, base_ws_url: str = "wss://ws.backpack.exchange"):
+	"""
+	Backpack websocket client.
+
+	stream()/subscribe_once()/unsubscribe() share one long-lived connection per base URL
+	and account (see common.ws_manager). Private streams (account.*) need a signature; pass
+	signer (returns a fresh [verifying_key, signature, timestamp, window] list) so the
+	subscription can be restored after a reconnect. A static signature= is only sent once:
+	after a reconnect the server rejects the unsigned subscribe and the stream raises.
+	Subscribe errors ({"id", "error"}) are raised from stream()/subscribe_once().
+	"""
+
+	def __init__(self, base_ws_url: str = "wss://ws.backpack.exchange",
+				 signer: Optional[Callable[[], List[str]]] = None):
 		self.base_ws_url = base_ws_url.rstrip("/")
+		self.signer = signer
+		self._account: Optional[str] = None
 
 	async def connect(self) -> websockets.WebSocketClientProtocol:
 		return await websockets.connect(self.base_ws_url, ping_interval=60)
 
-	async def stream(self, params: Iterable[str], signature: Optional[List[str]] = None) -> AsyncIterable[Any]:
-		async with await self.connect() as ws:
-			payload: dict = {"method": "SUBSCRIBE", "params": list(params)}
-			if signature:
-				payload["signature"] = signature
-			await ws.send(json.dumps(payload))
-			async for raw in ws:
-				try:
-					yield json.loads(raw)
-				except Exception:
-					yield raw
-
-	async def subscribe_once(self, params: Iterable[str], signature: Optional[List[str]] = None) -> Any:
-		async with await self.connect() as ws:
-			payload: dict = {"method": "SUBSCRIBE", "params": list(params)}
-			if signature:
-				payload["signature"] = signature
-			await ws.send(json.dumps(payload))
-			return await ws.recv()
+	async def manager(self, signature: Optional[List[str]] = None) -> WSConnectionManager:
+		"""Shared persistent connection for this base URL and account (started on first use).
+
+		Connections are keyed by the verifying key, so clients for different accounts never
+		share (or overwrite) each other's signer.
+		"""
+		signer = self.signer
+		if signer is None and signature:
+			signer = _once(signature)
+		if signer is not None and self._account is None:
+			self._account = (signature or signer())[0]
+		mgr = shared_manager(self.base_ws_url, BackpackProtocol, scope=self._account, ping_interval=60,
+							 name="BackpackWS")
+		if signer is not None:
+			# same account: a newer signer (or fresh static signature) is always safe to install
+			mgr.protocol.signer = signer
+		await mgr.start()
+		return mgr
+
+	async def stream(self, params: Iterable[str], signature: Optional[List[str]] = None,
+					 maxsize: int = 0, typed: bool = False, policy: Optional[str] = None) -> AsyncIterable[Any]:
+		"""Yields {"stream", "data"}; typed=True decodes bookTicker/trade/depth into common.ws_decode events,
+		policy selects latest/ring/lossless delivery (common.delivery)."""
+		mgr = await self.manager(signature)
+		sub = await mgr.subscribe(*params, maxsize=maxsize, typed=typed, policy=policy)
+		try:
+			async for stream, data in sub:
+				yield {"stream": stream, "data": data}
+		finally:
+			await mgr.unsubscribe(sub)
+
+	async def subscribe_once(self, params: Iterable[str], signature: Optional[List[str]] = None,
+							 timeout: Optional[float] = None) -> Any:
+		"""First message of the streams; raises RuntimeError if the server rejects the subscribe
+		and asyncio.TimeoutError if nothing arrives within timeout seconds."""
+		mgr = await self.manager(signature)
+		sub = await mgr.subscribe(*params)
+		try:
+			stream, data = await asyncio.wait_for(sub.get(), timeout)
+			return {"stream": stream, "data": data}
+		finally:
+			await mgr.unsubscribe(sub)
 
 	async def unsubscribe(self, params: Iterable[str]) -> Any:
-		async with await self.connect() as ws:
-			payload: dict = {"method": "UNSUBSCRIBE", "params": list(params)}
-			await ws.send(json.dumps(payload))
-			return await ws.recv()
+		"""Backpack does not acknowledge UNSUBSCRIBE, so this returns None once sent."""
+		mgr = await self.manager()
+		return await mgr.unsubscribe_streams(list(params))
+
+	async def close(self) -> None:
+		mgr = find_shared_manager(self.base_ws_url, BackpackProtocol, self._account)
+		if mgr is not None:
+			await mgr.close()
+
+
+def _once(signature: List[str]) -> Callable[[], Optional[List[str]]]:
+	"""Signer for a static signature: its timestamp goes stale, so only the first subscribe uses it."""
+	pending = [signature]
+
+	def signer() -> Optional[List[str]]:
+		return pending.pop() if pending else None
+
+	return signer
@@ -0,0 +1 @@
+# 跨交易所共享的基础设施（追踪等）
@@ -0,0 +1,446 @@
+"""
+对冲循环回测（NumPy 向量化）
+
+模拟 scripts/hedge_bp_aster_futures_loop.py 中 execute_hedge_cycle 的逻辑:
+	第一腿: BP 以 最新价 x (1 + offset) 挂卖单，每 poll_interval 检查一次成交；挂单超过
+	        max_order_wait_seconds 未成交则撤单并按最新价重挂；超过 max_monitor_seconds 放弃本轮。
+	        成交后 Aster 合约市价买入对冲。
+	休眠 between_legs_sleep 秒。
+	第二腿: BP 以 最新价 x (1 - offset) 挂买单，规则同上；成交后 Aster 市价卖出对冲。
+	        超时未成交则 Aster 市价平多、BP 以对手价买入平空。
+	休眠 cycle_sleep 秒后开始下一轮。
+
+时间离散为 poll_interval 的网格（与脚本的轮询一致），行情由 common.recorder 录制的数据预先聚合为
+每个网格区间的数组: BP 最新成交价、区间内最高/最低成交价与最优买卖价（判断挂单是否被吃到）、
+Aster 按深度快照计算的市价成交均价（含滑点）。所有参数组同时推进，每个时间步只做几次长度为
+参数组数的数组运算，数千组参数在一次遍历中完成。
+
+不建模的部分: 挂单排队位置（fill_on_touch=False 时要求成交价穿过挂单价作为保守估计）、
+下单/撤单的网络延迟（只对 Aster 对冲计 hedge_latency）、撤单与成交的竞争、资金费。
+"""
+import itertools
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from common.recorder import SIDE_ASK, SIDE_BID, SegmentReader, segment_paths
+
+# 回测参数（与 trade 配置同名，offset_percent 为百分比）
+PARAMS = ("offset_percent", "max_order_wait_seconds", "between_legs_sleep", "cycle_sleep")
+
+LEG1, BETWEEN, LEG2, SLEEP = 0, 1, 2, 3
+
+_SNAPSHOT_DEPTH = re.compile(r"@depth\d+")
+
+
+def _load(paths: Sequence[Any], venue: str, symbol: str, kind: str, start_ns: Optional[int], end_ns: Optional[int],
+		  stream_pattern: Optional[re.Pattern] = None) -> Dict[str, np.ndarray]:
+	"""从各段读取某交易所某交易对某类型的行，按接收时间排序"""
+	parts: List[Dict[str, np.ndarray]] = []
+	for path in paths:
+		with SegmentReader(path) as reader:
+			sids = [sid for sid, (v, stream, sym) in reader.streams.items()
+					if v == venue and sym == symbol and (stream_pattern is None or stream_pattern.search(stream))]
+			if not sids:
+				continue
+			cols = reader.read_kind(kind, start_ns, end_ns, sids)
+			if len(cols["recv_ns"]):
+				parts.append({name: np.array(col) for name, col in cols.items()})
+	if not parts:
+		return {}
+	out = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+	order = np.argsort(out["recv_ns"], kind="stable")
+	return {name: col[order] for name, col in out.items()}
+
+
+def _asof(ts: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+	"""每个网格时刻之前（含）最后一个值，之前没有值时为 NaN"""
+	idx = np.searchsorted(ts, grid, side="right") - 1
+	out = values[np.maximum(idx, 0)].astype(np.float64)
+	out[idx < 0] = np.nan
+	return out
+
+
+def _bin_reduce(ts: np.ndarray, values: np.ndarray, grid: np.ndarray, dt_ns: int, ufunc: np.ufunc,
+				empty: float) -> np.ndarray:
+	"""区间 (grid[k] - dt, grid[k]] 内的 ufunc 归约（最大/最小），空区间为 empty"""
+	out = np.full(len(grid), empty, dtype=np.float64)
+	if not len(ts):
+		return out
+	ends = np.searchsorted(ts, grid, side="right")
+	starts = np.searchsorted(ts, grid - dt_ns, side="right")
+	nonempty = np.flatnonzero(ends > starts)
+	if len(nonempty):
+		v = values[:ends[-1]]
+		out[nonempty] = ufunc.reduceat(v, starts[nonempty])
+	return out
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+	mask = np.isnan(values)
+	if not mask.any():
+		return values
+	idx = np.where(~mask, np.arange(len(values)), 0)
+	np.maximum.accumulate(idx, out=idx)
+	out = values[idx]
+	# 开头没有值的部分用第一个有效值填充
+	first = np.flatnonzero(~mask)
+	if len(first):
+		out[: first[0]] = values[first[0]]
+	return out
+
+
+def depth_vwap(depth: Dict[str, np.ndarray], quantity: float, side: int) -> Dict[str, np.ndarray]:
+	"""
+	按深度快照计算市价成交 quantity 的均价（side=SIDE_ASK 为买入吃卖盘，SIDE_BID 为卖出吃买盘）
+
+	返回 {"recv_ns", "vwap"}，每条深度推送一个值；深度不足时剩余部分按最差一档计
+	"""
+	recv, final, stream = depth["recv_ns"], depth["final_update_id"], depth["stream"]
+	n = len(recv)
+	if not n:
+		return {"recv_ns": np.empty(0, dtype=np.int64), "vwap": np.empty(0)}
+	boundary = np.ones(n, dtype=bool)
+	boundary[1:] = (recv[1:] != recv[:-1]) | (final[1:] != final[:-1]) | (stream[1:] != stream[:-1])
+	msg = np.cumsum(boundary) - 1
+	rows = np.flatnonzero(depth["side"] == side)
+	if not len(rows):
+		return {"recv_ns": np.empty(0, dtype=np.int64), "vwap": np.empty(0)}
+	m, price, qty = msg[rows], depth["price"][rows], depth["qty"][rows]
+	starts = np.flatnonzero(np.r_[True, m[1:] != m[:-1]])
+	cum = np.cumsum(qty)
+	before = cum - qty - np.repeat(np.r_[0.0, cum[starts[1:] - 1]], np.diff(np.r_[starts, len(m)]))
+	take = np.clip(quantity - before, 0.0, qty)
+	cost = np.add.reduceat(take * price, starts)
+	filled = np.add.reduceat(take, starts)
+	worst = price[np.r_[starts[1:], len(m)] - 1]
+	vwap = (cost + (quantity - filled) * worst) / quantity
+	return {"recv_ns": recv[rows][starts], "vwap": vwap}
+
+
+class MarketGrid:
+	"""
+	按 poll_interval 网格聚合的行情数组（回测输入）
+
+	Args:
+		times_ns: 网格时刻
+		dt: 网格间隔（秒），即订单状态轮询间隔
+		bp_last: BP 最新成交价（挂单定价用，对应 get_bp_last_price）
+		bp_up / bp_down: 区间内 BP 的最高成交价/最优买价、最低成交价/最优卖价（判断卖单/买单是否成交）
+		bp_bid / bp_ask: BP 最优买卖价（超时平仓用）
+		aster_buy / aster_sell: Aster 市价买入/卖出 quantity 的成交均价
+		aster_mid: Aster 中间价（期末按市值计）
+		quantity: 每腿数量
+	"""
+
+	ARRAYS = ("times_ns", "bp_last", "bp_up", "bp_down", "bp_bid", "bp_ask", "aster_buy", "aster_sell", "aster_mid")
+
+	def __init__(self, times_ns: np.ndarray, dt: float, bp_last: np.ndarray, bp_up: np.ndarray, bp_down: np.ndarray,
+				 bp_bid: np.ndarray, bp_ask: np.ndarray, aster_buy: np.ndarray, aster_sell: np.ndarray,
+				 aster_mid: np.ndarray, quantity: float):
+		self.times_ns = times_ns
+		self.dt = dt
+		self.bp_last = bp_last
+		self.bp_up = bp_up
+		self.bp_down = bp_down
+		self.bp_bid = bp_bid
+		self.bp_ask = bp_ask
+		self.aster_buy = aster_buy
+		self.aster_sell = aster_sell
+		self.aster_mid = aster_mid
+		self.quantity = quantity
+
+	def __len__(self) -> int:
+		return len(self.times_ns)
+
+	@property
+	def duration(self) -> float:
+		return len(self) * self.dt
+
+	def arrays(self) -> Dict[str, np.ndarray]:
+		return {name: getattr(self, name) for name in self.ARRAYS}
+
+	@classmethod
+	def from_arrays(cls, arrays: Dict[str, np.ndarray], dt: float, quantity: float) -> "MarketGrid":
+		return cls(dt=dt, quantity=quantity, **{name: arrays[name] for name in cls.ARRAYS})
+
+	def window(self, start: int = 0, stop: Optional[int] = None) -> "MarketGrid":
+		"""第 start ~ stop 步的子网格（数组切片，不复制）"""
+		return self.from_arrays({name: arr[start:stop] for name, arr in self.arrays().items()}, self.dt, self.quantity)
+
+	def save(self, directory: Any) -> Path:
+		"""每个数组存为一个 .npy（供多进程以 mmap 共享），元数据写入 grid.json"""
+		out = Path(directory)
+		out.mkdir(parents=True, exist_ok=True)
+		for name, arr in self.arrays().items():
+			np.save(out / f"{name}.npy", np.ascontiguousarray(arr))
+		(out / "grid.json").write_text(json.dumps({"dt": self.dt, "quantity": self.quantity, "steps": len(self)}),
+									   encoding="utf-8")
+		return out
+
+	@classmethod
+	def load(cls, directory: Any, mmap: bool = True) -> "MarketGrid":
+		"""读取 save() 的输出；mmap=True 时数组为只读内存映射，多个进程共享同一份页缓存"""
+		d = Path(directory)
+		meta = json.loads((d / "grid.json").read_text(encoding="utf-8"))
+		mode = "r" if mmap else None
+		arrays = {name: np.load(d / f"{name}.npy", mmap_mode=mode) for name in cls.ARRAYS}
+		return cls.from_arrays(arrays, meta["dt"], meta["quantity"])
+
+	@classmethod
+	def from_segments(cls, paths: Any, bp_symbol: str = "ASTER_USDC_PERP", aster_symbol: str = "ASTERUSDT",
+					  quantity: float = 10.0, dt: float = 1.0, start_ns: Optional[int] = None,
+					  end_ns: Optional[int] = None, slippage_bps: float = 1.0) -> "MarketGrid":
+		"""
+		从录制的段文件构建网格
+
+		Aster 有深度快照流（如 depth20@100ms）时按深度计算市价均价，否则用 bookTicker 买卖价加 slippage_bps
+		"""
+		if not isinstance(paths, (list, tuple)):
+			paths = segment_paths(paths) if not str(paths).endswith(".seg") else [paths]
+		bp_trades = _load(paths, "bp", bp_symbol, "trade", start_ns, end_ns)
+		bp_book = _load(paths, "bp", bp_symbol, "bookTicker", start_ns, end_ns)
+		aster_book = _load(paths, "aster", aster_symbol, "bookTicker", start_ns, end_ns)
+		aster_depth = _load(paths, "aster", aster_symbol, "depth", start_ns, end_ns, _SNAPSHOT_DEPTH)
+		if not bp_book or not aster_book:
+			raise ValueError(f"录制数据中缺少 bookTicker: bp={bp_symbol} {len(bp_book)>0} aster={aster_symbol} {len(aster_book)>0}")
+
+		first = max(bp_book["recv_ns"][0], aster_book["recv_ns"][0])
+		last = min(bp_book["recv_ns"][-1], aster_book["recv_ns"][-1])
+		dt_ns = int(dt * 1e9)
+		t0 = first if start_ns is None else max(first, start_ns)
+		t1 = last if end_ns is None else min(last, end_ns)
+		if t1 <= t0:
+			raise ValueError("两个交易所的录制数据没有重叠的时间段")
+		grid = np.arange(t0, t1 + 1, dt_ns, dtype=np.int64)
+
+		bp_bid = _ffill(_asof(bp_book["recv_ns"], bp_book["bid_price"], grid))
+		bp_ask = _ffill(_asof(bp_book["recv_ns"], bp_book["ask_price"], grid))
+		if bp_trades:
+			last_trade = _asof(bp_trades["recv_ns"], bp_trades["price"], grid)
+			trade_hi = _bin_reduce(bp_trades["recv_ns"], bp_trades["price"], grid, dt_ns, np.maximum, -np.inf)
+			trade_lo = _bin_reduce(bp_trades["recv_ns"], bp_trades["price"], grid, dt_ns, np.minimum, np.inf)
+		else:
+			last_trade = np.full(len(grid), np.nan)
+			trade_hi = np.full(len(grid), -np.inf)
+			trade_lo = np.full(len(grid), np.inf)
+		# 还没有成交时用中间价作为最新价
+		bp_last = np.where(np.isnan(last_trade), (bp_bid + bp_ask) / 2, last_trade)
+		bid_hi = _bin_reduce(bp_book["recv_ns"], bp_book["bid_price"], grid, dt_ns, np.maximum, -np.inf)
+		ask_lo = _bin_reduce(bp_book["recv_ns"], bp_book["ask_price"], grid, dt_ns, np.minimum, np.inf)
+		bp_up = np.maximum(np.maximum(trade_hi, bid_hi), bp_bid)
+		bp_down = np.minimum(np.minimum(trade_lo, ask_lo), bp_ask)
+
+		a_bid = _ffill(_asof(aster_book["recv_ns"], aster_book["bid_price"], grid))
+		a_ask = _ffill(_asof(aster_book["recv_ns"], aster_book["ask_price"], grid))
+		slip = slippage_bps / 1e4
+		aster_buy, aster_sell = a_ask * (1 + slip), a_bid * (1 - slip)
+		if aster_depth:
+			buy = depth_vwap(aster_depth, quantity, SIDE_ASK)
+			sell = depth_vwap(aster_depth, quantity, SIDE_BID)
+			if len(buy["vwap"]):
+				vwap = _asof(buy["recv_ns"], buy["vwap"], grid)
+				aster_buy = np.where(np.isnan(vwap), aster_buy, np.maximum(vwap, a_ask))
+			if len(sell["vwap"]):
+				vwap = _asof(sell["recv_ns"], sell["vwap"], grid)
+				aster_sell = np.where(np.isnan(vwap), aster_sell, np.minimum(vwap, a_bid))
+		return cls(grid, dt, bp_last, bp_up, bp_down, bp_bid, bp_ask, aster_buy, aster_sell, (a_bid + a_ask) / 2, quantity)
+
+
+def param_grid(**values: Iterable[float]) -> Dict[str, np.ndarray]:
+	"""参数的笛卡尔积，例如 param_grid(offset_percent=[0.1, 0.2], cycle_sleep=[30, 60])"""
+	names = list(values)
+	combos = list(itertools.product(*(list(values[name]) for name in names)))
+	return {name: np.array([c[i] for c in combos], dtype=np.float64) for i, name in enumerate(names)}
+
+
+def simulate(grid: MarketGrid, params: Dict[str, Any], tick_size: float = 0.0001, max_monitor_seconds: float = 300.0,
+			 hedge_latency: float = 0.2, bp_maker_fee: float = 0.0002, bp_taker_fee: float = 0.0005,
+			 aster_taker_fee: float = 0.00035, fill_on_touch: bool = True) -> Dict[str, np.ndarray]:
+	"""
+	同时回测多组参数
+
+	Args:
+		grid: 行情网格（dt 即 poll_interval_seconds）
+		params: PARAMS 中各参数的数组（长度相同，标量会广播），缺省的参数使用脚本默认值
+		tick_size: BP 价格步长（挂单价向下取整）
+		max_monitor_seconds: 单腿最长监控时间
+		hedge_latency: 发现成交到 Aster 对冲成交的延迟（秒）
+		fill_on_touch: 成交价等于挂单价即视为成交；False 时要求穿过（排队靠后的保守估计）
+
+	Returns:
+		各参数组的结果数组: pnl（期末按中间价计未平仓位）、fees、cycles、completed_cycles、orders、fills、
+		fill_rate、reprices、leg1_timeouts、leg2_timeouts、unhedged_seconds、aster_slippage_bps 等
+	"""
+	defaults = {"offset_percent": 0.2, "max_order_wait_seconds": 10, "between_legs_sleep": 20, "cycle_sleep": 60}
+	arrays = np.broadcast_arrays(*(np.asarray(params.get(name, defaults[name]), dtype=np.float64) for name in PARAMS))
+	offset, order_wait, between, cycle_sleep = (np.atleast_1d(a).astype(np.float64) for a in arrays)
+	n = len(offset)
+	T = len(grid)
+	dt = grid.dt
+	q = grid.quantity
+	off = offset / 100
+	wait_steps = np.maximum(np.ceil(order_wait / dt - 1e-9), 1).astype(np.int64)
+	between_steps = np.round(between / dt).astype(np.int64)
+	cycle_steps = np.round(cycle_sleep / dt).astype(np.int64)
+	monitor_steps = max(int(math.ceil(max_monitor_seconds / dt - 1e-9)), 1)
+	lat = int(math.ceil(hedge_latency / dt - 1e-9))
+
+	# np.memmap 转为普通 ndarray 视图（不复制），避免逐元素访问时的子类开销
+	last, up, down = np.asarray(grid.bp_last), np.asarray(grid.bp_up), np.asarray(grid.bp_down)
+	bp_bid, bp_ask = np.asarray(grid.bp_bid), np.asarray(grid.bp_ask)
+	a_buy, a_sell, a_mid = np.asarray(grid.aster_buy), np.asarray(grid.aster_sell), np.asarray(grid.aster_mid)
+	inv_tick = 1.0 / tick_size
+
+	def ask_price(k: int, idx: np.ndarray) -> np.ndarray:
+		return np.floor(last[k] * (1 + off[idx]) * inv_tick + 1e-9) * tick_size
+
+	def bid_price(k: int, idx: np.ndarray) -> np.ndarray:
+		return np.floor(last[k] * (1 - off[idx]) * inv_tick + 1e-9) * tick_size
+
+	everyone = np.arange(n)
+	phase = np.full(n, LEG1, dtype=np.int8)
+	price = ask_price(0, everyone)
+	start = np.zeros(n, dtype=np.int64)
+	retry = np.zeros(n, dtype=np.int64)
+	wake = np.zeros(n, dtype=np.int64)
+
+	bp_cash = np.zeros(n)
+	bp_pos = np.zeros(n)
+	aster_cash = np.zeros(n)
+	aster_pos = np.zeros(n)
+	fees = np.zeros(n)
+	slippage = np.zeros(n)
+	cycles = np.ones(n, dtype=np.int64)
+	completed = np.zeros(n, dtype=np.int64)
+	orders = np.ones(n, dtype=np.int64)
+	fills = np.zeros(n, dtype=np.int64)
+	reprices = np.zeros(n, dtype=np.int64)
+	leg1_timeouts = np.zeros(n, dtype=np.int64)
+	leg2_timeouts = np.zeros(n, dtype=np.int64)
+	hedges = np.zeros(n, dtype=np.int64)
+	unhedged = np.zeros(n)
+
+	hedge_delay = dt / 2 + hedge_latency
+	for k in range(1, T):
+		kl = min(k + lat, T - 1)
+		leg1 = phase == LEG1
+		leg2 = phase == LEG2
+		waiting = leg1 | leg2
+		if waiting.any():
+			timed_out = waiting & (k - start >= monitor_steps)
+			active = waiting & ~timed_out
+			if fill_on_touch:
+				f1 = active & leg1 & (up[k] >= price)
+				f2 = active & leg2 & (down[k] <= price)
+			else:
+				f1 = active & leg1 & (up[k] > price)
+				f2 = active & leg2 & (down[k] < price)
+
+			idx = np.flatnonzero(f1)
+			if len(idx):
+				# 第一腿成交：BP 卖出（maker），Aster 市价买入对冲
+				px, ax = price[idx], a_buy[kl]
+				bp_cash[idx] += px * q
+				bp_pos[idx] -= q
+				aster_cash[idx] -= ax * q
+				aster_pos[idx] += q
+				fees[idx] += px * q * bp_maker_fee + ax * q * aster_taker_fee
+				slippage[idx] += (ax - a_mid[kl]) / a_mid[kl]
+				fills[idx] += 1
+				hedges[idx] += 1
+				unhedged[idx] += hedge_delay
+				phase[idx] = BETWEEN
+				wake[idx] = k + between_steps[idx]
+
+			idx = np.flatnonzero(f2)
+			if len(idx):
+				# 第二腿成交：BP 买入（maker），Aster 市价卖出对冲
+				px, ax = price[idx], a_sell[kl]
+				bp_cash[idx] -= px * q
+				bp_pos[idx] += q
+				aster_cash[idx] += ax * q
+				aster_pos[idx] -= q
+				fees[idx] += px * q * bp_maker_fee + ax * q * aster_taker_fee
+				slippage[idx] += (a_mid[kl] - ax) / a_mid[kl]
+				fills[idx] += 1
+				hedges[idx] += 1
+				unhedged[idx] += hedge_delay
+				completed[idx] += 1
+				phase[idx] = SLEEP
+				wake[idx] = k + cycle_steps[idx]
+
+			idx = np.flatnonzero(timed_out & leg1)
+			if len(idx):
+				# 第一腿超时：撤单，跳过第二腿
+				leg1_timeouts[idx] += 1
+				phase[idx] = SLEEP
+				wake[idx] = k + cycle_steps[idx]
+
+			idx = np.flatnonzero(timed_out & leg2)
+			if len(idx):
+				# 第二腿超时：Aster 市价平多，BP 以对手价买入平空（均为 taker）
+				ax, bx = a_sell[kl], bp_ask[k]
+				aster_cash[idx] += ax * q
+				aster_pos[idx] -= q
+				bp_cash[idx] -= bx * q
+				bp_pos[idx] += q
+				fees[idx] += bx * q * bp_taker_fee + ax * q * aster_taker_fee
+				leg2_timeouts[idx] += 1
+				phase[idx] = SLEEP
+				wake[idx] = k + cycle_steps[idx]
+
+			idx = np.flatnonzero(active & ~(f1 | f2) & (k - retry >= wait_steps))
+			if len(idx):
+				# 挂单等待超时：撤单并按最新价重挂
+				sell = phase[idx] == LEG1
+				price[idx] = np.where(sell, ask_price(k, idx), bid_price(k, idx))
+				retry[idx] = k
+				orders[idx] += 1
+				reprices[idx] += 1
+
+		idx = np.flatnonzero((phase == BETWEEN) & (wake <= k))
+		if len(idx):
+			phase[idx] = LEG2
+			price[idx] = bid_price(k, idx)
+			start[idx] = retry[idx] = k
+			orders[idx] += 1
+
+		idx = np.flatnonzero((phase == SLEEP) & (wake <= k))
+		if len(idx):
+			phase[idx] = LEG1
+			price[idx] = ask_price(k, idx)
+			start[idx] = retry[idx] = k
+			orders[idx] += 1
+			cycles[idx] += 1
+
+	# 期末未平仓位按中间价计
+	bp_mid = (bp_bid[-1] + bp_ask[-1]) / 2
+	gross = bp_cash + bp_pos * bp_mid + aster_cash + aster_pos * a_mid[-1]
+	return {
+		**{name: arr for name, arr in zip(PARAMS, (offset, order_wait, between, cycle_sleep))},
+		"pnl": gross - fees,
+		"gross_pnl": gross,
+		"fees": fees,
+		"cycles": cycles,
+		"completed_cycles": completed,
+		"orders": orders,
+		"fills": fills,
+		"fill_rate": fills / np.maximum(orders, 1),
+		"reprices": reprices,
+		"leg1_timeouts": leg1_timeouts,
+		"leg2_timeouts": leg2_timeouts,
+		"unhedged_seconds": unhedged,
+		"aster_slippage_bps": np.where(hedges > 0, slippage / np.maximum(hedges, 1) * 1e4, 0.0),
+		"open_position": bp_pos + aster_pos,
+	}
+
+
+def top(results: Dict[str, np.ndarray], n: int = 10, by: str = "pnl") -> List[Dict[str, Any]]:
+	"""按某个指标取前 n 组参数（降序）"""
+	order = np.argsort(-results[by], kind="stable")[:n]
+	return [{name: (col[i].item() if hasattr(col[i], "item") else col[i]) for name, col in results.items()} for i in order]
@@ -0,0 +1,187 @@
+"""
+请求截止时间（deadline）与按接口的超时
+
+一次调用（可能包含多次重试、多个请求）共享一个截止时间：每个请求的 requests 超时取
+min(接口的连接/读取超时, 剩余预算)，重试只能用剩下的时间；预算用完或被取消时抛 DeadlineExceeded
+（requests.Timeout 的子类，已有的超时处理照常生效），调用方据此改走其它路径或放弃。
+
+	with deadline(2.0) as dl:                 # 这次对冲查询最多 2 秒，含重试
+		status = trade.get_order(symbol, order_id=oid)
+	# 别的线程可以 dl.cancel()：之后的请求（含重试）不再发出
+
+客户端按接口取默认值（EndpointTimeout：连接超时、读取超时、单次调用预算）：下单/撤单短，历史查询长，
+见各客户端模块的 DEFAULT_TIMEOUTS；配置中的 timeouts 段可以覆盖（TimeoutPolicy.override）。
+
+注意：requests 的读取超时是两次收到数据之间的间隔，不是整个响应的总时长；已经发出的请求无法中途取消，
+取消只对之后的请求生效。
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+
+# 连接/读取超时的下限（秒）：剩余预算低于它时直接判定超时，不再发出注定超时的请求
+MIN_TIMEOUT = 0.05
+
+_current: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(requests.Timeout):
+	"""调用预算用完（或被取消）"""
+
+
+class Deadline:
+	"""
+	截止时间
+
+	Args:
+		budget: 预算（秒），None 表示不限
+		parent: 外层截止时间；取两者中更早的一个，外层被取消时本层也视为取消
+	"""
+
+	def __init__(self, budget: Optional[float], parent: Optional["Deadline"] = None):
+		now = time.monotonic()
+		self.started = now
+		self.expires_at = now + budget if budget is not None else None
+		self.parent = parent
+		if parent is not None and parent.expires_at is not None:
+			self.expires_at = parent.expires_at if self.expires_at is None else min(self.expires_at, parent.expires_at)
+		self._cancelled = threading.Event()
+		self.reason: Optional[str] = None
+
+	def remaining(self) -> Optional[float]:
+		"""剩余秒数（不限时返回 None）"""
+		if self.expires_at is None:
+			return None
+		return max(0.0, self.expires_at - time.monotonic())
+
+	@property
+	def cancelled(self) -> bool:
+		return self._cancelled.is_set() or (self.parent is not None and self.parent.cancelled)
+
+	@property
+	def expired(self) -> bool:
+		remaining = self.remaining()
+		return remaining is not None and remaining < MIN_TIMEOUT
+
+	def cancel(self, reason: str = "cancelled") -> None:
+		"""取消：之后经过该截止时间的请求直接抛 DeadlineExceeded"""
+		self.reason = reason
+		self._cancelled.set()
+
+	def check(self, what: str = "") -> None:
+		if self.cancelled:
+			raise DeadlineExceeded(f"{what} 已取消: {self.reason or (self.parent.reason if self.parent else '')}".strip())
+		if self.expired:
+			raise DeadlineExceeded(f"{what} 超过截止时间（预算 {self.expires_at - self.started:.3f}s）".strip())
+
+	def timeout(self, connect: float, read: float, what: str = "") -> Tuple[float, float]:
+		"""requests 的 (连接超时, 读取超时)，不超过剩余预算"""
+		self.check(what)
+		remaining = self.remaining()
+		if remaining is None:
+			return connect, read
+		return min(connect, remaining), min(read, remaining)
+
+
+def current_deadline() -> Optional[Deadline]:
+	return _current.get()
+
+
+@contextmanager
+def deadline(budget: Optional[float]) -> Iterator[Deadline]:
+	"""在此上下文中发出的请求共享预算 budget 秒（与外层截止时间取更早者）"""
+	dl = Deadline(budget, parent=_current.get())
+	token = _current.set(dl)
+	try:
+		yield dl
+	finally:
+		_current.reset(token)
+
+
+class EndpointTimeout:
+	"""
+	单个接口的超时
+
+	Args:
+		connect: 连接超时（秒）
+		read: 读取超时（秒）
+		budget: 单次调用（含重试）的总预算（秒）
+	"""
+
+	__slots__ = ("connect", "read", "budget")
+
+	def __init__(self, connect: float, read: float, budget: Optional[float] = None):
+		self.connect = float(connect)
+		self.read = float(read)
+		self.budget = float(budget) if budget is not None else self.connect + self.read
+
+	def __repr__(self) -> str:
+		return f"EndpointTimeout(connect={self.connect}, read={self.read}, budget={self.budget})"
+
+
+class TimeoutPolicy:
+	"""
+	按接口取超时
+
+	Args:
+		default: 没有匹配规则时使用
+		rules: [(方法或 "*", 路径, EndpointTimeout)]，按顺序第一个匹配的生效；路径以 "/" 结尾时按前缀匹配
+	"""
+
+	def __init__(self, default: EndpointTimeout, rules: Sequence[Tuple[str, str, EndpointTimeout]] = ()):
+		self.default = default
+		self.rules: List[Tuple[str, str, EndpointTimeout]] = [(m.upper(), p, t) for m, p, t in rules]
+		self._cache: Dict[Tuple[str, str], EndpointTimeout] = {}
+
+	def lookup(self, method: str, path: str) -> EndpointTimeout:
+		key = (method.upper(), path)
+		hit = self._cache.get(key)
+		if hit is not None:
+			return hit
+		found = self.default
+		for m, p, t in self.rules:
+			if m in ("*", key[0]) and (path == p or (p.endswith("/") and path.startswith(p))):
+				found = t
+				break
+		self._cache[key] = found
+		return found
+
+	def override(self, cfg: Optional[Dict[str, Any]]) -> "TimeoutPolicy":
+		"""
+		按配置覆盖，返回新的策略
+
+		cfg: {"default": {"connect": 3, "read": 10, "budget": 15},
+		      "endpoints": {"POST /fapi/v1/order": {"read": 1.5, "budget": 2.5}, "GET /wapi/v1/history/": {...}}}
+		"""
+		if not cfg:
+			return self
+
+		def merged(base: EndpointTimeout, spec: Dict[str, Any]) -> EndpointTimeout:
+			return EndpointTimeout(spec.get("connect", base.connect), spec.get("read", base.read),
+								   spec.get("budget", base.budget))
+
+		default = merged(self.default, cfg.get("default") or {})
+		rules: List[Tuple[str, str, EndpointTimeout]] = []
+		for name, spec in (cfg.get("endpoints") or {}).items():
+			method, _, path = name.strip().rpartition(" ")
+			rules.append((method or "*", path, merged(self.lookup(method or "GET", path), spec)))
+		return TimeoutPolicy(default, rules + self.rules)
+
+
+def call_deadline(spec: EndpointTimeout, inherited: Optional[Deadline] = None) -> Deadline:
+	"""客户端单次调用的截止时间：重试时沿用 inherited，否则在当前截止时间之下按接口预算新建"""
+	return inherited if inherited is not None else Deadline(spec.budget, parent=_current.get())
+
+
+@contextmanager
+def scoped(dl: Deadline) -> Iterator[Deadline]:
+	"""把已有的截止时间设为当前截止时间（如客户端重试前的时间同步也只能使用剩余预算）"""
+	token = _current.set(dl)
+	try:
+		yield dl
+	finally:
+		_current.reset(token)
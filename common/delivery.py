@@ -0,0 +1,289 @@
+"""
+行情消息的投递策略
+
+- latest：按流只保留最新一条（报价、部分深度快照等），慢消费者总是拿到最新值，被覆盖的条数计入 conflated
+- ring：有界环形缓冲（成交等），满了丢弃最旧的一条并计入 dropped
+- lossless：不限长度、不丢消息（用户数据流：订单、账户更新）
+
+DeliveryBuffer 本身不加锁；异步订阅（common.ws_manager.Subscription）直接使用，
+线程回调（Mailbox/StreamWorker）在外层加锁。每条消息记录入队时间，出队时统计排队延迟。
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from common.ws_decode import stream_kind
+
+LATEST = "latest"
+RING = "ring"
+LOSSLESS = "lossless"
+POLICIES = (LATEST, RING, LOSSLESS)
+
+# ring 策略未指定长度时的默认容量
+DEFAULT_RING_SIZE = 1000
+
+# 按流类型推断的默认策略（Aster: "sym@kind"；Backpack: "kind.SYM"）
+_LATEST_KINDS = ("bookTicker", "markPrice", "ticker", "miniTicker", "kline")
+# 增量深度（sym@depth、Backpack depth.SYM）不能合并，否则本地盘口会缺增量；
+# 用环形缓冲，消费者可通过 dropped 或 update id 断档发现丢失后重新拉快照
+_RING_KINDS = ("trade", "aggTrade", "forceOrder", "depth")
+
+
+def default_policy(stream: str) -> str:
+	"""
+	按流名称推断投递策略：报价/部分深度快照（depth5/10/20）/标记价格/K线为 latest，
+	成交和增量深度为 ring，其他（listenKey 用户数据流、Backpack account.*）为 lossless。
+	全市场数组流（@arr）每帧可能只包含有变化的交易对，合并会丢失其他交易对的更新，因此用 ring
+	"""
+	if "@arr" in stream:
+		return RING
+	if stream.startswith("!"):
+		kind = stream[1:].split("@", 1)[0]
+	elif "@" in stream:
+		kind = stream.split("@", 2)[1]
+	elif "." in stream:
+		kind = stream.split(".", 1)[0]
+	else:
+		return LOSSLESS
+	if kind.startswith(_LATEST_KINDS) or (kind.startswith("depth") and kind[5:].isdigit()):
+		return LATEST
+	if kind in _RING_KINDS:
+		return RING
+	return LOSSLESS
+
+
+def conflation_key(stream: str, data: Any) -> Hashable:
+	"""latest 策略的合并键：全市场单条推送（如 !bookTicker）按交易对合并，其他按流合并"""
+	if not stream.startswith("!"):
+		return stream
+	symbol = data.get("s") if isinstance(data, dict) else getattr(data, "symbol", None)
+	return (stream, symbol) if symbol else stream
+
+
+class DeliveryBuffer:
+	"""
+	按策略缓冲 (key, item)，key 一般为流名称
+
+	Args:
+		policy: latest / ring / lossless
+		maxsize: ring 的容量（latest、lossless 忽略）
+	"""
+
+	def __init__(self, policy: str = LOSSLESS, maxsize: int = 0):
+		if policy not in POLICIES:
+			raise ValueError(f"未知投递策略: {policy}（可选: {', '.join(POLICIES)}）")
+		self.policy = policy
+		self.maxsize = (maxsize or DEFAULT_RING_SIZE) if policy == RING else 0
+		self._items: Deque[Tuple[Hashable, Any, float]] = deque()
+		self._latest: Dict[Hashable, Tuple[Any, float]] = {}
+
+		# 指标
+		self.received = 0
+		self.delivered = 0
+		self.dropped = 0
+		self.conflated = 0
+		self.high_watermark = 0
+		self.last_lag = 0.0
+		self.max_lag = 0.0
+		self._lag_total = 0.0
+
+	def __len__(self) -> int:
+		return len(self._latest) if self.policy == LATEST else len(self._items)
+
+	def put(self, key: Hashable, item: Any, now: Optional[float] = None) -> None:
+		now = time.monotonic() if now is None else now
+		self.received += 1
+		if self.policy == LATEST:
+			# 覆盖时更新时间戳：排队延迟衡量交付出去的值有多旧，消费跟不上的程度看 conflated
+			if key in self._latest:
+				self.conflated += 1
+			self._latest[key] = (item, now)
+		else:
+			if self.policy == RING and len(self._items) >= self.maxsize:
+				self._items.popleft()
+				self.dropped += 1
+			self._items.append((key, item, now))
+		if len(self) > self.high_watermark:
+			self.high_watermark = len(self)
+
+	def pop(self, now: Optional[float] = None) -> Tuple[Hashable, Any]:
+		"""取出最早的一条，缓冲为空时抛出 IndexError"""
+		if self.policy == LATEST:
+			if not self._latest:
+				raise IndexError("缓冲为空")
+			key = next(iter(self._latest))
+			item, enqueued = self._latest.pop(key)
+		else:
+			key, item, enqueued = self._items.popleft()
+		lag = (time.monotonic() if now is None else now) - enqueued
+		self.delivered += 1
+		self.last_lag = lag
+		self._lag_total += lag
+		if lag > self.max_lag:
+			self.max_lag = lag
+		return key, item
+
+	def clear(self) -> None:
+		self._items.clear()
+		self._latest.clear()
+
+	def metrics(self) -> Dict[str, Any]:
+		return {
+			"policy": self.policy,
+			"depth": len(self),
+			"high_watermark": self.high_watermark,
+			"received": self.received,
+			"delivered": self.delivered,
+			"dropped": self.dropped,
+			"conflated": self.conflated,
+			"last_lag_ms": round(self.last_lag * 1000, 3),
+			"max_lag_ms": round(self.max_lag * 1000, 3),
+			"avg_lag_ms": round(self._lag_total / self.delivered * 1000, 3) if self.delivered else 0.0,
+		}
+
+
+class Mailbox:
+	"""线程安全的 DeliveryBuffer：生产者（socket 线程）put，消费者线程阻塞 get"""
+
+	def __init__(self, policy: str = LOSSLESS, maxsize: int = 0):
+		self.buffer = DeliveryBuffer(policy, maxsize)
+		self._cond = threading.Condition()
+		self.closed = False
+
+	def put(self, key: Hashable, item: Any) -> None:
+		with self._cond:
+			if self.closed:
+				return
+			self.buffer.put(key, item)
+			self._cond.notify()
+
+	def get(self, timeout: Optional[float] = None) -> Optional[Tuple[Hashable, Any]]:
+		"""取出一条；超时或已关闭且为空时返回 None"""
+		with self._cond:
+			if not self._cond.wait_for(lambda: len(self.buffer) or self.closed, timeout):
+				return None
+			if not len(self.buffer):
+				return None
+			return self.buffer.pop()
+
+	def close(self) -> None:
+		with self._cond:
+			self.closed = True
+			self._cond.notify_all()
+
+	def metrics(self) -> Dict[str, Any]:
+		with self._cond:
+			return self.buffer.metrics()
+
+
+class StreamWorker:
+	"""
+	为一个流启动独立的消费线程：socket 线程只负责入队，慢处理器不会阻塞接收，
+	积压按策略处理（latest 合并 / ring 丢旧 / lossless 排队）
+	"""
+
+	def __init__(self, stream: str, handler: Callable[[Any], None], policy: Optional[str] = None, maxsize: int = 0,
+				 on_error: Optional[Callable[[str, Exception], None]] = None):
+		self.stream = stream
+		self.handler = handler
+		self.on_error = on_error
+		self.mailbox = Mailbox(policy or default_policy(stream), maxsize)
+		self.errors = 0
+		self._thread = threading.Thread(target=self._run, name=f"ws-worker-{stream}", daemon=True)
+		self._thread.start()
+
+	def submit(self, data: Any) -> None:
+		key = conflation_key(self.stream, data) if self.mailbox.buffer.policy == LATEST else self.stream
+		self.mailbox.put(key, data)
+
+	def _run(self) -> None:
+		while True:
+			entry = self.mailbox.get()
+			if entry is None:
+				if self.mailbox.closed:
+					return
+				continue
+			try:
+				self.handler(entry[1])
+			except Exception as e:
+				self.errors += 1
+				if self.on_error is not None:
+					self.on_error(self.stream, e)
+
+	def stop(self, timeout: Optional[float] = 1.0) -> None:
+		self.mailbox.close()
+		if threading.current_thread() is not self._thread:
+			self._thread.join(timeout)
+
+	def metrics(self) -> Dict[str, Any]:
+		m = self.mailbox.metrics()
+		m["handler_errors"] = self.errors
+		return m
+
+
+# 行情流的事件 id 字段（按 common.ws_decode.stream_kind 的类型）
+_ID_FIELDS = {"bookTicker": "u", "depth": "u", "trade": "t", "aggTrade": "a"}
+_ID_FIELD_CACHE: Dict[str, Optional[str]] = {}
+
+
+def event_id(stream: str, data: Any, raw: Any) -> Hashable:
+	"""
+	消息的去重键：行情流用 (stream, 交易对, 更新/成交 id)，其他流（用户数据、标记价格等）用消息原文
+
+	两条连接推送的同一事件原文相同；用户数据流同一毫秒可能有多条不同事件，不能只看事件时间
+	"""
+	field = _ID_FIELD_CACHE.get(stream, "")
+	if field == "":
+		field = _ID_FIELD_CACHE[stream] = _ID_FIELDS.get(stream_kind(stream)[0])
+	if field is not None and isinstance(data, dict):
+		value = data.get(field)
+		if isinstance(value, (int, str)):
+			return stream, data.get("s"), value
+	return stream, raw
+
+
+class OverlapDeduplicator:
+	"""
+	连接轮换重叠期间的去重：start() 后记录已投递的事件键，finish(grace) 后再保持 grace 秒
+	（旧连接关闭前已在途的消息），之后停止记录并清空
+
+	Args:
+		capacity: 记录的事件键上限，超过时淘汰最早的
+	"""
+
+	def __init__(self, capacity: int = 50000):
+		self.capacity = capacity
+		self.duplicates = 0
+		self._seen: Dict[Hashable, None] = {}
+		self._active_until = 0.0
+		self._lock = threading.Lock()
+
+	@property
+	def active(self) -> bool:
+		if not self._active_until:
+			return False
+		if time.monotonic() < self._active_until:
+			return True
+		with self._lock:
+			self._seen.clear()
+			self._active_until = 0.0
+		return False
+
+	def start(self) -> None:
+		self._active_until = float("inf")
+
+	def finish(self, grace: float) -> None:
+		self._active_until = time.monotonic() + grace
+
+	def seen(self, key: Hashable) -> bool:
+		"""已出现过返回 True（并计数），否则记录并返回 False"""
+		with self._lock:
+			if key in self._seen:
+				self.duplicates += 1
+				return True
+			self._seen[key] = None
+			if len(self._seen) > self.capacity:
+				del self._seen[next(iter(self._seen))]
+			return False
+
@@ -0,0 +1,322 @@
+"""
+对冲读（hedged request）：削减幂等 GET 的尾延迟
+
+查单、持仓、行情这类读请求的 p99 主要由偶发的慢响应决定。HedgedReadTransport 包在传输层外面：
+GET 请求发出后，如果在该接口最近延迟的 p95 之内还没有返回，就在另一个连接池连接上再发一份相同的请求，
+先返回的结果生效，另一份结果丢弃。
+
+- 只对 GET 生效（可用 paths 进一步限定），下单、撤单等 POST/DELETE 永远只发一次
+- limiter 为交易所权重限速器（common.ratelimit.TokenBucket，可按交易所分别设置）：经过这里的每个请求
+  （含下单、撤单）都按接口权重（request_weight，按交易所查表，depth / aggTrades 等远大于 1）无条件记入，
+  使令牌余量反映账户实际用掉的权重
+- 额外请求受两层预算限制，任一不足时不对冲，只等第一份：budget 限制额外请求的次数；
+  limiter 余量不足该接口权重时也不发（账户已接近额度时不再加请求）
+- 阈值按接口（主机 + 路径）统计：样本不足时用 initial_delay，之后取最近 window 次耗时的 percentile 分位
+- 第二份请求的超时扣掉已等待的时间，不会超出调用方的截止时间（common.deadline）
+
+	limiter = {"aster": TokenBucket.per_minute(2400), "backpack": TokenBucket.per_minute(600)}
+	transport = HedgedReadTransport(HttpTransport(), budget=TokenBucket.per_minute(120, burst=10), limiter=limiter)
+	client = AsterFuturesClient(key, secret, transport=transport)
+
+注意：签名请求的两份副本时间戳和签名相同，交易所按 recvWindow 校验，可以重复使用。
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+
+from common.deadline import MIN_TIMEOUT
+from common.log import get_logger
+from common.ratelimit import TokenBucket
+from common.transport import HttpTransport, Transport, _as_pairs
+
+log = get_logger("hedged_read")
+
+# Aster（Binance 风格）接口的请求权重，按版本前缀之后的路径；不在表中的接口按 1 计
+ASTER_WEIGHTS: Dict[str, int] = {
+	"exchangeInfo": 1, "trades": 1, "historicalTrades": 20, "aggTrades": 20, "premiumIndex": 1, "fundingRate": 1,
+	"order": 1, "openOrder": 1, "allOrders": 5, "balance": 5, "account": 5, "positionRisk": 5, "userTrades": 5,
+	"income": 30, "leverageBracket": 1, "batchOrders": 5,
+}
+# 不带 symbol 时（全部交易对）的权重
+ASTER_ALL_SYMBOLS_WEIGHTS: Dict[str, int] = {
+	"ticker/24hr": 40, "ticker/price": 2, "ticker/bookTicker": 2, "openOrders": 40,
+}
+
+
+def _endpoint_name(path: str) -> str:
+	"""/fapi/v1/ticker/price -> ticker/price"""
+	parts = [p for p in path.split("/") if p]
+	for i, part in enumerate(parts):
+		if len(part) > 1 and part[0] == "v" and part[1:].isdigit():
+			return "/".join(parts[i + 1:])
+	return "/".join(parts)
+
+
+def aster_weight(path: str, params: Any = None) -> int:
+	"""Aster 请求的权重（depth / klines 随 limit 变化，ticker / openOrders 不带 symbol 时更重）"""
+	name = _endpoint_name(path)
+	args = dict(_as_pairs(params))
+	if name == "depth":
+		limit = int(args.get("limit") or 500)
+		return 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+	if name.endswith("lines"):  # klines / indexPriceKlines / markPriceKlines
+		limit = int(args.get("limit") or 500)
+		return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+	if name in ASTER_ALL_SYMBOLS_WEIGHTS:
+		return 1 if args.get("symbol") else ASTER_ALL_SYMBOLS_WEIGHTS[name]
+	return ASTER_WEIGHTS.get(name, 1)
+
+
+def backpack_weight(path: str, params: Any = None) -> int:
+	"""Backpack 按请求次数限速，不区分接口，每个请求计 1"""
+	return 1
+
+
+# 交易所 -> 权重函数 (path, params) -> int
+VENUE_WEIGHTS: Dict[str, Callable[[str, Any], int]] = {"aster": aster_weight, "backpack": backpack_weight}
+
+
+def venue_of(host: str) -> str:
+	"""按主机名识别交易所：*.backpack.exchange 为 backpack，其余（fapi / sapi.asterdex.com）按 aster 计"""
+	return "backpack" if "backpack" in host else "aster"
+
+
+def request_weight(host: str, path: str, params: Any = None) -> int:
+	"""请求的交易所权重，按主机名选择该交易所的权重表"""
+	return VENUE_WEIGHTS[venue_of(host)](path, params)
+
+
+class _LatencyWindow:
+	"""某个接口最近 size 次请求的耗时（秒），分位数每 refresh 个新样本重算一次"""
+
+	__slots__ = ("samples", "refresh", "_since", "_cached")
+
+	def __init__(self, size: int, refresh: int):
+		self.samples: Deque[float] = deque(maxlen=size)
+		self.refresh = refresh
+		self._since = 0
+		self._cached: Optional[float] = None
+
+	def add(self, seconds: float) -> None:
+		self.samples.append(seconds)
+		self._since += 1
+
+	def percentile(self, pct: float) -> float:
+		if self._cached is None or self._since >= self.refresh:
+			ordered = sorted(self.samples)
+			k = max(0, min(len(ordered) - 1, int(math.ceil(pct / 100.0 * len(ordered))) - 1))
+			self._cached = ordered[k]
+			self._since = 0
+		return self._cached
+
+
+def _shrink(timeout: Any, elapsed: float) -> Any:
+	"""第二份请求的超时：扣掉第一份已经等待的时间；剩余不足 MIN_TIMEOUT 时返回 None（不再对冲）"""
+	if timeout is None:
+		return None
+	if isinstance(timeout, tuple):
+		connect, read = timeout
+		connect, read = connect - elapsed, read - elapsed
+		if connect < MIN_TIMEOUT or read < MIN_TIMEOUT:
+			return None
+		return connect, read
+	left = float(timeout) - elapsed
+	return left if left >= MIN_TIMEOUT else None
+
+
+class HedgedReadTransport(Transport):
+	"""
+	对冲读传输层
+
+	Args:
+		inner: 实际发送请求的传输层（两份请求共用它的连接池）
+		budget: 额外请求次数的令牌桶，默认每分钟 120 次、突发 10 次
+		limiter: 交易所权重限速器，或 {交易所: 限速器}（交易所见 venue_of，没有限速器的交易所不计）；
+			每个请求按接口权重无条件扣除，额外请求只在余量足够时发出；None 表示只受 budget 限制
+		weight: 计算请求权重的函数 (host, path, params) -> int，默认 request_weight
+		percentile: 对冲阈值取最近耗时的分位数
+		min_delay: 阈值下限（秒），避免在很快的接口上频繁对冲
+		initial_delay: 样本不足 min_samples 时使用的阈值（秒）
+		min_samples: 开始使用分位数阈值需要的样本数
+		window: 每个接口保留的耗时样本数
+		paths: 只对这些路径（以 "/" 结尾时按前缀）对冲；None 表示所有 GET
+		workers: 发送请求的线程数（每个在途请求占一个，对冲时占两个）
+	"""
+
+	def __init__(self, inner: Optional[Transport] = None, budget: Optional[TokenBucket] = None, percentile: float = 95.0,
+				 min_delay: float = 0.02, initial_delay: float = 0.3, min_samples: int = 20, window: int = 200,
+				 paths: Optional[Iterable[str]] = None, workers: int = 32,
+				 limiter: Union[TokenBucket, Dict[str, TokenBucket], None] = None,
+				 weight: Callable[[str, str, Any], int] = request_weight):
+		self.inner = inner or HttpTransport()
+		self.session = self.inner.session
+		self.budget = budget or TokenBucket.per_minute(120, burst=10)
+		self.limiter = limiter
+		self.weight = weight
+		self.percentile = float(percentile)
+		self.min_delay = float(min_delay)
+		self.initial_delay = float(initial_delay)
+		self.min_samples = int(min_samples)
+		self.window = int(window)
+		self.paths: Optional[Tuple[str, ...]] = tuple(paths) if paths is not None else None
+		self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedged-read")
+		self._lock = threading.Lock()
+		self._latency: Dict[str, _LatencyWindow] = {}
+		self.requests = 0
+		self.hedged = 0
+		self.hedge_wins = 0
+		self.budget_denied = 0
+		self.weight_denied = 0
+		self.weight_spent = 0
+		self.weight_charged = 0
+
+	def _hedgeable(self, method: str, path: str) -> bool:
+		if method.upper() != "GET":
+			return False
+		if self.paths is None:
+			return True
+		return any(path == p or (p.endswith("/") and path.startswith(p)) for p in self.paths)
+
+	def _limiter(self, host: str) -> Optional[TokenBucket]:
+		if isinstance(self.limiter, dict):
+			return self.limiter.get(venue_of(host))
+		return self.limiter
+
+	def threshold(self, endpoint: str) -> float:
+		"""该接口当前的对冲阈值（秒）"""
+		with self._lock:
+			lw = self._latency.get(endpoint)
+			if lw is None or len(lw.samples) < self.min_samples:
+				return self.initial_delay
+			return max(self.min_delay, lw.percentile(self.percentile))
+
+	def _observe(self, endpoint: str, started: float, fut: Future) -> None:
+		# 只统计成功返回的耗时（超时、连接错误不代表接口的正常延迟）
+		if fut.cancelled() or fut.exception() is not None:
+			return
+		elapsed = time.monotonic() - started
+		with self._lock:
+			lw = self._latency.get(endpoint)
+			if lw is None:
+				lw = self._latency[endpoint] = _LatencyWindow(self.window, max(1, self.window // 20))
+			lw.add(elapsed)
+
+	def _submit(self, endpoint: str, method: str, url: str, kwargs: Dict[str, Any]) -> Future:
+		started = time.monotonic()
+		fut = self._pool.submit(self.inner.request, method, url, **kwargs)
+		fut.add_done_callback(lambda f: self._observe(endpoint, started, f))
+		return fut
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		parts = urlsplit(url)
+		limiter = self._limiter(parts.netloc)
+		weight = 0
+		if limiter is not None:
+			# 主请求一定会发出：无条件扣除，令牌余量因此反映账户实际用掉的权重
+			pairs = _as_pairs(parse_qsl(parts.query)) + _as_pairs(kwargs.get("params"))
+			weight = self.weight(parts.netloc, parts.path, pairs)
+			limiter.charge(weight)
+			self.weight_charged += weight
+		if not self._hedgeable(method, parts.path):
+			return self.inner.request(method, url, **kwargs)
+		endpoint = f"{parts.netloc}{parts.path}"
+		self.requests += 1
+		started = time.monotonic()
+		delay = self.threshold(endpoint)
+		first = self._submit(endpoint, method, url, kwargs)
+		done, _ = wait([first], timeout=delay)
+		if done:
+			return first.result()
+
+		hedge_kwargs = dict(kwargs)
+		hedge_kwargs["timeout"] = _shrink(kwargs.get("timeout"), time.monotonic() - started)
+		if "timeout" in kwargs and hedge_kwargs["timeout"] is None:
+			return first.result()
+		if not self.budget.try_acquire(1):
+			self.budget_denied += 1
+			return first.result()
+		if limiter is not None:
+			if weight > limiter.capacity or not limiter.try_acquire(weight):
+				self.weight_denied += 1
+				return first.result()
+			self.weight_spent += weight
+		self.hedged += 1
+		log.debug("%s %s 超过 %.1fms 未返回，发出对冲请求", method, parts.path, delay * 1000)
+		second = self._submit(endpoint, method, url, hedge_kwargs)
+
+		pending = {first, second}
+		error: Optional[BaseException] = None
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED)
+			for fut in done:
+				exc = fut.exception()
+				if exc is None:
+					if fut is second:
+						self.hedge_wins += 1
+					return fut.result()
+				if fut is first or error is None:
+					error = exc
+		# 两份都失败：抛第一份请求的错误
+		raise error
+
+	def metrics(self) -> Dict[str, Any]:
+		with self._lock:
+			endpoints = list(self._latency)
+		thresholds = {ep: round(self.threshold(ep) * 1000, 2) for ep in endpoints}
+		return {
+			"requests": self.requests,
+			"hedged": self.hedged,
+			"hedge_wins": self.hedge_wins,
+			"budget_denied": self.budget_denied,
+			"weight_denied": self.weight_denied,
+			"weight_spent": self.weight_spent,
+			"weight_charged": self.weight_charged,
+			"hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+			"threshold_ms": thresholds,
+			"budget": self.budget.metrics(),
+			"limiter": self._limiter_metrics(),
+		}
+
+	def _limiter_metrics(self) -> Any:
+		if isinstance(self.limiter, dict):
+			return {venue: limiter.metrics() for venue, limiter in self.limiter.items()}
+		return self.limiter.metrics() if self.limiter is not None else None
+
+	def close(self) -> None:
+		self._pool.shutdown(wait=False)
+		self.inner.close()
+
+
+def build_hedged_read(inner: Transport, cfg: Optional[Dict[str, Any]],
+					  limiter: Union[TokenBucket, Dict[str, TokenBucket], None] = None) -> Transport:
+	"""
+	按配置包装传输层（未启用时原样返回）；limiter 为交易所权重限速器（或按交易所的字典），
+	所有请求按接口权重记入，额外请求只在余量足够时发出
+
+	cfg:
+		enabled: 是否启用（false）
+		percentile: 阈值分位数（95）
+		min_delay_ms / initial_delay_ms: 阈值下限、样本不足时的阈值（20 / 300）
+		per_minute / burst: 额外请求的预算（120 / 10）
+		paths: 只对这些路径对冲（默认所有 GET）
+		workers: 发送请求的线程数（32）
+	"""
+	if not cfg or not cfg.get("enabled", False):
+		return inner
+	paths: Optional[List[str]] = cfg.get("paths")
+	return HedgedReadTransport(
+		inner,
+		budget=TokenBucket.per_minute(float(cfg.get("per_minute", 120)), burst=float(cfg.get("burst", 10))),
+		percentile=float(cfg.get("percentile", 95)),
+		min_delay=float(cfg.get("min_delay_ms", 20)) / 1000.0,
+		initial_delay=float(cfg.get("initial_delay_ms", 300)) / 1000.0,
+		paths=paths,
+		workers=int(cfg.get("workers", 32)),
+		limiter=limiter,
+	)
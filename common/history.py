@@ -0,0 +1,421 @@
+"""
+Aster 合约历史行情回补
+
+把时间范围切成窗口，多个线程并发地用 MarketDataDAO.iter_* 分页生成器（startTime / fromId 游标）拉取，
+共享一个令牌桶限速（common.ratelimit）。每个窗口的数据转成列数组后追加到磁盘上的列文件
+（每列一个 <列名>.bin，小端定长），完成的窗口记录在 parts.json 中，中断后重新运行会跳过已完成的窗口。
+内存中最多只有每个线程当前窗口的数据。
+
+数据集:
+	klines / markPriceKlines / indexPriceKlines: 按开盘时间窗口，每个窗口一页（limit 根K线）
+	aggTrades: 按 1 小时窗口（接口对 startTime/endTime 跨度的限制）
+	trades: 历史成交按成交id窗口（先用 aggTrades 把时间换算成成交id）
+	fundingRate: 按 30 天窗口
+
+读取:
+	store = ColumnStore.open("data/history/aggTrades/ASTERUSDT")
+	cols = store.read(start_ms, end_ms)          # 按时间排序的列数组
+	raw = store.columns()                         # 只读 mmap（按写入顺序，不复制）
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.ratelimit import TokenBucket
+
+INDEX_FILE = "parts.json"
+
+_KLINE = (
+	("open_time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+	("close_time", "<i8"), ("quote_volume", "<f8"), ("trades", "<i8"), ("taker_buy_volume", "<f8"),
+	("taker_buy_quote_volume", "<f8"),
+)
+SCHEMAS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+	"klines": _KLINE,
+	"markPriceKlines": _KLINE,
+	"indexPriceKlines": _KLINE,
+	"aggTrades": (
+		("agg_id", "<i8"), ("price", "<f8"), ("qty", "<f8"), ("first_id", "<i8"), ("last_id", "<i8"),
+		("time", "<i8"), ("buyer_maker", "<u1"),
+	),
+	"trades": (
+		("id", "<i8"), ("price", "<f8"), ("qty", "<f8"), ("quote_qty", "<f8"), ("time", "<i8"), ("buyer_maker", "<u1"),
+	),
+	"fundingRate": (("funding_time", "<i8"), ("funding_rate", "<f8"), ("mark_price", "<f8")),
+}
+TIME_COLUMNS = {
+	"klines": "open_time", "markPriceKlines": "open_time", "indexPriceKlines": "open_time",
+	"aggTrades": "time", "trades": "time", "fundingRate": "funding_time",
+}
+# 切窗口所按的列（trades 按成交id，其余按时间）
+WINDOW_COLUMNS = {"trades": "id"}
+# 分页游标所按的列（重试时从最后一行 + 1 继续）
+CURSOR_COLUMNS = {**TIME_COLUMNS, "aggTrades": "agg_id", "trades": "id"}
+KLINE_DATASETS = ("klines", "markPriceKlines", "indexPriceKlines")
+
+_INTERVAL_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 7 * 86_400_000, "M": 30 * 86_400_000}
+
+
+def interval_ms(interval: str) -> int:
+	"""K线间隔 -> 毫秒（1M 按 30 天计，只用于切窗口）"""
+	return int(interval[:-1]) * _INTERVAL_MS[interval[-1]]
+
+
+def _kline_columns(page: List[List]) -> Dict[str, np.ndarray]:
+	width = len(_KLINE)
+	arr = np.array([(row[:width] + [0] * (width - len(row)))[:width] for row in page], dtype=np.float64)
+	return {name: arr[:, i].astype(dtype) for i, (name, dtype) in enumerate(_KLINE)}
+
+
+def _dict_columns(page: List[Dict[str, Any]], fields: Sequence[Tuple[str, str, str]]) -> Dict[str, np.ndarray]:
+	n = len(page)
+	out = {}
+	for name, key, dtype in fields:
+		if dtype == "<u1":
+			out[name] = np.fromiter((bool(row.get(key)) for row in page), dtype=dtype, count=n)
+		elif dtype == "<i8":
+			out[name] = np.fromiter((int(row[key]) for row in page), dtype=dtype, count=n)
+		else:
+			out[name] = np.fromiter((float(row.get(key) or "nan") for row in page), dtype=dtype, count=n)
+	return out
+
+
+CONVERTERS: Dict[str, Callable[[List[Any]], Dict[str, np.ndarray]]] = {
+	"klines": _kline_columns,
+	"markPriceKlines": _kline_columns,
+	"indexPriceKlines": _kline_columns,
+	"aggTrades": lambda page: _dict_columns(page, (
+		("agg_id", "a", "<i8"), ("price", "p", "<f8"), ("qty", "q", "<f8"), ("first_id", "f", "<i8"),
+		("last_id", "l", "<i8"), ("time", "T", "<i8"), ("buyer_maker", "m", "<u1"),
+	)),
+	"trades": lambda page: _dict_columns(page, (
+		("id", "id", "<i8"), ("price", "price", "<f8"), ("qty", "qty", "<f8"), ("quote_qty", "quoteQty", "<f8"),
+		("time", "time", "<i8"), ("buyer_maker", "isBuyerMaker", "<u1"),
+	)),
+	"fundingRate": lambda page: _dict_columns(page, (
+		("funding_time", "fundingTime", "<i8"), ("funding_rate", "fundingRate", "<f8"), ("mark_price", "markPrice", "<f8"),
+	)),
+}
+
+
+class ColumnStore:
+	"""
+	追加写的列文件目录
+
+	每列一个 <列名>.bin；parts.json 记录每个完成窗口的 [start, end)（window_column 上的范围）、行偏移与行数，
+	同时作为断点续传的检查点。
+	各窗口按完成顺序追加，读取时按窗口起点排序。上次中断时写了一半的列数据在打开时按 parts.json 截断。
+	"""
+
+	def __init__(self, directory: Any, schema: Sequence[Tuple[str, str]], time_column: str,
+				 meta: Optional[Dict[str, Any]] = None, window_column: Optional[str] = None):
+		self.dir = Path(directory)
+		self.dir.mkdir(parents=True, exist_ok=True)
+		self.schema = tuple((name, dtype) for name, dtype in schema)
+		self.time_column = time_column
+		self.window_column = window_column or time_column
+		self.meta = dict(meta or {})
+		self.parts: List[Dict[str, int]] = []
+		self._lock = threading.Lock()
+		index = self.dir / INDEX_FILE
+		if index.exists():
+			data = json.loads(index.read_text(encoding="utf-8"))
+			if [tuple(c) for c in data["schema"]] != list(self.schema):
+				raise ValueError(f"{self.dir} 的列定义与当前数据集不一致")
+			self.parts = data["parts"]
+			self.meta = {**data.get("meta", {}), **self.meta}
+		self._done = {(p["start"], p["end"]) for p in self.parts}
+		self.rows = sum(p["rows"] for p in self.parts)
+		for name, dtype in self.schema:
+			path = self._path(name)
+			size = self.rows * np.dtype(dtype).itemsize
+			if path.exists() and path.stat().st_size > size:
+				with path.open("r+b") as f:
+					f.truncate(size)
+			elif not path.exists() or path.stat().st_size < size:
+				if self.rows:
+					raise ValueError(f"{path} 比 {INDEX_FILE} 记录的行数短，数据已损坏")
+				path.touch()
+
+	@classmethod
+	def open(cls, directory: Any) -> "ColumnStore":
+		"""打开已有目录（列定义从 parts.json 读取）"""
+		data = json.loads((Path(directory) / INDEX_FILE).read_text(encoding="utf-8"))
+		return cls(directory, [tuple(c) for c in data["schema"]], data["time_column"],
+				   window_column=data.get("window_column"))
+
+	def _path(self, name: str) -> Path:
+		return self.dir / f"{name}.bin"
+
+	def has(self, start: int, end: int) -> bool:
+		return (start, end) in self._done
+
+	def append(self, start: int, end: int, columns: Dict[str, np.ndarray]) -> None:
+		"""追加一个完成的窗口（线程安全）；先写列数据并落盘，再更新 parts.json"""
+		n = len(columns[self.schema[0][0]]) if columns else 0
+		with self._lock:
+			if (start, end) in self._done:
+				return
+			for name, dtype in self.schema:
+				if not n:
+					break
+				with self._path(name).open("ab") as f:
+					np.ascontiguousarray(columns[name], dtype=dtype).tofile(f)
+					f.flush()
+					os.fsync(f.fileno())
+			self.parts.append({"start": int(start), "end": int(end), "offset": self.rows, "rows": n})
+			self._done.add((start, end))
+			self.rows += n
+			self._write_index()
+
+	def _write_index(self) -> None:
+		data = {
+			"schema": [list(c) for c in self.schema],
+			"time_column": self.time_column,
+			"window_column": self.window_column,
+			"meta": self.meta,
+			"rows": self.rows,
+			"parts": self.parts,
+		}
+		tmp = self.dir / (INDEX_FILE + ".tmp")
+		tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+		os.replace(tmp, self.dir / INDEX_FILE)
+
+	def columns(self) -> Dict[str, np.ndarray]:
+		"""全部列的只读 mmap（按写入顺序）"""
+		out = {}
+		for name, dtype in self.schema:
+			if self.rows:
+				out[name] = np.memmap(self._path(name), dtype=dtype, mode="r", shape=(self.rows,))
+			else:
+				out[name] = np.empty(0, dtype=dtype)
+		return out
+
+	def read(self, start: Optional[int] = None, end: Optional[int] = None,
+			 columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+		"""读取 [start, end) 内的行，按窗口顺序拼接（只复制涉及的窗口）"""
+		names = list(columns) if columns else [name for name, _ in self.schema]
+		raw = self.columns()
+		by_time = self.window_column == self.time_column
+		parts = sorted((p for p in self.parts if p["rows"] and (not by_time or (
+						(start is None or p["end"] > start) and (end is None or p["start"] < end)))),
+					   key=lambda p: p["start"])
+		out = {}
+		for name in names + ([self.time_column] if self.time_column not in names else []):
+			col = raw[name]
+			out[name] = (np.concatenate([col[p["offset"]:p["offset"] + p["rows"]] for p in parts]) if parts
+						 else np.empty(0, dtype=col.dtype))
+		ts = out[self.time_column]
+		mask = None
+		if start is not None:
+			mask = ts >= start
+		if end is not None:
+			mask = (ts < end) if mask is None else mask & (ts < end)
+		if self.time_column not in names:
+			out.pop(self.time_column)
+		if mask is not None and not mask.all():
+			out = {name: col[mask] for name, col in out.items()}
+		return out
+
+
+class HistoryDownloader:
+	"""
+	并发、可续传的历史行情下载器
+
+	Args:
+		market: aster_futures_dao.market.MarketDataDAO
+		out_dir: 输出根目录，数据集写在 <out_dir>/<数据集>/<交易对>[_<间隔>]/
+		limiter: 共享的令牌桶，默认每分钟 1200 权重（Aster 额度 2400 的一半，留给交易）
+		workers: 并发线程数
+		max_retries: 单个窗口的最大重试次数（超过后记为失败，下次运行时重试）
+		backoff: 重试退避的初始秒数（指数增长）；遇到 429/418 时清空令牌桶
+		on_progress: 每完成一个窗口回调一次 (dataset, done, total, rows)
+	"""
+
+	def __init__(self, market: Any, out_dir: Any = "data/history", limiter: Optional[TokenBucket] = None,
+				 workers: int = 4, max_retries: int = 5, backoff: float = 1.0,
+				 on_progress: Optional[Callable[[str, int, int, int], None]] = None):
+		self.market = market
+		self.out_dir = Path(out_dir)
+		self.limiter = limiter or TokenBucket.per_minute(1200)
+		self.workers = workers
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self.on_progress = on_progress
+		self._stop = threading.Event()
+		self.requests = 0
+		self.retries = 0
+
+	def stop(self) -> None:
+		"""让进行中的下载在当前页结束后退出（已完成的窗口保留）"""
+		self._stop.set()
+
+	def store(self, dataset: str, symbol: str, interval: Optional[str] = None) -> ColumnStore:
+		name = f"{symbol}_{interval}" if dataset in KLINE_DATASETS else symbol
+		meta = {"dataset": dataset, "symbol": symbol, "interval": interval}
+		return ColumnStore(self.out_dir / dataset / name, SCHEMAS[dataset], TIME_COLUMNS[dataset], meta,
+						   window_column=WINDOW_COLUMNS.get(dataset))
+
+	def windows(self, dataset: str, symbol: str, start_ms: int, end_ms: int, interval: Optional[str] = None,
+				window: Optional[int] = None) -> List[Tuple[int, int]]:
+		"""[start, end) 窗口列表；trades 的窗口是成交id范围，其余是毫秒时间范围"""
+		if dataset == "trades":
+			first, last = self.resolve_trade_id(symbol, start_ms), self.resolve_trade_id(symbol, end_ms)
+			span = window or 100_000
+			return [(i, min(i + span, last)) for i in range(first, last, span)]
+		if dataset in KLINE_DATASETS:
+			if not interval:
+				raise ValueError(f"{dataset} 需要指定 interval")
+			step = interval_ms(interval)
+			start_ms -= start_ms % step
+			span = window or step * 1500
+		elif dataset == "aggTrades":
+			span = min(window or 3_600_000, 3_600_000)
+		else:
+			span = window or 30 * 86_400_000
+		return [(t, min(t + span, end_ms)) for t in range(start_ms, end_ms, span)]
+
+	def resolve_trade_id(self, symbol: str, ts_ms: int) -> int:
+		"""某时刻之后第一笔成交的id（之后没有成交时为最新成交id + 1）"""
+		def resolve() -> int:
+			self.limiter.acquire(1)
+			latest = self.market.trades(symbol, limit=1)
+			if not latest:
+				return 0
+			after_last = int(latest[-1]["id"]) + 1
+			# 晚于最新成交的时刻不必逐小时查找
+			if ts_ms > int(latest[-1]["time"]):
+				return after_last
+			for page in self.market.iter_agg_trades(symbol, start_time=ts_ms, limit=1, limiter=self.limiter):
+				return int(page[0]["f"])
+			return after_last
+		return self._with_retries(resolve)
+
+	def _retry_wait(self, attempt: int, error: Exception) -> None:
+		"""第 attempt 次连续失败后的指数退避，超过 max_retries 时抛出原异常；遇到 429/418 先清空令牌桶，让所有线程一起退避"""
+		self.retries += 1
+		if attempt > self.max_retries:
+			raise error
+		text = str(error)
+		if "429" in text or "418" in text:
+			self.limiter.drain()
+		time.sleep(self.backoff * (2 ** (attempt - 1)))
+
+	def _with_retries(self, call: Callable[[], Any]) -> Any:
+		attempt = 0
+		while True:
+			try:
+				return call()
+			except Exception as e:
+				attempt += 1
+				self._retry_wait(attempt, e)
+
+	def _pages(self, dataset: str, symbol: str, interval: Optional[str], start: int, end: int,
+			   cursor: Optional[int] = None) -> Iterator[List[Any]]:
+		"""窗口 [start, end) 的分页生成器；cursor 为上次失败前已取到的位置（下一行的时间或id）"""
+		m, lim = self.market, self.limiter
+		if dataset == "klines":
+			return m.iter_klines(symbol, interval, cursor or start, end - 1, limiter=lim)
+		if dataset == "markPriceKlines":
+			return m.iter_mark_price_klines(symbol, interval, cursor or start, end - 1, limiter=lim)
+		if dataset == "indexPriceKlines":
+			return m.iter_index_price_klines(symbol, interval, cursor or start, end - 1, limiter=lim)
+		if dataset == "aggTrades":
+			return m.iter_agg_trades(symbol, start_time=start, end_time=end - 1, from_id=cursor, limiter=lim)
+		if dataset == "trades":
+			return m.iter_historical_trades(symbol, from_id=cursor or start, end_id=end, limiter=lim)
+		if dataset == "fundingRate":
+			return m.iter_funding_rate(symbol, cursor or start, end - 1, limiter=lim)
+		raise ValueError(f"未知数据集: {dataset}")
+
+	def _fetch_window(self, store: ColumnStore, dataset: str, symbol: str, interval: Optional[str],
+					  start: int, end: int) -> int:
+		convert = CONVERTERS[dataset]
+		key = CURSOR_COLUMNS[dataset]
+		chunks: List[Dict[str, np.ndarray]] = []
+		cursor = None
+		attempt = 0
+		while True:
+			try:
+				for page in self._pages(dataset, symbol, interval, start, end, cursor):
+					self.requests += 1
+					cols = convert(page)
+					chunks.append(cols)
+					# 失败后从已取到的位置继续，不重新拉取整个窗口
+					cursor = int(cols[key][-1]) + 1
+					attempt = 0
+					if self._stop.is_set():
+						raise InterruptedError("下载已停止")
+				break
+			except InterruptedError:
+				raise
+			except Exception as e:
+				attempt += 1
+				self._retry_wait(attempt, e)
+		if chunks:
+			columns = {name: np.concatenate([c[name] for c in chunks]) for name, _ in store.schema}
+			# K线窗口的最后一页可能包含窗口之外的行（按开盘时间截断）
+			if dataset in KLINE_DATASETS or dataset == "fundingRate":
+				ts = columns[store.time_column]
+				keep = (ts >= start) & (ts < end)
+				if not keep.all():
+					columns = {name: col[keep] for name, col in columns.items()}
+		else:
+			columns = {}
+		store.append(start, end, columns)
+		return len(columns[store.schema[0][0]]) if columns else 0
+
+	def download(self, dataset: str, symbol: str, start_ms: int, end_ms: int, interval: Optional[str] = None,
+				 window: Optional[int] = None) -> Dict[str, Any]:
+		"""下载 [start_ms, end_ms) 的数据；已完成的窗口跳过，返回统计"""
+		if dataset not in SCHEMAS:
+			raise ValueError(f"未知数据集: {dataset}，可选 {', '.join(SCHEMAS)}")
+		store = self.store(dataset, symbol, interval)
+		all_windows = self.windows(dataset, symbol, start_ms, end_ms, interval, window)
+		todo = [w for w in all_windows if not store.has(*w)]
+		skipped = len(all_windows) - len(todo)
+		started = time.monotonic()
+		rows = 0
+		done = skipped
+		failed: List[Dict[str, Any]] = []
+		with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"history-{dataset}") as pool:
+			futures = {pool.submit(self._fetch_window, store, dataset, symbol, interval, s, e): (s, e) for s, e in todo}
+			try:
+				for fut in as_completed(futures):
+					try:
+						rows += fut.result()
+						done += 1
+					except InterruptedError:
+						pass
+					except Exception as e:
+						s, e_ = futures[fut]
+						failed.append({"start": s, "end": e_, "error": repr(e)})
+					if self.on_progress is not None:
+						self.on_progress(dataset, done, len(all_windows), rows)
+			except KeyboardInterrupt:
+				self.stop()
+				for fut in futures:
+					fut.cancel()
+				raise
+		elapsed = time.monotonic() - started
+		return {
+			"dataset": dataset,
+			"symbol": symbol,
+			"interval": interval,
+			"path": str(store.dir),
+			"windows": len(all_windows),
+			"skipped": skipped,
+			"completed": done - skipped,
+			"failed": failed,
+			"rows": rows,
+			"total_rows": store.rows,
+			"elapsed_s": round(elapsed, 3),
+			"rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+			"limiter": self.limiter.metrics(),
+		}
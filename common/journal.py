@@ -0,0 +1,310 @@
+"""
+交易日志（对冲轮次、下单、撤单、成交、对冲、平仓）
+
+record() 在交易热路径中调用，只把 (墙钟ns, 单调ns, 类型, 轮次, 字段) 追加到内存队列，不做序列化和 IO；
+后台写线程按 flush_interval 批量写入 SQLite（common.ledger.LedgerStore，一批一个事务）或 JSONL 分段文件。
+写盘跟不上时超出 max_pending 的记录被丢弃并计数，绝不阻塞下单；写入失败的批次放回队首，下个周期重试。
+
+	journal = set_journal(build_journal({"backend": "sqlite", "path": "logs/journal.db"})).start()
+	with journal.cycle("cycle-1"):
+		journal.record("order", venue="bp", leg=1, side="Ask", price=1.23, quantity=10, order_id="...")
+	journal.close()
+
+事后分析（延迟、滑点）见 scripts/journal_report.py，SQLite 后端也可直接用 SQL 查询 journal 表。
+"""
+import contextvars
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .ledger import LedgerStore
+
+# 当前对冲轮次（record 未显式传 cycle 时使用）
+_current_cycle: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("journal_cycle", default=None)
+
+# 提升为独立列的字段（便于建索引和查询），其余字段序列化到 data 列
+COLUMNS = ("leg", "venue", "symbol", "side", "order_id", "price", "quantity")
+
+TABLE = "journal"
+TABLE_COLUMNS = [
+	("run_id", "TEXT"), ("seq", "INTEGER"), ("ts_ns", "INTEGER"), ("mono_ns", "INTEGER"), ("kind", "TEXT"),
+	("cycle", "TEXT"), ("leg", "INTEGER"), ("venue", "TEXT"), ("symbol", "TEXT"), ("side", "TEXT"),
+	("order_id", "TEXT"), ("price", "REAL"), ("quantity", "REAL"), ("data", "TEXT"),
+]
+
+
+def _row(run_id: str, seq: int, item: Tuple[int, int, str, Optional[str], Dict[str, Any]]) -> Dict[str, Any]:
+	ts_ns, mono_ns, kind, cycle, fields = item
+	row: Dict[str, Any] = {"run_id": run_id, "seq": seq, "ts_ns": ts_ns, "mono_ns": mono_ns, "kind": kind, "cycle": cycle}
+	rest = dict(fields)
+	for name in COLUMNS:
+		value = rest.pop(name, None)
+		row[name] = str(value) if name == "order_id" and value is not None else value
+	for name in ("price", "quantity"):
+		if row[name] is not None:
+			row[name] = float(row[name])
+	row["data"] = rest or None
+	return row
+
+
+class SQLiteJournalSink:
+	"""写入 SQLite 的 journal 表（主键 run_id + seq，按 kind / cycle / order_id 建索引）"""
+
+	def __init__(self, path: Any = "logs/journal.db"):
+		self.store = path if isinstance(path, LedgerStore) else LedgerStore(path)
+		self.store.ensure_table(TABLE, TABLE_COLUMNS, key=["run_id", "seq"],
+								indexes=[("kind", "ts_ns"), ("cycle",), ("order_id",)])
+
+	def write(self, rows: List[Dict[str, Any]]) -> int:
+		for row in rows:
+			if row["data"] is not None:
+				row["data"] = json.dumps(row["data"], ensure_ascii=False, separators=(",", ":"), default=str)
+		return self.store.upsert(TABLE, rows)
+
+	def close(self) -> None:
+		self.store.close()
+
+
+class JsonlJournalSink:
+	"""写入 JSONL 分段文件 <directory>/journal-<run_id>-<序号>.jsonl，单段超过 segment_bytes 时切换"""
+
+	def __init__(self, directory: Any = "logs/journal", segment_bytes: int = 64 << 20):
+		self.directory = Path(directory)
+		self.directory.mkdir(parents=True, exist_ok=True)
+		self.segment_bytes = segment_bytes
+		self.segments: List[Path] = []
+		self._file = None
+		self._bytes = 0
+
+	def _open(self, run_id: str) -> None:
+		if self._file is not None:
+			self._file.close()
+		path = self.directory / f"journal-{run_id}-{len(self.segments):04d}.jsonl"
+		self._file = path.open("a", encoding="utf-8")
+		self._bytes = 0
+		self.segments.append(path)
+
+	def write(self, rows: List[Dict[str, Any]]) -> int:
+		if self._file is None or self._bytes >= self.segment_bytes:
+			self._open(rows[0]["run_id"])
+		lines = "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str) + "\n" for row in rows)
+		self._file.write(lines)
+		self._file.flush()
+		self._bytes += len(lines)
+		return len(rows)
+
+	def close(self) -> None:
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+
+
+class TradeJournal:
+	"""
+	异步交易日志
+
+	Args:
+		sink: SQLiteJournalSink / JsonlJournalSink（任何带 write(rows) / close() 的对象）；None 表示关闭
+		flush_interval: 写线程批量写入的间隔（秒），也是最长的落盘延迟
+		batch_size: 单批最多写入的记录数
+		max_pending: 待写队列上限，超过时丢弃新记录并计入 dropped
+		run_id: 本次运行的标识，默认随机生成
+		on_error: 写线程异常回调
+	"""
+
+	def __init__(self, sink: Any = None, flush_interval: float = 0.5, batch_size: int = 5000,
+				 max_pending: int = 1_000_000, run_id: Optional[str] = None,
+				 on_error: Optional[Callable[[Exception], None]] = None):
+		self.sink = sink
+		self.enabled = sink is not None
+		self.flush_interval = flush_interval
+		self.batch_size = batch_size
+		self.max_pending = max_pending
+		self.run_id = run_id or uuid.uuid4().hex[:12]
+		self.on_error = on_error
+
+		self._pending: Deque[Tuple[int, int, str, Optional[str], Dict[str, Any]]] = deque()
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+		self._seq = itertools.count(1)
+
+		# 指标
+		self.recorded = 0
+		self.dropped = 0
+		self.written = 0
+		self.batches = 0
+		self.max_batch = 0
+		self.errors = 0
+		self.write_seconds = 0.0
+		self.last_error: Optional[str] = None
+
+	# ---------- 热路径 ----------
+
+	def record(self, kind: str, cycle: Optional[str] = None, mono_ns: Optional[int] = None, **fields: Any) -> None:
+		"""
+		登记一条记录（只入队）
+
+		Args:
+			kind: 记录类型（cycle_start / order / cancel / fill / hedge / order_status / unwind / cycle_end ...）
+			cycle: 所属轮次，默认取 cycle() 上下文
+			mono_ns: 事件发生的单调时钟（time.perf_counter_ns），默认为现在；事后补记时传入事件发生时刻
+			fields: 其它字段，leg / venue / symbol / side / order_id / price / quantity 存为独立列
+		"""
+		if not self.enabled:
+			return
+		if len(self._pending) >= self.max_pending:
+			self.dropped += 1
+			return
+		self._pending.append((time.time_ns(), mono_ns or time.perf_counter_ns(), kind,
+							  cycle if cycle is not None else _current_cycle.get(), fields))
+		self.recorded += 1
+
+	@contextmanager
+	def cycle(self, cycle_id: str) -> Iterator[str]:
+		"""在此上下文中登记的记录都归属于 cycle_id"""
+		token = _current_cycle.set(cycle_id)
+		try:
+			yield cycle_id
+		finally:
+			_current_cycle.reset(token)
+
+	# ---------- 生命周期 ----------
+
+	def start(self) -> "TradeJournal":
+		if self.enabled and self._thread is None:
+			self._stop.clear()
+			self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+			self._thread.start()
+		return self
+
+	def close(self, timeout: Optional[float] = 30.0) -> None:
+		"""写完队列中的全部记录并关闭输出"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+		if self.sink is not None:
+			try:
+				self.flush()
+			except Exception as e:
+				# 关闭时仍写不进去，剩余记录计入 dropped
+				self._on_write_error(e)
+				with self._lock:
+					self.dropped += len(self._pending)
+					self._pending.clear()
+			self.sink.close()
+			self.enabled = False
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.close()
+
+	# ---------- 写线程 ----------
+
+	def flush(self) -> None:
+		"""立即写出队列中的全部记录；某批写入失败时把它放回队首（下次重试）并抛出异常"""
+		with self._lock:
+			while self._pending:
+				items = []
+				while self._pending and len(items) < self.batch_size:
+					items.append(self._pending.popleft())
+				rows = [_row(self.run_id, next(self._seq), item) for item in items]
+				t0 = time.perf_counter()
+				try:
+					self.sink.write(rows)
+				except Exception:
+					self._pending.extendleft(reversed(items))
+					raise
+				self.write_seconds += time.perf_counter() - t0
+				self.written += len(rows)
+				self.batches += 1
+				self.max_batch = max(self.max_batch, len(rows))
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.flush_interval):
+			try:
+				self.flush()
+			except Exception as e:
+				self._on_write_error(e)
+
+	def _on_write_error(self, e: Exception) -> None:
+		self.errors += 1
+		self.last_error = repr(e)
+		if self.on_error is not None:
+			self.on_error(e)
+
+	def metrics(self) -> Dict[str, Any]:
+		return {
+			"run_id": self.run_id,
+			"recorded": self.recorded,
+			"pending": len(self._pending),
+			"dropped": self.dropped,
+			"written": self.written,
+			"batches": self.batches,
+			"max_batch": self.max_batch,
+			"errors": self.errors,
+			"write_seconds": round(self.write_seconds, 3),
+			"last_error": self.last_error,
+		}
+
+
+def build_journal(cfg: Optional[Dict[str, Any]]) -> TradeJournal:
+	"""
+	按配置创建交易日志（未配置或 enabled: false 时返回关闭的日志，record 为空操作）
+
+	cfg: {"enabled": true, "backend": "sqlite" | "jsonl", "path": "logs/journal.db", "flush_interval": 0.5}
+	"""
+	cfg = cfg or {}
+	if not cfg.get("enabled", True) or not cfg.get("path"):
+		return TradeJournal()
+	backend = str(cfg.get("backend", "sqlite")).lower()
+	if backend == "sqlite":
+		sink: Any = SQLiteJournalSink(cfg["path"])
+	elif backend == "jsonl":
+		sink = JsonlJournalSink(cfg["path"], segment_bytes=int(cfg.get("segment_mb", 64)) << 20)
+	else:
+		raise ValueError(f"不支持的日志后端: {backend}（可选: sqlite / jsonl）")
+	return TradeJournal(sink, flush_interval=float(cfg.get("flush_interval", 0.5)))
+
+
+def load_journal(path: Any) -> List[Dict[str, Any]]:
+	"""读取交易日志（SQLite 文件或 JSONL 分段目录），按时间排序；data 列展开到记录中"""
+	p = Path(path)
+	records: List[Dict[str, Any]] = []
+	if p.is_dir():
+		for seg in sorted(p.glob("journal-*.jsonl")):
+			with seg.open("r", encoding="utf-8") as f:
+				records.extend(json.loads(line) for line in f if line.strip())
+	else:
+		with LedgerStore(p) as store:
+			records = [dict(r) for r in store.query(f"SELECT * FROM {TABLE}")]
+		for r in records:
+			r["data"] = json.loads(r["data"]) if r["data"] else None
+	out = []
+	for r in records:
+		data = r.pop("data", None) or {}
+		out.append({**data, **r})
+	out.sort(key=lambda r: (r["ts_ns"], r["seq"]))
+	return out
+
+
+_journal = TradeJournal()
+
+
+def get_journal() -> TradeJournal:
+	return _journal
+
+
+def set_journal(journal: TradeJournal) -> TradeJournal:
+	global _journal
+	_journal = journal
+	return journal
@@ -0,0 +1,152 @@
+"""
+本地账本（SQLite，WAL 模式）
+
+交易所历史记录（成交、订单、资金费、结算、资金流水）增量同步到本地，对账和 PnL 报表直接查本地库，
+不再反复拉取全部历史。每个数据流一张表（主键去重，按 symbol / 时间等建索引），sync_state 表记录每个
+数据流的高水位（已同步到的最大时间或id）与游标，下次同步只取之后的新记录。
+
+WAL 模式下读写互不阻塞：同步进程写入的同时，报表脚本可以并发查询。
+
+	store = LedgerStore("data/ledger.db")
+	store.ensure_table("bp_fills", [("key", "TEXT"), ("symbol", "TEXT"), ("ts", "INTEGER")], key=["key"],
+					   indexes=[("symbol", "ts")])
+	store.upsert("bp_fills", rows)
+	store.set_state("bp.fills:*", hwm=1760000000000)
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def to_ms(value: Any) -> Optional[int]:
+	"""交易所时间字段 -> 毫秒：整数毫秒/微秒、数字字符串或 ISO 时间（无时区视为 UTC）"""
+	if value is None or value == "":
+		return None
+	if isinstance(value, (int, float)):
+		v = int(value)
+	elif isinstance(value, str) and value.lstrip("-").isdigit():
+		v = int(value)
+	else:
+		dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+		if dt.tzinfo is None:
+			dt = dt.replace(tzinfo=timezone.utc)
+		return int(dt.timestamp() * 1000)
+	# 微秒时间戳（Backpack 部分接口）统一为毫秒
+	return v // 1000 if v > 10 ** 14 else v
+
+
+class LedgerStore:
+	"""
+	SQLite 账本
+
+	Args:
+		path: 数据库文件路径（":memory:" 用于测试）
+		timeout: 等待其它连接释放写锁的秒数
+	"""
+
+	def __init__(self, path: Any = "data/ledger.db", timeout: float = 30.0):
+		self.path = str(path)
+		if self.path != ":memory:":
+			Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+		self._lock = threading.RLock()
+		self.conn = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False, isolation_level=None)
+		self.conn.row_factory = sqlite3.Row
+		self.conn.execute("PRAGMA journal_mode=WAL")
+		self.conn.execute("PRAGMA synchronous=NORMAL")
+		self.conn.execute(
+			"CREATE TABLE IF NOT EXISTS sync_state ("
+			"stream TEXT PRIMARY KEY, hwm INTEGER, cursor TEXT, rows INTEGER NOT NULL DEFAULT 0, updated_ms INTEGER)"
+		)
+		self._tables: Dict[str, List[str]] = {}
+
+	def ensure_table(self, table: str, columns: Sequence[Tuple[str, str]], key: Sequence[str],
+					 indexes: Sequence[Sequence[str]] = ()) -> None:
+		"""建表（已存在则跳过）；key 为去重主键，indexes 为需要的查询索引"""
+		cols = ", ".join(f"{name} {sqltype}" for name, sqltype in columns)
+		with self._lock:
+			self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols}, PRIMARY KEY ({', '.join(key)}))")
+			for index in indexes:
+				name = f"ix_{table}_{'_'.join(index)}"
+				self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index)})")
+			self._tables[table] = [name for name, _ in columns]
+
+	@contextmanager
+	def transaction(self) -> Iterator[sqlite3.Connection]:
+		with self._lock:
+			self.conn.execute("BEGIN IMMEDIATE")
+			try:
+				yield self.conn
+			except BaseException:
+				self.conn.execute("ROLLBACK")
+				raise
+			self.conn.execute("COMMIT")
+
+	def upsert(self, table: str, rows: Sequence[Dict[str, Any]], replace: bool = False) -> int:
+		"""
+		批量写入，返回新增行数
+
+		replace=False 时主键已存在的行被忽略（成交、资金费等不可变记录）；replace=True 时覆盖（订单状态会变化）
+		"""
+		if not rows:
+			return 0
+		names = self._tables[table]
+		verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+		sql = f"{verb} INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})"
+		values = [tuple(_sql_value(row.get(name)) for name in names) for row in rows]
+		with self.transaction() as conn:
+			before = conn.total_changes
+			conn.executemany(sql, values)
+			return conn.total_changes - before
+
+	def state(self, stream: str) -> Dict[str, Any]:
+		row = self.conn.execute("SELECT hwm, cursor, rows, updated_ms FROM sync_state WHERE stream = ?", (stream,)).fetchone()
+		if row is None:
+			return {"hwm": None, "cursor": None, "rows": 0, "updated_ms": None}
+		return {"hwm": row["hwm"], "cursor": row["cursor"], "rows": row["rows"], "updated_ms": row["updated_ms"]}
+
+	def set_state(self, stream: str, hwm: Optional[int] = None, cursor: Optional[str] = None, added: int = 0) -> None:
+		"""更新高水位（只增不减）与游标，added 为本次新增行数"""
+		with self._lock:
+			self.conn.execute(
+				"INSERT INTO sync_state (stream, hwm, cursor, rows, updated_ms) VALUES (?, ?, ?, ?, ?) "
+				"ON CONFLICT(stream) DO UPDATE SET hwm = max(coalesce(hwm, excluded.hwm), coalesce(excluded.hwm, hwm)), "
+				"cursor = coalesce(excluded.cursor, cursor), rows = rows + excluded.rows, updated_ms = excluded.updated_ms",
+				(stream, hwm, cursor, added, int(time.time() * 1000)),
+			)
+
+	def states(self) -> Dict[str, Dict[str, Any]]:
+		rows = self.conn.execute("SELECT stream, hwm, cursor, rows, updated_ms FROM sync_state ORDER BY stream").fetchall()
+		return {r["stream"]: dict(r) for r in rows}
+
+	def query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+		with self._lock:
+			return self.conn.execute(sql, params).fetchall()
+
+	def tables(self) -> List[str]:
+		return [r[0] for r in self.query("SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+
+	def count(self, table: str) -> int:
+		return int(self.query(f"SELECT count(*) FROM {table}")[0][0])
+
+	def close(self) -> None:
+		with self._lock:
+			self.conn.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def _sql_value(value: Any) -> Any:
+	if isinstance(value, bool):
+		return int(value)
+	if isinstance(value, (dict, list)):
+		return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+	return value
@@ -0,0 +1,189 @@
+"""
+全市场数组流的列式快照表（NumPy）
+
+每个交易对一行，每个字段一列 float64（缺失为 NaN），收到 !markPrice@arr / !ticker@arr / !miniTicker@arr
+推送时原地更新。每列按一次向量化转换写入（字符串数组 -> float64），扫描时直接对整列做
+NumPy 运算，例如按资金费率排序、筛选 24h 涨幅:
+
+	table = MarketTable("markPrice")
+	table.update(items)
+	rates = table.column("funding_rate")
+	top = table.top("funding_rate", 5)
+"""
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common import ws_decode
+
+# 各流类型的列：(列名, 推送中的字段)
+FIELDS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+	"markPrice": (
+		("mark_price", "p"), ("index_price", "i"), ("settle_price", "P"), ("funding_rate", "r"),
+		("next_funding_time", "T"),
+	),
+	"ticker": (
+		("price_change", "p"), ("price_change_pct", "P"), ("weighted_avg_price", "w"), ("last_price", "c"),
+		("last_qty", "Q"), ("open_price", "o"), ("high_price", "h"), ("low_price", "l"), ("volume", "v"),
+		("quote_volume", "q"), ("trade_count", "n"),
+	),
+	"miniTicker": (
+		("last_price", "c"), ("open_price", "o"), ("high_price", "h"), ("low_price", "l"), ("volume", "v"),
+		("quote_volume", "q"),
+	),
+}
+
+# 全市场数组流名称 -> 表类型
+ARRAY_STREAMS = {
+	"!markPrice@arr": "markPrice",
+	"!markPrice@arr@1s": "markPrice",
+	"!ticker@arr": "ticker",
+	"!miniTicker@arr": "miniTicker",
+}
+
+
+class MarketTable:
+	"""
+	列式快照表
+
+	Args:
+		kind: markPrice / ticker / miniTicker（或使用 fields 自定义列）
+		capacity: 初始行数，不够时按倍数扩容
+		fields: 自定义列定义 ((列名, 字段), ...)
+	"""
+
+	def __init__(self, kind: str = "markPrice", capacity: int = 256,
+				 fields: Optional[Sequence[Tuple[str, str]]] = None):
+		if fields is None:
+			if kind not in FIELDS:
+				raise ValueError(f"未知的表类型: {kind}（可选: {', '.join(FIELDS)}）")
+			fields = FIELDS[kind]
+		self.kind = kind
+		self.fields: Tuple[Tuple[str, str], ...] = tuple(fields)
+		self._getter = itemgetter(*(key for _, key in self.fields))
+		self.symbols: List[str] = []
+		self.index: Dict[str, int] = {}
+		self._capacity = max(1, capacity)
+		self._columns: Dict[str, np.ndarray] = {
+			name: np.full(self._capacity, np.nan, dtype=np.float64) for name, _ in self.fields
+		}
+		self._event_time = np.zeros(self._capacity, dtype=np.int64)
+		self._updates = np.zeros(self._capacity, dtype=np.int64)
+		self._last_symbols: List[str] = []
+		self._last_rows = np.empty(0, dtype=np.intp)
+		self.frames = 0
+
+	def __len__(self) -> int:
+		return len(self.symbols)
+
+	def __contains__(self, symbol: str) -> bool:
+		return symbol in self.index
+
+	def _grow(self, needed: int) -> None:
+		capacity = self._capacity
+		while capacity < needed:
+			capacity *= 2
+		if capacity == self._capacity:
+			return
+		for name, col in self._columns.items():
+			grown = np.full(capacity, np.nan, dtype=np.float64)
+			grown[: self._capacity] = col
+			self._columns[name] = grown
+		for attr in ("_event_time", "_updates"):
+			col = getattr(self, attr)
+			grown = np.zeros(capacity, dtype=np.int64)
+			grown[: self._capacity] = col
+			setattr(self, attr, grown)
+		self._capacity = capacity
+
+	def _rows(self, symbols: List[str]) -> np.ndarray:
+		# 交易所每帧的交易对顺序通常不变，相同时直接复用上一帧的行号
+		if symbols == self._last_symbols:
+			return self._last_rows
+		index = self.index
+		rows = np.empty(len(symbols), dtype=np.intp)
+		for i, symbol in enumerate(symbols):
+			row = index.get(symbol)
+			if row is None:
+				row = index[symbol] = len(self.symbols)
+				self.symbols.append(symbol)
+			rows[i] = row
+		if len(self.symbols) > self._capacity:
+			self._grow(len(self.symbols))
+		self._last_symbols, self._last_rows = symbols, rows
+		return rows
+
+	def update(self, items: Iterable[Dict[str, Any]]) -> int:
+		"""用一帧推送（dict 列表）原地更新，返回更新的行数"""
+		items = [d for d in items if isinstance(d, dict) and "s" in d]
+		if not items:
+			return 0
+		rows = self._rows([d["s"] for d in items])
+		try:
+			# 常见情况：每个元素都有全部字段，一次转换成 (行, 列) 矩阵
+			matrix = np.array([self._getter(d) for d in items], dtype=np.float64).reshape(len(items), len(self.fields))
+		except (KeyError, TypeError, ValueError):
+			matrix = None
+		if matrix is not None:
+			for j, (name, _) in enumerate(self.fields):
+				self._columns[name][rows] = matrix[:, j]
+		else:
+			for name, key in self.fields:
+				present = [i for i, d in enumerate(items) if d.get(key) is not None]
+				if present:
+					self._columns[name][rows[present]] = np.asarray([items[i][key] for i in present], dtype=np.float64)
+		self._event_time[rows] = [d.get("E", 0) for d in items]
+		self._updates[rows] += 1
+		self.frames += 1
+		return len(items)
+
+	def update_raw(self, body: Any) -> int:
+		"""用 payload 原文更新（内部用 common.ws_decode 的 JSON 后端解析）"""
+		return self.update(ws_decode.loads(body))
+
+	def column(self, name: str) -> np.ndarray:
+		"""某列当前的值（只读视图，行顺序与 symbols 一致）"""
+		view = self._columns[name][: len(self.symbols)]
+		view.flags.writeable = False
+		return view
+
+	@property
+	def event_time(self) -> np.ndarray:
+		view = self._event_time[: len(self.symbols)]
+		view.flags.writeable = False
+		return view
+
+	@property
+	def update_counts(self) -> np.ndarray:
+		view = self._updates[: len(self.symbols)]
+		view.flags.writeable = False
+		return view
+
+	def row(self, symbol: str) -> Optional[Dict[str, float]]:
+		i = self.index.get(symbol)
+		if i is None:
+			return None
+		out: Dict[str, Any] = {name: float(self._columns[name][i]) for name, _ in self.fields}
+		out["symbol"] = symbol
+		out["event_time"] = int(self._event_time[i])
+		return out
+
+	def snapshot(self) -> Dict[str, np.ndarray]:
+		"""全部列的拷贝（含 symbol、event_time），可安全地在其他线程/进程中使用"""
+		n = len(self.symbols)
+		out: Dict[str, np.ndarray] = {name: col[:n].copy() for name, col in self._columns.items()}
+		out["symbol"] = np.array(self.symbols, dtype=object)
+		out["event_time"] = self._event_time[:n].copy()
+		return out
+
+	def top(self, name: str, n: int = 10, ascending: bool = False) -> List[Tuple[str, float]]:
+		"""按某列排序取前 n 个交易对（忽略 NaN）"""
+		col = self.column(name)
+		valid = np.flatnonzero(~np.isnan(col))
+		if not len(valid):
+			return []
+		order = valid[np.argsort(col[valid])]
+		if not ascending:
+			order = order[::-1]
+		return [(self.symbols[i], float(col[i])) for i in order[:n]]
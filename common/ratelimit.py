@@ -0,0 +1,145 @@
+"""
+请求权重限速（令牌桶）
+
+交易所按 IP 统计每分钟请求权重（Aster 合约为 2400/分钟，不同接口权重不同）。TokenBucket 以 rate 个/秒
+匀速补充令牌，最多积累 capacity 个；每个请求按接口权重取令牌，不足时等待。线程安全，同一个桶可以被
+多个下载线程共享，异步代码用 acquire_async。
+
+	limiter = TokenBucket.per_minute(1200)      # 只用交易所额度的一半，留给交易
+	limiter.acquire(20)                          # aggTrades 权重 20
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class TokenBucket:
+	"""
+	令牌桶
+
+	Args:
+		rate: 每秒补充的令牌数
+		capacity: 桶容量（允许的突发量），默认为 1 秒的补充量
+		clock: 单调时钟（测试时可替换）
+	"""
+
+	def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+		if rate <= 0:
+			raise ValueError("rate 必须大于 0")
+		self.rate = float(rate)
+		self.capacity = float(capacity if capacity is not None else rate)
+		self._clock = clock
+		self._tokens = self.capacity
+		self._updated = clock()
+		self._lock = threading.Lock()
+		self.acquired = 0.0
+		self.requests = 0
+		self.waits = 0
+		self.wait_seconds = 0.0
+		self.rejected = 0
+
+	@classmethod
+	def per_minute(cls, weight: float, burst: Optional[float] = None) -> "TokenBucket":
+		"""每分钟 weight 个令牌，默认允许 1/10 分钟额度的突发"""
+		return cls(weight / 60.0, burst if burst is not None else max(weight / 10.0, 1.0))
+
+	def _refill(self, now: float) -> None:
+		elapsed = now - self._updated
+		if elapsed > 0:
+			self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+			self._updated = now
+
+	def _take(self, tokens: float) -> float:
+		"""取令牌；成功返回 0，否则返回还需等待的秒数"""
+		if tokens > self.capacity:
+			raise ValueError(f"单次取 {tokens} 个令牌超过桶容量 {self.capacity}")
+		with self._lock:
+			self._refill(self._clock())
+			if self._tokens >= tokens:
+				self._tokens -= tokens
+				self.acquired += tokens
+				self.requests += 1
+				return 0.0
+			return (tokens - self._tokens) / self.rate
+
+	@property
+	def available(self) -> float:
+		with self._lock:
+			self._refill(self._clock())
+			return self._tokens
+
+	def try_acquire(self, tokens: float = 1) -> bool:
+		"""不等待地取令牌"""
+		if self._take(tokens) == 0.0:
+			return True
+		self.rejected += 1
+		return False
+
+	def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+		"""取令牌，不足时阻塞等待；timeout 内取不到返回 False"""
+		deadline = None if timeout is None else self._clock() + timeout
+		started = None
+		while True:
+			wait = self._take(tokens)
+			if wait == 0.0:
+				if started is not None:
+					self.waits += 1
+					self.wait_seconds += self._clock() - started
+				return True
+			if started is None:
+				started = self._clock()
+			if deadline is not None:
+				remaining = deadline - self._clock()
+				if remaining <= 0:
+					self.rejected += 1
+					return False
+				wait = min(wait, remaining)
+			time.sleep(wait)
+
+	async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+		"""acquire 的协程版本（等待时不阻塞事件循环）"""
+		deadline = None if timeout is None else self._clock() + timeout
+		started = None
+		while True:
+			wait = self._take(tokens)
+			if wait == 0.0:
+				if started is not None:
+					self.waits += 1
+					self.wait_seconds += self._clock() - started
+				return True
+			if started is None:
+				started = self._clock()
+			if deadline is not None:
+				remaining = deadline - self._clock()
+				if remaining <= 0:
+					self.rejected += 1
+					return False
+				wait = min(wait, remaining)
+			await asyncio.sleep(wait)
+
+	def charge(self, tokens: float = 1) -> None:
+		"""无条件扣令牌（可以扣成负数，之后的取令牌要等补回）：记入已经发出、不能因限速推迟的请求"""
+		with self._lock:
+			self._refill(self._clock())
+			self._tokens -= tokens
+			self.acquired += tokens
+			self.requests += 1
+
+	def drain(self, tokens: Optional[float] = None) -> None:
+		"""扣掉令牌（收到 429 / 418 时清空桶，让所有调用方一起退避）"""
+		with self._lock:
+			self._refill(self._clock())
+			self._tokens = self._tokens - tokens if tokens is not None else 0.0
+
+	def metrics(self) -> Dict[str, Any]:
+		return {
+			"rate_per_min": round(self.rate * 60, 1),
+			"capacity": self.capacity,
+			"available": round(self.available, 2),
+			"requests": self.requests,
+			"acquired": self.acquired,
+			"waits": self.waits,
+			"wait_seconds": round(self.wait_seconds, 3),
+			"rejected": self.rejected,
+		}
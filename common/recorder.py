@@ -0,0 +1,623 @@
+"""
+行情录制：把两个交易所的 WS 推送（bookTicker / trade / depth / markPrice）连同本地接收时间
+写入分段、列式、压缩的二进制文件，供回放与回测使用
+
+段文件（*.seg）格式:
+	文件头 MAGIC，之后是一串块。每个块是同一类型的若干行，各列连续存放后整体压缩:
+		块头 BLOCK_HEADER: 块标识、类型码、压缩算法、行数、原始长度、压缩长度、最小/最大接收时间（ns）
+		块体: 按 SCHEMAS 顺序拼接的 little-endian 列数组（接收/事件时间列先差分，压缩率更高）
+	类型码 0 为流表块（JSON），登记 (交易所, 流, 交易对)，数据块的 stream 列是流表中的序号。
+	段关闭时写出索引 <段文件>.idx.json（各块的偏移、类型、行数、接收时间范围、包含的流），
+	按时间/类型/流定位块时不必读块体；索引缺失（进程崩溃）时 SegmentReader 扫描块头重建。
+
+写入路径: 行情回调只把 (接收时间, 交易所, 流, payload) 追加到队列；后台线程每 flush_interval 秒
+批量取出、转换为列、压缩写入，按时长或大小切换新段。payload 可以是已解析的 dict/list，也可以是
+原文（common.ws_manager.RecorderSink 直接传原文，JSON 解析也在后台线程中完成）。
+
+	recorder = MarketRecorder("data/market").start()
+	recorder.record("aster", "asterusdt@bookTicker", data)
+	...
+	recorder.close()
+"""
+import json
+import mmap
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from common import ws_decode
+from common.ws_decode import stream_kind
+
+try:
+	import zstandard as _zstd
+except ImportError:  # pragma: no cover - 可选依赖
+	_zstd = None
+
+MAGIC = b"MDSEG\x00\x01\x00"
+BLOCK_MAGIC = b"BLK1"
+# 块标识, 类型码, 压缩算法, 保留, 行数, 原始长度, 压缩长度, 最小接收时间, 最大接收时间
+BLOCK_HEADER = struct.Struct("<4sBBHIIIqq")
+INDEX_SUFFIX = ".idx.json"
+SEGMENT_SUFFIX = ".seg"
+
+# 公共列：本地接收时间（time.time_ns）、交易所事件时间（统一为微秒）、流表序号
+_COMMON = (("recv_ns", "<i8"), ("event_us", "<i8"), ("stream", "<u4"))
+
+SCHEMAS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+	"bookTicker": _COMMON + (
+		("update_id", "<i8"), ("bid_price", "<f8"), ("bid_qty", "<f8"), ("ask_price", "<f8"), ("ask_qty", "<f8"),
+	),
+	"trade": _COMMON + (
+		("trade_id", "<i8"), ("price", "<f8"), ("qty", "<f8"), ("buyer_maker", "<u1"),
+	),
+	# 每个价位一行，同一条推送的各行 recv_ns/final_update_id 相同；side 见 SIDE_*
+	"depth": _COMMON + (
+		("first_update_id", "<i8"), ("final_update_id", "<i8"), ("prev_final_update_id", "<i8"),
+		("side", "<u1"), ("price", "<f8"), ("qty", "<f8"),
+	),
+	"markPrice": _COMMON + (
+		("mark_price", "<f8"), ("index_price", "<f8"), ("funding_rate", "<f8"), ("next_funding_ms", "<i8"),
+	),
+}
+KIND_CODES = {"streams": 0, "bookTicker": 1, "trade": 2, "depth": 3, "markPrice": 4}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+DELTA_COLUMNS = frozenset(("recv_ns", "event_us"))
+
+SIDE_BID, SIDE_ASK, SIDE_NONE = 0, 1, 2
+
+_CODECS: Dict[str, Tuple[int, Callable[[bytes, int], bytes], Callable[[bytes, int], bytes], int]] = {
+	"none": (0, lambda data, level: data, lambda data, size: data, 0),
+	"zlib": (1, zlib.compress, lambda data, size: zlib.decompress(data, bufsize=max(size, 1)), 1),
+}
+if _zstd is not None:
+	_CODECS["zstd"] = (
+		2,
+		lambda data, level: _zstd.ZstdCompressor(level=level).compress(data),
+		lambda data, size: _zstd.ZstdDecompressor().decompress(data, max_output_size=size),
+		3,
+	)
+_CODEC_NAMES = {code: name for name, (code, *_rest) in _CODECS.items()}
+DEFAULT_CODEC = "zstd" if _zstd is not None else "zlib"
+
+
+def record_kind(stream: str) -> Optional[str]:
+	"""流名称对应的录制类型（bookTicker / trade / depth / markPrice），不录制的流返回 None"""
+	if stream.startswith("!"):
+		kind = stream[1:].split("@", 1)[0]
+	else:
+		kind = stream_kind(stream)[0]
+	if kind == "aggTrade":
+		kind = "trade"
+	return kind if kind in SCHEMAS else None
+
+
+def _event_us(venue: str, data: Dict[str, Any]) -> int:
+	# Backpack 的事件时间为微秒，Aster 为毫秒
+	value = data.get("E") or 0
+	return int(value) if venue == "bp" else int(value) * 1000
+
+
+def _int(value: Any) -> int:
+	return -1 if value is None else int(value)
+
+
+def _float(value: Any) -> float:
+	return float("nan") if value is None else float(value)
+
+
+def segment_paths(directory: Any) -> List[Path]:
+	"""目录下的段文件（按文件名即开始时间排序）"""
+	return sorted(Path(directory).glob(f"*{SEGMENT_SUFFIX}"))
+
+
+# ---------- 写入 ----------
+
+class SegmentWriter:
+	"""
+	单个段文件的写入器（非线程安全，由 MarketRecorder 的写线程独占）
+
+	Args:
+		path: 段文件路径
+		codec: none / zlib / zstd（需安装 zstandard）
+		level: 压缩级别，默认为该算法的快速档
+	"""
+
+	def __init__(self, path: Any, codec: str = DEFAULT_CODEC, level: Optional[int] = None):
+		if codec not in _CODECS:
+			raise ValueError(f"不支持的压缩算法: {codec}（可选: {', '.join(_CODECS)}）")
+		self.path = Path(path)
+		self.codec = codec
+		self._code, self._compress, _, default_level = _CODECS[codec]
+		self.level = default_level if level is None else level
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._f = self.path.open("wb")
+		self._f.write(MAGIC)
+		self.size = len(MAGIC)
+		self.streams: Dict[int, Tuple[str, str, str]] = {}
+		self.blocks: List[Dict[str, Any]] = []
+		self.rows = 0
+		self.bytes_raw = 0
+		self.start_ns: Optional[int] = None
+		self.end_ns: Optional[int] = None
+		self.opened_at = time.monotonic()
+
+	def _write(self, kind_code: int, rows: int, raw: bytes, ts_min: int, ts_max: int) -> Tuple[int, int]:
+		payload = self._compress(raw, self.level)
+		offset = self.size
+		self._f.write(BLOCK_HEADER.pack(BLOCK_MAGIC, kind_code, self._code, 0, rows, len(raw), len(payload), ts_min, ts_max))
+		self._f.write(payload)
+		self.size += BLOCK_HEADER.size + len(payload)
+		self.bytes_raw += len(raw)
+		return offset, len(payload)
+
+	def add_streams(self, entries: Dict[int, Tuple[str, str, str]]) -> None:
+		"""登记流表条目 {序号: (交易所, 流, 交易对)}（写入流表块）"""
+		entries = {sid: entry for sid, entry in entries.items() if sid not in self.streams}
+		if not entries:
+			return
+		raw = json.dumps([[sid, *entry] for sid, entry in entries.items()], separators=(",", ":")).encode()
+		self._write(KIND_CODES["streams"], len(entries), raw, 0, 0)
+		self.streams.update(entries)
+
+	def write_block(self, kind: str, columns: Dict[str, np.ndarray]) -> Dict[str, Any]:
+		"""写入一个数据块，columns 需包含 SCHEMAS[kind] 的全部列且长度一致"""
+		schema = SCHEMAS[kind]
+		recv = np.asarray(columns["recv_ns"], dtype=np.int64)
+		rows = len(recv)
+		parts = []
+		for name, dtype in schema:
+			col = np.ascontiguousarray(columns[name], dtype=dtype)
+			if name in DELTA_COLUMNS:
+				col = np.diff(col, prepend=col.dtype.type(0)).astype(dtype, copy=False)
+			parts.append(col.tobytes())
+		ts_min, ts_max = int(recv.min()), int(recv.max())
+		offset, comp_len = self._write(KIND_CODES[kind], rows, b"".join(parts), ts_min, ts_max)
+		block = {
+			"kind": kind, "offset": offset, "rows": rows, "comp_len": comp_len, "ts_min": ts_min, "ts_max": ts_max,
+			"streams": np.unique(np.asarray(columns["stream"])).tolist(),
+		}
+		self.blocks.append(block)
+		self.rows += rows
+		self.start_ns = ts_min if self.start_ns is None else min(self.start_ns, ts_min)
+		self.end_ns = ts_max if self.end_ns is None else max(self.end_ns, ts_max)
+		return block
+
+	def flush(self) -> None:
+		self._f.flush()
+
+	def index(self) -> Dict[str, Any]:
+		return {
+			"version": 1,
+			"segment": self.path.name,
+			"codec": self.codec,
+			"schemas": {kind: [list(col) for col in schema] for kind, schema in SCHEMAS.items()},
+			"streams": [[sid, *entry] for sid, entry in sorted(self.streams.items())],
+			"blocks": self.blocks,
+			"rows": self.rows,
+			"bytes": self.size,
+			"bytes_raw": self.bytes_raw,
+			"start_ns": self.start_ns,
+			"end_ns": self.end_ns,
+		}
+
+	def close(self) -> Path:
+		"""关闭段文件并写出索引，返回索引路径"""
+		self._f.close()
+		index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+		tmp = index_path.with_suffix(".tmp")
+		tmp.write_text(json.dumps(self.index(), separators=(",", ":")), encoding="utf-8")
+		tmp.replace(index_path)
+		return index_path
+
+
+class _Columns:
+	"""一种类型待写入的行（按行累积的元组，写块时一次转置为列）"""
+
+	__slots__ = ("kind", "rows")
+
+	def __init__(self, kind: str):
+		self.kind = kind
+		self.rows: List[tuple] = []
+
+	def to_arrays(self) -> Dict[str, np.ndarray]:
+		schema = SCHEMAS[self.kind]
+		cols = list(zip(*self.rows))
+		return {name: np.array(col, dtype=dtype) for (name, dtype), col in zip(schema, cols)}
+
+
+class MarketRecorder:
+	"""
+	行情录制器：record() 在行情回调中调用（只入队），后台线程批量写入分段文件
+
+	Args:
+		directory: 输出目录
+		prefix: 段文件名前缀，文件名为 <prefix>-<开始时间>-<序号>.seg
+		flush_interval: 写线程批量写入的间隔（秒），也是最长的落盘延迟
+		block_rows: 单个块的最大行数
+		segment_seconds: 单个段的最长时长（秒），到时切换新段
+		segment_bytes: 单个段的最大字节数（压缩后）
+		codec: none / zlib / zstd（默认有 zstandard 时用 zstd，否则 zlib）
+		level: 压缩级别
+		max_pending: 待写队列上限，超过时丢弃新消息并计入 dropped（写盘跟不上时保护内存）
+		on_error: 写线程异常回调
+	"""
+
+	def __init__(self, directory: Any, prefix: str = "market", flush_interval: float = 1.0, block_rows: int = 65536,
+				 segment_seconds: float = 3600.0, segment_bytes: int = 256 << 20, codec: str = DEFAULT_CODEC,
+				 level: Optional[int] = None, max_pending: int = 2_000_000,
+				 on_error: Optional[Callable[[Exception], None]] = None):
+		if codec not in _CODECS:
+			raise ValueError(f"不支持的压缩算法: {codec}（可选: {', '.join(_CODECS)}）")
+		self.directory = Path(directory)
+		self.prefix = prefix
+		self.flush_interval = flush_interval
+		self.block_rows = block_rows
+		self.segment_seconds = segment_seconds
+		self.segment_bytes = segment_bytes
+		self.codec = codec
+		self.level = level
+		self.max_pending = max_pending
+		self.on_error = on_error
+
+		self._pending: Deque[Tuple[int, str, str, Any]] = deque()
+		self._lock = threading.Lock()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+		self._segment: Optional[SegmentWriter] = None
+		self._seq = 0
+		self._stream_ids: Dict[Tuple[str, str, str], int] = {}
+		self._kinds: Dict[str, Optional[str]] = {}
+		self._batches: Dict[str, _Columns] = {kind: _Columns(kind) for kind in SCHEMAS}
+		self.segments: List[Path] = []
+
+		# 指标
+		self.received = 0
+		self.dropped = 0
+		self.skipped = 0
+		self.errors = 0
+		self.rows = 0
+		self.blocks = 0
+		self.bytes_raw = 0
+		self.bytes_written = 0
+		self.write_seconds = 0.0
+		self.last_error: Optional[str] = None
+
+	# ---------- 热路径 ----------
+
+	def record(self, venue: str, stream: str, data: Any, recv_ns: Optional[int] = None) -> None:
+		"""登记一条推送（venue 为 aster / bp；data 为解析后的 payload 或原文）"""
+		if len(self._pending) >= self.max_pending:
+			self.dropped += 1
+			return
+		self._pending.append((recv_ns or time.time_ns(), venue, stream, data))
+		self.received += 1
+
+	# ---------- 生命周期 ----------
+
+	def start(self) -> "MarketRecorder":
+		if self._thread is None:
+			self._stop.clear()
+			self._thread = threading.Thread(target=self._run, name="market-recorder", daemon=True)
+			self._thread.start()
+		return self
+
+	def close(self, timeout: Optional[float] = 30.0) -> None:
+		"""写完队列中的全部消息，关闭当前段并写出索引"""
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+		with self._lock:
+			self._drain()
+			self._close_segment()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def flush(self) -> None:
+		"""立即把队列中的消息写入当前段"""
+		with self._lock:
+			self._drain()
+			if self._segment is not None:
+				self._segment.flush()
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.flush_interval):
+			try:
+				self.flush()
+			except Exception as e:
+				self.errors += 1
+				self.last_error = repr(e)
+				if self.on_error is not None:
+					self.on_error(e)
+
+	# ---------- 写线程 ----------
+
+	def _stream_id(self, venue: str, stream: str, symbol: str) -> int:
+		key = (venue, stream, symbol)
+		sid = self._stream_ids.get(key)
+		if sid is None:
+			sid = self._stream_ids[key] = len(self._stream_ids)
+		return sid
+
+	def _drain(self) -> None:
+		t0 = time.perf_counter()
+		pending = self._pending
+		# 只取当前已有的条数：生产者可能在取的同时继续追加
+		for _ in range(len(pending)):
+			recv_ns, venue, stream, data = pending.popleft()
+			kind = self._kinds.get(stream, "")
+			if kind == "":
+				kind = self._kinds[stream] = record_kind(stream)
+			if kind is None:
+				self.skipped += 1
+				continue
+			try:
+				if isinstance(data, (str, bytes, bytearray, memoryview)):
+					data = ws_decode.loads(data)
+				batch = self._batches[kind]
+				for item in (data if isinstance(data, list) else (data,)):
+					self._append(batch, venue, stream, recv_ns, item)
+			except (KeyError, TypeError, ValueError):
+				self.errors += 1
+				continue
+			if len(batch.rows) >= self.block_rows:
+				self._write_batch(batch)
+		for batch in self._batches.values():
+			if batch.rows:
+				self._write_batch(batch)
+		self.write_seconds += time.perf_counter() - t0
+
+	def _append(self, batch: _Columns, venue: str, stream: str, recv_ns: int, d: Dict[str, Any]) -> None:
+		symbol = d.get("s") or stream_kind(stream)[1]
+		sid = self._stream_id(venue, stream, symbol)
+		event_us = _event_us(venue, d)
+		kind = batch.kind
+		if kind == "bookTicker":
+			batch.rows.append((recv_ns, event_us, sid, _int(d.get("u")), float(d["b"]), float(d["B"]),
+							   float(d["a"]), float(d["A"])))
+		elif kind == "trade":
+			trade_id = d.get("t")
+			if trade_id is None:
+				trade_id = d.get("a")
+			batch.rows.append((recv_ns, event_us, sid, _int(trade_id), float(d["p"]), float(d["q"]), 1 if d.get("m") else 0))
+		elif kind == "depth":
+			# Aster 现货部分深度为 {"lastUpdateId", "bids", "asks"}
+			final_id = _int(d.get("u", d.get("lastUpdateId")))
+			first_id, prev_id = _int(d.get("U")), _int(d.get("pu"))
+			before = len(batch.rows)
+			for side, levels in ((SIDE_BID, d.get("b", d.get("bids"))), (SIDE_ASK, d.get("a", d.get("asks")))):
+				for price, qty in levels or ():
+					batch.rows.append((recv_ns, event_us, sid, first_id, final_id, prev_id, side, float(price), float(qty)))
+			if len(batch.rows) == before:
+				# 没有价位变化的推送也保留一行，回放时不丢更新 id
+				batch.rows.append((recv_ns, event_us, sid, first_id, final_id, prev_id, SIDE_NONE, float("nan"), float("nan")))
+		else:
+			if venue == "bp":
+				funding, next_funding = d.get("f"), d.get("n")
+			else:
+				funding, next_funding = d.get("r"), d.get("T")
+			batch.rows.append((recv_ns, event_us, sid, _float(d.get("p")), _float(d.get("i")), _float(funding),
+							   _int(next_funding)))
+
+	def _write_batch(self, batch: _Columns) -> None:
+		segment = self._current_segment()
+		new = {sid: key for key, sid in self._stream_ids.items() if sid not in segment.streams}
+		if new:
+			segment.add_streams(new)
+		before = segment.size
+		segment.write_block(batch.kind, batch.to_arrays())
+		self.rows += len(batch.rows)
+		self.blocks += 1
+		self.bytes_written += segment.size - before
+		batch.rows = []
+
+	def _current_segment(self) -> SegmentWriter:
+		segment = self._segment
+		if segment is not None and (segment.size >= self.segment_bytes
+									or time.monotonic() - segment.opened_at >= self.segment_seconds):
+			self._close_segment()
+			segment = None
+		if segment is None:
+			stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+			path = self.directory / f"{self.prefix}-{stamp}-{self._seq:04d}{SEGMENT_SUFFIX}"
+			self._seq += 1
+			segment = self._segment = SegmentWriter(path, self.codec, self.level)
+			self.segments.append(path)
+		return segment
+
+	def _close_segment(self) -> None:
+		if self._segment is not None:
+			self.bytes_raw += self._segment.bytes_raw
+			self._segment.close()
+			self._segment = None
+
+	def metrics(self) -> Dict[str, Any]:
+		segment = self._segment
+		raw = self.bytes_raw + (segment.bytes_raw if segment is not None else 0)
+		return {
+			"received": self.received,
+			"pending": len(self._pending),
+			"dropped": self.dropped,
+			"skipped": self.skipped,
+			"errors": self.errors,
+			"rows": self.rows,
+			"blocks": self.blocks,
+			"segments": len(self.segments),
+			"bytes_raw": raw,
+			"bytes_written": self.bytes_written,
+			"compression_ratio": round(raw / self.bytes_written, 2) if self.bytes_written else 0.0,
+			"write_seconds": round(self.write_seconds, 3),
+			"last_error": self.last_error,
+		}
+
+
+# ---------- 读取 ----------
+
+class SegmentReader:
+	"""
+	以 mmap 只读方式打开段文件，按索引定位并解压块
+
+	Args:
+		path: 段文件路径；同名 .idx.json 索引不存在或损坏时扫描块头重建（最后一个不完整的块被忽略）
+	"""
+
+	def __init__(self, path: Any):
+		self.path = Path(path)
+		self._file = self.path.open("rb")
+		size = self.path.stat().st_size
+		self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+		if self._mm is None or self._mm[:len(MAGIC)] != MAGIC:
+			self.close()
+			raise ValueError(f"不是行情段文件: {self.path}")
+		self.index = self._load_index()
+		self.streams: Dict[int, Tuple[str, str, str]] = {
+			int(sid): (venue, stream, symbol) for sid, venue, stream, symbol in self.index["streams"]
+		}
+		self.blocks: List[Dict[str, Any]] = self.index["blocks"]
+
+	def _load_index(self) -> Dict[str, Any]:
+		index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+		if index_path.exists():
+			try:
+				index = json.loads(index_path.read_text(encoding="utf-8"))
+				if index.get("version") == 1:
+					return index
+			except ValueError:
+				pass
+		return self._scan()
+
+	def _scan(self) -> Dict[str, Any]:
+		"""扫描块头重建索引（段未正常关闭时）"""
+		mm = self._mm
+		offset, size = len(MAGIC), len(mm)
+		streams: List[list] = []
+		blocks: List[Dict[str, Any]] = []
+		while offset + BLOCK_HEADER.size <= size:
+			magic, code, codec, _, rows, raw_len, comp_len, ts_min, ts_max = BLOCK_HEADER.unpack_from(mm, offset)
+			end = offset + BLOCK_HEADER.size + comp_len
+			if magic != BLOCK_MAGIC or end > size:
+				break
+			if code == KIND_CODES["streams"]:
+				streams.extend(json.loads(bytes(self._payload(offset, codec, raw_len, comp_len))))
+			elif code in KINDS:
+				blocks.append({"kind": KINDS[code], "offset": offset, "rows": rows, "comp_len": comp_len,
+							   "ts_min": ts_min, "ts_max": ts_max, "streams": None})
+			offset = end
+		return {
+			"version": 1, "segment": self.path.name, "streams": streams, "blocks": blocks,
+			"rows": sum(b["rows"] for b in blocks),
+			"start_ns": min((b["ts_min"] for b in blocks), default=None),
+			"end_ns": max((b["ts_max"] for b in blocks), default=None),
+			"rebuilt": True,
+		}
+
+	def _payload(self, offset: int, codec: int, raw_len: int, comp_len: int) -> bytes:
+		# 未压缩的块直接返回 mmap 上的视图，read() 得到的列不发生拷贝
+		start = offset + BLOCK_HEADER.size
+		return _CODECS[_CODEC_NAMES[codec]][2](memoryview(self._mm)[start:start + comp_len], raw_len)
+
+	@property
+	def start_ns(self) -> Optional[int]:
+		return self.index.get("start_ns")
+
+	@property
+	def end_ns(self) -> Optional[int]:
+		return self.index.get("end_ns")
+
+	def select(self, kind: Optional[str] = None, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+			   streams: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+		"""按类型、接收时间范围、流序号筛选块（只看索引，不读块体）"""
+		wanted = set(streams) if streams is not None else None
+		out = []
+		for block in self.blocks:
+			if kind is not None and block["kind"] != kind:
+				continue
+			if start_ns is not None and block["ts_max"] < start_ns:
+				continue
+			if end_ns is not None and block["ts_min"] > end_ns:
+				continue
+			if wanted is not None and block.get("streams") is not None and wanted.isdisjoint(block["streams"]):
+				continue
+			out.append(block)
+		return out
+
+	def seek(self, ts_ns: int, kind: Optional[str] = None) -> int:
+		"""第一个可能包含 >= ts_ns 的块在 select(kind) 结果中的位置"""
+		blocks = self.select(kind)
+		ends = [b["ts_max"] for b in blocks]
+		if ends == sorted(ends):
+			return bisect_right(ends, ts_ns - 1)
+		return next((i for i, b in enumerate(blocks) if b["ts_max"] >= ts_ns), len(blocks))
+
+	def read(self, block: Dict[str, Any]) -> Dict[str, np.ndarray]:
+		"""解压一个块，返回 {列名: 数组}"""
+		offset = block["offset"]
+		magic, code, codec, _, rows, raw_len, comp_len, _, _ = BLOCK_HEADER.unpack_from(self._mm, offset)
+		if magic != BLOCK_MAGIC or KINDS.get(code) != block["kind"]:
+			raise ValueError(f"块头不匹配: {self.path}@{offset}")
+		raw = self._payload(offset, codec, raw_len, comp_len)
+		out: Dict[str, np.ndarray] = {}
+		pos = 0
+		for name, dtype in SCHEMAS[block["kind"]]:
+			dt = np.dtype(dtype)
+			col = np.frombuffer(raw, dtype=dt, count=rows, offset=pos)
+			pos += dt.itemsize * rows
+			if name in DELTA_COLUMNS:
+				col = np.cumsum(col, dtype=dt)
+			out[name] = col
+		return out
+
+	def read_kind(self, kind: str, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+				  streams: Optional[Iterable[int]] = None) -> Dict[str, np.ndarray]:
+		"""读取某类型在时间范围内的全部行（各块拼接），可按流序号过滤"""
+		wanted = None if streams is None else np.asarray(sorted(set(streams)), dtype=np.uint32)
+		parts = []
+		for block in self.select(kind, start_ns, end_ns, None if wanted is None else wanted.tolist()):
+			cols = self.read(block)
+			mask = None
+			if start_ns is not None:
+				mask = cols["recv_ns"] >= start_ns
+			if end_ns is not None:
+				m = cols["recv_ns"] <= end_ns
+				mask = m if mask is None else mask & m
+			if wanted is not None:
+				m = np.isin(cols["stream"], wanted)
+				mask = m if mask is None else mask & m
+			parts.append(cols if mask is None else {name: col[mask] for name, col in cols.items()})
+		schema = SCHEMAS[kind]
+		if not parts:
+			return {name: np.empty(0, dtype=dtype) for name, dtype in schema}
+		return {name: np.concatenate([p[name] for p in parts]) for name, _ in schema}
+
+	def stream_ids(self, venue: Optional[str] = None, symbol: Optional[str] = None,
+				   stream: Optional[str] = None) -> List[int]:
+		"""按交易所/交易对/流名称查流序号"""
+		return [sid for sid, (v, s, sym) in self.streams.items()
+				if (venue is None or v == venue) and (symbol is None or sym == symbol) and (stream is None or s == stream)]
+
+	def close(self) -> None:
+		if getattr(self, "_mm", None) is not None:
+			try:
+				self._mm.close()
+			except BufferError:
+				# 仍有 read() 返回的数组引用 mmap 时无法关闭，交给垃圾回收
+				pass
+			self._mm = None
+		self._file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
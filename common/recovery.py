@@ -0,0 +1,320 @@
+"""
+对冲状态快照与重启对账
+
+StateSnapshot 记录当前对冲轮次的阶段（每次交易所回执之后原子写入，不在检测成交到对冲下单之间写盘）：
+
+	idle         没有进行中的轮次
+	leg1_open    第一腿 BP 做空挂单中（bp_order_id）
+	leg1_hedged  第一腿已成交并在 Aster 做多对冲，等待第二腿
+	leg2_open    第二腿 BP 做多挂单中
+	done         本轮结束（第二腿对冲完成或已平仓）
+
+Reconciler 在启动时并发读取两个交易所的挂单和持仓（一次往返），与快照对比后：
+撤掉残留挂单；BP 与 Aster 净敞口不为零时在 Aster 市价补对冲；BP 仍持有第一腿空单时从第二腿继续（start_leg=2）。
+
+	snapshot = StateSnapshot("logs/hedge_state.json")
+	result = Reconciler(bp_orders, bp_account, aster_trade, aster_account, bp_symbol, aster_symbol, snapshot).run()
+	execute_hedge_cycle(..., start_leg=result["start_leg"])
+
+Aster 一侧用现货对冲时（scripts/hedge_bp_aster_loop.py）没有持仓，SpotReconciler 以基础资产余额相对
+基准余额（快照中的 aster_base_baseline）的变化作为 Aster 持仓。
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .log import get_logger
+
+logger = get_logger("recovery")
+
+PHASES = ("idle", "leg1_open", "leg1_hedged", "leg2_open", "done")
+
+
+class StateSnapshot:
+	"""
+	对冲状态快照（JSON 文件，写临时文件后 os.replace，进程崩溃时不会留下半个文件）
+
+	Args:
+		path: 快照文件路径
+		fsync: 写入后是否 fsync（断电也不丢失；只影响写快照本身的耗时）
+		keep: 切换到新轮次时保留的字段（如 SpotReconciler 的 aster_base_baseline）
+	"""
+
+	def __init__(self, path: Any = "logs/hedge_state.json", fsync: bool = True, keep: Iterable[str] = ()):
+		self.path = Path(path)
+		self.fsync = fsync
+		self.keep = tuple(keep)
+		self.state: Dict[str, Any] = self.load()
+		self.writes = 0
+		self.write_seconds = 0.0
+
+	def load(self) -> Dict[str, Any]:
+		try:
+			with self.path.open("r", encoding="utf-8") as f:
+				state = json.load(f)
+			return state if isinstance(state, dict) else {}
+		except (OSError, ValueError):
+			return {}
+
+	def save(self, **fields: Any) -> Dict[str, Any]:
+		"""合并字段并写盘；phase 切换到新轮次（cycle 变化）时丢弃上一轮的字段"""
+		if fields.get("cycle") is not None and fields["cycle"] != self.state.get("cycle"):
+			self.state = {k: self.state[k] for k in self.keep if k in self.state}
+		if "phase" in fields and fields["phase"] not in PHASES:
+			raise ValueError(f"未知阶段: {fields['phase']}")
+		self.state.update(fields)
+		self.state["updated_ms"] = int(time.time() * 1000)
+		t0 = time.perf_counter()
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+		with tmp.open("w", encoding="utf-8") as f:
+			json.dump(self.state, f, ensure_ascii=False, default=str)
+			if self.fsync:
+				f.flush()
+				os.fsync(f.fileno())
+		os.replace(tmp, self.path)
+		self.writes += 1
+		self.write_seconds += time.perf_counter() - t0
+		return self.state
+
+	@property
+	def phase(self) -> str:
+		return str(self.state.get("phase") or "idle")
+
+
+def _signed_position(rows: Any, symbol: str, *fields: str) -> Decimal:
+	if not isinstance(rows, list):
+		return Decimal("0")
+	total = Decimal("0")
+	for row in rows:
+		if isinstance(row, dict) and row.get("symbol") == symbol:
+			for name in fields:
+				if row.get(name) not in (None, ""):
+					total += Decimal(str(row[name]))
+					break
+	return total
+
+
+def _order_ids(rows: Any, *fields: str) -> List[str]:
+	ids = []
+	for row in rows if isinstance(rows, list) else []:
+		for name in fields:
+			if isinstance(row, dict) and row.get(name) not in (None, ""):
+				ids.append(str(row[name]))
+				break
+	return ids
+
+
+class Reconciler:
+	"""
+	重启对账
+
+	策略约定：第一腿 BP 做空 + Aster 做多，第二腿 BP 做多 + Aster 做空，一轮结束后两边都回到零。
+
+	Args:
+		bp_orders / bp_account: bp_dao OrderDAO / AccountDAO
+		aster_trade / aster_account: aster_futures_dao TradeDAO / AccountDAO
+		bp_symbol / aster_symbol: 交易对
+		snapshot: 上次运行的状态快照（可选，用于核对和报告）
+		tolerance: 视为零的持仓数量
+		quantity_step: Aster 下单数量步长，补对冲数量向下取整到该步长
+		recv_window: Aster 接收窗口
+		log: 日志输出函数，默认写入 recovery 组件日志
+	"""
+
+	def __init__(self, bp_orders: Any, bp_account: Any, aster_trade: Any, aster_account: Any, bp_symbol: str,
+				 aster_symbol: str, snapshot: Optional[StateSnapshot] = None, tolerance: Decimal = Decimal("0"),
+				 quantity_step: Optional[Decimal] = None, recv_window: int = 5000,
+				 log: Optional[Callable[[str], None]] = None):
+		self.bp_orders = bp_orders
+		self.bp_account = bp_account
+		self.aster_trade = aster_trade
+		self.aster_account = aster_account
+		self.bp_symbol = bp_symbol
+		self.aster_symbol = aster_symbol
+		self.snapshot = snapshot
+		self.tolerance = Decimal(str(tolerance))
+		self.quantity_step = Decimal(str(quantity_step)) if quantity_step else None
+		self.recv_window = recv_window
+		self.log = log or logger.info
+
+	def _parallel(self, calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+		"""并发执行（每个调用一个线程），返回 名称 -> 结果或异常"""
+		out: Dict[str, Any] = {}
+		with ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix="reconcile") as pool:
+			futures = {name: pool.submit(fn) for name, fn in calls.items()}
+			for name, fut in futures.items():
+				try:
+					out[name] = fut.result()
+				except Exception as e:
+					out[name] = e
+		return out
+
+	def _read_aster_position(self) -> Any:
+		return self.aster_account.get_position_risk(self.aster_symbol, self.recv_window)
+
+	def _aster_position(self, raw: Any) -> Decimal:
+		return _signed_position(raw, self.aster_symbol, "positionAmt")
+
+	def load_state(self) -> Dict[str, Any]:
+		"""并发读取两个交易所的挂单与持仓"""
+		t0 = time.perf_counter()
+		raw = self._parallel({
+			"bp_open_orders": lambda: self.bp_orders.get_open_orders(symbol=self.bp_symbol),
+			"bp_positions": lambda: self.bp_account.positions(self.bp_symbol),
+			"aster_open_orders": lambda: self.aster_trade.get_open_orders(self.aster_symbol, self.recv_window),
+			"aster_positions": self._read_aster_position,
+		})
+		errors = {k: repr(v) for k, v in raw.items() if isinstance(v, Exception)}
+		if errors:
+			raise RuntimeError(f"读取交易所状态失败: {errors}")
+		return {
+			"bp_open_orders": _order_ids(raw["bp_open_orders"], "id", "orderId"),
+			"aster_open_orders": _order_ids(raw["aster_open_orders"], "orderId"),
+			"bp_position": _signed_position(raw["bp_positions"], self.bp_symbol, "netQuantity", "size"),
+			"aster_position": self._aster_position(raw["aster_positions"]),
+			"elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+		}
+
+	def plan(self, view: Dict[str, Any]) -> Dict[str, Any]:
+		"""根据交易所状态与快照决定动作（不访问交易所）"""
+		snap = self.snapshot.state if self.snapshot is not None else {}
+		bp, aster = view["bp_position"], view["aster_position"]
+		net = bp + aster
+		hedge = None
+		if abs(net) > self.tolerance:
+			qty = abs(net)
+			if self.quantity_step:
+				qty = (qty / self.quantity_step).to_integral_value(rounding="ROUND_DOWN") * self.quantity_step
+			if qty > 0:
+				hedge = {"side": "SELL" if net > 0 else "BUY", "quantity": qty}
+		# BP 持有空单（第一腿已成交）时从第二腿继续，数量为实际空单数量；其余情况从第一腿开始
+		start_leg = 2 if bp < -self.tolerance else 1
+		notes = []
+		phase = str(snap.get("phase") or "idle")
+		expected_short = phase in ("leg1_open", "leg1_hedged", "leg2_open")
+		if start_leg == 2 and not expected_short:
+			notes.append(f"快照阶段为 {phase}，但 BP 仍有空单 {bp}")
+		if bp > self.tolerance:
+			notes.append(f"BP 持有多单 {bp}（非本策略正常状态），第一腿做空将其平掉")
+		if snap.get("quantity") and start_leg == 2 and abs(bp) != Decimal(str(snap["quantity"])):
+			notes.append(f"BP 空单 {abs(bp)} 与快照数量 {snap['quantity']} 不一致，按实际数量继续")
+		return {
+			"snapshot_phase": phase,
+			"snapshot_cycle": snap.get("cycle"),
+			"cancel_bp": view["bp_open_orders"],
+			"cancel_aster": view["aster_open_orders"],
+			"hedge": hedge,
+			"start_leg": start_leg,
+			"resume_quantity": abs(bp) if start_leg == 2 else None,
+			"notes": notes,
+		}
+
+	def run(self, dry_run: bool = False) -> Dict[str, Any]:
+		"""
+		读取状态 -> 撤残留挂单 -> 补对冲 -> 返回从哪一腿开始
+
+		有残留挂单时撤单后重新读取持仓（挂单可能在撤单前成交），再计算补对冲数量。
+		"""
+		t0 = time.perf_counter()
+		view = self.load_state()
+		actions = self.plan(view)
+		round_trips = 1
+		if not dry_run and (actions["cancel_bp"] or actions["cancel_aster"]):
+			calls: Dict[str, Callable[[], Any]] = {}
+			if actions["cancel_bp"]:
+				calls["bp"] = lambda: self.bp_orders.cancel_all_orders(symbol=self.bp_symbol)
+			if actions["cancel_aster"]:
+				calls["aster"] = lambda: self.aster_trade.cancel_all_orders(self.aster_symbol, self.recv_window)
+			cancelled = self._parallel(calls)
+			for name, res in cancelled.items():
+				if isinstance(res, Exception):
+					self.log(f"[Recovery] 撤销 {name} 挂单失败: {res}")
+			view = self.load_state()
+			round_trips += 2
+			actions = {**self.plan(view), "cancel_bp": actions["cancel_bp"], "cancel_aster": actions["cancel_aster"]}
+		hedge_resp = None
+		if actions["hedge"] is not None and not dry_run:
+			h = actions["hedge"]
+			self.log(f"[Recovery] 净敞口 {view['bp_position'] + view['aster_position']}，Aster 市价{h['side']} {h['quantity']} 补对冲")
+			hedge_resp = self.aster_trade.place_order(symbol=self.aster_symbol, side=h["side"], order_type="MARKET",
+													  quantity=float(h["quantity"]), recv_window=self.recv_window)
+			round_trips += 1
+		for note in actions["notes"]:
+			self.log(f"[Recovery] {note}")
+		if self.snapshot is not None and not dry_run:
+			self.snapshot.save(phase="leg1_hedged" if actions["start_leg"] == 2 else "idle", recovered_ms=int(time.time() * 1000))
+		return {
+			**actions,
+			"bp_position": view["bp_position"],
+			"aster_position": view["aster_position"],
+			"hedge_response": hedge_resp,
+			"round_trips": round_trips,
+			"elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+			"dry_run": dry_run,
+		}
+
+
+class SpotReconciler(Reconciler):
+	"""
+	Aster 一侧为现货时的重启对账：以基础资产余额相对基准余额的变化作为 Aster 持仓
+
+	基准余额（不含对冲仓位的余额）保存在快照的 aster_base_baseline 中，快照需以 keep=("aster_base_baseline",)
+	创建，使其跨轮次保留。没有基准时（首次运行）假设当前已对冲完整，以 余额 + BP 持仓 作为基准，不补对冲。
+
+	Args:
+		base_asset: 基础资产，默认为 aster_symbol 去掉 quote_asset
+		quote_asset: 计价资产
+		其余参数同 Reconciler（aster_account 需提供 get_balance(recv_window)）
+	"""
+
+	def __init__(self, *args: Any, base_asset: Optional[str] = None, quote_asset: str = "USDT", **kwargs: Any):
+		super().__init__(*args, **kwargs)
+		self.base_asset = base_asset or self.aster_symbol.replace(quote_asset, "")
+		self.balance: Optional[Decimal] = None
+
+	def _read_aster_position(self) -> Any:
+		return self.aster_account.get_balance(self.recv_window)
+
+	def _aster_position(self, raw: Any) -> Decimal:
+		balance = Decimal("0")
+		for row in raw if isinstance(raw, list) else []:
+			if isinstance(row, dict) and row.get("asset") == self.base_asset:
+				if row.get("walletBalance") not in (None, ""):
+					balance = Decimal(str(row["walletBalance"]))
+				else:
+					balance = Decimal(str(row.get("free") or 0)) + Decimal(str(row.get("locked") or 0))
+				break
+		self.balance = balance
+		return balance - self.baseline
+
+	@property
+	def baseline(self) -> Decimal:
+		snap = self.snapshot.state if self.snapshot is not None else {}
+		if snap.get("aster_base_baseline") not in (None, ""):
+			return Decimal(str(snap["aster_base_baseline"]))
+		return self.balance if self.balance is not None else Decimal("0")
+
+	def load_state(self) -> Dict[str, Any]:
+		view = super().load_state()
+		snap = self.snapshot.state if self.snapshot is not None else {}
+		if snap.get("aster_base_baseline") in (None, ""):
+			# 没有基准：视为已完整对冲，Aster 持仓取 BP 持仓的相反数
+			view["aster_position"] = -view["bp_position"]
+		return view
+
+	def run(self, dry_run: bool = False) -> Dict[str, Any]:
+		result = super().run(dry_run)
+		# 对账后两边已对齐：Aster 对冲仓位 = -BP 持仓，基准 = 余额（含补对冲成交）- 对冲仓位
+		balance = self.balance if self.balance is not None else Decimal("0")
+		if result["hedge"] is not None and not dry_run:
+			qty = result["hedge"]["quantity"]
+			balance += qty if result["hedge"]["side"] == "BUY" else -qty
+		baseline = balance + result["bp_position"]
+		if self.snapshot is not None and not dry_run:
+			self.snapshot.save(aster_base_baseline=str(baseline))
+		return {**result, "aster_base_baseline": baseline}
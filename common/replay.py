@@ -0,0 +1,363 @@
+"""
+行情回放：以 mmap 打开 common.recorder 录制的段文件，按本地接收时间把两个交易所的各个流
+k 路堆归并成一条事件序列，并还原为与实时推送相同的格式
+
+三种使用方式（与实时行情的接口一致，策略代码不用改）:
+	- ReplayEngine.events(): 迭代 (recv_ns, venue, stream, data)
+	- ReplayEngine.run(handlers): 按流名称回调，与 AsterFuturesWS.subscribe(stream, handler) 的处理器相同
+	- ReplayManager: WSConnectionManager 的回放版本，subscribe() 返回同样的 Subscription 队列
+
+data 为交易所推送格式的 dict（价格数量为字符串，Aster 事件时间为毫秒、Backpack 为微秒）；
+typed=True 时 bookTicker/trade/depth 为 common.ws_decode 的事件对象。全市场数组流（@arr）每行还原为
+只含一个交易对的列表。speed 为回放倍速：1 为实时，3600 为一小时一秒，0 为不等待（尽快回放）。
+"""
+import asyncio
+import heapq
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from common.recorder import SCHEMAS, SIDE_ASK, SIDE_BID, SegmentReader, segment_paths
+from common.ws_decode import StreamDecoder
+from common.ws_manager import WSConnectionManager, WSProtocol
+
+ReplayEvent = Tuple[int, str, str, Any]
+
+
+def _num(value: float) -> str:
+	return repr(value)
+
+
+def _event_time(venue: str, event_us: int) -> int:
+	# 还原交易所原始单位：Backpack 微秒，Aster 毫秒
+	return event_us if venue == "bp" else event_us // 1000
+
+
+def _book_ticker(venue: str, stream: str, symbol: str, c: Dict[str, list], i: int, end: int) -> Dict[str, Any]:
+	e = _event_time(venue, c["event_us"][i])
+	return {
+		"e": "bookTicker", "u": c["update_id"][i], "E": e, "T": e, "s": symbol,
+		"b": _num(c["bid_price"][i]), "B": _num(c["bid_qty"][i]), "a": _num(c["ask_price"][i]), "A": _num(c["ask_qty"][i]),
+	}
+
+
+def _trade(venue: str, stream: str, symbol: str, c: Dict[str, list], i: int, end: int) -> Dict[str, Any]:
+	e = _event_time(venue, c["event_us"][i])
+	out = {"e": "trade", "E": e, "T": e, "s": symbol, "p": _num(c["price"][i]), "q": _num(c["qty"][i]),
+		   "m": bool(c["buyer_maker"][i])}
+	if "@aggTrade" in stream:
+		out["e"] = "aggTrade"
+		out["a"] = c["trade_id"][i]
+	else:
+		out["t"] = c["trade_id"][i]
+	return out
+
+
+def _depth(venue: str, stream: str, symbol: str, c: Dict[str, list], i: int, end: int) -> Dict[str, Any]:
+	e = _event_time(venue, c["event_us"][i])
+	bids, asks = [], []
+	side, price, qty = c["side"], c["price"], c["qty"]
+	for j in range(i, end):
+		if side[j] == SIDE_BID:
+			bids.append([_num(price[j]), _num(qty[j])])
+		elif side[j] == SIDE_ASK:
+			asks.append([_num(price[j]), _num(qty[j])])
+	out = {"e": "depth" if venue == "bp" else "depthUpdate", "E": e, "T": e, "s": symbol,
+		   "U": c["first_update_id"][i], "u": c["final_update_id"][i], "b": bids, "a": asks}
+	if c["prev_final_update_id"][i] >= 0:
+		out["pu"] = c["prev_final_update_id"][i]
+	return out
+
+
+def _mark_price(venue: str, stream: str, symbol: str, c: Dict[str, list], i: int, end: int) -> Any:
+	e = _event_time(venue, c["event_us"][i])
+	if venue == "bp":
+		out = {"e": "markPrice", "E": e, "s": symbol, "p": _num(c["mark_price"][i]), "f": _num(c["funding_rate"][i]),
+			   "i": _num(c["index_price"][i]), "n": c["next_funding_ms"][i], "T": e}
+	else:
+		out = {"e": "markPriceUpdate", "E": e, "s": symbol, "p": _num(c["mark_price"][i]), "i": _num(c["index_price"][i]),
+			   "P": _num(c["mark_price"][i]), "r": _num(c["funding_rate"][i]), "T": c["next_funding_ms"][i]}
+	return [out] if "@arr" in stream else out
+
+
+_BUILDERS: Dict[str, Callable[[str, str, str, Dict[str, list], int, int], Any]] = {
+	"bookTicker": _book_ticker,
+	"trade": _trade,
+	"depth": _depth,
+	"markPrice": _mark_price,
+}
+
+
+class _Block:
+	"""一个已解压并转为 Python 列表的块（热循环中按下标取值比 NumPy 标量快）"""
+
+	__slots__ = ("kind", "streams", "columns")
+
+	def __init__(self, kind: str, streams: Dict[int, Tuple[str, str, str]], columns: Dict[str, list]):
+		self.kind = kind
+		self.streams = streams
+		self.columns = columns
+
+
+class ReplayEngine:
+	"""
+	多段、多流的时间序回放
+
+	Args:
+		paths: 段文件路径或目录（目录下全部 *.seg）
+		start_ns / end_ns: 接收时间范围（time.time_ns 纳秒），None 表示不限
+		venues: 只回放这些交易所（aster / bp）
+		streams: 只回放这些流名称
+		symbols: 只回放这些交易对
+		kinds: 只回放这些类型（bookTicker / trade / depth / markPrice）
+		typed: bookTicker/trade/depth 解码为事件对象
+		speed: 回放倍速，0 表示不等待
+	"""
+
+	def __init__(self, paths: Union[str, Path, Sequence[Union[str, Path]]], start_ns: Optional[int] = None,
+				 end_ns: Optional[int] = None, venues: Optional[Iterable[str]] = None,
+				 streams: Optional[Iterable[str]] = None, symbols: Optional[Iterable[str]] = None,
+				 kinds: Optional[Iterable[str]] = None, typed: bool = False, speed: float = 0.0):
+		if isinstance(paths, (str, Path)):
+			paths = segment_paths(paths) if Path(paths).is_dir() else [Path(paths)]
+		self.paths = [Path(p) for p in paths]
+		self.start_ns = start_ns
+		self.end_ns = end_ns
+		self.venues = set(venues) if venues else None
+		self.streams = set(streams) if streams else None
+		self.symbols = set(symbols) if symbols else None
+		self.kinds = [k for k in SCHEMAS if not kinds or k in set(kinds)]
+		self.decoder = StreamDecoder() if typed else None
+		self.speed = speed
+		self.readers: List[SegmentReader] = []
+
+		# 统计
+		self.replayed = 0
+		self.counts: Dict[str, int] = {}
+		self.elapsed = 0.0
+		self.first_ns: Optional[int] = None
+		self.last_ns: Optional[int] = None
+
+	def _wanted(self, reader: SegmentReader) -> Optional[List[int]]:
+		if self.venues is None and self.streams is None and self.symbols is None:
+			return None
+		return [sid for sid, (venue, stream, symbol) in reader.streams.items()
+				if (self.venues is None or venue in self.venues) and (self.streams is None or stream in self.streams)
+				and (self.symbols is None or symbol in self.symbols)]
+
+	def _source(self, reader: SegmentReader, kind: str, wanted: Optional[List[int]], order: int) -> Iterator[tuple]:
+		"""一个段中一种类型的事件，按接收时间有序产出 (recv_ns, order, 起始行, 结束行, 块)"""
+		wanted_arr = None if wanted is None else np.asarray(wanted, dtype=np.uint32)
+		for block in reader.select(kind, self.start_ns, self.end_ns, wanted):
+			cols = reader.read(block)
+			recv = cols["recv_ns"]
+			mask = np.ones(len(recv), dtype=bool)
+			if self.start_ns is not None:
+				mask &= recv >= self.start_ns
+			if self.end_ns is not None:
+				mask &= recv <= self.end_ns
+			if wanted_arr is not None:
+				mask &= np.isin(cols["stream"], wanted_arr)
+			idx = np.flatnonzero(mask)
+			if not len(idx):
+				continue
+			if np.any(np.diff(recv[idx]) < 0):
+				# 系统时钟回拨时块内接收时间可能乱序
+				idx = idx[np.argsort(recv[idx], kind="stable")]
+			data = _Block(kind, reader.streams, {name: cols[name][idx].tolist() for name, _ in SCHEMAS[kind]})
+			times = data.columns["recv_ns"]
+			n = len(times)
+			if kind == "depth":
+				# 同一条推送的各价位行：接收时间、流、更新 id 都相同
+				sid, final = data.columns["stream"], data.columns["final_update_id"]
+				start = 0
+				for j in range(1, n + 1):
+					if j == n or times[j] != times[start] or sid[j] != sid[start] or final[j] != final[start]:
+						yield times[start], order, start, j, data
+						start = j
+			else:
+				for j in range(n):
+					yield times[j], order, j, j + 1, data
+
+	def open(self) -> None:
+		if not self.readers:
+			self.readers = [SegmentReader(p) for p in self.paths]
+
+	def close(self) -> None:
+		for reader in self.readers:
+			reader.close()
+		self.readers = []
+
+	def __enter__(self):
+		self.open()
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def _merged(self) -> Iterator[tuple]:
+		self.open()
+		sources = []
+		for reader in self.readers:
+			if self.end_ns is not None and reader.start_ns is not None and reader.start_ns > self.end_ns:
+				continue
+			if self.start_ns is not None and reader.end_ns is not None and reader.end_ns < self.start_ns:
+				continue
+			wanted = self._wanted(reader)
+			if wanted is not None and not wanted:
+				continue
+			for kind in self.kinds:
+				sources.append(self._source(reader, kind, wanted, len(sources)))
+		# 各来源内部已按时间有序，k 路堆归并；order 保证同一时间戳下不比较块对象
+		return heapq.merge(*sources)
+
+	def events(self) -> Iterator[ReplayEvent]:
+		"""按接收时间产出 (recv_ns, venue, stream, data)；speed > 0 时按倍速等待"""
+		decoder = self.decoder
+		pacer = _Pacer(self.speed)
+		t0 = time.perf_counter()
+		try:
+			for recv_ns, _, start, end, block in self._merged():
+				delay = pacer.delay(recv_ns)
+				if delay > 0:
+					time.sleep(delay)
+				c = block.columns
+				venue, stream, symbol = block.streams[c["stream"][start]]
+				data = _BUILDERS[block.kind](venue, stream, symbol, c, start, end)
+				if decoder is not None:
+					data = decoder.decode(stream, data)
+				self._count(recv_ns, stream)
+				yield recv_ns, venue, stream, data
+		finally:
+			self.elapsed += time.perf_counter() - t0
+
+	def _count(self, recv_ns: int, stream: str) -> None:
+		self.replayed += 1
+		self.counts[stream] = self.counts.get(stream, 0) + 1
+		if self.first_ns is None:
+			self.first_ns = recv_ns
+		self.last_ns = recv_ns
+
+	def run(self, handlers: Dict[str, Callable[[Any], None]], default: Optional[Callable[[str, Any], None]] = None) -> int:
+		"""
+		按流名称回调（处理器签名与 AsterFuturesWS.subscribe 相同），没有处理器的流交给 default(stream, data)
+
+		返回回放的事件数
+		"""
+		n = 0
+		for _, _, stream, data in self.events():
+			handler = handlers.get(stream)
+			if handler is not None:
+				handler(data)
+			elif default is not None:
+				default(stream, data)
+			n += 1
+		return n
+
+	def metrics(self) -> Dict[str, Any]:
+		span = (self.last_ns - self.first_ns) / 1e9 if self.first_ns is not None and self.last_ns is not None else 0.0
+		return {
+			"events": self.replayed,
+			"elapsed_s": round(self.elapsed, 3),
+			"events_per_sec": round(self.replayed / self.elapsed, 1) if self.elapsed else 0.0,
+			"data_span_s": round(span, 3),
+			"speedup": round(span / self.elapsed, 1) if self.elapsed else 0.0,
+			"streams": dict(self.counts),
+		}
+
+
+class _Pacer:
+	"""按倍速把录制时间映射到墙上时间"""
+
+	def __init__(self, speed: float):
+		self.speed = speed
+		self._origin_ns: Optional[int] = None
+		self._t0 = 0.0
+
+	def delay(self, ts_ns: int) -> float:
+		if self.speed <= 0:
+			return 0.0
+		if self._origin_ns is None:
+			self._origin_ns, self._t0 = ts_ns, time.perf_counter()
+			return 0.0
+		return (ts_ns - self._origin_ns) / 1e9 / self.speed - (time.perf_counter() - self._t0)
+
+
+class ReplayManager(WSConnectionManager):
+	"""
+	WSConnectionManager 的回放版本：subscribe() / subscribe_table() / metrics() 与实时连接相同，
+	start() 后按倍速把录制的事件分发给订阅者，回放结束时关闭全部订阅（async for 随之结束）
+
+	示例:
+		mgr = ReplayManager(ReplayEngine("data/market", speed=60))
+		q = await mgr.subscribe("asterusdt@bookTicker", "bookTicker.ASTER_USDC_PERP", typed=True)
+		await mgr.start()
+		async for stream, event in q:
+			...
+
+	Args:
+		engine: 回放引擎（其 speed 决定倍速；typed 由各订阅自行指定，引擎的 typed 不起作用）
+		yield_every: 不等待（speed=0）时每分发多少条让出一次事件循环
+	"""
+
+	def __init__(self, engine: ReplayEngine, yield_every: int = 256, debug: bool = False):
+		super().__init__("replay://", WSProtocol(), debug=debug, name="ReplayManager")
+		self.engine = engine
+		self.yield_every = yield_every
+		self.finished = asyncio.Event()
+
+	async def _send(self, build: Callable[[List[str], int], Dict[str, Any]], streams: List[str],
+					wait: bool = True, ws: Any = None) -> Optional[Dict[str, Any]]:
+		return None
+
+	async def rotate(self, overlap: Optional[float] = None) -> None:
+		return None
+
+	async def _run(self) -> None:
+		engine = self.engine
+		pacer = _Pacer(engine.speed)
+		self._connected.set()
+		try:
+			n = 0
+			t0 = time.perf_counter()
+			try:
+				for recv_ns, _, start, end, block in engine._merged():
+					delay = pacer.delay(recv_ns)
+					if delay > 0:
+						await asyncio.sleep(delay)
+					else:
+						n += 1
+						if n % self.yield_every == 0:
+							await asyncio.sleep(0)
+					c = block.columns
+					venue, stream, symbol = block.streams[c["stream"][start]]
+					engine._count(recv_ns, stream)
+					self.messages += 1
+					self.last_message_at = time.monotonic()
+					subs = self._subscribers.get(stream)
+					if not subs:
+						self.skipped += 1
+						continue
+					self._dispatch(stream, _BUILDERS[block.kind](venue, stream, symbol, c, start, end), subs)
+			finally:
+				engine.elapsed += time.perf_counter() - t0
+		finally:
+			self._connected.clear()
+			for subs in self._subscribers.values():
+				for sub in subs:
+					sub.closed = True
+			self.finished.set()
+
+	async def wait_finished(self, timeout: Optional[float] = None) -> None:
+		await asyncio.wait_for(self.finished.wait(), timeout)
+
+	async def close(self) -> None:
+		await super().close()
+		self.engine.close()
+
+	def metrics(self) -> Dict[str, Any]:
+		out = super().metrics()
+		out["replay"] = self.engine.metrics()
+		return out
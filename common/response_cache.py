@@ -0,0 +1,254 @@
+"""
+慢变接口的响应缓存（TTL + LRU）
+
+exchangeInfo、fundingInfo、杠杆分层、手续费率、BP 市场列表、持仓模式这类接口很少变化，却会被随时重新拉取。
+ResponseCache 包在传输层外面，按声明的规则（CacheRule）缓存 GET 响应：
+
+- 每条规则有自己的 TTL 和条目上限（超过时按 LRU 淘汰）
+- 失效钩子：规则声明 invalidated_by（如 "POST /fapi/v1/leverage"），同一账户的这些请求成功（或超时、无法确认是否生效）后清掉对应缓存；
+  也可以直接调用 invalidate(path)
+- 签名接口按账户（common.transport.request_account）分开缓存
+- 只缓存 2xx 响应；可选持久化到 JSON 文件（重启后未过期的条目继续使用，过期时间按墙钟保存）
+- metrics() 给出每条规则的命中、未命中、淘汰、失效次数
+
+	cache = ResponseCache(HttpTransport(), DEFAULT_RULES, path="logs/response_cache.json")
+	market = MarketDataDAO(AsterFuturesClient(key, secret, transport=cache))
+	market.exchange_info()   # 5 分钟内再次调用不访问交易所
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from common.log import get_logger
+from common.transport import HttpTransport, Transport, _build_response, request_account, request_key
+
+log = get_logger("response_cache")
+
+
+class CacheRule:
+	"""
+	一个接口的缓存规则
+
+	Args:
+		path: 接口路径（以 "/" 结尾时按前缀匹配）
+		ttl: 缓存时长（秒）
+		max_entries: 条目上限（不同参数、不同账户各占一条），超过时淘汰最久未使用的
+		invalidated_by: 使缓存失效的请求 ["POST /fapi/v1/leverage", ...]（同一账户；省略方法时为 POST）
+	"""
+
+	__slots__ = ("path", "ttl", "max_entries", "invalidated_by")
+
+	def __init__(self, path: str, ttl: float, max_entries: int = 64, invalidated_by: Iterable[str] = ()):
+		self.path = path
+		self.ttl = float(ttl)
+		self.max_entries = int(max_entries)
+		self.invalidated_by: Tuple[str, ...] = tuple(" ".join(_split_endpoint(e)) for e in invalidated_by)
+
+	def matches(self, path: str) -> bool:
+		return path == self.path or (self.path.endswith("/") and path.startswith(self.path))
+
+	def __repr__(self) -> str:
+		return f"CacheRule({self.path!r}, ttl={self.ttl}, max_entries={self.max_entries})"
+
+
+def _split_endpoint(name: str) -> Tuple[str, str]:
+	method, _, path = name.strip().rpartition(" ")
+	return (method or "POST").upper(), path
+
+
+# 默认规则：Aster 合约、Aster 现货、BP
+DEFAULT_RULES: Sequence[CacheRule] = (
+	CacheRule("/fapi/v1/exchangeInfo", ttl=300, max_entries=4),
+	CacheRule("/fapi/v1/fundingInfo", ttl=300, max_entries=4),
+	CacheRule("/fapi/v1/leverageBracket", ttl=3600, invalidated_by=["POST /fapi/v1/leverage"]),
+	CacheRule("/fapi/v1/commissionRate", ttl=3600),
+	CacheRule("/fapi/v1/positionSide/dual", ttl=3600, max_entries=16, invalidated_by=["POST /fapi/v1/positionSide/dual"]),
+	CacheRule("/api/v1/exchangeInfo", ttl=300, max_entries=4),
+	CacheRule("/api/v1/markets", ttl=300, max_entries=16),
+)
+
+
+class ResponseCache(Transport):
+	"""
+	按规则缓存响应的传输层
+
+	Args:
+		inner: 实际发送请求的传输层
+		rules: 缓存规则，按顺序第一个匹配的生效；没有匹配规则的请求直接透传
+		path: 持久化文件（JSON），None 表示只缓存在内存中
+	"""
+
+	def __init__(self, inner: Optional[Transport] = None, rules: Sequence[CacheRule] = DEFAULT_RULES,
+				 path: Optional[str] = None):
+		self.inner = inner or HttpTransport()
+		self.session = self.inner.session
+		self.rules: List[CacheRule] = list(rules)
+		self.path = Path(path) if path else None
+		self._lock = threading.Lock()
+		self._save_lock = threading.Lock()
+		# 规则路径 -> OrderedDict(key -> (过期时间（墙钟）, 账户, 录制格式的响应))，按最近使用排序
+		self._entries: Dict[str, "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]"] = {r.path: OrderedDict() for r in self.rules}
+		self._rule_cache: Dict[str, Optional[CacheRule]] = {}
+		self._stats: Dict[str, Dict[str, int]] = {
+			r.path: {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0} for r in self.rules}
+		if self.path is not None:
+			self._load()
+
+	def rule_for(self, path: str) -> Optional[CacheRule]:
+		if path not in self._rule_cache:
+			self._rule_cache[path] = next((r for r in self.rules if r.matches(path)), None)
+		return self._rule_cache[path]
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		path = urlsplit(url).path
+		if method.upper() != "GET":
+			# 请求超时等情况下无法确认是否已生效，同样清除
+			try:
+				resp = self.inner.request(method, url, **kwargs)
+			except requests.RequestException:
+				self._on_write(f"{method.upper()} {path}", request_account(kwargs))
+				raise
+			if 200 <= resp.status_code < 300:
+				self._on_write(f"{method.upper()} {path}", request_account(kwargs))
+			return resp
+		rule = self.rule_for(path)
+		if rule is None:
+			return self.inner.request(method, url, **kwargs)
+
+		account = request_account(kwargs)
+		key = account + " " + request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"))
+		entries = self._entries[rule.path]
+		stats = self._stats[rule.path]
+		with self._lock:
+			cached = entries.get(key)
+			if cached is not None and cached[0] > time.time():
+				entries.move_to_end(key)
+				stats["hits"] += 1
+				return _build_response(cached[2], url)
+			stats["misses"] += 1
+
+		resp = self.inner.request(method, url, **kwargs)
+		if 200 <= resp.status_code < 300:
+			entry = {"s": resp.status_code, "ct": resp.headers.get("Content-Type", ""),
+					 "date": resp.headers.get("Date", ""), "b": resp.text}
+			with self._lock:
+				entries[key] = (time.time() + rule.ttl, account, entry)
+				entries.move_to_end(key)
+				while len(entries) > rule.max_entries:
+					entries.popitem(last=False)
+					stats["evictions"] += 1
+			self._save()
+		return resp
+
+	def _on_write(self, endpoint: str, account: str) -> None:
+		for rule in self.rules:
+			if endpoint in rule.invalidated_by:
+				log.debug("%s 之后清除 %s 的缓存", endpoint, rule.path)
+				self.invalidate(rule.path, account=account)
+
+	def invalidate(self, path: Optional[str] = None, account: Optional[str] = None) -> int:
+		"""
+		清除缓存，返回清除的条目数
+
+		Args:
+			path: 规则路径，None 表示所有规则
+			account: 只清除该账户（request_account 的返回值）的条目；None 表示所有账户
+		"""
+		removed = 0
+		with self._lock:
+			for rule in self.rules:
+				if path is not None and rule.path != path:
+					continue
+				entries = self._entries[rule.path]
+				keys = [k for k, (_, who, _) in entries.items() if account is None or who == account]
+				for k in keys:
+					del entries[k]
+				if keys:
+					self._stats[rule.path]["invalidations"] += 1
+					removed += len(keys)
+		if removed:
+			self._save()
+		return removed
+
+	def _load(self) -> None:
+		try:
+			data = json.loads(self.path.read_text(encoding="utf-8"))
+		except FileNotFoundError:
+			return
+		except (OSError, ValueError) as e:
+			log.warning("读取响应缓存失败，忽略: %s", e)
+			return
+		now = time.time()
+		loaded = 0
+		for rule_path, items in (data.get("entries") or {}).items():
+			entries = self._entries.get(rule_path)
+			if entries is None:
+				continue
+			for key, expires, account, entry in items:
+				if expires > now:
+					entries[key] = (expires, account, entry)
+					loaded += 1
+		log.debug("从 %s 载入 %d 条缓存", self.path, loaded)
+
+	def _save(self) -> None:
+		"""写入持久化文件（先写临时文件再替换；缓存的都是慢变接口，写入不频繁）"""
+		if self.path is None:
+			return
+		with self._lock:
+			data = {"v": 1, "entries": {p: [[k, exp, who, entry] for k, (exp, who, entry) in entries.items()]
+									   for p, entries in self._entries.items() if entries}}
+		with self._save_lock:
+			try:
+				self.path.parent.mkdir(parents=True, exist_ok=True)
+				tmp = self.path.with_name(self.path.name + ".tmp")
+				tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+				os.replace(tmp, self.path)
+			except OSError as e:
+				log.warning("写入响应缓存失败: %s", e)
+
+	def metrics(self) -> Dict[str, Any]:
+		with self._lock:
+			rules = {p: dict(stats, entries=len(self._entries[p])) for p, stats in self._stats.items()}
+		hits = sum(r["hits"] for r in rules.values())
+		misses = sum(r["misses"] for r in rules.values())
+		return {
+			"hits": hits,
+			"misses": misses,
+			"hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+			"rules": rules,
+		}
+
+	def close(self) -> None:
+		self.inner.close()
+
+
+def build_response_cache(inner: Transport, cfg: Optional[Dict[str, Any]]) -> Transport:
+	"""
+	按配置包装传输层（未启用时原样返回）
+
+	cfg:
+		enabled: 是否启用（false）
+		path: 持久化文件（不配置则只缓存在内存中）
+		rules: 覆盖或新增规则 {"/fapi/v1/exchangeInfo": {"ttl": 600}, "/fapi/v1/leverageBracket":
+		       {"ttl": 3600, "max_entries": 64, "invalidated_by": ["POST /fapi/v1/leverage"]}}；ttl 为 0 时禁用该规则
+	"""
+	if not cfg or not cfg.get("enabled", False):
+		return inner
+	rules = {r.path: r for r in DEFAULT_RULES}
+	for path, spec in (cfg.get("rules") or {}).items():
+		base = rules.get(path)
+		spec = spec or {}
+		rules[path] = CacheRule(
+			path,
+			ttl=spec.get("ttl", base.ttl if base else 60),
+			max_entries=spec.get("max_entries", base.max_entries if base else 64),
+			invalidated_by=spec.get("invalidated_by", base.invalidated_by if base else ()),
+		)
+	return ResponseCache(inner, [r for r in rules.values() if r.ttl > 0], path=cfg.get("path"))
@@ -0,0 +1,202 @@
+"""
+相同读请求合并（single-flight）
+
+多组对冲并发运行时，会在几毫秒内重复发出同样的 ticker、premiumIndex、exchangeInfo、positionRisk 请求。
+CoalescingTransport 包在传输层外面：同一时刻相同的 GET 请求只有第一个（leader）真正发出，
+其余调用方等待它的结果并共用（成功时各自拿到响应的副本，失败时抛同一个异常），节省限速权重。
+
+- 请求键：common.transport.request_key（忽略 timestamp、signature 等易变参数）；签名请求再加上账户（request_account），
+  不同账户的账户查询不会合并，公开行情跨账户合并
+- 可选微缓存（ttl）：成功响应（2xx）在 ttl 秒内直接复用
+- 同一账户发出非 GET 请求（下单、撤单、改杠杆）时清掉该账户的缓存，之后的查询也不会加入下单前发出的在途请求，
+  保证下单之后读到的是新状态
+- 只处理 GET（可用 paths 进一步限定），其它方法直接透传
+
+	transport = CoalescingTransport(HttpTransport(), ttl=0.05)
+	markets = MarketsDAO(BackpackClient(..., transport=transport))
+"""
+import copy
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from common.log import get_logger
+from common.transport import HttpTransport, Transport, request_account, request_key
+
+log = get_logger("singleflight")
+
+class _Flight:
+	"""一个在途请求：leader 完成后唤醒等待者"""
+
+	__slots__ = ("identity", "done", "response", "error", "waiters")
+
+	def __init__(self, identity: str):
+		self.identity = identity
+		self.done = threading.Event()
+		self.response: Optional[requests.Response] = None
+		self.error: Optional[BaseException] = None
+		self.waiters = 0
+
+
+def _wait_limit(timeout: Any) -> Optional[float]:
+	"""等待者最多等多久：与自己单独发请求时的超时相同（连接 + 读取）"""
+	if timeout is None:
+		return None
+	if isinstance(timeout, tuple):
+		return sum(t for t in timeout if t is not None)
+	return float(timeout)
+
+
+class CoalescingTransport(Transport):
+	"""
+	合并并发的相同读请求
+
+	Args:
+		inner: 实际发送请求的传输层
+		ttl: 成功响应的微缓存时长（秒），0 表示只合并在途请求、不缓存
+		paths: 只合并这些路径（以 "/" 结尾时按前缀）；None 表示所有 GET
+		max_entries: 微缓存最多保留的响应数，超过时先清理过期项，仍超过则清空
+	"""
+
+	def __init__(self, inner: Optional[Transport] = None, ttl: float = 0.0, paths: Optional[Iterable[str]] = None,
+				 max_entries: int = 1024):
+		self.inner = inner or HttpTransport()
+		self.session = self.inner.session
+		self.ttl = float(ttl)
+		self.paths: Optional[Tuple[str, ...]] = tuple(paths) if paths is not None else None
+		self.max_entries = int(max_entries)
+		self._lock = threading.Lock()
+		self._inflight: Dict[str, _Flight] = {}
+		# key -> (过期时间, 账户, 响应)
+		self._cache: Dict[str, Tuple[float, str, requests.Response]] = {}
+		self._generation = 0
+		self.requests = 0
+		self.calls = 0
+		self.coalesced = 0
+		self.cache_hits = 0
+		self.invalidations = 0
+
+	def _eligible(self, method: str, url: str) -> bool:
+		if method.upper() != "GET":
+			return False
+		if self.paths is None:
+			return True
+		path = urlsplit(url).path
+		return any(path == p or (p.endswith("/") and path.startswith(p)) for p in self.paths)
+
+	def invalidate(self, identity: Optional[str] = None) -> None:
+		"""
+		清掉微缓存（identity 为 request_account 返回的账户时只清该账户的）
+
+		同时让之后的相同请求不再加入已经在途的请求（它可能在下单之前就发出了），
+		在途请求完成后也不写入缓存。
+		"""
+		with self._lock:
+			self._generation += 1
+			if identity is None:
+				self._cache.clear()
+				self._inflight.clear()
+			else:
+				for key in [k for k, (_, who, _) in self._cache.items() if who == identity]:
+					del self._cache[key]
+				for key in [k for k, f in self._inflight.items() if f.identity == identity]:
+					del self._inflight[key]
+			self.invalidations += 1
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		identity = request_account(kwargs)
+		if not self._eligible(method, url):
+			if method.upper() != "GET":
+				self.invalidate(identity)
+			return self.inner.request(method, url, **kwargs)
+
+		key = identity + " " + request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"))
+		with self._lock:
+			self.requests += 1
+			if self.ttl > 0:
+				cached = self._cache.get(key)
+				if cached is not None and cached[0] > time.monotonic():
+					self.cache_hits += 1
+					return copy.copy(cached[2])
+			flight = self._inflight.get(key)
+			leader = flight is None
+			if leader:
+				flight = self._inflight[key] = _Flight(identity)
+				generation = self._generation
+				self.calls += 1
+			else:
+				flight.waiters += 1
+				self.coalesced += 1
+
+		if not leader:
+			if not flight.done.wait(_wait_limit(kwargs.get("timeout"))):
+				raise requests.ReadTimeout(f"等待合并的请求超时: {method} {urlsplit(url).path}")
+			if flight.error is not None:
+				raise flight.error
+			return copy.copy(flight.response)
+
+		try:
+			resp = self.inner.request(method, url, **kwargs)
+			flight.response = resp
+		except BaseException as e:
+			flight.error = e
+			raise
+		finally:
+			with self._lock:
+				if self._inflight.get(key) is flight:
+					del self._inflight[key]
+				if (self.ttl > 0 and flight.error is None and generation == self._generation
+						and 200 <= flight.response.status_code < 300):
+					self._store(key, identity, flight.response)
+			flight.done.set()
+		if flight.waiters:
+			log.debug("%s %s 合并了 %d 个相同请求", method, urlsplit(url).path, flight.waiters)
+		return resp
+
+	def _store(self, key: str, identity: str, resp: requests.Response) -> None:
+		# 调用方持有锁
+		now = time.monotonic()
+		if len(self._cache) >= self.max_entries:
+			for k in [k for k, (exp, _, _) in self._cache.items() if exp <= now]:
+				del self._cache[k]
+			if len(self._cache) >= self.max_entries:
+				self._cache.clear()
+		self._cache[key] = (now + self.ttl, identity, resp)
+
+	def metrics(self) -> Dict[str, Any]:
+		saved = self.coalesced + self.cache_hits
+		return {
+			"requests": self.requests,
+			"calls": self.calls,
+			"coalesced": self.coalesced,
+			"cache_hits": self.cache_hits,
+			"invalidations": self.invalidations,
+			"saved_ratio": round(saved / self.requests, 4) if self.requests else 0.0,
+		}
+
+	def close(self) -> None:
+		self.inner.close()
+
+
+def build_coalescing(inner: Transport, cfg: Optional[Dict[str, Any]]) -> Transport:
+	"""
+	按配置包装传输层（未启用时原样返回）
+
+	cfg:
+		enabled: 是否启用（false）
+		ttl_ms: 微缓存时长（0，只合并在途请求）
+		paths: 只合并这些路径（默认所有 GET）
+		max_entries: 微缓存上限（1024）
+	"""
+	if not cfg or not cfg.get("enabled", False):
+		return inner
+	paths: Optional[List[str]] = cfg.get("paths")
+	return CoalescingTransport(
+		inner,
+		ttl=float(cfg.get("ttl_ms", 0)) / 1000.0,
+		paths=paths,
+		max_entries=int(cfg.get("max_entries", 1024)),
+	)
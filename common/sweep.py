@@ -0,0 +1,227 @@
+"""
+回测参数扫描（多进程）
+
+行情网格先用 MarketGrid.save 写成 .npy，工作进程在初始化时以只读 mmap 打开：所有进程共享同一份页缓存，
+任务只传参数数组，行情数据不随任务序列化。参数网格按块分给 ProcessPoolExecutor，结果按完成顺序流入
+SweepSummary（可同时逐行写 CSV）。simulate 每次调用都要按时间步走一遍完整的 Python 循环，
+参数组只是循环内的向量宽度：一块的耗时 ≈ 固定的时间循环开销 + 与参数组数成正比的部分，
+且前者占大头。因此默认每个进程只分一块（ceil(n / workers)），多切一块就多付一次时间循环。
+
+提前停止: prune_fraction > 0 时每块先只在前 prune_fraction 的行情上回测（第一阶段），
+PnL 低于 max_loss 或低于已完成第一阶段结果的 prune_quantile 分位数的参数组直接记为淘汰，
+其余参数组重新合并成不超过 workers 块，再在完整行情上回测（第二阶段）。第二阶段仍要走完整的时间循环，
+只有参数组足够多、向量部分占主要耗时时淘汰才省时间；否则总耗时反而多出第一阶段那一段。
+"""
+import csv
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from common.backtest import PARAMS, MarketGrid, simulate, top
+
+# 工作进程内的行情网格（_init_worker 打开）
+_GRID: Optional[MarketGrid] = None
+
+
+def _init_worker(grid_dir: str) -> None:
+	global _GRID
+	_GRID = MarketGrid.load(grid_dir, mmap=True)
+
+
+def _run_chunk(stage: int, ids: np.ndarray, params: Dict[str, np.ndarray], stop: Optional[int],
+			   sim_kwargs: Dict[str, Any]) -> Tuple[int, np.ndarray, Dict[str, np.ndarray], float]:
+	grid = _GRID if stop is None else _GRID.window(0, stop)
+	t0 = time.process_time()
+	result = simulate(grid, params, **sim_kwargs)
+	return stage, ids, result, time.process_time() - t0
+
+
+class SweepSummary:
+	"""
+	扫描结果表：每个参数组一行，按完成顺序填入
+
+	pruned 为第一阶段被淘汰的参数组（对应行是前缀行情上的结果），done 为已有结果的参数组
+	"""
+
+	def __init__(self, params: Dict[str, np.ndarray], csv_path: Optional[Union[str, Path]] = None):
+		self.params = params
+		self.size = len(params[PARAMS[0]])
+		self.columns: Dict[str, np.ndarray] = {}
+		self.done = np.zeros(self.size, dtype=bool)
+		self.pruned = np.zeros(self.size, dtype=bool)
+		self.started = time.monotonic()
+		self.cpu_seconds = 0.0
+		self.tasks = 0
+		self._csv_file = None
+		self._csv = None
+		if csv_path:
+			p = Path(csv_path)
+			p.parent.mkdir(parents=True, exist_ok=True)
+			self._csv_file = p.open("w", newline="", encoding="utf-8")
+
+	def add(self, ids: np.ndarray, result: Dict[str, np.ndarray], pruned: bool = False) -> None:
+		if not self.columns:
+			self.columns = {name: np.zeros(self.size, dtype=col.dtype) for name, col in result.items()}
+		for name, col in result.items():
+			self.columns[name][ids] = col
+		self.done[ids] = True
+		self.pruned[ids] = pruned
+		if self._csv_file is not None:
+			if self._csv is None:
+				self._csv = csv.writer(self._csv_file)
+				self._csv.writerow(["id", *self.columns, "pruned"])
+			names = list(self.columns)
+			for j, i in enumerate(ids):
+				self._csv.writerow([int(i), *(result[name][j].item() for name in names), int(pruned)])
+			self._csv_file.flush()
+
+	@property
+	def completed(self) -> int:
+		return int(self.done.sum())
+
+	def table(self, include_pruned: bool = False) -> Dict[str, np.ndarray]:
+		"""已完成参数组的结果列（默认不含被淘汰的）"""
+		mask = self.done if include_pruned else self.done & ~self.pruned
+		out = {name: col[mask] for name, col in self.columns.items()}
+		out["id"] = np.flatnonzero(mask)
+		return out
+
+	def top(self, n: int = 10, by: str = "pnl") -> List[Dict[str, Any]]:
+		table = self.table()
+		if not len(table.get("id", ())):
+			return []
+		return top(table, n, by)
+
+	def metrics(self) -> Dict[str, Any]:
+		elapsed = time.monotonic() - self.started
+		return {
+			"param_sets": self.size,
+			"completed": self.completed,
+			"pruned": int(self.pruned.sum()),
+			"tasks": self.tasks,
+			"elapsed_s": round(elapsed, 3),
+			"cpu_s": round(self.cpu_seconds, 3),
+			"param_sets_per_minute": round(self.completed / elapsed * 60, 1) if elapsed > 0 else 0.0,
+			"parallelism": round(self.cpu_seconds / elapsed, 2) if elapsed > 0 else 0.0,
+		}
+
+	def close(self) -> None:
+		if self._csv_file is not None:
+			self._csv_file.close()
+			self._csv_file = None
+
+
+def _chunks(ids: np.ndarray, size: int) -> List[np.ndarray]:
+	return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def run_sweep(grid: Union[MarketGrid, str, Path], params: Dict[str, np.ndarray], workers: Optional[int] = None,
+			  chunk_size: Optional[int] = None, prune_fraction: float = 0.0, prune_quantile: float = 0.5,
+			  max_loss: Optional[float] = None, sim_kwargs: Optional[Dict[str, Any]] = None,
+			  csv_path: Optional[Union[str, Path]] = None,
+			  on_progress: Optional[Callable[[SweepSummary], None]] = None) -> SweepSummary:
+	"""
+	多进程扫描参数网格
+
+	Args:
+		grid: MarketGrid（写入临时目录）或 MarketGrid.save 的目录
+		params: 参数数组（见 common.backtest.param_grid）
+		workers: 进程数，默认 CPU 核数；1 时在当前进程内执行
+		chunk_size: 第一阶段每个任务的参数组数，默认每个进程一块
+		prune_fraction: 第一阶段使用的行情比例（0 表示不做提前停止）
+		prune_quantile: 第一阶段 PnL 低于该分位数的参数组被淘汰
+		max_loss: 第一阶段 PnL 低于 -max_loss 的参数组被淘汰
+		sim_kwargs: 传给 common.backtest.simulate 的其它参数
+		csv_path: 结果逐行写入的 CSV
+		on_progress: 每完成一个任务回调一次
+	"""
+	workers = workers or os.cpu_count() or 1
+	sim_kwargs = dict(sim_kwargs or {})
+	summary = SweepSummary(params, csv_path)
+	n = summary.size
+	chunk_size = chunk_size or max(1, math.ceil(n / workers))
+
+	tmp = None
+	if isinstance(grid, MarketGrid):
+		tmp = tempfile.TemporaryDirectory(prefix="sweep_grid_")
+		grid_dir = str(grid.save(tmp.name))
+	else:
+		grid_dir = str(grid)
+	steps = len(MarketGrid.load(grid_dir))
+	stop = max(int(steps * prune_fraction), 2) if 0 < prune_fraction < 1 else None
+
+	def subset(ids: np.ndarray) -> Dict[str, np.ndarray]:
+		return {name: np.asarray(col)[ids] for name, col in params.items()}
+
+	# 第一阶段结果全部到齐后再统一筛选：分位数用全部样本，存活者也能一次合并成至多 workers 块
+	stage1: Dict[str, List[Any]] = {"pnl": [], "held": []}
+	warmup = len(_chunks(np.arange(n), chunk_size))
+
+	def screen(ids: np.ndarray, result: Dict[str, np.ndarray]) -> np.ndarray:
+		"""返回第一阶段存活的 id，淘汰的直接写入结果表"""
+		pnl = result["pnl"]
+		keep = np.ones(len(ids), dtype=bool)
+		if max_loss is not None:
+			keep &= pnl >= -max_loss
+		if prune_quantile > 0:
+			keep &= pnl >= np.quantile(np.concatenate(stage1["pnl"]), prune_quantile)
+		if (~keep).any():
+			summary.add(ids[~keep], {name: col[~keep] for name, col in result.items()}, pruned=True)
+		return ids[keep]
+
+	pool = None
+	try:
+		if workers <= 1:
+			_init_worker(grid_dir)
+			submit = lambda *args: _InlineFuture(_run_chunk(*args))
+		else:
+			pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(grid_dir,))
+			submit = lambda *args: pool.submit(_run_chunk, *args)
+		pending: Set[Any] = set()
+		first_stage = 1 if stop is not None else 2
+		for ids in _chunks(np.arange(n), chunk_size):
+			pending.add(submit(first_stage, ids, subset(ids), stop, sim_kwargs))
+		while pending:
+			done, pending = wait(pending, return_when=FIRST_COMPLETED) if pool is not None else (set(pending), set())
+			for fut in done:
+				stage, ids, result, cpu = fut.result()
+				summary.cpu_seconds += cpu
+				summary.tasks += 1
+				if stage == 2:
+					summary.add(ids, result)
+				else:
+					stage1["pnl"].append(result["pnl"])
+					stage1["held"].append((ids, result))
+					if len(stage1["pnl"]) < warmup:
+						continue
+					survivors = np.concatenate([screen(held_ids, held) for held_ids, held in stage1["held"]])
+					if len(survivors):
+						# 每块都要走一遍完整时间循环，存活者合并成至多 workers 块
+						for chunk in _chunks(survivors, math.ceil(len(survivors) / workers)):
+							pending.add(submit(2, chunk, subset(chunk), None, sim_kwargs))
+					stage1["held"] = []
+				if on_progress is not None:
+					on_progress(summary)
+	finally:
+		if pool is not None:
+			pool.shutdown(wait=True, cancel_futures=True)
+		summary.close()
+		if tmp is not None:
+			tmp.cleanup()
+	return summary
+
+
+class _InlineFuture:
+	"""workers=1 时的同步结果（与 Future.result() 接口一致）"""
+
+	def __init__(self, value: Any):
+		self._value = value
+
+	def result(self) -> Any:
+		return self._value
@@ -0,0 +1,248 @@
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+
+# 当前协程/线程所属的追踪ID（每轮对冲一个）
+_current_trace: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+
+class Span:
+	"""
+	一个计时区间，结束时写入追踪器
+	时间戳全部基于 time.perf_counter_ns（单调时钟）
+	"""
+
+	__slots__ = ("tracer", "name", "cat", "args", "trace_id", "tid", "start_ns", "end_ns")
+
+	def __init__(self, tracer: "Tracer", name: str, cat: str, args: Dict[str, Any]):
+		self.tracer = tracer
+		self.name = name
+		self.cat = cat
+		self.args = args
+		self.trace_id = _current_trace.get()
+		self.tid = threading.get_ident()
+		self.start_ns = time.perf_counter_ns()
+		self.end_ns: Optional[int] = None
+
+	def set(self, **args: Any) -> None:
+		"""附加参数（如订单ID、状态）"""
+		self.args.update(args)
+
+	def end(self, **args: Any) -> None:
+		if self.end_ns is not None:
+			return
+		if args:
+			self.args.update(args)
+		self.end_ns = time.perf_counter_ns()
+		self.tracer._record(self)
+
+	@property
+	def duration_ms(self) -> float:
+		end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+		return (end - self.start_ns) / 1e6
+
+	def __enter__(self) -> "Span":
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		if exc is not None:
+			self.args["error"] = f"{exc_type.__name__}: {exc}"
+		self.end()
+
+
+class _NoopSpan:
+	"""追踪关闭时使用的空区间，避免热路径上的开销"""
+
+	__slots__ = ()
+	trace_id = None
+	duration_ms = 0.0
+
+	def set(self, **args: Any) -> None:
+		pass
+
+	def end(self, **args: Any) -> None:
+		pass
+
+	def __enter__(self) -> "_NoopSpan":
+		return self
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+	"""
+	基于区间的延迟追踪器，可导出为 Chrome trace / Perfetto JSON
+
+	Args:
+		enabled: 是否启用；关闭时 span() 返回空区间
+		max_events: 内存中最多保留的事件数（超出后丢弃最旧的）
+	"""
+
+	def __init__(self, enabled: bool = False, max_events: int = 200000):
+		self.enabled = enabled
+		self.pid = os.getpid()
+		self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+		self._lock = threading.Lock()
+		self._seq = itertools.count(1)
+		# 导出时把单调时钟换算为相对起点的微秒
+		self._origin_ns = time.perf_counter_ns()
+		self._origin_wall = time.time()
+		self._thread_names: Dict[int, str] = {}
+
+	def new_trace_id(self, prefix: str = "t") -> str:
+		return f"{prefix}-{next(self._seq)}-{int(self._origin_wall)}"
+
+	@contextmanager
+	def trace(self, name: str, trace_id: Optional[str] = None, **args: Any) -> Iterator[Span]:
+		"""开启一条新的追踪（如一轮对冲），其中的所有区间共享同一个追踪ID"""
+		if not self.enabled:
+			yield _NOOP_SPAN
+			return
+		token = _current_trace.set(trace_id or self.new_trace_id())
+		try:
+			with self.span(name, cat="trace", **args) as sp:
+				yield sp
+		finally:
+			_current_trace.reset(token)
+
+	def span(self, name: str, cat: str = "app", **args: Any) -> Any:
+		"""创建区间；可用作 with 语句，或手动调用 end()"""
+		if not self.enabled:
+			return _NOOP_SPAN
+		return Span(self, name, cat, args)
+
+	def instant(self, name: str, cat: str = "app", **args: Any) -> None:
+		"""记录瞬时事件（如检测到成交）"""
+		if not self.enabled:
+			return
+		trace_id = _current_trace.get()
+		if trace_id is not None:
+			args["trace_id"] = trace_id
+		event = {
+			"name": name,
+			"cat": cat,
+			"ph": "i",
+			"s": "t",
+			"ts": (time.perf_counter_ns() - self._origin_ns) / 1000.0,
+			"pid": self.pid,
+			"tid": threading.get_ident(),
+			"args": args,
+		}
+		with self._lock:
+			self._events.append(event)
+
+	def _record(self, span: Span) -> None:
+		args = span.args
+		if span.trace_id is not None:
+			args["trace_id"] = span.trace_id
+		event = {
+			"name": span.name,
+			"cat": span.cat,
+			"ph": "X",
+			"ts": (span.start_ns - self._origin_ns) / 1000.0,
+			"dur": ((span.end_ns or span.start_ns) - span.start_ns) / 1000.0,
+			"pid": self.pid,
+			"tid": span.tid,
+			"args": args,
+		}
+		with self._lock:
+			self._events.append(event)
+			if span.tid not in self._thread_names:
+				self._thread_names[span.tid] = threading.current_thread().name
+
+	def events(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+		with self._lock:
+			events = list(self._events)
+		if trace_id is None:
+			return events
+		return [e for e in events if e["args"].get("trace_id") == trace_id]
+
+	def summary(self, trace_id: str) -> Dict[str, float]:
+		"""按区间名汇总某条追踪的耗时（毫秒），便于快速定位关键路径"""
+		totals: Dict[str, float] = {}
+		for e in self.events(trace_id):
+			if e["ph"] != "X":
+				continue
+			totals[e["name"]] = totals.get(e["name"], 0.0) + e["dur"] / 1000.0
+		return totals
+
+	def clear(self) -> None:
+		with self._lock:
+			self._events.clear()
+
+	def to_chrome_trace(self) -> Dict[str, Any]:
+		with self._lock:
+			events = list(self._events)
+			thread_names = dict(self._thread_names)
+		meta = [
+			{"name": "process_name", "ph": "M", "pid": self.pid, "tid": 0, "args": {"name": "aster-bp-bot"}},
+		]
+		for tid, tname in thread_names.items():
+			meta.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": tname}})
+		return {
+			"traceEvents": meta + events,
+			"displayTimeUnit": "ms",
+			"otherData": {"origin_wall_time": self._origin_wall},
+		}
+
+	def export_chrome_trace(self, path: str) -> None:
+		"""写出 Chrome trace JSON（chrome://tracing 或 ui.perfetto.dev 可直接打开）"""
+		p = Path(path)
+		p.parent.mkdir(parents=True, exist_ok=True)
+		tmp = p.with_suffix(p.suffix + ".tmp")
+		with tmp.open("w", encoding="utf-8") as f:
+			json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+		os.replace(tmp, p)
+
+
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+	return _tracer
+
+
+def set_tracer(tracer: Tracer) -> Tracer:
+	global _tracer
+	_tracer = tracer
+	return tracer
+
+
+def span(name: str, cat: str = "app", **args: Any) -> Any:
+	"""使用全局追踪器创建区间"""
+	return _tracer.span(name, cat, **args)
+
+
+def current_trace_id() -> Optional[str]:
+	return _current_trace.get()
+
+
+def traced(name: Optional[str] = None, cat: str = "dao") -> Callable:
+	"""装饰器：把函数调用记录为一个区间"""
+
+	def decorator(func: Callable) -> Callable:
+		span_name = name or func.__qualname__
+
+		@functools.wraps(func)
+		def wrapper(*args: Any, **kwargs: Any) -> Any:
+			if not _tracer.enabled:
+				return func(*args, **kwargs)
+			with _tracer.span(span_name, cat):
+				return func(*args, **kwargs)
+
+		return wrapper
+
+	return decorator
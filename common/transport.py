@@ -0,0 +1,305 @@
+import atexit
+import gzip
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+# 每次请求都会变化的参数，录制/回放匹配时忽略
+VOLATILE_PARAMS = {"timestamp", "signature", "recvWindow", "window"}
+
+# 客户端自定义订单号每次运行都不同：录制/回放匹配时也忽略，同一接口的请求按录制顺序对应
+# （合并请求、响应缓存仍区分订单号，不同订单的查询不能混用）
+REPLAY_VOLATILE_PARAMS = VOLATILE_PARAMS | {"newClientOrderId", "origClientOrderId"}
+
+# 请求头中标识账户的字段（BP / Aster）
+AUTH_HEADERS = ("X-API-Key", "X-MBX-APIKEY")
+
+
+class Transport(ABC):
+	"""
+	HTTP传输层接口，客户端所有网络请求都经过这里
+	request() 的参数与 requests.Session.request 相同，返回 requests.Response
+	"""
+
+	session: Optional[requests.Session] = None
+
+	@abstractmethod
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		"""发送请求并返回响应"""
+
+	def close(self) -> None:
+		pass
+
+
+class HttpTransport(Transport):
+	"""默认传输层：直接使用 requests.Session 访问交易所"""
+
+	def __init__(self, session: Optional[requests.Session] = None):
+		self.session = session or requests.Session()
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		return self.session.request(method, url, **kwargs)
+
+	def close(self) -> None:
+		self.session.close()
+
+
+class ReplayMiss(requests.ConnectionError):
+	"""回放文件中没有匹配的请求"""
+
+
+def _as_pairs(value: Any) -> List[Tuple[str, str]]:
+	if value is None:
+		return []
+	if isinstance(value, (bytes, str)):
+		text = value.decode() if isinstance(value, bytes) else value
+		return parse_qsl(text, keep_blank_values=True)
+	if isinstance(value, dict):
+		return [(str(k), str(v)) for k, v in value.items() if v is not None]
+	return [(str(k), str(v)) for k, v in value if v is not None]
+
+
+def request_key(method: str, url: str, params: Any = None, data: Any = None, json_body: Any = None,
+				volatile: Any = VOLATILE_PARAMS) -> str:
+	"""
+	生成与签名无关的请求键：方法 + 主机/路径 + 排序后的参数（去掉 volatile 中的时间戳、签名等易变字段）
+	"""
+	parts = urlsplit(url)
+	pairs = _as_pairs(parse_qsl(parts.query, keep_blank_values=True)) + _as_pairs(params) + _as_pairs(data)
+	canonical = "&".join(f"{k}={v}" for k, v in sorted(pairs) if k not in volatile)
+	key = f"{method.upper()} {parts.netloc}{parts.path}?{canonical}"
+	if json_body is not None:
+		key += " " + json.dumps(json_body, sort_keys=True, separators=(",", ":"), default=str)
+	return key
+
+
+def replay_key(method: str, url: str, kwargs: Dict[str, Any]) -> str:
+	"""录制/回放使用的请求键（kwargs 为 Transport.request 的关键字参数），另外忽略客户端订单号"""
+	return request_key(method, url, kwargs.get("params"), kwargs.get("data"), kwargs.get("json"),
+					   volatile=REPLAY_VOLATILE_PARAMS)
+
+
+def _signed(kwargs: Dict[str, Any]) -> bool:
+	"""请求是否带签名：params/data 中的 signature（dict、元组列表或编码后的字符串），或 X-Signature 请求头"""
+	for field in ("params", "data"):
+		try:
+			pairs = _as_pairs(kwargs.get(field))
+		except (TypeError, ValueError):
+			continue
+		if any(k == "signature" for k, _ in pairs):
+			return True
+	headers = kwargs.get("headers")
+	return bool(headers) and "X-Signature" in headers
+
+
+def request_account(kwargs: Dict[str, Any]) -> str:
+	"""
+	签名请求所属的账户（API Key 的摘要，不含 Key 本身，可以写入磁盘）；公开接口返回空串
+
+	kwargs 为 Transport.request 的关键字参数。缓存、合并请求时与 request_key 一起使用，不同账户的账户查询互不混用。
+	"""
+	headers = kwargs.get("headers")
+	if not headers or not _signed(kwargs):
+		return ""
+	for name in AUTH_HEADERS:
+		value = headers.get(name)
+		if value:
+			return hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:16]
+	return ""
+
+
+def _build_response(entry: Dict[str, Any], url: str) -> requests.Response:
+	resp = requests.Response()
+	resp.status_code = int(entry["s"])
+	resp._content = entry.get("b", "").encode("utf-8")
+	resp.encoding = "utf-8"
+	headers = CaseInsensitiveDict()
+	if entry.get("ct"):
+		headers["Content-Type"] = entry["ct"]
+	if entry.get("date"):
+		headers["Date"] = entry["date"]
+	resp.headers = headers
+	resp.url = url
+	resp.reason = "REPLAY"
+	return resp
+
+
+class RecordingTransport(Transport):
+	"""
+	录制传输层：透传到真实交易所，同时把请求/响应及耗时写入 gzip JSONL 文件
+
+	Args:
+		path: 录制文件路径（建议 .jsonl.gz）
+		inner: 实际发送请求的传输层，默认 HttpTransport
+	"""
+
+	def __init__(self, path: str, inner: Optional[Transport] = None):
+		self.inner = inner or HttpTransport()
+		self.session = self.inner.session
+		self.path = Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._lock = threading.Lock()
+		self._fh = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+		self._start = time.monotonic()
+		self._fh.write(json.dumps({"v": 1, "created": time.time()}) + "\n")
+		self._closed = False
+		atexit.register(self.close)
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		started = time.monotonic()
+		resp = self.inner.request(method, url, **kwargs)
+		duration_ms = (time.monotonic() - started) * 1000.0
+		entry = {
+			"t": round(started - self._start, 4),
+			"d": round(duration_ms, 3),
+			"k": replay_key(method, url, kwargs),
+			"s": resp.status_code,
+			"ct": resp.headers.get("Content-Type", ""),
+			"date": resp.headers.get("Date", ""),
+			"b": resp.text,
+		}
+		line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+		with self._lock:
+			if not self._closed:
+				self._fh.write(line)
+		return resp
+
+	def close(self) -> None:
+		with self._lock:
+			if self._closed:
+				return
+			self._closed = True
+			self._fh.close()
+
+
+class ReplayTransport(Transport):
+	"""
+	回放传输层：按录制顺序返回相同请求的响应，不访问网络
+
+	Args:
+		path: 录制文件路径
+		preserve_latency: 是否按录制耗时 sleep，模拟真实网络延迟
+		latency_scale: 延迟缩放倍数（0.5 表示按一半延迟回放）
+		strict: 某请求的录制响应用完后是否报错；否则重复返回最后一条
+	"""
+
+	def __init__(self, path: str, preserve_latency: bool = False, latency_scale: float = 1.0, strict: bool = False):
+		self.path = Path(path)
+		self.preserve_latency = preserve_latency
+		self.latency_scale = latency_scale
+		self.strict = strict
+		self.session = requests.Session()
+		self._lock = threading.Lock()
+		self._queues: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+		self._last: Dict[str, Dict[str, Any]] = {}
+		self.hits = 0
+		self.misses = 0
+		for entry in iter_recording(self.path):
+			self._queues[entry["k"]].append(entry)
+
+	def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+		key = replay_key(method, url, kwargs)
+		with self._lock:
+			queue = self._queues.get(key)
+			if queue:
+				entry = queue.popleft()
+				self._last[key] = entry
+				self.hits += 1
+			elif key in self._last and not self.strict:
+				entry = self._last[key]
+				self.hits += 1
+			else:
+				self.misses += 1
+				raise ReplayMiss(f"回放文件中没有匹配的请求: {key}")
+		if self.preserve_latency and entry.get("d"):
+			time.sleep(entry["d"] / 1000.0 * self.latency_scale)
+		return _build_response(entry, url)
+
+
+def iter_recording(path: Path):
+	"""逐条读取录制文件（容忍进程被杀导致的 gzip 截断）"""
+	with gzip.open(path, "rt", encoding="utf-8") as f:
+		try:
+			for line in f:
+				if not line.strip():
+					continue
+				entry = json.loads(line)
+				if "k" in entry:
+					yield entry
+		except (EOFError, json.JSONDecodeError):
+			return
+
+
+def build_transport(cfg: Optional[Dict[str, Any]], limiter: Any = None) -> Optional[Transport]:
+	"""
+	根据配置创建传输层，供脚本使用
+
+	limiter 为交易所权重限速器（common.ratelimit.TokenBucket，或 {交易所: 限速器}），启用对冲读时
+	每个请求按该交易所的接口权重记入，额外请求只在余量足够时发出；未传入时按 weight_per_minute
+	为每个交易所各建一个（未配置则额外请求只受 hedged_reads.per_minute 限制）
+
+	配置示例:
+		transport:
+		  mode: record          # live / record / replay
+		  path: "recordings/hedge.jsonl.gz"
+		  preserve_latency: true
+		  weight_per_minute: 1200  # 每个交易所的权重额度，也可分别配置 {aster: 2400, backpack: 600}
+		  hedged_reads:         # 对冲读（common.hedged_read），回放时不生效
+		    enabled: true
+		  coalesce:             # 合并并发的相同读请求（common.singleflight），在录制/回放层之外
+		    enabled: true
+		    ttl_ms: 50
+		  cache:                # 慢变接口的响应缓存（common.response_cache），最外层
+		    enabled: true
+		    path: "logs/response_cache.json"
+
+	live 模式且没有启用任何包装时返回 None（客户端使用默认的 HttpTransport）
+	"""
+	from common.hedged_read import VENUE_WEIGHTS, build_hedged_read
+	from common.response_cache import build_response_cache
+	from common.singleflight import build_coalescing
+
+	if not cfg:
+		return None
+	quota = cfg.get("weight_per_minute")
+	if limiter is None and quota:
+		from common.ratelimit import TokenBucket
+		# 各交易所的额度互相独立
+		quotas = quota if isinstance(quota, dict) else {venue: quota for venue in VENUE_WEIGHTS}
+		limiter = {venue: TokenBucket.per_minute(float(q)) for venue, q in quotas.items()}
+	mode = str(cfg.get("mode", "live")).lower()
+	if mode == "live":
+		http = HttpTransport()
+		transport = build_hedged_read(http, cfg.get("hedged_reads"), limiter)
+	elif mode in ("record", "replay"):
+		path = cfg.get("path")
+		if not path:
+			raise ValueError("transport.path 未配置")
+		if mode == "record":
+			# 对冲读在录制层之内：录制文件里每个请求只有胜出的那份响应
+			transport = RecordingTransport(path, inner=build_hedged_read(HttpTransport(), cfg.get("hedged_reads"), limiter))
+		else:
+			transport = ReplayTransport(
+				path,
+				preserve_latency=bool(cfg.get("preserve_latency", False)),
+				latency_scale=float(cfg.get("latency_scale", 1.0)),
+				strict=bool(cfg.get("strict", False)),
+			)
+	else:
+		raise ValueError(f"不支持的 transport.mode: {mode}")
+	# 合并在录制层之外：录制和回放看到的是同样合并后的请求序列
+	transport = build_coalescing(transport, cfg.get("coalesce"))
+	transport = build_response_cache(transport, cfg.get("cache"))
+	if mode == "live" and transport is http:
+		return None
+	return transport
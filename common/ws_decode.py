@@ -0,0 +1,286 @@
+"""
+WebSocket 消息快速解码
+
+- JSON 后端可插拔：优先 orjson，其次 ujson，最后标准库 json（use_backend() 可手动切换）
+- split_envelope() 在不解析整条消息的情况下取出组合流消息的 stream 名和 data 原文，
+  没有订阅者的流可以直接丢弃，只有需要的 payload 才做完整解析
+- bookTicker / trade / depth 解码为 __slots__ 事件对象（价格数量转为 float）
+
+Aster（Binance 风格，"asterusdt@bookTicker"）与 Backpack（"bookTicker.ASTER_USDC_PERP"）
+这三类推送的字段名一致，同一套解码器可以处理两个交易所。
+"""
+import json
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Pattern, Tuple
+
+try:
+	import orjson as _orjson
+except ImportError:  # pragma: no cover - 可选依赖
+	_orjson = None
+
+try:
+	import ujson as _ujson
+except ImportError:  # pragma: no cover - 可选依赖
+	_ujson = None
+
+
+_BACKENDS: Dict[str, Callable[[Any], Any]] = {"json": json.loads}
+if _ujson is not None:
+	_BACKENDS["ujson"] = _ujson.loads
+if _orjson is not None:
+	_BACKENDS["orjson"] = _orjson.loads
+
+JSON_BACKEND = "orjson" if _orjson is not None else "ujson" if _ujson is not None else "json"
+loads: Callable[[Any], Any] = _BACKENDS[JSON_BACKEND]
+
+
+def use_backend(name: str) -> str:
+	"""切换 JSON 后端（json / ujson / orjson），返回之前的后端名；未安装时抛出 ValueError"""
+	global JSON_BACKEND, loads
+	if name not in _BACKENDS:
+		raise ValueError(f"JSON 后端不可用: {name}（可用: {', '.join(_BACKENDS)}）")
+	previous = JSON_BACKEND
+	JSON_BACKEND, loads = name, _BACKENDS[name]
+	return previous
+
+
+def available_backends() -> List[str]:
+	return list(_BACKENDS)
+
+
+# ---------- 组合流信封 ----------
+
+def _skip_ws(raw: str, i: int) -> int:
+	while i < len(raw) and raw[i] in " \t\r\n":
+		i += 1
+	return i
+
+
+def split_envelope(raw: Any) -> Tuple[Optional[str], Optional[str]]:
+	"""
+	从 {"stream":"<name>","data":<payload>} 中取出 (stream, payload 原文)，不解析 payload
+
+	只识别 stream 在前、data 在后的常见格式（两个交易所实际推送均如此）；
+	其他消息（订阅回执、原始流、键顺序不同）返回 (None, None)，由调用方做完整解析
+	"""
+	if isinstance(raw, (bytes, bytearray)):
+		raw = raw.decode("utf-8")
+	# 紧凑格式（交易所实际推送）：{"stream":"x","data":...}
+	if raw.startswith('{"stream":"'):
+		end = raw.find('"', 11)
+		if end > 0 and raw.startswith('","data":', end) and raw.endswith("}"):
+			return raw[11:end], raw[end + 9:-1]
+	elif not raw.startswith('{"stream"'):
+		return None, None
+	i = _skip_ws(raw, 9)
+	if i >= len(raw) or raw[i] != ":":
+		return None, None
+	i = _skip_ws(raw, i + 1)
+	if i >= len(raw) or raw[i] != '"':
+		return None, None
+	end = raw.find('"', i + 1)
+	if end < 0:
+		return None, None
+	stream = raw[i + 1:end]
+	j = _skip_ws(raw, end + 1)
+	if not raw.startswith(',', j):
+		return None, None
+	j = _skip_ws(raw, j + 1)
+	if not raw.startswith('"data"', j):
+		return None, None
+	j = _skip_ws(raw, j + 6)
+	if j >= len(raw) or raw[j] != ":":
+		return None, None
+	body_end = raw.rstrip().rfind("}")
+	if body_end <= j:
+		return None, None
+	return stream, raw[j + 1:body_end]
+
+
+# ---------- 全市场数组流 ----------
+
+_SYMBOL_PATTERNS: Dict[FrozenSet[str], Pattern[str]] = {}
+
+
+def _symbol_pattern(symbols: FrozenSet[str]) -> Pattern[str]:
+	pattern = _SYMBOL_PATTERNS.get(symbols)
+	if pattern is None:
+		alternatives = "|".join(re.escape(s) for s in sorted(symbols))
+		pattern = _SYMBOL_PATTERNS[symbols] = re.compile(r'"s"\s*:\s*"(?:%s)"' % alternatives)
+	return pattern
+
+
+def select_array_items(body: str, symbols: Iterable[str]) -> List[Dict[str, Any]]:
+	"""
+	从全市场数组流（!markPrice@arr、!ticker@arr、!miniTicker@arr）的 payload 原文中只解析指定交易对
+
+	用正则定位 "s":"<symbol>"，再取所在的 {...} 单独解析，其他交易对不构造 dict。
+	依赖数组元素为不含嵌套对象的扁平对象（上述三种流均是）。
+	"""
+	symbols = symbols if isinstance(symbols, frozenset) else frozenset(symbols)
+	if not symbols:
+		return []
+	items = []
+	for m in _symbol_pattern(symbols).finditer(body):
+		start = body.rfind("{", 0, m.start())
+		end = body.find("}", m.end())
+		if start < 0 or end < 0:
+			continue
+		items.append(loads(body[start:end + 1]))
+	return items
+
+
+# ---------- 事件 ----------
+
+class BookTicker:
+	__slots__ = ("symbol", "bid_price", "bid_qty", "ask_price", "ask_qty", "update_id", "event_time", "transaction_time")
+
+	def __init__(self, symbol: str, bid_price: float, bid_qty: float, ask_price: float, ask_qty: float,
+				 update_id: Optional[int] = None, event_time: Optional[int] = None, transaction_time: Optional[int] = None):
+		self.symbol = symbol
+		self.bid_price = bid_price
+		self.bid_qty = bid_qty
+		self.ask_price = ask_price
+		self.ask_qty = ask_qty
+		self.update_id = update_id
+		self.event_time = event_time
+		self.transaction_time = transaction_time
+
+	@property
+	def mid(self) -> float:
+		return (self.bid_price + self.ask_price) / 2
+
+	def __repr__(self) -> str:
+		return f"BookTicker({self.symbol} {self.bid_price}x{self.bid_qty} / {self.ask_price}x{self.ask_qty} u={self.update_id})"
+
+
+class Trade:
+	__slots__ = ("symbol", "price", "qty", "trade_id", "is_buyer_maker", "trade_time", "event_time")
+
+	def __init__(self, symbol: str, price: float, qty: float, trade_id: Optional[int] = None,
+				 is_buyer_maker: Optional[bool] = None, trade_time: Optional[int] = None, event_time: Optional[int] = None):
+		self.symbol = symbol
+		self.price = price
+		self.qty = qty
+		self.trade_id = trade_id
+		self.is_buyer_maker = is_buyer_maker
+		self.trade_time = trade_time
+		self.event_time = event_time
+
+	def __repr__(self) -> str:
+		return f"Trade({self.symbol} {self.price}x{self.qty} id={self.trade_id} maker={self.is_buyer_maker})"
+
+
+class Depth:
+	"""
+	深度快照或增量；bids/asks 为 [(price, qty), ...]
+
+	first_update_id / final_update_id 对应 U / u，prev_final_update_id 对应 Aster 合约的 pu
+	"""
+
+	__slots__ = ("symbol", "bids", "asks", "first_update_id", "final_update_id", "prev_final_update_id",
+				 "event_time", "transaction_time")
+
+	def __init__(self, symbol: str, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]],
+				 first_update_id: Optional[int] = None, final_update_id: Optional[int] = None,
+				 prev_final_update_id: Optional[int] = None, event_time: Optional[int] = None,
+				 transaction_time: Optional[int] = None):
+		self.symbol = symbol
+		self.bids = bids
+		self.asks = asks
+		self.first_update_id = first_update_id
+		self.final_update_id = final_update_id
+		self.prev_final_update_id = prev_final_update_id
+		self.event_time = event_time
+		self.transaction_time = transaction_time
+
+	def __repr__(self) -> str:
+		return f"Depth({self.symbol} {len(self.bids)} bids / {len(self.asks)} asks u={self.final_update_id})"
+
+
+def _levels(raw: Optional[List[List[str]]]) -> List[Tuple[float, float]]:
+	return [(float(p), float(q)) for p, q in raw] if raw else []
+
+
+def decode_book_ticker(d: Dict[str, Any], symbol: str = "") -> BookTicker:
+	return BookTicker(d.get("s", symbol), float(d["b"]), float(d["B"]), float(d["a"]), float(d["A"]),
+					  d.get("u"), d.get("E"), d.get("T"))
+
+
+def decode_trade(d: Dict[str, Any], symbol: str = "") -> Trade:
+	return Trade(d.get("s", symbol), float(d["p"]), float(d["q"]), d.get("t"), d.get("m"), d.get("T"), d.get("E"))
+
+
+def decode_depth(d: Dict[str, Any], symbol: str = "") -> Depth:
+	# Aster 现货的部分深度流（@depth5）为 {"lastUpdateId", "bids", "asks"}，不带交易对
+	if "bids" in d:
+		return Depth(symbol, _levels(d["bids"]), _levels(d["asks"]), final_update_id=d.get("lastUpdateId"),
+					 event_time=d.get("E"), transaction_time=d.get("T"))
+	return Depth(d.get("s", symbol), _levels(d.get("b")), _levels(d.get("a")), d.get("U"), d.get("u"),
+				 d.get("pu"), d.get("E"), d.get("T"))
+
+
+DECODERS: Dict[str, Callable[[Dict[str, Any], str], Any]] = {
+	"bookTicker": decode_book_ticker,
+	"trade": decode_trade,
+	"depth": decode_depth,
+}
+
+
+def stream_kind(stream: str) -> Tuple[str, str]:
+	"""
+	解析流名称，返回 (类型, 交易对)
+
+	"asterusdt@depth5@100ms" -> ("depth", "ASTERUSDT")；"bookTicker.ASTER_USDC_PERP" -> ("bookTicker", "ASTER_USDC_PERP")
+	"""
+	if "@" in stream:
+		sym, _, rest = stream.partition("@")
+		kind = rest.split("@", 1)[0]
+		if kind.startswith("depth"):
+			kind = "depth"
+		return kind, sym.upper()
+	kind, _, sym = stream.partition(".")
+	return kind, sym
+
+
+class StreamDecoder:
+	"""
+	按流名称分派的解码器：已知类型（bookTicker/trade/depth）解码为事件对象，其他原样返回 dict
+
+	流名称到解码函数的查找结果会缓存，热路径上每条消息只做一次字典查找
+	"""
+
+	def __init__(self, decoders: Optional[Dict[str, Callable[[Dict[str, Any], str], Any]]] = None):
+		self.decoders = dict(DECODERS if decoders is None else decoders)
+		self._routes: Dict[str, Tuple[Optional[Callable[[Dict[str, Any], str], Any]], str]] = {}
+
+	def route(self, stream: str) -> Tuple[Optional[Callable[[Dict[str, Any], str], Any]], str]:
+		route = self._routes.get(stream)
+		if route is None:
+			kind, symbol = stream_kind(stream)
+			route = self._routes[stream] = (self.decoders.get(kind), symbol)
+		return route
+
+	def decode(self, stream: str, data: Any) -> Any:
+		"""把已解析的 payload 转为事件对象（未知类型或格式不符时原样返回）"""
+		fn, symbol = self.route(stream)
+		if fn is None or not isinstance(data, dict):
+			return data
+		try:
+			return fn(data, symbol)
+		except (KeyError, TypeError, ValueError):
+			return data
+
+	def decode_raw(self, raw: Any, wanted: Optional[Callable[[str], bool]] = None) -> Tuple[Optional[str], Any]:
+		"""
+		解码一条原始组合流消息，返回 (stream, 事件)
+
+		wanted(stream) 返回 False 时不解析 payload，返回 (stream, None)；
+		不是组合流格式的消息完整解析后返回 (None, msg)
+		"""
+		stream, body = split_envelope(raw)
+		if stream is None:
+			return None, loads(raw)
+		if wanted is not None and not wanted(stream):
+			return stream, None
+		return stream, self.decode(stream, loads(body))
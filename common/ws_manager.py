@@ -0,0 +1,747 @@
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from common import ws_decode
+from common.delivery import (LATEST, LOSSLESS, RING, DeliveryBuffer, OverlapDeduplicator, conflation_key, default_policy,
+							 event_id)
+from common.log import enable_debug, get_logger
+from common.ws_decode import StreamDecoder, select_array_items, split_envelope
+
+if TYPE_CHECKING:
+	from common.market_table import MarketTable
+	from common.recorder import MarketRecorder
+
+
+class Subscription:
+	"""
+	单个订阅者的消息队列，可 await 读取或 async for 迭代，元素为 (stream, data)
+
+	投递策略见 common.delivery：未指定 policy 时 maxsize>0 为 ring（满了丢最旧的并计数），
+	maxsize=0 为 lossless；policy="latest" 时每个流只保留最新一条（报价类数据），
+	policy="auto" 按第一个流的类型推断（common.delivery.default_policy）。
+	typed=True 时 bookTicker/trade/depth 的 data 为 common.ws_decode 中的事件对象；
+	symbols 用于全市场数组流（!markPrice@arr 等），只投递这些交易对的元素，其余元素不解析
+	"""
+
+	# 为 True 的订阅者接收 payload 原文（str/bytes）；一个流的订阅者都为 True 时读循环不解析该流
+	raw = False
+
+	def __init__(self, streams: Iterable[str], maxsize: int = 0, typed: bool = False, policy: Optional[str] = None,
+				 symbols: Optional[Iterable[str]] = None):
+		self.streams: Set[str] = set(streams)
+		self.typed = typed
+		self.symbols: Optional[FrozenSet[str]] = frozenset(symbols) if symbols else None
+		if policy == "auto":
+			policy = default_policy(next(iter(self.streams))) if self.streams else None
+		self.buffer = DeliveryBuffer(policy or (RING if maxsize > 0 else LOSSLESS), maxsize)
+		self._ready = asyncio.Event()
+		self._closed = False
+		self._error: Optional[Exception] = None
+
+	@property
+	def closed(self) -> bool:
+		return self._closed
+
+	@closed.setter
+	def closed(self, value: bool) -> None:
+		self._closed = value
+		if value:
+			# 唤醒等待中的消费者，让 async for 在取完剩余消息后结束
+			self._ready.set()
+
+	@property
+	def error(self) -> Optional[Exception]:
+		return self._error
+
+	def fail(self, exc: Exception) -> None:
+		"""服务器拒绝了订阅：取完剩余消息后 get()/async for 抛出 exc"""
+		self._error = exc
+		self.closed = True
+
+	@property
+	def dropped(self) -> int:
+		return self.buffer.dropped
+
+	@property
+	def policy(self) -> str:
+		return self.buffer.policy
+
+	def put(self, stream: str, data: Any) -> None:
+		if self._closed:
+			return
+		key = conflation_key(stream, data) if self.buffer.policy == LATEST else stream
+		self.buffer.put(key, (stream, data))
+		self._ready.set()
+
+	async def get(self) -> Tuple[str, Any]:
+		while not len(self.buffer):
+			if self._closed:
+				raise self._error or ConnectionError("订阅已关闭")
+			self._ready.clear()
+			await self._ready.wait()
+		return self.buffer.pop()[1]
+
+	def get_nowait(self) -> Tuple[str, Any]:
+		if not len(self.buffer):
+			raise asyncio.QueueEmpty
+		return self.buffer.pop()[1]
+
+	def qsize(self) -> int:
+		return len(self.buffer)
+
+	def metrics(self) -> Dict[str, Any]:
+		"""排队深度、丢弃/合并条数与排队延迟"""
+		return self.buffer.metrics()
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self) -> Tuple[str, Any]:
+		try:
+			return await self.get()
+		except ConnectionError:
+			raise StopAsyncIteration
+
+
+class TableSink(Subscription):
+	"""把全市场数组流直接写入 MarketTable 的订阅者（不排队，在读循环中原地更新）"""
+
+	def __init__(self, streams: Iterable[str], table: "MarketTable"):
+		super().__init__(streams)
+		self.table = table
+
+	def put(self, stream: str, data: Any) -> None:
+		if not self._closed and isinstance(data, list):
+			self.buffer.received += 1
+			self.table.update(data)
+
+
+class RecorderSink(Subscription):
+	"""把推送原文连同本地接收时间交给 common.recorder.MarketRecorder（不排队；解析在录制线程中进行）"""
+
+	raw = True
+
+	def __init__(self, streams: Iterable[str], recorder: "MarketRecorder", venue: str):
+		super().__init__(streams)
+		self.recorder = recorder
+		self.venue = venue
+
+	def put(self, stream: str, data: Any) -> None:
+		if not self._closed:
+			self.buffer.received += 1
+			self.recorder.record(self.venue, stream, data, time.time_ns())
+
+
+class WSProtocol:
+	"""各交易所 WS 协议差异：连接地址、订阅消息格式、回执与数据消息的识别"""
+
+	# 服务器是否对 SUBSCRIBE/UNSUBSCRIBE 返回带 id 的回执
+	acknowledges = True
+	# typed 订阅使用的事件解码器
+	decoder = StreamDecoder()
+
+	def url(self, base_url: str, streams: List[str]) -> str:
+		return base_url
+
+	def url_streams(self, streams: List[str]) -> List[str]:
+		"""连接时直接放在 URL 中的流（其余连接后再 SUBSCRIBE）"""
+		return []
+
+	def subscribe_message(self, streams: List[str], msg_id: int) -> Dict[str, Any]:
+		return {"method": "SUBSCRIBE", "params": streams, "id": msg_id}
+
+	def unsubscribe_message(self, streams: List[str], msg_id: int) -> Dict[str, Any]:
+		return {"method": "UNSUBSCRIBE", "params": streams, "id": msg_id}
+
+	def parse(self, msg: Any) -> Tuple[str, Any, Any]:
+		"""
+		识别消息类型，返回:
+			("ack", id, msg)      订阅回执（含 error 时表示失败）
+			("data", stream, data) 数据推送
+			("other", None, msg)  其他
+		"""
+		if isinstance(msg, dict):
+			if "id" in msg and ("result" in msg or "error" in msg):
+				return "ack", msg["id"], msg
+			if "stream" in msg and "data" in msg:
+				return "data", msg["stream"], msg["data"]
+		return "other", None, msg
+
+
+class CombinedStreamProtocol(WSProtocol):
+	"""
+	Aster 现货/合约（Binance 风格）：/stream?streams=a/b 组合流，推送为 {"stream", "data"}，
+	SUBSCRIBE/UNSUBSCRIBE 返回 {"result": null, "id": n}
+	"""
+
+	def __init__(self, max_url_streams: int = 100):
+		self.max_url_streams = max_url_streams
+
+	def url(self, base_url: str, streams: List[str]) -> str:
+		if not streams:
+			return f"{base_url}/stream"
+		return f"{base_url}/stream?streams={'/'.join(streams)}"
+
+	def url_streams(self, streams: List[str]) -> List[str]:
+		return streams[: self.max_url_streams]
+
+
+class BackpackProtocol(WSProtocol):
+	"""
+	Backpack：连接根地址后 SUBSCRIBE，推送为 {"stream", "data"}；成功订阅没有回执，
+	失败时返回 {"id", "error"}（管理器按请求 id 转给对应订阅者）。私有流（account.*）的订阅需要签名，
+	每次发送时调用 signer 生成，以便重连后使用新的时间戳；signer 返回 None 时不带签名发送。
+	"""
+
+	acknowledges = False
+
+	def __init__(self, signer: Optional[Callable[[], List[str]]] = None):
+		self.signer = signer
+
+	def subscribe_message(self, streams: List[str], msg_id: int) -> Dict[str, Any]:
+		msg = super().subscribe_message(streams, msg_id)
+		if self.signer is not None and any(s.startswith("account.") for s in streams):
+			signature = self.signer()
+			if signature:
+				msg["signature"] = signature
+		return msg
+
+
+class WSConnectionManager:
+	"""
+	长连接管理器：每个端点一个 WebSocket 连接，所有订阅复用该连接
+
+	- 运行中通过 SUBSCRIBE/UNSUBSCRIBE（带请求 id）增减订阅，并跟踪服务器回执
+	- 同一个流可以有多个订阅者，消息扇出到各自的 Subscription 队列
+	- 断线后按带抖动的指数退避重连，并恢复全部订阅
+	- 先建后断的连接轮换（rotate() 或 rotate_after 定时）：新连接建立并完成订阅、与旧连接重叠
+	  rotation_overlap 秒后才关闭旧连接，重叠期间按事件/更新 id 去重，行情与用户数据流都不断档
+
+	Args:
+		base_url: WebSocket 地址
+		protocol: 交易所协议（CombinedStreamProtocol / BackpackProtocol）
+		debug: 是否输出调试日志（组件 ws.<name> 设为 DEBUG）
+		backoff_initial: 首次重连等待时间（秒）
+		backoff_max: 重连等待时间上限（秒）
+		ack_timeout: 等待回执的超时时间（秒）
+		ping_interval: websockets 心跳间隔（秒）
+		name: 日志组件名（ws.<name>）
+		rotate_after: 连接建立多久后自动轮换（秒），None 表示不定时轮换（交易所通常 24 小时断开）
+		rotation_overlap: 轮换时新旧连接同时接收的时间（秒）
+		dedup_grace: 旧连接关闭后继续去重的时间（秒），覆盖旧连接上已在途的消息
+	"""
+
+	# 无回执协议保留的最近 SUBSCRIBE 请求数
+	MAX_UNACKED = 256
+
+	def __init__(self, base_url: str, protocol: WSProtocol, debug: bool = False,
+				 backoff_initial: float = 0.5, backoff_max: float = 30.0, ack_timeout: float = 10.0,
+				 ping_interval: Optional[float] = 60.0, name: str = "WSConnectionManager",
+				 rotate_after: Optional[float] = None, rotation_overlap: float = 2.0, dedup_grace: float = 2.0):
+		self.base_url = base_url.rstrip("/")
+		self.protocol = protocol
+		self.debug = debug
+		self.backoff_initial = backoff_initial
+		self.backoff_max = backoff_max
+		self.ack_timeout = ack_timeout
+		self.ping_interval = ping_interval
+		self.name = name
+		self.log = get_logger(f"ws.{name}")
+		if debug:
+			enable_debug(f"ws.{name}")
+		self.rotate_after = rotate_after
+		self.rotation_overlap = rotation_overlap
+		self.dedup_grace = dedup_grace
+
+		self._subscribers: Dict[str, List[Subscription]] = {}
+		self._ws: Any = None
+		self._reader: Optional[asyncio.Task] = None
+		self._opened_at = 0.0
+		self._rotating = False
+		# 重连退避期间轮换完成时，rotate() 把新连接交给 _run：_backing_off 标记退避中，
+		# _adopted 为新连接上已订阅的流，_wake 提前结束退避
+		self._backing_off = False
+		self._adopted: Optional[List[str]] = None
+		self._wake = asyncio.Event()
+		self._dedup = OverlapDeduplicator()
+		self._task: Optional[asyncio.Task] = None
+		self._connected = asyncio.Event()
+		self._closing = False
+		self._ids = itertools.count(1)
+		self._pending: Dict[int, asyncio.Future] = {}
+		# 无回执协议：最近发出的 SUBSCRIBE 请求 id -> 流，失败回执据此找到对应订阅者
+		self._unacked: "OrderedDict[int, List[str]]" = OrderedDict()
+
+		# 统计
+		self.reconnects = 0
+		self.rotations = 0
+		self.messages = 0
+		self.skipped = 0
+		self.last_message_at: Optional[float] = None
+		self.errors: List[Any] = []
+
+	def _log(self, message: str, *args: Any, level: int = logging.DEBUG):
+		"""日志（组件 ws.<name>）"""
+		self.log.log(level, message, *args)
+
+	# ---------- 生命周期 ----------
+
+	@property
+	def connected(self) -> bool:
+		return self._connected.is_set()
+
+	@property
+	def streams(self) -> List[str]:
+		return list(self._subscribers)
+
+	async def start(self, wait: bool = True, timeout: float = 10.0) -> None:
+		"""启动后台连接任务（重复调用无副作用）；wait=True 时等待连接建立"""
+		if self._task is None or self._task.done():
+			self._closing = False
+			self._task = asyncio.create_task(self._run(), name=self.name)
+		if wait:
+			await self.wait_connected(timeout)
+
+	async def wait_connected(self, timeout: Optional[float] = None) -> None:
+		await asyncio.wait_for(self._connected.wait(), timeout)
+
+	async def close(self) -> None:
+		"""关闭连接并结束所有订阅队列"""
+		self._closing = True
+		if self._ws is not None:
+			await self._ws.close()
+		if self._task is not None:
+			self._task.cancel()
+			try:
+				await self._task
+			except asyncio.CancelledError:
+				pass
+			self._task = None
+		for subs in self._subscribers.values():
+			for sub in subs:
+				sub.closed = True
+		self._subscribers.clear()
+		self._fail_pending(ConnectionError("WebSocket 已关闭"))
+
+	async def __aenter__(self):
+		await self.start()
+		return self
+
+	async def __aexit__(self, *exc) -> None:
+		await self.close()
+
+	# ---------- 连接循环 ----------
+
+	def _backoff(self, attempt: int) -> float:
+		"""带抖动的指数退避：在 [d/2, d] 内均匀取值，d = min(上限, 初始值 * 2^attempt)"""
+		delay = min(self.backoff_max, self.backoff_initial * (2 ** attempt))
+		return delay / 2 + random.uniform(0, delay / 2)
+
+	async def _open(self) -> Tuple[Any, asyncio.Task, List[str]]:
+		"""建立一条连接并启动读循环，返回 (ws, 读任务, 已放在 URL 中订阅的流)"""
+		in_url = self.protocol.url_streams(self.streams)
+		ws = await websockets.connect(self.protocol.url(self.base_url, in_url), ping_interval=self.ping_interval)
+		return ws, asyncio.create_task(self._read_loop(ws)), in_url
+
+	async def _run(self) -> None:
+		attempt = 0
+		while not self._closing:
+			try:
+				if self._adopted is not None:
+					# 退避期间轮换已装上新连接并订阅
+					in_url, self._adopted = self._adopted, None
+				else:
+					self._log("连接到 %s（%s 个流）", self.base_url, len(self.streams))
+					self._ws, self._reader, in_url = await self._open()
+					self._opened_at = time.monotonic()
+				# 先标记已连接：此后新增的订阅由 subscribe() 自行发送；
+				# 不在 URL 中的流（含连接期间新增的流）在这里补订
+				self._connected.set()
+				missing = [s for s in self.streams if s not in in_url]
+				if missing:
+					await self._send(self.protocol.subscribe_message, missing, wait=False)
+				connected_at = time.monotonic()
+				await self._serve()
+				# 连接稳定运行过一段时间才重置退避计数，避免抖动时快速重连
+				if time.monotonic() - connected_at > self.backoff_max:
+					attempt = 0
+			except asyncio.CancelledError:
+				raise
+			except (ConnectionClosed, OSError, asyncio.TimeoutError) as e:
+				self._log("连接断开: %r", e)
+			except Exception as e:
+				self._log("连接异常: %r", e, level=logging.WARNING)
+			finally:
+				ws, reader = self._ws, self._reader
+				self._ws = self._reader = None
+				self._connected.clear()
+				self._fail_pending(ConnectionError("WebSocket 连接断开"))
+				if reader is not None:
+					reader.cancel()
+				if ws is not None:
+					await self._close_quietly(ws)
+			if self._closing:
+				break
+			delay = self._backoff(attempt)
+			attempt += 1
+			self.reconnects += 1
+			self._log("%.2fs 后重连（第 %s 次）", delay, attempt)
+			self._wake.clear()
+			self._backing_off = True
+			try:
+				await asyncio.wait_for(self._wake.wait(), delay)
+			except asyncio.TimeoutError:
+				pass
+			finally:
+				self._backing_off = False
+
+	async def _serve(self) -> None:
+		"""等待当前连接结束；轮换后转而等待新连接，到达 rotate_after 时自动轮换"""
+		while not self._closing:
+			reader = self._reader
+			timeout = None
+			if self.rotate_after:
+				timeout = max(0.0, self._opened_at + self.rotate_after - time.monotonic())
+			done, _ = await asyncio.wait({reader}, timeout=timeout)
+			if reader is not self._reader:
+				# 已轮换到新连接，旧连接的读循环正常结束
+				continue
+			if done:
+				return
+			try:
+				await self.rotate()
+			except Exception as e:
+				# 轮换失败不影响当前连接，稍后再试
+				self._log("轮换失败: %r", e, level=logging.WARNING)
+				self._opened_at = time.monotonic() - self.rotate_after + self.backoff_max
+
+	@staticmethod
+	async def _close_quietly(ws: Any) -> None:
+		try:
+			await ws.close()
+		except Exception:
+			pass
+
+	async def rotate(self, overlap: Optional[float] = None) -> None:
+		"""
+		先建后断地轮换连接
+
+		1. 建立新连接并订阅全部流（有回执的协议等待回执）
+		2. 新旧连接同时接收 overlap 秒，期间按事件/更新 id 去重
+		3. 补齐轮换期间新增/取消的订阅，切换到新连接后关闭旧连接
+
+		重叠期间旧连接断开：_run 还在重连退避中时直接接管新连接并结束退避；
+		_run 已装上另一条连接时放弃本次轮换（关闭新连接），不会同时保留两个连接
+		"""
+		if self._ws is None:
+			raise ConnectionError("WebSocket 未连接")
+		if self._rotating:
+			return
+		self._rotating = True
+		self._dedup.start()
+		old_ws = self._ws
+		try:
+			self._log("开始轮换连接")
+			ws, reader, in_url = await self._open()
+			try:
+				on_new = set(in_url)
+				missing = [s for s in self.streams if s not in on_new]
+				if missing:
+					await self._send(self.protocol.subscribe_message, missing, ws=ws)
+					on_new.update(missing)
+				await asyncio.sleep(self.rotation_overlap if overlap is None else overlap)
+				desired = set(self.streams)
+				added, removed = sorted(desired - on_new), sorted(on_new - desired)
+				if added:
+					await self._send(self.protocol.subscribe_message, added, ws=ws)
+				if removed:
+					await self._send(self.protocol.unsubscribe_message, removed, ws=ws)
+			except BaseException:
+				reader.cancel()
+				await self._close_quietly(ws)
+				raise
+			adopt = self._ws is None and self._backing_off and not self._closing
+			if self._ws is not old_ws and not adopt:
+				# 重叠期间旧连接断开、_run 已重连（或正在重连、已关闭）：保留 _run 的连接，丢弃新连接
+				self._log("轮换期间连接已被替换，放弃本次轮换")
+				reader.cancel()
+				await self._close_quietly(ws)
+				return
+			self._ws, self._reader, self._opened_at = ws, reader, time.monotonic()
+			if adopt:
+				# 旧连接已断开、_run 在退避：新连接已订阅全部流，交给 _run 继续服务
+				self._log("旧连接已断开，新连接直接接管")
+				self._adopted = sorted(desired)
+				self._connected.set()
+				self._wake.set()
+			self.rotations += 1
+			self._log("轮换完成（第 %s 次），关闭旧连接", self.rotations)
+			await self._close_quietly(old_ws)
+		finally:
+			self._rotating = False
+			self._dedup.finish(self.dedup_grace)
+
+	async def _read_loop(self, ws: Any) -> None:
+		try:
+			async for raw in ws:
+				self._on_message(raw)
+		except ConnectionClosed as e:
+			self._log("连接关闭: %s", e.rcvd.code if e.rcvd else '')
+
+	def _on_message(self, raw: Any) -> None:
+		self.messages += 1
+		self.last_message_at = time.monotonic()
+		# 快速路径：先取出 stream 名，没有订阅者的流不解析 payload
+		stream, body = split_envelope(raw)
+		try:
+			if stream is not None:
+				subs = self._subscribers.get(stream)
+				if not subs:
+					self.skipped += 1
+					return
+				if all(sub.raw for sub in subs):
+					data = body
+				elif body.startswith("[") and all(sub.symbols for sub in subs):
+					# 全市场数组流且所有订阅者都只要部分交易对：只解析这些交易对的元素
+					wanted = frozenset().union(*(sub.symbols for sub in subs))
+					data = select_array_items(body, wanted)
+				else:
+					data = ws_decode.loads(body)
+				if self._dedup.active and self._dedup.seen(event_id(stream, data, body)):
+					return
+				self._dispatch(stream, data, subs)
+				return
+			msg = ws_decode.loads(raw)
+		except (TypeError, ValueError):
+			self._log("JSON解析错误", level=logging.WARNING)
+			return
+		kind, key, payload = self.protocol.parse(msg)
+		if kind == "data":
+			subs = self._subscribers.get(key)
+			if subs:
+				if self._dedup.active and self._dedup.seen(event_id(key, payload, raw)):
+					return
+				self._dispatch(key, payload, subs)
+			else:
+				self.skipped += 1
+		elif kind == "ack":
+			fut = self._pending.pop(key, None)
+			streams = self._unacked.pop(key, None)
+			if payload.get("error") is not None:
+				self.errors.append(payload)
+				self._log("请求失败: %s", payload, level=logging.WARNING)
+				if streams:
+					self._fail_streams(streams, RuntimeError(f"订阅失败: {payload['error']}"))
+			if fut is not None and not fut.done():
+				if payload.get("error") is not None:
+					fut.set_exception(RuntimeError(f"请求失败: {payload['error']}"))
+				else:
+					fut.set_result(payload)
+		else:
+			self._log("未识别的消息")
+
+	def _dispatch(self, stream: str, data: Any, subs: List[Subscription]) -> None:
+		event = None
+		for sub in subs:
+			if sub.symbols is not None and isinstance(data, list):
+				items = [d for d in data if isinstance(d, dict) and d.get("s") in sub.symbols]
+				if items:
+					sub.put(stream, items)
+			elif sub.typed:
+				if event is None:
+					event = self.protocol.decoder.decode(stream, data)
+				sub.put(stream, event)
+			else:
+				sub.put(stream, data)
+
+	def _fail_streams(self, streams: Iterable[str], exc: Exception) -> None:
+		"""服务器拒绝订阅：移除这些流，并让订阅者在 get()/迭代时收到 exc"""
+		for stream in streams:
+			for sub in self._subscribers.pop(stream, ()):
+				sub.streams.discard(stream)
+				sub.fail(exc)
+
+	def _fail_pending(self, exc: Exception) -> None:
+		pending, self._pending = self._pending, {}
+		for fut in pending.values():
+			if not fut.done():
+				fut.set_exception(exc)
+
+	async def request(self, payload: Dict[str, Any], wait: bool = True, ws: Any = None) -> Optional[Dict[str, Any]]:
+		"""
+		发送一条带 id 的请求并等待回执（payload 中的 id 会被覆盖）
+
+		协议没有回执或 wait=False 时发送后立即返回 None；ws 指定发送的连接（默认当前连接）
+		"""
+		ws = ws or self._ws
+		if ws is None:
+			raise ConnectionError("WebSocket 未连接")
+		msg_id = next(self._ids)
+		payload = dict(payload, id=msg_id)
+		if not self.protocol.acknowledges:
+			if payload.get("method") == "SUBSCRIBE":
+				# 成功没有回执，只保留最近的请求以便把失败回执对应到订阅者
+				self._unacked[msg_id] = list(payload.get("params") or ())
+				while len(self._unacked) > self.MAX_UNACKED:
+					self._unacked.popitem(last=False)
+			await ws.send(json.dumps(payload))
+			return None
+		fut = asyncio.get_running_loop().create_future()
+		self._pending[msg_id] = fut
+		if not wait:
+			# 回执由读循环处理，这里只需避免“未取回的异常”告警
+			fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+		await ws.send(json.dumps(payload))
+		if not wait:
+			return None
+		try:
+			return await asyncio.wait_for(fut, self.ack_timeout)
+		finally:
+			self._pending.pop(msg_id, None)
+
+	async def _send(self, build: Callable[[List[str], int], Dict[str, Any]], streams: List[str],
+					wait: bool = True, ws: Any = None) -> Optional[Dict[str, Any]]:
+		if (ws or self._ws) is None or not streams:
+			return None
+		return await self.request(build(streams, 0), wait=wait, ws=ws)
+
+	# ---------- 订阅 ----------
+
+	async def subscribe(self, *streams: str, maxsize: int = 0, subscription: Optional[Subscription] = None,
+						typed: bool = False, policy: Optional[str] = None,
+						symbols: Optional[Iterable[str]] = None) -> Subscription:
+		"""
+		订阅一个或多个数据流，返回接收这些流消息的队列
+
+		只有首次被订阅的流才会发送 SUBSCRIBE；未连接时只登记，连接建立后自动生效。
+
+		Args:
+			streams: 数据流名称
+			maxsize: 队列长度上限，0 表示不限
+			subscription: 复用已有队列（把新的流加到同一个队列）
+			typed: 是否把 bookTicker/trade/depth 解码为事件对象
+			policy: 投递策略 latest / ring / lossless / auto（见 common.delivery），默认由 maxsize 决定
+			symbols: 全市场数组流只投递这些交易对
+		"""
+		sub = subscription or Subscription(streams, maxsize, typed, policy, symbols)
+		sub.streams.update(streams)
+		new_streams = []
+		for stream in streams:
+			subs = self._subscribers.setdefault(stream, [])
+			if not subs:
+				new_streams.append(stream)
+			if sub not in subs:
+				subs.append(sub)
+		if new_streams and self.connected:
+			self._log("订阅数据流: %s", new_streams)
+			await self._send(self.protocol.subscribe_message, new_streams)
+		return sub
+
+	async def unsubscribe(self, subscription: Subscription, *streams: str) -> Optional[Dict[str, Any]]:
+		"""
+		取消某个订阅者的订阅；不指定 streams 时取消其全部订阅并关闭队列
+
+		只有当某个流没有任何订阅者时才会向服务器发送 UNSUBSCRIBE，返回服务器回执
+		"""
+		targets = list(streams) or list(subscription.streams)
+		removed = []
+		for stream in targets:
+			subs = self._subscribers.get(stream)
+			subscription.streams.discard(stream)
+			if not subs:
+				continue
+			if subscription in subs:
+				subs.remove(subscription)
+			if not subs:
+				del self._subscribers[stream]
+				removed.append(stream)
+		if not subscription.streams:
+			subscription.closed = True
+		if removed and self.connected:
+			self._log("取消订阅数据流: %s", removed)
+			return await self._send(self.protocol.unsubscribe_message, removed)
+		return None
+
+	async def subscribe_table(self, stream: str, table: "MarketTable") -> TableSink:
+		"""把全市场数组流（如 !markPrice@arr）接到列式快照表，返回的 sink 可传给 unsubscribe()"""
+		return await WSConnectionManager.subscribe(self, stream, subscription=TableSink([stream], table))
+
+	async def subscribe_recorder(self, streams: Iterable[str], recorder: "MarketRecorder",
+								 venue: str) -> RecorderSink:
+		"""把行情流接到录制器（venue 为 aster / bp），返回的 sink 可传给 unsubscribe()"""
+		streams = list(streams)
+		return await WSConnectionManager.subscribe(self, *streams, subscription=RecorderSink(streams, recorder, venue))
+
+	async def unsubscribe_streams(self, streams: Iterable[str]) -> Optional[Dict[str, Any]]:
+		"""按流名称取消订阅（所有订阅者），返回服务器回执"""
+		streams = [s for s in streams if s in self._subscribers]
+		for stream in streams:
+			for sub in self._subscribers.pop(stream):
+				sub.streams.discard(stream)
+				if not sub.streams:
+					sub.closed = True
+		if streams and self.connected:
+			self._log("取消订阅数据流: %s", streams)
+			return await self._send(self.protocol.unsubscribe_message, streams)
+		return None
+
+	def metrics(self) -> Dict[str, Any]:
+		"""连接与各订阅队列的指标（排队深度、丢弃/合并条数、排队延迟）"""
+		subs: List[Subscription] = []
+		for stream_subs in self._subscribers.values():
+			for sub in stream_subs:
+				if sub not in subs:
+					subs.append(sub)
+		return {
+			"connected": self.connected,
+			"reconnects": self.reconnects,
+			"rotations": self.rotations,
+			"duplicates": self._dedup.duplicates,
+			"messages": self.messages,
+			"skipped": self.skipped,
+			"subscriptions": [dict(sub.metrics(), streams=sorted(sub.streams)) for sub in subs],
+		}
+
+	async def list_subscriptions(self) -> Any:
+		"""查询服务器端当前订阅（仅支持有回执的协议）"""
+		if self._ws is None or not self.protocol.acknowledges:
+			return None
+		ack = await self.request({"method": "LIST_SUBSCRIPTIONS"})
+		return ack.get("result") if ack else None
+
+
+# 共享连接：同一事件循环内同一地址（同一账户）只保持一个连接
+_shared: Dict[Tuple[int, str, Any, Any], WSConnectionManager] = {}
+
+
+def _shared_key(base_url: str, protocol_factory: Callable[[], WSProtocol], scope: Any) -> Tuple[int, str, Any, Any]:
+	return id(asyncio.get_running_loop()), base_url.rstrip("/"), protocol_factory, scope
+
+
+def shared_manager(base_url: str, protocol_factory: Callable[[], WSProtocol], scope: Any = None,
+				   **kwargs: Any) -> WSConnectionManager:
+	"""
+	获取（或创建）某个地址的共享连接管理器，供多个 DAO/调用方复用同一个长连接
+
+	连接按事件循环、协议和 scope（如私有流的账户公钥）隔离；管理器需要调用方 await start() 启动
+	"""
+	key = _shared_key(base_url, protocol_factory, scope)
+	mgr = _shared.get(key)
+	if mgr is None:
+		mgr = _shared[key] = WSConnectionManager(base_url, protocol_factory(), **kwargs)
+	return mgr
+
+
+def find_shared_manager(base_url: str, protocol_factory: Callable[[], WSProtocol],
+						scope: Any = None) -> Optional[WSConnectionManager]:
+	"""已创建的共享连接管理器（不存在时返回 None，不会新建）"""
+	return _shared.get(_shared_key(base_url, protocol_factory, scope))
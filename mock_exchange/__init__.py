@@ -0,0 +1,4 @@
+# 本地模拟交易所（Aster 合约 + Backpack），用于离线联调与压测
+from .server import DEFAULT_MARKETS, MockExchange
+
+__all__ = ["MockExchange", "DEFAULT_MARKETS"]
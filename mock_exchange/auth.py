@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from nacl import signing
+from nacl.exceptions import BadSignatureError
+
+
+class AuthError(Exception):
+	"""鉴权失败，携带交易所格式的错误码"""
+
+	def __init__(self, status: int, code: Any, message: str):
+		super().__init__(message)
+		self.status = status
+		self.code = code
+		self.message = message
+
+
+def _strip_signature(raw: str) -> Tuple[str, Optional[str]]:
+	"""从原始查询串/表单中去掉 signature=...，返回 (剩余原文, 签名)"""
+	if not raw:
+		return "", None
+	kept: List[str] = []
+	signature = None
+	for part in raw.split("&"):
+		if part.startswith("signature="):
+			signature = part[len("signature="):]
+		else:
+			kept.append(part)
+	return "&".join(kept), signature
+
+
+def verify_aster_hmac(secrets: Dict[str, str], api_key: Optional[str], query: str, body: str,
+					  now_ms: Optional[int] = None) -> Dict[str, str]:
+	"""
+	按 Aster（Binance 风格）规则验证 HMAC SHA256 签名
+
+	签名原文为原始查询串与请求体直接拼接（totalParams），不做任何重新编码或排序；
+	同时校验 timestamp 是否在 recvWindow 内。返回解析后的参数。
+	"""
+	if not api_key or api_key not in secrets:
+		raise AuthError(401, -2015, "Invalid API-key, IP, or permissions for action.")
+	query_wo, sig_q = _strip_signature(query)
+	body_wo, sig_b = _strip_signature(body)
+	signature = sig_q or sig_b
+	if not signature:
+		raise AuthError(400, -1102, "Mandatory parameter 'signature' was not sent, was empty/null, or malformed.")
+	total = query_wo + body_wo
+	expected = hmac.new(secrets[api_key].encode("utf-8"), total.encode("utf-8"), hashlib.sha256).hexdigest()
+	if not hmac.compare_digest(expected, signature.lower()):
+		raise AuthError(400, -1022, "Signature for this request is not valid.")
+	params = dict(parse_qsl(query_wo, keep_blank_values=True))
+	params.update(parse_qsl(body_wo, keep_blank_values=True))
+	now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+	try:
+		ts = int(params.get("timestamp", ""))
+	except ValueError:
+		raise AuthError(400, -1102, "Mandatory parameter 'timestamp' was not sent, was empty/null, or malformed.")
+	recv_window = int(params.get("recvWindow", 5000))
+	if ts > now_ms + 1000 or now_ms - ts > recv_window:
+		raise AuthError(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+	return params
+
+
+def _bp_value(v: Any) -> str:
+	# Backpack 对布尔值使用小写
+	if isinstance(v, bool):
+		return "true" if v else "false"
+	return str(v)
+
+
+def _bp_qs(params: Dict[str, Any]) -> str:
+	return "&".join(f"{k}={_bp_value(params[k])}" for k in sorted(params) if params[k] is not None)
+
+
+def backpack_signing_payload(instruction: str, params: Any, timestamp: str, window: str) -> str:
+	"""按 Backpack 规则重建签名原文（批量下单时每个订单各带一次 instruction）"""
+	if isinstance(params, list):
+		parts = []
+		for item in params:
+			qs = _bp_qs(item)
+			parts.append(f"instruction={instruction}&{qs}" if qs else f"instruction={instruction}")
+		prefix = "&".join(parts)
+	else:
+		qs = _bp_qs(params or {})
+		prefix = f"instruction={instruction}&{qs}" if qs else f"instruction={instruction}"
+	return f"{prefix}&timestamp={timestamp}&window={window}"
+
+
+def verify_backpack_ed25519(public_keys: List[str], headers: Dict[str, str], instruction: str, params: Any,
+							now_ms: Optional[int] = None) -> str:
+	"""
+	按 Backpack 规则验证 ED25519 签名，返回调用方公钥（作为账户标识）
+
+	headers 的键需为小写
+	"""
+	api_key = headers.get("x-api-key")
+	signature_b64 = headers.get("x-signature")
+	timestamp = headers.get("x-timestamp")
+	window = headers.get("x-window") or "5000"
+	if not api_key or api_key not in public_keys:
+		raise AuthError(401, "UNAUTHORIZED", "Invalid API key")
+	if not signature_b64 or not timestamp:
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Missing signature headers")
+	payload = backpack_signing_payload(instruction, params, timestamp, window)
+	try:
+		verify_key = signing.VerifyKey(base64.b64decode(api_key))
+		verify_key.verify(payload.encode("utf-8"), base64.b64decode(signature_b64))
+	except (BadSignatureError, ValueError):
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Invalid signature, could not verify signature")
+	now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+	try:
+		ts, win = int(timestamp), int(window)
+	except ValueError:
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Invalid timestamp or window")
+	if win > 60000:
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Window must be at most 60000")
+	if ts + win < now_ms or ts > now_ms + 1000:
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Request has expired")
+	return api_key
+
+
+def verify_backpack_ws(public_keys: List[str], signature: List[str], params: List[str], now_ms: Optional[int] = None) -> str:
+	"""验证 Backpack WS 私有流订阅签名：[verifying_key, signature, timestamp, window]，instruction=subscribe"""
+	if not isinstance(signature, list) or len(signature) < 3:
+		raise AuthError(400, "INVALID_CLIENT_REQUEST", "Invalid signature array")
+	headers = {
+		"x-api-key": signature[0],
+		"x-signature": signature[1],
+		"x-timestamp": str(signature[2]),
+		"x-window": str(signature[3]) if len(signature) > 3 else "5000",
+	}
+	return verify_backpack_ed25519(public_keys, headers, "subscribe", {}, now_ms)
+
+
+def generate_backpack_keypair() -> Tuple[str, str]:
+	"""生成一对 Backpack 风格的 ED25519 密钥 (public_b64, secret_b64)"""
+	key = signing.SigningKey.generate()
+	return (
+		base64.b64encode(bytes(key.verify_key)).decode("ascii"),
+		base64.b64encode(bytes(key)).decode("ascii"),
+	)
+
+
+def parse_json_body(body: str) -> Any:
+	if not body:
+		return None
+	return json.loads(body)
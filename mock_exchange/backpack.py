@@ -0,0 +1,321 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .aster_futures import ApiError, MockRequest, fmt
+from .auth import AuthError, parse_json_body, verify_backpack_ed25519, verify_backpack_ws
+from .engine import Market, MatchingEngine, Order
+
+VENUE = "bp"
+
+_STATUS = {
+	"NEW": "New",
+	"PARTIALLY_FILLED": "PartiallyFilled",
+	"FILLED": "Filled",
+	"CANCELED": "Cancelled",
+	"EXPIRED": "Expired",
+}
+
+
+def _err(status: int, code: str, message: str) -> ApiError:
+	return ApiError(status, {"code": code, "message": message})
+
+
+class BackpackVenue:
+	"""
+	模拟 Backpack REST（/api/v1/...）与 WS 数据流，签名按 ED25519 规则校验
+
+	Args:
+		engine: 撮合引擎
+		public_keys: 允许访问的 API 公钥（base64）
+		verify_signatures: 是否校验签名
+	"""
+
+	def __init__(self, engine: MatchingEngine, public_keys: List[str], verify_signatures: bool = True):
+		self.engine = engine
+		self.public_keys = public_keys
+		self.verify_signatures = verify_signatures
+		# (method, path) -> (handler, instruction)
+		self.routes: Dict[Tuple[str, str], Tuple[Callable[..., Any], Optional[str]]] = {
+			("GET", "/api/v1/markets"): (self.markets, None),
+			("GET", "/api/v1/market"): (self.market, None),
+			("GET", "/api/v1/ticker"): (self.ticker, None),
+			("GET", "/api/v1/depth"): (self.depth, None),
+			("POST", "/api/v1/order"): (self.execute_one, "orderExecute"),
+			("POST", "/api/v1/orders"): (self.execute_batch, "orderExecute"),
+			("GET", "/api/v1/order"): (self.get_order, "orderQuery"),
+			("DELETE", "/api/v1/order"): (self.cancel_order, "orderCancel"),
+			("GET", "/api/v1/orders"): (self.open_orders, "orderQueryAll"),
+			("DELETE", "/api/v1/orders"): (self.cancel_all, "orderCancelAll"),
+			("GET", "/api/v1/position"): (self.positions, "positionQuery"),
+		}
+
+	def authenticate(self, req: MockRequest, instruction: Optional[str]) -> Tuple[Optional[str], Any]:
+		"""返回 (账户公钥, 请求参数)；GET 参数来自查询串，其余来自 JSON 请求体"""
+		if req.method == "GET":
+			payload: Any = dict(req.params)
+		else:
+			try:
+				payload = parse_json_body(req.body)
+			except ValueError:
+				raise _err(400, "INVALID_CLIENT_REQUEST", "Invalid JSON body")
+		if instruction is None:
+			return None, payload
+		if not self.verify_signatures:
+			return req.headers.get("x-api-key") or "anonymous", payload
+		try:
+			account = verify_backpack_ed25519(self.public_keys, req.headers, instruction, payload)
+		except AuthError as e:
+			raise _err(e.status, e.code, e.message)
+		return account, payload
+
+	# ---------- 工具 ----------
+
+	def _market(self, symbol: Optional[str]) -> Market:
+		market = self.engine.market(VENUE, symbol or "")
+		if market is None:
+			raise _err(400, "INVALID_MARKET", "Market not found")
+		return market
+
+	def order_json(self, order: Order) -> Dict[str, Any]:
+		m = self.engine.market(VENUE, order.symbol)
+		tick, step = (m.tick_size, m.step_size) if m else (0.0001, 0.01)
+		return {
+			"id": str(order.id),
+			"clientId": order.client_id,
+			"createdAt": order.created_ms,
+			"executedQuantity": fmt(order.filled, step),
+			"executedQuoteQuantity": f"{order.cum_quote:.8f}",
+			"orderType": "Limit" if order.type == "LIMIT" else "Market",
+			"price": fmt(order.price, tick) if order.price is not None else None,
+			"quantity": fmt(order.qty, step),
+			"reduceOnly": order.reduce_only,
+			"side": "Bid" if order.side == "BUY" else "Ask",
+			"status": _STATUS.get(order.status, order.status),
+			"symbol": order.symbol,
+			"timeInForce": order.time_in_force,
+			"postOnly": False,
+			"selfTradePrevention": "RejectTaker",
+		}
+
+	def _submit(self, account: str, body: Dict[str, Any]) -> Order:
+		if not isinstance(body, dict):
+			raise _err(400, "INVALID_CLIENT_REQUEST", "Invalid order payload")
+		market = self._market(body.get("symbol"))
+		side = {"Bid": "BUY", "Ask": "SELL"}.get(str(body.get("side")))
+		order_type = {"Limit": "LIMIT", "Market": "MARKET"}.get(str(body.get("orderType")))
+		if side is None or order_type is None:
+			raise _err(400, "INVALID_ORDER", "Invalid side or orderType")
+		try:
+			qty = float(body.get("quantity"))
+			price = float(body["price"]) if order_type == "LIMIT" else None
+		except (TypeError, ValueError, KeyError):
+			raise _err(400, "INVALID_ORDER", "Invalid price or quantity")
+		order, _ = self.engine.submit(
+			VENUE, account, market.symbol, side, order_type, qty, price,
+			client_id=body.get("clientId"), reduce_only=bool(body.get("reduceOnly", False)),
+			time_in_force=str(body.get("timeInForce") or "GTC"),
+		)
+		return order
+
+	# ---------- 行情 ----------
+
+	def _market_json(self, m: Market) -> Dict[str, Any]:
+		return {
+			"symbol": m.symbol,
+			"baseSymbol": m.symbol.split("_")[0],
+			"quoteSymbol": m.symbol.split("_")[1] if "_" in m.symbol else "USDC",
+			"marketType": "PERP" if m.symbol.endswith("_PERP") else "SPOT",
+			"filters": {
+				"price": {"tickSize": fmt(m.tick_size, m.tick_size), "minPrice": fmt(m.tick_size, m.tick_size)},
+				"quantity": {"stepSize": fmt(m.step_size, m.step_size), "minQuantity": fmt(m.step_size, m.step_size)},
+			},
+			"orderBookState": "Open",
+			"visible": True,
+		}
+
+	def markets(self, req: MockRequest, payload: Any) -> List[Dict[str, Any]]:
+		return [self._market_json(m) for (v, _), m in self.engine.markets.items() if v == VENUE]
+
+	def market(self, req: MockRequest, payload: Any) -> Dict[str, Any]:
+		return self._market_json(self._market(req.params.get("symbol")))
+
+	def ticker(self, req: MockRequest, payload: Any) -> Dict[str, Any]:
+		m = self._market(req.params.get("symbol"))
+		change = m.last_price - m.open_price
+		return {
+			"symbol": m.symbol,
+			"firstPrice": fmt(m.open_price, m.tick_size),
+			"lastPrice": fmt(m.last_price, m.tick_size),
+			"priceChange": fmt(change, m.tick_size),
+			"priceChangePercent": f"{(change / m.open_price) if m.open_price else 0:.6f}",
+			"high": fmt(m.high, m.tick_size),
+			"low": fmt(m.low, m.tick_size),
+			"volume": fmt(m.volume, m.step_size),
+			"quoteVolume": f"{m.quote_volume:.4f}",
+			"trades": str(m.trade_count),
+		}
+
+	def depth(self, req: MockRequest, payload: Any) -> Dict[str, Any]:
+		m = self._market(req.params.get("symbol"))
+		bids, asks = m.depth(int(req.params.get("limit", 20)))
+		return {
+			# Backpack 深度：买卖盘均按价格升序
+			"asks": [[fmt(p, m.tick_size), fmt(q, m.step_size)] for p, q in asks],
+			"bids": [[fmt(p, m.tick_size), fmt(q, m.step_size)] for p, q in reversed(bids)],
+			"lastUpdateId": str(m.update_id),
+			"timestamp": int(time.time() * 1_000_000),
+		}
+
+	# ---------- 交易 ----------
+
+	def execute_one(self, req: MockRequest, payload: Any, account: str) -> Dict[str, Any]:
+		return self.order_json(self._submit(account, payload))
+
+	def execute_batch(self, req: MockRequest, payload: Any, account: str) -> List[Any]:
+		if not isinstance(payload, list) or not payload:
+			raise _err(400, "INVALID_CLIENT_REQUEST", "Expected a list of orders")
+		out: List[Any] = []
+		for item in payload:
+			try:
+				out.append(self.order_json(self._submit(account, item)))
+			except ApiError as e:
+				out.append(e.payload)
+		return out
+
+	def _find_open(self, account: str, p: Dict[str, Any]) -> Order:
+		order = None
+		if p.get("orderId"):
+			try:
+				order = self.engine.orders.get(int(p["orderId"]))
+			except ValueError:
+				order = None
+		elif p.get("clientId") is not None:
+			cid = str(p["clientId"])
+			order = next((o for o in self.engine.orders.values() if str(o.client_id) == cid and o.account == account), None)
+		# Backpack 只返回仍在盘口上的订单，成交/撤销后返回 404
+		if order is None or order.account != account or not order.is_open or self.engine.market(VENUE, order.symbol) is None:
+			raise _err(404, "RESOURCE_NOT_FOUND", "Order not found")
+		return order
+
+	def get_order(self, req: MockRequest, payload: Any, account: str) -> Dict[str, Any]:
+		return self.order_json(self._find_open(account, payload or {}))
+
+	def cancel_order(self, req: MockRequest, payload: Any, account: str) -> Dict[str, Any]:
+		order = self._find_open(account, payload or {})
+		self.engine.cancel(order.id)
+		return self.order_json(order)
+
+	def open_orders(self, req: MockRequest, payload: Any, account: str) -> List[Dict[str, Any]]:
+		return [self.order_json(o) for o in self.engine.open_orders(VENUE, account, (payload or {}).get("symbol"))]
+
+	def cancel_all(self, req: MockRequest, payload: Any, account: str) -> List[Dict[str, Any]]:
+		m = self._market((payload or {}).get("symbol"))
+		return [self.order_json(o) for o in self.engine.cancel_all(VENUE, account, m.symbol)]
+
+	def positions(self, req: MockRequest, payload: Any, account: str) -> List[Dict[str, Any]]:
+		symbol = (payload or {}).get("symbol")
+		out = []
+		for (v, sym), m in self.engine.markets.items():
+			if v != VENUE or (symbol and sym != symbol):
+				continue
+			pos = self.engine.position(VENUE, account, sym)
+			if pos.qty == 0 and pos.realized_pnl == 0:
+				continue
+			out.append({
+				"symbol": sym,
+				"netQuantity": fmt(pos.qty, m.step_size),
+				"netExposureQuantity": fmt(abs(pos.qty), m.step_size),
+				"netExposureNotional": f"{abs(pos.qty) * m.mid:.4f}",
+				"netCost": f"{pos.qty * pos.entry_price:.4f}",
+				"entryPrice": fmt(pos.entry_price, m.tick_size),
+				"breakEvenPrice": fmt(pos.entry_price, m.tick_size),
+				"markPrice": fmt(m.mid, m.tick_size),
+				"estLiquidationPrice": "0",
+				"pnlRealized": f"{pos.realized_pnl:.4f}",
+				"pnlUnrealized": f"{pos.qty * (m.mid - pos.entry_price):.4f}",
+				"cumulativeFundingPayment": "0",
+				"positionId": f"{account[:8]}-{sym}",
+			})
+		return out
+
+	# ---------- WS 数据流 ----------
+
+	def verify_ws_subscription(self, signature: Any) -> str:
+		if not self.verify_signatures:
+			return signature[0] if signature else "anonymous"
+		try:
+			return verify_backpack_ws(self.public_keys, signature, [])
+		except AuthError as e:
+			raise _err(e.status, e.code, e.message)
+
+	def stream_payloads(self, streams: List[str], kind: str, market: Optional[Market]) -> List[Tuple[str, Any]]:
+		now_us = int(time.time() * 1_000_000)
+		out: List[Tuple[str, Any]] = []
+		for stream in streams:
+			channel, _, sym = stream.partition(".")
+			if kind == "timer":
+				m = self.engine.market(VENUE, sym)
+				if m is None:
+					continue
+				if channel == "markPrice":
+					out.append((stream, {
+						"e": "markPrice", "E": now_us, "s": m.symbol, "p": fmt(m.mid, m.tick_size),
+						"f": "0.0001", "i": fmt(m.mid, m.tick_size), "n": (now_us // 1000 // 28800000 + 1) * 28800000, "T": now_us,
+					}))
+				elif channel == "ticker":
+					out.append((stream, {
+						"e": "ticker", "E": now_us, "s": m.symbol, "o": fmt(m.open_price, m.tick_size),
+						"c": fmt(m.last_price, m.tick_size), "h": fmt(m.high, m.tick_size), "l": fmt(m.low, m.tick_size),
+						"v": fmt(m.volume, m.step_size), "V": f"{m.quote_volume:.4f}", "n": m.trade_count,
+					}))
+				continue
+			if market is None or market.venue != VENUE or market.symbol != sym or kind != "book":
+				continue
+			if channel == "bookTicker":
+				out.append((stream, {
+					"e": "bookTicker", "E": now_us, "s": market.symbol,
+					"a": fmt(market.best_ask(), market.tick_size), "A": fmt(market.level_qty, market.step_size),
+					"b": fmt(market.best_bid(), market.tick_size), "B": fmt(market.level_qty, market.step_size),
+					"u": market.update_id, "T": now_us,
+				}))
+			elif channel == "depth":
+				bids, asks = market.depth(20)
+				out.append((stream, {
+					"e": "depth", "E": now_us, "s": market.symbol,
+					"a": [[fmt(p, market.tick_size), fmt(q, market.step_size)] for p, q in asks],
+					"b": [[fmt(p, market.tick_size), fmt(q, market.step_size)] for p, q in bids],
+					"U": market.update_id, "u": market.update_id, "T": now_us,
+				}))
+		return out
+
+	def trade_payloads(self, streams: List[str], trade: Dict[str, Any], market: Market) -> List[Tuple[str, Any]]:
+		stream = f"trade.{market.symbol}"
+		if stream not in streams:
+			return []
+		now_us = int(time.time() * 1_000_000)
+		return [(stream, {
+			"e": "trade", "E": now_us, "s": market.symbol,
+			"p": fmt(trade["price"], market.tick_size), "q": fmt(trade["qty"], market.step_size),
+			"b": "0", "a": "0", "t": trade["trade_id"], "T": now_us, "m": trade["buyer_maker"],
+		})]
+
+	def order_update(self, order: Order, fill: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+		"""account.orderUpdate 私有推送"""
+		m = self.engine.market(VENUE, order.symbol)
+		tick, step = (m.tick_size, m.step_size) if m else (0.0001, 0.01)
+		now_us = int(time.time() * 1_000_000)
+		if fill:
+			event = "orderFill"
+		elif order.status == "CANCELED":
+			event = "orderCancelled"
+		else:
+			event = "orderAccepted"
+		return {
+			"e": event, "E": now_us, "s": order.symbol, "c": order.client_id,
+			"S": "Bid" if order.side == "BUY" else "Ask", "o": order.type, "f": order.time_in_force,
+			"q": fmt(order.qty, step), "p": fmt(order.price or 0.0, tick),
+			"X": _STATUS.get(order.status, order.status), "i": str(order.id),
+			"z": fmt(order.filled, step), "Z": f"{order.cum_quote:.8f}",
+			"l": fmt(fill["qty"], step) if fill else "0", "L": fmt(fill["price"], tick) if fill else "0",
+			"m": bool(fill and fill["is_maker"]), "t": fill["trade_id"] if fill else None, "T": now_us,
+		}
@@ -0,0 +1,312 @@
+import itertools
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+def _round_to(value: float, step: float) -> float:
+	if step <= 0:
+		return value
+	return round(round(value / step) * step, 12)
+
+
+class Order:
+	"""撮合引擎内部订单（与交易所无关，由各交易所路由转换为各自的返回格式）"""
+
+	__slots__ = (
+		"id", "client_id", "account", "symbol", "side", "type", "price", "qty",
+		"filled", "cum_quote", "status", "reduce_only", "time_in_force", "created_ms", "updated_ms",
+	)
+
+	def __init__(self, id: int, account: str, symbol: str, side: str, type: str, qty: float,
+				 price: Optional[float] = None, client_id: Optional[str] = None,
+				 reduce_only: bool = False, time_in_force: str = "GTC"):
+		self.id = id
+		self.client_id = client_id
+		self.account = account
+		self.symbol = symbol
+		self.side = side  # BUY / SELL
+		self.type = type  # LIMIT / MARKET
+		self.price = price
+		self.qty = qty
+		self.filled = 0.0
+		self.cum_quote = 0.0
+		self.status = "NEW"  # NEW / PARTIALLY_FILLED / FILLED / CANCELED / EXPIRED
+		self.reduce_only = reduce_only
+		self.time_in_force = time_in_force
+		self.created_ms = int(time.time() * 1000)
+		self.updated_ms = self.created_ms
+
+	@property
+	def remaining(self) -> float:
+		return max(0.0, self.qty - self.filled)
+
+	@property
+	def avg_price(self) -> float:
+		return self.cum_quote / self.filled if self.filled > 0 else 0.0
+
+	@property
+	def is_open(self) -> bool:
+		return self.status in ("NEW", "PARTIALLY_FILLED")
+
+
+class Fill:
+	__slots__ = ("trade_id", "order_id", "account", "symbol", "side", "price", "qty", "is_maker", "ts_ms")
+
+	def __init__(self, trade_id: int, order: Order, price: float, qty: float, is_maker: bool):
+		self.trade_id = trade_id
+		self.order_id = order.id
+		self.account = order.account
+		self.symbol = order.symbol
+		self.side = order.side
+		self.price = price
+		self.qty = qty
+		self.is_maker = is_maker
+		self.ts_ms = int(time.time() * 1000)
+
+
+class Position:
+	__slots__ = ("qty", "entry_price", "realized_pnl")
+
+	def __init__(self):
+		self.qty = 0.0  # 带符号：多为正，空为负
+		self.entry_price = 0.0
+		self.realized_pnl = 0.0
+
+	def apply(self, side: str, price: float, qty: float) -> None:
+		signed = qty if side == "BUY" else -qty
+		if self.qty == 0 or (self.qty > 0) == (signed > 0):
+			new_qty = self.qty + signed
+			self.entry_price = (abs(self.qty) * self.entry_price + qty * price) / abs(new_qty)
+			self.qty = new_qty
+			return
+		closing = min(abs(signed), abs(self.qty))
+		direction = 1.0 if self.qty > 0 else -1.0
+		self.realized_pnl += closing * (price - self.entry_price) * direction
+		new_qty = self.qty + signed
+		if abs(new_qty) < 1e-12:
+			self.qty, self.entry_price = 0.0, 0.0
+		elif (new_qty > 0) != (self.qty > 0):
+			# 反手：剩余部分以成交价开新仓
+			self.qty, self.entry_price = new_qty, price
+		else:
+			self.qty = new_qty
+
+
+class Market:
+	"""
+	单个交易对：合成做市深度 + 用户挂单
+
+	合成深度围绕 mid 价对称分布，每档 level_qty；用户限价单价格被
+	对手方最优价穿过时按挂单价成交（maker），市价单逐档吃合成深度（taker）
+	"""
+
+	def __init__(self, venue: str, symbol: str, price: float, tick_size: float = 0.0001,
+				 step_size: float = 0.01, spread_bps: float = 2.0, levels: int = 20,
+				 level_qty: float = 500.0, level_step_bps: float = 1.0):
+		self.venue = venue
+		self.symbol = symbol
+		self.mid = price
+		self.tick_size = tick_size
+		self.step_size = step_size
+		self.spread_bps = spread_bps
+		self.levels = levels
+		self.level_qty = level_qty
+		self.level_step_bps = level_step_bps
+		self.last_price = price
+		self.open_price = price
+		self.high = price
+		self.low = price
+		self.volume = 0.0
+		self.quote_volume = 0.0
+		self.trade_count = 0
+		self.update_id = 1
+		self.orders: Dict[int, Order] = {}
+
+	def best_bid(self) -> float:
+		return _round_to(self.mid * (1 - self.spread_bps / 20000.0), self.tick_size)
+
+	def best_ask(self) -> float:
+		ask = _round_to(self.mid * (1 + self.spread_bps / 20000.0), self.tick_size)
+		return max(ask, self.best_bid() + self.tick_size)
+
+	def synthetic_levels(self, side: str, n: Optional[int] = None) -> List[Tuple[float, float]]:
+		"""合成深度：side=BUY 返回卖盘（吃单方向），side=SELL 返回买盘"""
+		n = n or self.levels
+		out = []
+		for i in range(n):
+			if side == "BUY":
+				px = _round_to(self.best_ask() * (1 + i * self.level_step_bps / 10000.0), self.tick_size)
+			else:
+				px = _round_to(self.best_bid() * (1 - i * self.level_step_bps / 10000.0), self.tick_size)
+			out.append((px, self.level_qty))
+		return out
+
+	def depth(self, limit: int = 20) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+		"""合并用户挂单后的深度 (bids, asks)"""
+		bids: Dict[float, float] = dict(self.synthetic_levels("SELL", limit))
+		asks: Dict[float, float] = dict(self.synthetic_levels("BUY", limit))
+		for o in self.orders.values():
+			if not o.is_open or o.price is None:
+				continue
+			book = bids if o.side == "BUY" else asks
+			book[o.price] = book.get(o.price, 0.0) + o.remaining
+		bid_list = sorted(bids.items(), key=lambda x: -x[0])[:limit]
+		ask_list = sorted(asks.items(), key=lambda x: x[0])[:limit]
+		return bid_list, ask_list
+
+	def record_trade(self, price: float, qty: float) -> None:
+		self.last_price = price
+		self.high = max(self.high, price)
+		self.low = min(self.low, price)
+		self.volume += qty
+		self.quote_volume += qty * price
+		self.trade_count += 1
+
+
+class MatchingEngine:
+	"""
+	简单撮合引擎：维护各交易所的交易对、订单、持仓，并驱动价格随机游走
+
+	所有方法都在同一个事件循环线程中调用，无需加锁
+
+	Args:
+		volatility_bps: 每个价格步的波动（基点，正态分布标准差）
+		basis_bps: 各交易对相对公共价格的独立噪声（基点）
+		seed: 随机种子，便于复现
+	"""
+
+	def __init__(self, volatility_bps: float = 3.0, basis_bps: float = 0.5, seed: Optional[int] = None,
+				 initial_balance: float = 10000.0):
+		self.markets: Dict[Tuple[str, str], Market] = {}
+		self.orders: Dict[int, Order] = {}
+		self.positions: Dict[Tuple[str, str, str], Position] = {}
+		self.volatility_bps = volatility_bps
+		self.basis_bps = basis_bps
+		self.initial_balance = initial_balance
+		self.rng = random.Random(seed)
+		self._order_ids = itertools.count(int(time.time() * 1000) * 10)
+		self._trade_ids = itertools.count(1)
+		# 事件监听（WS 推送、统计等）：callback(kind, payload)
+		self.listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+		# 事件日志供压测统计：(序号, monotonic, kind, data)
+		self.event_log: Deque[Tuple[int, float, str, Dict[str, Any]]] = deque(maxlen=200000)
+		self._event_seq = itertools.count(1)
+
+	def add_market(self, market: Market) -> None:
+		self.markets[(market.venue, market.symbol)] = market
+
+	def market(self, venue: str, symbol: str) -> Optional[Market]:
+		return self.markets.get((venue, symbol))
+
+	def position(self, venue: str, account: str, symbol: str) -> Position:
+		key = (venue, account, symbol)
+		pos = self.positions.get(key)
+		if pos is None:
+			pos = self.positions[key] = Position()
+		return pos
+
+	def _emit(self, kind: str, payload: Dict[str, Any]) -> None:
+		self.event_log.append((next(self._event_seq), time.monotonic(), kind, payload))
+		for listener in self.listeners:
+			listener(kind, payload)
+
+	def _fill(self, market: Market, order: Order, price: float, qty: float, is_maker: bool) -> Fill:
+		order.filled += qty
+		order.cum_quote += qty * price
+		order.status = "FILLED" if order.remaining <= 1e-12 else "PARTIALLY_FILLED"
+		order.updated_ms = int(time.time() * 1000)
+		market.record_trade(price, qty)
+		market.update_id += 1
+		self.position(market.venue, order.account, order.symbol).apply(order.side, price, qty)
+		fill = Fill(next(self._trade_ids), order, price, qty, is_maker)
+		self._emit("fill", {
+			"venue": market.venue, "account": order.account, "symbol": order.symbol, "order_id": order.id,
+			"side": order.side, "price": price, "qty": qty, "is_maker": is_maker, "trade_id": fill.trade_id,
+			"order_type": order.type, "status": order.status,
+		})
+		return fill
+
+	def submit(self, venue: str, account: str, symbol: str, side: str, order_type: str, qty: float,
+			   price: Optional[float] = None, client_id: Optional[str] = None, reduce_only: bool = False,
+			   time_in_force: str = "GTC") -> Tuple[Order, List[Fill]]:
+		market = self.markets[(venue, symbol)]
+		order = Order(next(self._order_ids), account, symbol, side, order_type, qty, price, client_id, reduce_only, time_in_force)
+		self.orders[order.id] = order
+		self._emit("order", {
+			"venue": venue, "account": account, "symbol": symbol, "order_id": order.id,
+			"side": side, "type": order_type, "price": price, "qty": qty,
+		})
+		fills: List[Fill] = []
+		# 吃合成深度
+		for level_px, level_qty in market.synthetic_levels(side):
+			if order.remaining <= 1e-12:
+				break
+			if order_type == "LIMIT" and price is not None:
+				if (side == "BUY" and level_px > price) or (side == "SELL" and level_px < price):
+					break
+			fills.append(self._fill(market, order, level_px, min(level_qty, order.remaining), is_maker=False))
+		if order.remaining > 1e-12:
+			if order_type == "MARKET" or time_in_force in ("IOC", "FOK"):
+				# 市价单吃完合成深度仍有剩余、或 IOC/FOK 无法全部成交：剩余部分过期
+				order.status = "EXPIRED"
+			else:
+				market.orders[order.id] = order
+		return order, fills
+
+	def cancel(self, order_id: int) -> Optional[Order]:
+		order = self.orders.get(order_id)
+		if order is None or not order.is_open:
+			return None
+		order.status = "CANCELED"
+		order.updated_ms = int(time.time() * 1000)
+		venue = None
+		for market in self.markets.values():
+			if market.orders.pop(order_id, None) is not None:
+				venue = market.venue
+		self._emit("cancel", {"venue": venue, "account": order.account, "symbol": order.symbol, "order_id": order_id})
+		return order
+
+	def cancel_all(self, venue: str, account: str, symbol: str) -> List[Order]:
+		market = self.markets.get((venue, symbol))
+		if market is None:
+			return []
+		ids = [o.id for o in market.orders.values() if o.account == account and o.is_open]
+		return [o for o in (self.cancel(i) for i in ids) if o is not None]
+
+	def open_orders(self, venue: str, account: str, symbol: Optional[str] = None) -> List[Order]:
+		out = []
+		for (v, sym), market in self.markets.items():
+			if v != venue or (symbol and sym != symbol):
+				continue
+			out.extend(o for o in market.orders.values() if o.account == account and o.is_open)
+		return out
+
+	def step(self) -> List[Fill]:
+		"""推进一个价格步：公共随机游走 + 各交易对独立噪声，撮合被穿价的用户挂单"""
+		common = self.rng.gauss(0.0, self.volatility_bps / 10000.0)
+		fills: List[Fill] = []
+		for market in self.markets.values():
+			noise = self.rng.gauss(0.0, self.basis_bps / 10000.0)
+			market.mid *= math.exp(common + noise)
+			market.update_id += 1
+			# 模拟其他参与者的成交
+			trade_side = "BUY" if self.rng.random() < 0.5 else "SELL"
+			trade_px = market.best_ask() if trade_side == "BUY" else market.best_bid()
+			trade_qty = _round_to(self.rng.uniform(0.1, 2.0) * market.level_qty / 10, market.step_size) or market.step_size
+			market.record_trade(trade_px, trade_qty)
+			self._emit("public_trade", {
+				"venue": market.venue, "symbol": market.symbol, "price": trade_px, "qty": trade_qty,
+				"buyer_maker": trade_side == "SELL", "trade_id": next(self._trade_ids),
+			})
+			bid, ask = market.best_bid(), market.best_ask()
+			for order in list(market.orders.values()):
+				if order.price is None or not order.is_open:
+					continue
+				if (order.side == "SELL" and bid >= order.price) or (order.side == "BUY" and ask <= order.price):
+					fills.append(self._fill(market, order, order.price, order.remaining, is_maker=True))
+					market.orders.pop(order.id, None)
+			self._emit("book", {"venue": market.venue, "symbol": market.symbol})
+		return fills
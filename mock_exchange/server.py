@@ -0,0 +1,431 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlsplit
+
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from .aster_futures import ApiError, AsterFuturesVenue, MockRequest
+from .backpack import BackpackVenue
+from .engine import Market, MatchingEngine
+
+
+DEFAULT_MARKETS: List[Dict[str, Any]] = [
+	{"venue": "aster", "symbol": "ASTERUSDT", "price": 1.5, "tick_size": 0.0001, "step_size": 0.01},
+	{"venue": "bp", "symbol": "ASTER_USDC_PERP", "price": 1.5, "tick_size": 0.0001, "step_size": 0.01},
+]
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class _WsConn:
+	"""单个 WS 连接的订阅状态与发送队列（按到达时间顺序发送，模拟推送延迟）"""
+
+	def __init__(self, ws: ServerConnection, venue: str, combined: bool, streams: List[str]):
+		self.ws = ws
+		self.venue = venue
+		self.combined = combined
+		self.streams: List[str] = list(streams)
+		# 私有流：账户 -> 推送时使用的 stream 名
+		self.private: Dict[str, str] = {}
+		self.queue: "asyncio.Queue[Tuple[float, str]]" = asyncio.Queue()
+
+	def subscribe(self, streams: List[str]) -> None:
+		for s in streams:
+			if s not in self.streams:
+				self.streams.append(s)
+
+	def unsubscribe(self, streams: List[str]) -> None:
+		self.streams = [s for s in self.streams if s not in streams]
+		self.private = {a: s for a, s in self.private.items() if s not in streams}
+
+
+class MockExchange:
+	"""
+	本地模拟交易所：Aster 合约 + Backpack 的 REST 与 WS，一个撮合引擎
+
+	REST 按路径前缀分发：/fapi/... -> Aster 合约，/api/... 与 /wapi/... -> Backpack；
+	WS 端口上 /ws、/ws/<streams>、/stream?streams= 为 Aster，根路径 / 为 Backpack。
+	/mock/stats、/mock/events 提供请求计数和事件日志，供压测统计使用。
+
+	Args:
+		host: 监听地址
+		http_port / ws_port: 端口，0 表示随机分配
+		latency_ms: REST 往返延迟（毫秒），请求前后各一半
+		jitter_ms: 延迟抖动（毫秒，均匀分布）
+		ws_latency_ms: WS 推送延迟，默认取 latency_ms 的一半
+		tick_interval: 价格步间隔（秒）
+		timer_interval: markPrice / ticker 等定时推送间隔（秒）
+		verify_signatures: 是否校验签名
+		aster_keys: {api_key: api_secret}
+		bp_public_keys: 允许的 Backpack 公钥列表
+		markets: 交易对配置，默认 DEFAULT_MARKETS
+		seed: 随机种子
+	"""
+
+	def __init__(self, host: str = "127.0.0.1", http_port: int = 0, ws_port: int = 0,
+				 latency_ms: float = 0.0, jitter_ms: float = 0.0, ws_latency_ms: Optional[float] = None,
+				 tick_interval: float = 0.2, timer_interval: float = 1.0, verify_signatures: bool = True,
+				 aster_keys: Optional[Dict[str, str]] = None, bp_public_keys: Optional[List[str]] = None,
+				 markets: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None,
+				 volatility_bps: float = 3.0, basis_bps: float = 0.5):
+		self.host = host
+		self.http_port = http_port
+		self.ws_port = ws_port
+		self.latency_ms = latency_ms
+		self.jitter_ms = jitter_ms
+		self.ws_latency_ms = ws_latency_ms if ws_latency_ms is not None else latency_ms / 2.0
+		self.tick_interval = tick_interval
+		self.timer_interval = timer_interval
+		self.rng = random.Random(seed)
+		self.engine = MatchingEngine(volatility_bps=volatility_bps, basis_bps=basis_bps, seed=seed)
+		for m in markets or DEFAULT_MARKETS:
+			cfg = dict(m)
+			self.engine.add_market(Market(cfg.pop("venue"), cfg.pop("symbol"), float(cfg.pop("price")), **cfg))
+		self.aster = AsterFuturesVenue(self.engine, aster_keys or {}, verify_signatures)
+		self.bp = BackpackVenue(self.engine, bp_public_keys or [], verify_signatures)
+		self.engine.listeners.append(self._on_engine_event)
+		self.request_counts: Counter = Counter()
+		self.status_counts: Counter = Counter()
+		self.ws_messages_sent = 0
+		self._conns: Set[_WsConn] = set()
+		self._http_tasks: Set[asyncio.Task] = set()
+		self._http_server: Optional[asyncio.AbstractServer] = None
+		self._ws_server: Any = None
+		self._tasks: List[asyncio.Task] = []
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._thread: Optional[threading.Thread] = None
+		self._started = time.monotonic()
+
+	# ---------- 生命周期 ----------
+
+	@property
+	def http_url(self) -> str:
+		return f"http://{self.host}:{self.http_port}"
+
+	@property
+	def ws_url(self) -> str:
+		return f"ws://{self.host}:{self.ws_port}"
+
+	async def start(self) -> None:
+		self._loop = asyncio.get_running_loop()
+		self._http_server = await asyncio.start_server(self._handle_http, self.host, self.http_port)
+		self.http_port = self._http_server.sockets[0].getsockname()[1]
+		self._ws_server = await serve(self._handle_ws, self.host, self.ws_port, ping_interval=None)
+		self.ws_port = next(iter(self._ws_server.sockets)).getsockname()[1]
+		self._tasks = [asyncio.create_task(self._tick_loop()), asyncio.create_task(self._timer_loop())]
+
+	async def stop(self) -> None:
+		for task in self._tasks:
+			task.cancel()
+		await asyncio.gather(*self._tasks, return_exceptions=True)
+		self._tasks = []
+		# keep-alive 连接上的处理协程不会随 server.close() 结束，需要显式取消
+		for task in list(self._http_tasks):
+			task.cancel()
+		await asyncio.gather(*self._http_tasks, return_exceptions=True)
+		if self._ws_server is not None:
+			self._ws_server.close()
+			await self._ws_server.wait_closed()
+		if self._http_server is not None:
+			self._http_server.close()
+			await self._http_server.wait_closed()
+
+	async def serve_forever(self) -> None:
+		await self.start()
+		try:
+			await asyncio.Event().wait()
+		finally:
+			await self.stop()
+
+	def start_in_thread(self) -> "MockExchange":
+		"""在后台线程中运行（供同步脚本/压测使用），端口就绪后返回"""
+		ready = threading.Event()
+		errors: List[BaseException] = []
+
+		def _run() -> None:
+			loop = asyncio.new_event_loop()
+			asyncio.set_event_loop(loop)
+			try:
+				loop.run_until_complete(self.start())
+			except BaseException as e:
+				errors.append(e)
+				ready.set()
+				return
+			ready.set()
+			loop.run_forever()
+			loop.run_until_complete(self.stop())
+			loop.close()
+
+		self._thread = threading.Thread(target=_run, name="mock-exchange", daemon=True)
+		self._thread.start()
+		ready.wait()
+		if errors:
+			raise errors[0]
+		return self
+
+	def stop_thread(self) -> None:
+		if self._loop is not None and self._thread is not None:
+			self._loop.call_soon_threadsafe(self._loop.stop)
+			self._thread.join(timeout=5)
+			self._thread = None
+
+	# ---------- 延迟 ----------
+
+	def _delay(self, base_ms: float) -> float:
+		if base_ms <= 0 and self.jitter_ms <= 0:
+			return 0.0
+		return max(0.0, base_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+
+	# ---------- HTTP ----------
+
+	async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		task = asyncio.current_task()
+		self._http_tasks.add(task)
+		try:
+			while True:
+				request_line = await reader.readline()
+				if not request_line:
+					break
+				method, target, _ = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+				headers: Dict[str, str] = {}
+				while True:
+					line = await reader.readline()
+					if line in (b"\r\n", b"\n", b""):
+						break
+					name, _, value = line.decode("latin-1").partition(":")
+					headers[name.strip().lower()] = value.strip()
+				length = int(headers.get("content-length", "0") or 0)
+				body = (await reader.readexactly(length)).decode("utf-8") if length else ""
+				status, payload = await self._dispatch(method.upper(), target, headers, body)
+				data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+				keep_alive = headers.get("connection", "").lower() != "close"
+				head = (
+					f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+					f"Content-Type: application/json; charset=utf-8\r\n"
+					f"Content-Length: {len(data)}\r\n"
+					f"Date: {formatdate(usegmt=True)}\r\n"
+					f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+				)
+				writer.write(head.encode("latin-1") + data)
+				await writer.drain()
+				if not keep_alive:
+					break
+		except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+			pass
+		finally:
+			self._http_tasks.discard(task)
+			writer.close()
+
+	async def _dispatch(self, method: str, target: str, headers: Dict[str, str], body: str) -> Tuple[int, Any]:
+		parts = urlsplit(target)
+		path, query = parts.path, parts.query
+		if path.startswith("/mock/"):
+			return self._admin(path, dict(parse_qsl(query)))
+		await asyncio.sleep(self._delay(self.latency_ms / 2.0))
+		params = dict(parse_qsl(query, keep_blank_values=True))
+		if body and headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+			params.update(parse_qsl(body, keep_blank_values=True))
+		req = MockRequest(method, path, query, headers, body, params)
+		account: Optional[str] = None
+		venue = "aster" if path.startswith("/fapi/") else "bp"
+		try:
+			if venue == "aster":
+				handler = self.aster.routes.get((method, path))
+				if handler is None:
+					raise ApiError(404, {"code": -5000, "msg": f"Path {path} not found"})
+				account = self.aster.authenticate(req)
+				result = handler(req, account) if account is not None else handler(req)
+			else:
+				route = self.bp.routes.get((method, path))
+				if route is None:
+					raise ApiError(404, {"code": "NOT_FOUND", "message": f"Path {path} not found"})
+				handler, instruction = route
+				account, payload = self.bp.authenticate(req, instruction)
+				result = handler(req, payload, account) if instruction else handler(req, payload)
+			status = 200
+		except ApiError as e:
+			status, result = e.status, e.payload
+		except Exception as e:  # 模拟服务端内部错误，不让连接断开
+			status, result = 500, {"code": -1000, "msg": f"{type(e).__name__}: {e}"}
+		self.request_counts[f"{method} {path}"] += 1
+		self.status_counts[status] += 1
+		self.engine._emit("request", {
+			"venue": venue, "account": account, "method": method, "path": path, "status": status,
+			"latency_ms": round((time.monotonic() - req.received) * 1000.0, 3),
+		})
+		await asyncio.sleep(self._delay(self.latency_ms / 2.0))
+		return status, result
+
+	def _admin(self, path: str, q: Dict[str, str]) -> Tuple[int, Any]:
+		if path == "/mock/stats":
+			markets = {
+				f"{v}:{s}": {"mid": m.mid, "bid": m.best_bid(), "ask": m.best_ask(), "open_orders": len(m.orders)}
+				for (v, s), m in self.engine.markets.items()
+			}
+			return 200, {
+				"uptime_s": round(time.monotonic() - self._started, 3),
+				"requests": dict(self.request_counts),
+				"status": {str(k): v for k, v in self.status_counts.items()},
+				"ws_connections": len(self._conns),
+				"ws_messages_sent": self.ws_messages_sent,
+				"markets": markets,
+			}
+		if path == "/mock/events":
+			since = int(q.get("since", "0") or 0)
+			kinds = set(q["kinds"].split(",")) if q.get("kinds") else None
+			limit = int(q.get("limit", "10000") or 10000)
+			events = []
+			for seq, ts, kind, data in self.engine.event_log:
+				if seq <= since or (kinds and kind not in kinds):
+					continue
+				events.append({"seq": seq, "t": ts, "kind": kind, **data})
+				if len(events) >= limit:
+					break
+			return 200, {"now": time.monotonic(), "events": events}
+		return 404, {"code": "NOT_FOUND", "message": path}
+
+	# ---------- WS ----------
+
+	async def _handle_ws(self, ws: ServerConnection) -> None:
+		parts = urlsplit(ws.request.path)
+		if parts.path.startswith("/stream"):
+			streams = [s for s in ",".join(parse_qs(parts.query).get("streams", [])).replace(",", "/").split("/") if s]
+			conn = _WsConn(ws, "aster", True, streams)
+		elif parts.path.startswith("/ws"):
+			streams = [s for s in parts.path[len("/ws"):].split("/") if s]
+			conn = _WsConn(ws, "aster", False, streams)
+		else:
+			conn = _WsConn(ws, "bp", True, [])
+		for s in list(conn.streams):
+			self._attach_listen_key(conn, s)
+		self._conns.add(conn)
+		sender = asyncio.create_task(self._ws_sender(conn))
+		try:
+			async for raw in ws:
+				await self._on_ws_message(conn, raw)
+		except ConnectionClosed:
+			pass
+		finally:
+			self._conns.discard(conn)
+			sender.cancel()
+
+	def _attach_listen_key(self, conn: _WsConn, stream: str) -> None:
+		account = self.aster.listen_keys.get(stream)
+		if account is not None:
+			conn.private[account] = stream
+
+	async def _on_ws_message(self, conn: _WsConn, raw: Any) -> None:
+		try:
+			msg = json.loads(raw)
+		except ValueError:
+			return
+		method = str(msg.get("method", "")).upper()
+		params = [str(p) for p in msg.get("params") or []]
+		if conn.venue == "aster":
+			result: Any = None
+			if method == "SUBSCRIBE":
+				conn.subscribe(params)
+				for s in params:
+					self._attach_listen_key(conn, s)
+			elif method == "UNSUBSCRIBE":
+				conn.unsubscribe(params)
+			elif method == "LIST_SUBSCRIPTIONS":
+				result = list(conn.streams)
+			else:
+				self._enqueue(conn, json.dumps({"error": {"code": 2, "msg": f"Invalid request: unknown method {method}"}, "id": msg.get("id")}))
+				return
+			self._enqueue(conn, json.dumps({"result": result, "id": msg.get("id")}))
+			return
+		# Backpack：私有流（account.*）需要签名，公开流无确认消息
+		if method == "SUBSCRIBE":
+			private = [p for p in params if p.startswith("account.")]
+			if private:
+				try:
+					account = self.bp.verify_ws_subscription(msg.get("signature"))
+				except ApiError as e:
+					self._enqueue(conn, json.dumps({"error": e.payload, "id": msg.get("id")}))
+					return
+				for p in private:
+					conn.private[account] = p
+			conn.subscribe([p for p in params if not p.startswith("account.")])
+		elif method == "UNSUBSCRIBE":
+			conn.unsubscribe(params)
+
+	def _enqueue(self, conn: _WsConn, text: str) -> None:
+		conn.queue.put_nowait((time.monotonic() + self._delay(self.ws_latency_ms), text))
+
+	def _push(self, conn: _WsConn, stream: str, data: Any) -> None:
+		if conn.combined:
+			self._enqueue(conn, json.dumps({"stream": stream, "data": data}, separators=(",", ":")))
+		else:
+			self._enqueue(conn, json.dumps(data, separators=(",", ":")))
+
+	async def _ws_sender(self, conn: _WsConn) -> None:
+		try:
+			while True:
+				due, text = await conn.queue.get()
+				wait = due - time.monotonic()
+				if wait > 0:
+					await asyncio.sleep(wait)
+				await conn.ws.send(text)
+				self.ws_messages_sent += 1
+		except (ConnectionClosed, asyncio.CancelledError):
+			pass
+
+	def _venue_for(self, venue: str) -> Any:
+		return self.aster if venue == "aster" else self.bp
+
+	def _on_engine_event(self, kind: str, data: Dict[str, Any]) -> None:
+		if not self._conns:
+			return
+		if kind == "book":
+			market = self.engine.market(data["venue"], data["symbol"])
+			for conn in list(self._conns):
+				if conn.venue == data["venue"] and conn.streams:
+					for stream, payload in self._venue_for(conn.venue).stream_payloads(conn.streams, "book", market):
+						self._push(conn, stream, payload)
+		elif kind in ("public_trade", "fill"):
+			market = self.engine.market(data["venue"], data["symbol"])
+			trade = data
+			if kind == "fill":
+				# 买方为 maker <=> (买单且为 maker) 或 (卖单且为 taker)
+				trade = dict(data, buyer_maker=(data["side"] == "BUY") == data["is_maker"])
+			for conn in list(self._conns):
+				if conn.venue == data["venue"] and conn.streams and market is not None:
+					for stream, payload in self._venue_for(conn.venue).trade_payloads(conn.streams, trade, market):
+						self._push(conn, stream, payload)
+			if kind == "fill":
+				self._push_order_update(data, data)
+		elif kind in ("order", "cancel"):
+			self._push_order_update(data, None)
+
+	def _push_order_update(self, data: Dict[str, Any], fill: Optional[Dict[str, Any]]) -> None:
+		order = self.engine.orders.get(data["order_id"])
+		if order is None:
+			return
+		for conn in list(self._conns):
+			stream = conn.private.get(order.account)
+			if stream is None or conn.venue != data.get("venue"):
+				continue
+			self._push(conn, stream, self._venue_for(conn.venue).order_update(order, fill))
+
+	async def _tick_loop(self) -> None:
+		while True:
+			await asyncio.sleep(self.tick_interval)
+			self.engine.step()
+
+	async def _timer_loop(self) -> None:
+		while True:
+			await asyncio.sleep(self.timer_interval)
+			for conn in list(self._conns):
+				if conn.streams:
+					for stream, payload in self._venue_for(conn.venue).stream_payloads(conn.streams, "timer", None):
+						self._push(conn, stream, payload)
+
@@ -0,0 +1,209 @@
+"""
+对冲循环参数回测（common.backtest）：在录制的行情上同时评估多组
+offset_percent / max_order_wait_seconds / between_legs_sleep / cycle_sleep
+
+用法:
+	python scripts/backtest_hedge.py data/market --config config/hedge_futures.yaml
+	python scripts/backtest_hedge.py data/market --offset 0.05 0.1 0.2 0.3 --order-wait 3 5 10 20 \\
+		--between 0 5 20 --cycle-sleep 10 30 60 --top 20 --output logs/backtest.json
+	python scripts/backtest_hedge.py data/market --offset-range 0.02 0.5 0.02 --order-wait-range 1 30 1
+	python scripts/backtest_hedge.py data/market --offset-range 0.01 1 0.01 --order-wait-range 1 60 1 \\
+		--workers 8 --prune-fraction 0.25 --csv logs/sweep.csv   # 多进程扫描 + 提前淘汰
+
+参数网格为各参数取值的笛卡尔积；--*-range 为 起始 结束 步长（含结束值）。
+--workers 大于 1 或指定 --prune-fraction 时用 common.sweep 多进程扫描：行情网格写入 --grid-cache
+（默认临时目录）后各进程以 mmap 共享，结果按完成顺序汇总，可逐行写入 --csv。
+数量、交易对、轮询间隔、最长监控时间默认取配置文件的 trade / bp / aster 部分。
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import yaml
+
+from common.backtest import MarketGrid, param_grid, simulate, top
+from common.sweep import SweepSummary, run_sweep
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+	if not path:
+		return {}
+	p = Path(path)
+	if not p.exists():
+		raise FileNotFoundError(f"配置文件不存在: {p}")
+	with p.open("r", encoding="utf-8") as f:
+		return yaml.safe_load(f) or {}
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+	"""UTC ISO 时间或 Unix 秒 -> 纳秒"""
+	if not value:
+		return None
+	try:
+		return int(float(value) * 1e9)
+	except ValueError:
+		pass
+	dt = datetime.fromisoformat(value)
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=timezone.utc)
+	return int(dt.timestamp() * 1e9)
+
+
+def values_for(args: argparse.Namespace, name: str, default: float) -> List[float]:
+	rng = getattr(args, f"{name}_range")
+	if rng:
+		start, stop, step = rng
+		return [round(v, 10) for v in np.arange(start, stop + step / 2, step)]
+	return getattr(args, name) or [default]
+
+
+def build_params(args: argparse.Namespace, trade: Dict[str, Any]) -> Dict[str, np.ndarray]:
+	return param_grid(
+		offset_percent=values_for(args, "offset", float(trade.get("offset_percent", 0.2))),
+		max_order_wait_seconds=values_for(args, "order_wait", float(trade.get("max_order_wait_seconds", 10))),
+		between_legs_sleep=values_for(args, "between", float(trade.get("between_legs_sleep", 20))),
+		cycle_sleep=values_for(args, "cycle_sleep", float(trade.get("cycle_sleep", 60))),
+	)
+
+
+def format_row(row: Dict[str, Any]) -> str:
+	return (f"offset {row['offset_percent']:>6.3f}% wait {row['max_order_wait_seconds']:>5.1f}s "
+			f"between {row['between_legs_sleep']:>5.1f}s sleep {row['cycle_sleep']:>5.1f}s | "
+			f"PnL {row['pnl']:>+10.4f} 手续费 {row['fees']:>8.4f} 轮次 {row['completed_cycles']:>3}/{row['cycles']:<3} "
+			f"成交率 {row['fill_rate']:>6.1%} 重挂 {row['reprices']:>4} 超时 {row['leg1_timeouts']}/{row['leg2_timeouts']} "
+			f"未对冲 {row['unhedged_seconds']:>6.1f}s 滑点 {row['aster_slippage_bps']:>5.2f}bp")
+
+
+def progress_printer(interval: float):
+	state = {"last": 0.0}
+
+	def on_progress(summary: SweepSummary) -> None:
+		now = time.monotonic()
+		if now - state["last"] < interval:
+			return
+		state["last"] = now
+		m = summary.metrics()
+		best = summary.top(1)
+		best_pnl = f"{best[0]['pnl']:+.4f}" if best else "-"
+		print(f"  进度 {m['completed']}/{m['param_sets']}（淘汰 {m['pruned']}） {m['param_sets_per_minute']:,.0f} 组/分钟 "
+			  f"当前最优 PnL {best_pnl}")
+
+	return on_progress
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	cfg = load_config(args.config)
+	trade = cfg.get("trade") or {}
+	bp_symbol = args.bp_symbol or (cfg.get("bp") or {}).get("symbol", "ASTER_USDC_PERP")
+	aster_symbol = args.aster_symbol or (cfg.get("aster") or {}).get("symbol", "ASTERUSDT")
+	quantity = args.quantity or float(trade.get("quantity", 10))
+	poll = args.poll_interval or float(trade.get("poll_interval_seconds", 1))
+	monitor = args.max_monitor_seconds or float(trade.get("max_monitor_seconds", 300))
+
+	t0 = time.perf_counter()
+	grid = MarketGrid.from_segments(args.path, bp_symbol=bp_symbol, aster_symbol=aster_symbol, quantity=quantity,
+									dt=poll, start_ns=parse_time(args.start), end_ns=parse_time(args.end),
+									slippage_bps=args.slippage_bps)
+	load_s = time.perf_counter() - t0
+	params = build_params(args, trade)
+	n = len(params["offset_percent"])
+	print(f"{bp_symbol} / {aster_symbol} 数量 {quantity}，行情 {grid.duration / 3600:.2f} 小时（{len(grid)} 步，"
+		  f"步长 {poll}s，加载 {load_s:.2f}s），参数组 {n}")
+
+	sim_kwargs = {
+		"tick_size": args.tick_size, "max_monitor_seconds": monitor, "hedge_latency": args.hedge_latency,
+		"bp_maker_fee": args.bp_maker_fee, "bp_taker_fee": args.bp_taker_fee, "aster_taker_fee": args.aster_taker_fee,
+		"fill_on_touch": not args.strict_fills,
+	}
+	t0 = time.perf_counter()
+	sweep = None
+	if args.workers > 1 or args.prune_fraction > 0:
+		source = grid.save(args.grid_cache) if args.grid_cache else grid
+		sweep = run_sweep(source, params, workers=args.workers, chunk_size=args.chunk_size,
+						  prune_fraction=args.prune_fraction, prune_quantile=args.prune_quantile, max_loss=args.max_loss,
+						  sim_kwargs=sim_kwargs, csv_path=args.csv, on_progress=progress_printer(args.progress_interval))
+		results = sweep.table()
+	else:
+		results = simulate(grid, params, **sim_kwargs)
+	sim_s = time.perf_counter() - t0
+	rate = n / sim_s * 60 if sim_s > 0 else 0.0
+	print(f"回测用时 {sim_s:.2f}s，{rate:,.0f} 组参数/分钟")
+	if sweep is not None:
+		m = sweep.metrics()
+		print(f"任务 {m['tasks']} 个，淘汰 {m['pruned']} 组，CPU {m['cpu_s']:.1f}s，并行度 {m['parallelism']}")
+
+	best = top(results, args.top, by=args.sort)
+	print(f"按 {args.sort} 排序前 {len(best)} 组:")
+	for row in best:
+		print("  " + format_row(row))
+	return {
+		"bp_symbol": bp_symbol,
+		"aster_symbol": aster_symbol,
+		"quantity": quantity,
+		"poll_interval": poll,
+		"steps": len(grid),
+		"param_sets": n,
+		"simulate_seconds": round(sim_s, 3),
+		"param_sets_per_minute": round(rate, 1),
+		"sweep": sweep.metrics() if sweep is not None else None,
+		"top": best,
+	}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="对冲循环参数回测")
+	ap.add_argument("path", help="录制的段文件目录或单个 .seg 文件")
+	ap.add_argument("--config", help="对冲脚本配置（取交易对、数量、轮询间隔等默认值）")
+	ap.add_argument("--start", help="开始时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--end", help="结束时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--bp-symbol")
+	ap.add_argument("--aster-symbol")
+	ap.add_argument("--quantity", type=float)
+	ap.add_argument("--poll-interval", type=float, help="订单状态轮询间隔，即回测步长（秒）")
+	ap.add_argument("--max-monitor-seconds", type=float)
+	for name, label in (("offset", "挂单偏离百分比"), ("order-wait", "挂单等待秒数"),
+						("between", "两腿间隔秒数"), ("cycle-sleep", "轮次间隔秒数")):
+		ap.add_argument(f"--{name}", type=float, nargs="*", help=f"{label}的取值")
+		ap.add_argument(f"--{name}-range", type=float, nargs=3, metavar=("START", "STOP", "STEP"), help=f"{label}的范围")
+	ap.add_argument("--tick-size", type=float, default=0.0001, help="BP 价格步长")
+	ap.add_argument("--hedge-latency", type=float, default=0.2, help="发现成交到 Aster 对冲成交的延迟（秒）")
+	ap.add_argument("--slippage-bps", type=float, default=1.0, help="无深度数据时 Aster 市价单的滑点（基点）")
+	ap.add_argument("--bp-maker-fee", type=float, default=0.0002)
+	ap.add_argument("--bp-taker-fee", type=float, default=0.0005)
+	ap.add_argument("--aster-taker-fee", type=float, default=0.00035)
+	ap.add_argument("--strict-fills", action="store_true", help="成交价穿过挂单价才算成交（默认触及即成交）")
+	ap.add_argument("--workers", type=int, default=1, help="扫描进程数（大于 1 时用 common.sweep）")
+	ap.add_argument("--chunk-size", type=int, help="每个任务的参数组数")
+	ap.add_argument("--prune-fraction", type=float, default=0.0, help="先在前这部分行情上回测并淘汰差的参数组（0 表示不淘汰）")
+	ap.add_argument("--prune-quantile", type=float, default=0.5, help="第一阶段 PnL 低于该分位数的参数组被淘汰")
+	ap.add_argument("--max-loss", type=float, help="第一阶段亏损超过该值的参数组被淘汰")
+	ap.add_argument("--grid-cache", help="行情网格 .npy 目录（多进程 mmap 共享，默认临时目录）")
+	ap.add_argument("--csv", help="扫描结果逐行写入的 CSV")
+	ap.add_argument("--progress-interval", type=float, default=5.0, help="扫描进度打印间隔（秒）")
+	ap.add_argument("--sort", default="pnl", help="排序指标（pnl / fill_rate / completed_cycles ...）")
+	ap.add_argument("--top", type=int, default=10)
+	ap.add_argument("--output", help="结果 JSON 输出路径")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run(args)
+	if args.output:
+		out = Path(args.output)
+		out.parent.mkdir(parents=True, exist_ok=True)
+		out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+		print(f"结果已写入 {out}")
+
+
+if __name__ == "__main__":
+	main()
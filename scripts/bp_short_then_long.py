@@ -13,8 +13,10 @@ import yaml
 from bp_dao.http import BackpackClient
 from bp_dao.markets import MarketsDAO
 from bp_dao.order import OrderDAO
+from common.log import get_logger, setup_logging
 
 getcontext().prec = 28
+log = get_logger("hedge")
 
 
 def load_config(path: str) -> dict:
@@ -73,6 +75,7 @@ def main():
 		print("用法: python scripts/bp_short_then_long.py config/bp_trading.yaml")
 		sys.exit(1)
 	cfg = load_config(sys.argv[1])
+	setup_logging(cfg.get("logging"))
 
 	api_pub = cfg["api_public_key_b64"]
 	api_sec = cfg["api_secret_key_b64"]
@@ -94,7 +97,7 @@ def main():
 		want_perp = any(x in symbol.upper() for x in ["PERP", "-PERP"])
 		actual = resolve_symbol(markets, symbol, base_hint="ASTER", want_perp=want_perp)
 		if actual != symbol:
-			print(f"提示: 交易对 {symbol} 无效，自动使用 {actual}")
+			log.info("提示: 交易对 %s 无效，自动使用 %s", symbol, actual)
 			symbol = actual
 			mk = markets.market(symbol)
 
@@ -120,7 +123,8 @@ def main():
 	price_increment = Decimal(str(price_increment_s))
 	price_decimals = decimals_from_tick(str(price_increment))
 	if debug:
-		print(f"[BP] market price_increment={price_increment} (decimals={price_decimals}) raw_market_keys={list(mk.keys()) if isinstance(mk, dict) else 'N/A'}")
+		log.info("[BP] market price_increment=%s (decimals=%s) raw_market_keys=%s", price_increment, price_decimals,
+				 list(mk.keys()) if isinstance(mk, dict) else 'N/A')
 
 	# 获取最新价格
 	ticker = markets.ticker(symbol)
@@ -136,7 +140,7 @@ def main():
 	short_raw = last * (Decimal("1") - pct)
 	short_price = floor_to_increment(short_raw, price_increment)
 	short_price_str = format(short_price, f".{price_decimals}f")
-	print(f"限价做空价: {short_price_str} (步进: {price_increment}, 小数位: {price_decimals})，symbol={symbol}")
+	log.info("限价做空价: %s (步进: %s, 小数位: %s)，symbol=%s", short_price_str, price_increment, price_decimals, symbol)
 
 	# 提交做空 10 个（Ask）限价单
 	short_resp = orders.execute(
@@ -146,9 +150,9 @@ def main():
 		price=short_price_str,
 		quantity=str(quantity),
 	)
-	print("做空下单回执:", short_resp)
+	log.info("做空下单回执: %s", short_resp)
 
-	print("休眠 10 秒...")
+	log.info("休眠 10 秒...")
 	time.sleep(10)
 
 	# 重新获取最新价格
@@ -164,7 +168,7 @@ def main():
 	long_raw = last2 * (Decimal("1") + pct)
 	long_price = floor_to_increment(long_raw, price_increment)
 	long_price_str = format(long_price, f".{price_decimals}f")
-	print(f"限价做多价: {long_price_str} (步进: {price_increment}, 小数位: {price_decimals})，symbol={symbol}")
+	log.info("限价做多价: %s (步进: %s, 小数位: %s)，symbol=%s", long_price_str, price_increment, price_decimals, symbol)
 
 	# 提交做多 10 个（Bid）限价单
 	long_resp = orders.execute(
@@ -174,7 +178,7 @@ def main():
 		price=long_price_str,
 		quantity=str(quantity),
 	)
-	print("做多下单回执:", long_resp)
+	log.info("做多下单回执: %s", long_resp)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,141 @@
+"""
+Aster 合约历史行情回补（common.history）：K线、标记/指数价格K线、归集成交、历史成交、资金费率
+
+用法:
+	python scripts/download_history.py --symbol ASTERUSDT --datasets klines aggTrades fundingRate \\
+		--interval 1m --start 2026-07-01 --end 2026-10-01
+	python scripts/download_history.py --config config/hedge_futures.yaml --datasets trades --start 2026-10-18 --workers 8
+
+中断后用相同参数重新运行即可续传（已完成的窗口记录在每个数据集目录的 parts.json 中）。
+trades（historicalTrades）需要 API Key，取配置文件的 aster.api_key。
+--weight-per-minute 为本脚本使用的请求权重额度，默认 1200（Aster 每 IP 2400/分钟），与交易脚本同机运行时应留足余量。
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import yaml
+
+from aster_futures_dao.http import AsterFuturesClient
+from aster_futures_dao.market import MarketDataDAO
+from common.history import SCHEMAS, HistoryDownloader
+from common.ratelimit import TokenBucket
+from common.transport import build_transport
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+	if not path:
+		return {}
+	p = Path(path)
+	if not p.exists():
+		raise FileNotFoundError(f"配置文件不存在: {p}")
+	with p.open("r", encoding="utf-8") as f:
+		return yaml.safe_load(f) or {}
+
+
+def parse_time_ms(value: Optional[str], default: Optional[int] = None) -> int:
+	"""UTC ISO 时间或 Unix 秒 -> 毫秒"""
+	if not value:
+		if default is None:
+			raise ValueError("缺少时间参数")
+		return default
+	try:
+		return int(float(value) * 1000)
+	except ValueError:
+		pass
+	dt = datetime.fromisoformat(value)
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=timezone.utc)
+	return int(dt.timestamp() * 1000)
+
+
+def progress_printer(interval: float):
+	state = {"last": 0.0}
+
+	def on_progress(dataset: str, done: int, total: int, rows: int) -> None:
+		now = time.monotonic()
+		if now - state["last"] < interval and done < total:
+			return
+		state["last"] = now
+		print(f"  [{dataset}] 窗口 {done}/{total}，本次 {rows} 行")
+
+	return on_progress
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+	cfg = load_config(args.config)
+	aster_cfg = cfg.get("aster") or {}
+	symbol = args.symbol or aster_cfg.get("symbol", "ASTERUSDT")
+	client = AsterFuturesClient(
+		api_key=aster_cfg.get("api_key", ""),
+		api_secret=aster_cfg.get("api_secret", ""),
+		base_url=args.base_url or aster_cfg.get("base_url", "https://fapi.asterdex.com"),
+		debug=bool(aster_cfg.get("debug", False)),
+		transport=build_transport(cfg.get("transport")),
+	)
+	limiter = TokenBucket.per_minute(args.weight_per_minute)
+	downloader = HistoryDownloader(MarketDataDAO(client), args.out, limiter=limiter, workers=args.workers,
+								   max_retries=args.max_retries, on_progress=progress_printer(args.progress_interval))
+	start_ms = parse_time_ms(args.start)
+	end_ms = parse_time_ms(args.end, default=int(time.time() * 1000))
+	results = []
+	for dataset in args.datasets:
+		print(f"下载 {dataset} {symbol}{' ' + args.interval if 'lines' in dataset.lower() else ''} "
+			  f"{datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc):%Y-%m-%d %H:%M} ~ "
+			  f"{datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc):%Y-%m-%d %H:%M} UTC")
+		window = None
+		if args.window_minutes:
+			window = int(args.window_minutes) if dataset == "trades" else int(args.window_minutes * 60_000)
+		result = downloader.download(dataset, symbol, start_ms, end_ms, interval=args.interval, window=window)
+		results.append(result)
+		print(f"  完成 {result['completed']} 个窗口（跳过已完成 {result['skipped']}，失败 {len(result['failed'])}），"
+			  f"{result['rows']} 行，{result['rows_per_sec']:,.0f} 行/秒，累计 {result['total_rows']} 行 -> {result['path']}")
+		lim = result["limiter"]
+		print(f"  限速: 请求 {lim['requests']} 次，权重 {lim['acquired']:.0f}，等待 {lim['waits']} 次共 {lim['wait_seconds']:.1f}s")
+		for f in result["failed"][:5]:
+			print(f"  失败窗口 [{f['start']}, {f['end']}): {f['error']}")
+	return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="Aster 合约历史行情回补")
+	ap.add_argument("--config", help="对冲脚本配置（取 aster.symbol / base_url / api_key）")
+	ap.add_argument("--symbol")
+	ap.add_argument("--base-url")
+	ap.add_argument("--datasets", nargs="+", default=["klines"], choices=list(SCHEMAS))
+	ap.add_argument("--interval", default="1m", help="K线间隔")
+	ap.add_argument("--start", required=True, help="开始时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--end", help="结束时间（UTC ISO 或 Unix 秒），默认现在")
+	ap.add_argument("--out", default="data/history", help="输出目录")
+	ap.add_argument("--workers", type=int, default=4, help="并发线程数")
+	ap.add_argument("--weight-per-minute", type=float, default=1200, help="请求权重额度（每分钟）")
+	ap.add_argument("--window-minutes", type=float, help="窗口长度（分钟；trades 为成交id个数），默认按数据集")
+	ap.add_argument("--max-retries", type=int, default=5)
+	ap.add_argument("--progress-interval", type=float, default=5.0)
+	ap.add_argument("--output", help="统计 JSON 输出路径")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	try:
+		results = run(args)
+	except KeyboardInterrupt:
+		print("已中断，重新运行相同命令可续传")
+		return
+	if args.output:
+		out = Path(args.output)
+		out.parent.mkdir(parents=True, exist_ok=True)
+		out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+	main()
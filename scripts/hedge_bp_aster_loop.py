@@ -1,3 +1,4 @@
+import atexit
 import sys
 import time
 from decimal import Decimal, ROUND_DOWN, getcontext
@@ -11,14 +12,22 @@ if str(ROOT) not in sys.path:
 
 import yaml
 
+from bp_dao.account import AccountDAO as BPAccountDAO
 from bp_dao.http import BackpackClient
 from bp_dao.markets import MarketsDAO
 from bp_dao.order import OrderDAO
+from aster_futures_dao.account import AccountDAO as AsterAccountDAO
 from aster_futures_dao.http import AsterFuturesClient
 from aster_futures_dao.trade import TradeDAO
+from common.journal import build_journal, get_journal, set_journal
+from common.log import get_logger, setup_logging
+from common.recovery import SpotReconciler, StateSnapshot
+from common.tracing import get_tracer, traced
+from common.transport import build_transport
 
 
 getcontext().prec = 28
+log = get_logger("hedge")
 
 
 def load_config(path: str) -> dict:
@@ -93,9 +102,10 @@ def get_bp_price_increment_and_decimals(markets: MarketsDAO, symbol: str, debug:
 	price_increment = Decimal(str(price_increment_s))
 	price_decimals = decimals_from_tick(str(price_increment))
 	if debug:
-		print(f"[BP] market price_increment={price_increment} (decimals={price_decimals}) raw_market_keys={list(mk.keys()) if isinstance(mk, dict) else 'N/A'}")
+		log.info("[BP] market price_increment=%s (decimals=%s) raw_market_keys=%s", price_increment, price_decimals,
+				 list(mk.keys()) if isinstance(mk, dict) else 'N/A')
 		if "filters" in mk:
-			print(f"[BP] filters structure: {mk['filters']}")
+			log.info("[BP] filters structure: %s", mk['filters'])
 	return price_increment, price_decimals
 
 
@@ -109,14 +119,21 @@ def get_bp_last_price(markets: MarketsDAO, symbol: str) -> Decimal:
 	return Decimal(str(last_price_s))
 
 
-def place_bp_limit_order(orders: OrderDAO, symbol: str, side: str, price_str: str, quantity: str) -> dict:
-	return orders.execute(
+def place_bp_limit_order(orders: OrderDAO, symbol: str, side: str, price_str: str, quantity: str,
+						 leg: int = 0, reason: str = "entry") -> dict:
+	sent_ns = time.perf_counter_ns()
+	resp = orders.execute(
 		symbol=symbol,
 		side=side,
 		orderType="Limit",
 		price=price_str,
 		quantity=str(quantity),
 	)
+	# 回执返回后才记日志，不占用下单路径
+	get_journal().record("order", mono_ns=sent_ns, venue="bp", leg=leg, reason=reason, symbol=symbol, side=side,
+						 price=price_str, quantity=quantity, order_id=extract_bp_order_id(resp),
+						 ack_ms=(time.perf_counter_ns() - sent_ns) / 1e6)
+	return resp
 
 
 def extract_bp_order_id(resp: dict) -> str:
@@ -129,6 +146,7 @@ def extract_bp_order_id(resp: dict) -> str:
 	return ""
 
 
+@traced("hedge.fill_poll", cat="hedge")
 def check_bp_order_status_alternative(orders: OrderDAO, order_id: str, symbol: str) -> tuple[bool, str]:
 	"""
 	检查订单状态的替代方法，处理404错误
@@ -150,37 +168,55 @@ def check_bp_order_status_alternative(orders: OrderDAO, order_id: str, symbol: s
 		error_msg = str(e)
 		# 如果是404错误，可能是订单已成交或不存在
 		if "404" in error_msg or "RESOURCE_NOT_FOUND" in error_msg:
-			print(f"[DEBUG] 订单 {order_id} 查询返回404，可能已成交或不存在")
+			log.debug("订单 %s 查询返回404，可能已成交或不存在", order_id)
 			# 对于404，我们假设订单可能已成交，但需要进一步确认
 			return None, "NOT_FOUND_MAYBE_FILLED"
 		else:
-			print(f"[DEBUG] 查询订单 {order_id} 时发生其他错误: {e}")
+			log.warning("查询订单 %s 时发生其他错误: %s", order_id, e)
 			return False, f"ERROR: {error_msg}"
 
 
 def cancel_bp_order(orders: OrderDAO, order_id: str, symbol: str) -> dict:
-	return orders.cancel(orderId=order_id, symbol=symbol)
+	sent_ns = time.perf_counter_ns()
+	resp = orders.cancel(orderId=order_id, symbol=symbol)
+	get_journal().record("cancel", mono_ns=sent_ns, venue="bp", symbol=symbol, order_id=order_id,
+						 ack_ms=(time.perf_counter_ns() - sent_ns) / 1e6)
+	return resp
 
 def cancel_all_bp_orders(orders: OrderDAO, symbol: str) -> dict:
 	"""撤销BP指定交易对的所有挂单"""
 	try:
-		print(f"[CancelAll] 撤销BP {symbol} 的所有挂单...")
+		log.info("[CancelAll] 撤销BP %s 的所有挂单...", symbol)
 		result = orders.cancel_all_orders(symbol=symbol)
-		print(f"[CancelAll] BP {symbol} 撤销所有挂单回执:", result)
+		log.info("[CancelAll] BP %s 撤销所有挂单回执: %s", symbol, result)
 		return result
 	except Exception as e:
-		print(f"[CancelAll] BP {symbol} 撤销所有挂单失败: {e}")
+		log.warning("[CancelAll] BP %s 撤销所有挂单失败: %s", symbol, e)
 		return None
 
 
-def hedge_on_aster(trade: TradeDAO, symbol: str, side: str, quantity: str, recv_window: int) -> dict:
-	return trade.place_order(
-		symbol=symbol,
-		side=side,
-		order_type="MARKET",
-		quantity=float(quantity),
-		recv_window=recv_window,
-	)
+@traced("hedge.dispatch", cat="hedge")
+def hedge_on_aster(trade: TradeDAO, symbol: str, side: str, quantity: str, recv_window: int,
+				   leg: int = 0, reason: str = "hedge") -> dict:
+	"""Aster 市价单对冲（reason: hedge 对冲 / unwind 平仓）"""
+	sent_ns = time.perf_counter_ns()
+	try:
+		order_resp = trade.place_order(
+			symbol=symbol,
+			side=side,
+			order_type="MARKET",
+			quantity=float(quantity),
+			recv_window=recv_window,
+		)
+	except Exception as e:
+		get_journal().record("error", mono_ns=sent_ns, venue="aster", leg=leg, stage=reason, symbol=symbol, side=side,
+							 quantity=quantity, error=str(e))
+		raise
+	resp = order_resp if isinstance(order_resp, dict) else {}
+	get_journal().record(reason, mono_ns=sent_ns, venue="aster", leg=leg, symbol=symbol, side=side, quantity=quantity,
+						 price=float(resp.get("avgPrice") or 0) or None, order_id=resp.get("orderId"),
+						 status=resp.get("status"), ack_ms=(time.perf_counter_ns() - sent_ns) / 1e6)
+	return order_resp
 
 
 def get_next_funding_time() -> datetime:
@@ -232,132 +268,162 @@ def wait_until_funding_time():
 	wait_seconds = (next_funding - now).total_seconds()
 	
 	if wait_seconds > 0:
-		print(f"等待资金费率时间 {next_funding.strftime('%H:%M')} UTC...")
-		print(f"预计等待 {int(wait_seconds/60)} 分钟")
+		log.info("等待资金费率时间 %s UTC...", next_funding.strftime('%H:%M'))
+		log.info("预计等待 %s 分钟", int(wait_seconds/60))
 		
 		# 每分钟输出一次等待状态
 		while wait_seconds > 0:
 			minutes_left = int(wait_seconds / 60)
 			seconds_left = int(wait_seconds % 60)
-			print(f"等待中... 还有 {minutes_left}分{seconds_left}秒")
+			log.debug("等待中... 还有 %s分%s秒", minutes_left, seconds_left)
 			
 			# 等待1分钟或剩余时间（取较小值）
 			sleep_time = min(60, wait_seconds)
 			time.sleep(sleep_time)
 			wait_seconds -= sleep_time
 		
-		print("资金费率时间已到，继续执行对冲策略...")
+		log.info("资金费率时间已到，继续执行对冲策略...")
+
+
+def save_state(state, **fields):
+	"""写状态快照（state 为 None 时跳过）；写盘失败只记日志，不影响交易"""
+	if state is None:
+		return
+	try:
+		state.save(**fields)
+	except Exception as e:
+		log.warning("[State] 写状态快照失败: %s", e)
 
 
 def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_symbol, 
 						quantity, offset_percent, price_increment, price_decimals, 
 						first_wait_seconds, recv_window, cycle_count,
-						order_wait_seconds, monitor_timeout_seconds):
+						order_wait_seconds, monitor_timeout_seconds, start_leg=1, state=None):
 	"""
 	执行一轮完整的对冲策略
+
+	start_leg=2 时跳过第一腿（重启对账发现第一腿已成交并对冲，见 common.recovery）；
+	state 为 StateSnapshot，每次交易所回执之后记录当前阶段，供崩溃后重启对账
 	"""
-	print(f"[Cycle {cycle_count}] 开始执行对冲策略")
+	log.info("[Cycle %s] 开始执行对冲策略", cycle_count)
 	
-	# ---------- 第一腿：BP 做空，ASTER 市价买入对冲 ----------
-	try:
-		last = get_bp_last_price(bp_markets, bp_symbol)
-		# 价格 +0.2% 做空（Ask）
-		short_raw = last * (Decimal("1") + offset_percent)
-		short_price = floor_to_increment(short_raw, price_increment)
-		short_price_str = format(short_price, f".{price_decimals}f")
-		print(f"[Leg1] BP 限价做空价: {short_price_str} (基于最新价 {last})，symbol={bp_symbol}")
-
-		resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=short_price_str, quantity=quantity)
-		print("[Leg1] BP 做空下单回执:", resp)
-		order_id = extract_bp_order_id(resp)
-		if not order_id:
-			raise RuntimeError("无法解析 BP 订单ID")
-
-		# 持续监控直到成交为止
-		filled = False
-		monitor_start = time.time()
-		max_wait_seconds = monitor_timeout_seconds  # 最大等待时间（从配置文件读取）
-		max_order_wait_seconds = order_wait_seconds  # 单个订单最大等待成交时间（从配置文件读取）
-		last_retry_time = monitor_start  # 上次重试时间
+	if start_leg <= 1:
+		# ---------- 第一腿：BP 做空，ASTER 市价买入对冲 ----------
+		try:
+			last = get_bp_last_price(bp_markets, bp_symbol)
+			# 价格 +0.2% 做空（Ask）
+			short_raw = last * (Decimal("1") + offset_percent)
+			short_price = floor_to_increment(short_raw, price_increment)
+			short_price_str = format(short_price, f".{price_decimals}f")
+			log.info("[Leg1] BP 限价做空价: %s (基于最新价 %s)，symbol=%s", short_price_str, last, bp_symbol)
+
+			resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=short_price_str, quantity=quantity, leg=1)
+			log.info("[Leg1] BP 做空下单回执: %s", resp)
+			order_id = extract_bp_order_id(resp)
+			if not order_id:
+				raise RuntimeError("无法解析 BP 订单ID")
+			save_state(state, cycle=cycle_count, phase="leg1_open", bp_order_id=order_id, quantity=quantity)
+
+			# 持续监控直到成交为止
+			filled = False
+			monitor_start = time.time()
+			max_wait_seconds = monitor_timeout_seconds  # 最大等待时间（从配置文件读取）
+			max_order_wait_seconds = order_wait_seconds  # 单个订单最大等待成交时间（从配置文件读取）
+			last_retry_time = monitor_start  # 上次重试时间
 		
-		print(f"[Leg1] 开始监控 BP 做空订单 {order_id}，将持续监控直到成交...")
+			log.info("[Leg1] 开始监控 BP 做空订单 %s，将持续监控直到成交...", order_id)
 		
-		while not filled:
-			elapsed = int(time.time() - monitor_start)
-			current_time = time.time()
-			
-			# 检查是否超过最大等待时间
-			if elapsed >= max_wait_seconds:
-				print(f"[Leg1] 订单 {order_id} 已等待 {elapsed} 秒，超过最大等待时间 {max_wait_seconds} 秒，停止监控")
-				break
-			
-			# 使用新的状态检查函数
-			status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
+			with get_tracer().span("leg1.fill_detection", cat="hedge", order_id=order_id) as fill_span:
+				while not filled:
+					elapsed = int(time.time() - monitor_start)
+					current_time = time.time()
 			
-			if status_result is True:
-				filled = True
-				print(f"[Leg1] BP 做空订单 {order_id} 已成交！总耗时 {elapsed} 秒，状态: {status_info}")
-				break
-			elif status_result is None:  # 404错误，可能已成交
-				print(f"[Leg1] 订单 {order_id} 查询返回404，可能已成交，尝试执行对冲...")
-				filled = True  # 假设已成交，执行对冲
-				break
-			
-			# 每1秒输出一次监控日志
-			if elapsed % 1 == 0 and elapsed > 0:
-				print(f"[Leg1] 监控中... 已等待 {elapsed}s，订单 {order_id} 未成交")
+					# 检查是否超过最大等待时间
+					if elapsed >= max_wait_seconds:
+						log.info("[Leg1] 订单 %s 已等待 %s 秒，超过最大等待时间 %s 秒，停止监控", order_id, elapsed, max_wait_seconds)
+						break
 			
-			# 检查是否需要重新挂单（基于等待时间）
-			order_wait_time = current_time - last_retry_time
-			if order_wait_time >= max_order_wait_seconds:
-				print(f"[Leg1] 订单已等待 {int(order_wait_time)} 秒，取消当前订单并重新挂单...")
-				try:
-					_ = cancel_bp_order(bp_orders, order_id, bp_symbol)
-					print(f"[Leg1] 订单 {order_id} 已取消")
-				except Exception as e:
-					print(f"[Leg1] 取消失败: {e}")
-					# 如果取消失败（可能是订单已成交），检查状态
+					# 使用新的状态检查函数
 					status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
-					if status_result is None:  # 404错误，可能已成交
-						print(f"[Leg1] 取消失败但订单可能已成交，尝试执行对冲...")
+			
+					if status_result is True:
 						filled = True
+						log.info("[Leg1] BP 做空订单 %s 已成交！总耗时 %s 秒，状态: %s", order_id, elapsed, status_info)
+						break
+					elif status_result is None:  # 404错误，可能已成交
+						log.info("[Leg1] 订单 %s 查询返回404，可能已成交，尝试执行对冲...", order_id)
+						filled = True  # 假设已成交，执行对冲
 						break
+			
+					# 每1秒输出一次监控日志
+					if elapsed % 1 == 0 and elapsed > 0:
+						log.debug("[Leg1] 监控中... 已等待 %ss，订单 %s 未成交", elapsed, order_id)
+			
+					# 检查是否需要重新挂单（基于等待时间）
+					order_wait_time = current_time - last_retry_time
+					if order_wait_time >= max_order_wait_seconds:
+						log.info("[Leg1] 订单已等待 %s 秒，取消当前订单并重新挂单...", int(order_wait_time))
+						try:
+							_ = cancel_bp_order(bp_orders, order_id, bp_symbol)
+							log.info("[Leg1] 订单 %s 已取消", order_id)
+						except Exception as e:
+							log.warning("[Leg1] 取消失败: %s", e)
+							# 如果取消失败（可能是订单已成交），检查状态
+							status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
+							if status_result is None:  # 404错误，可能已成交
+								log.warning("[Leg1] 取消失败但订单可能已成交，尝试执行对冲...")
+								filled = True
+								break
 				
-				# 使用最新价重算 +0.2%
-				last = get_bp_last_price(bp_markets, bp_symbol)
-				short_raw = last * (Decimal("1") + offset_percent)
-				short_price = floor_to_increment(short_raw, price_increment)
-				short_price_str = format(short_price, f".{price_decimals}f")
-				print(f"[Leg1] 重新挂单，最新价: {last}，挂单价: {short_price_str}")
+						# 使用最新价重算 +0.2%
+						last = get_bp_last_price(bp_markets, bp_symbol)
+						short_raw = last * (Decimal("1") + offset_percent)
+						short_price = floor_to_increment(short_raw, price_increment)
+						short_price_str = format(short_price, f".{price_decimals}f")
+						log.info("[Leg1] 重新挂单，最新价: %s，挂单价: %s", last, short_price_str)
 				
-				resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=short_price_str, quantity=quantity)
-				print("[Leg1] BP 重挂做空回执:", resp)
-				order_id = extract_bp_order_id(resp)
-				if not order_id:
-					raise RuntimeError("无法解析重挂后的 BP 订单ID")
+						resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=short_price_str, quantity=quantity,
+													leg=1, reason="reprice")
+						log.info("[Leg1] BP 重挂做空回执: %s", resp)
+						order_id = extract_bp_order_id(resp)
+						if not order_id:
+							raise RuntimeError("无法解析重挂后的 BP 订单ID")
+						save_state(state, bp_order_id=order_id)
 				
-				last_retry_time = current_time  # 重置重试时间
-				print(f"[Leg1] 重挂完成，继续监控订单 {order_id}...")
+						last_retry_time = current_time  # 重置重试时间
+						log.info("[Leg1] 重挂完成，继续监控订单 %s...", order_id)
 			
-			time.sleep(1)
-
-		if filled:
-			print("[Leg1] BP 做空已成交，ASTER 市价买入对冲...")
-			buy_resp = hedge_on_aster(aster_trade, aster_symbol, side="BUY", quantity=quantity, recv_window=recv_window)
-			print("[Leg1] ASTER 市价买入回执:", buy_resp)
-		else:
-			print(f"[Leg1] 警告：BP 做空在 {max_wait_seconds} 秒后仍未成交，撤销所有挂单并跳过第二腿，直接开始下一轮。")
-			# 撤销BP所有挂单
+					time.sleep(1)
+
+				fill_span.set(filled=filled, order_id=order_id)
+
+			if filled:
+				fill_ns = time.perf_counter_ns()
+				get_tracer().instant("leg1.fill_detected", cat="hedge", order_id=order_id)
+				log.info("[Leg1] BP 做空已成交，ASTER 市价买入对冲...")
+				get_journal().record("fill", mono_ns=fill_ns, venue="bp", leg=1, symbol=bp_symbol, side="Ask",
+									 price=short_price_str, quantity=quantity, order_id=order_id)
+				buy_resp = hedge_on_aster(aster_trade, aster_symbol, side="BUY", quantity=quantity, recv_window=recv_window, leg=1)
+				save_state(state, phase="leg1_hedged", aster_order_id=buy_resp.get("orderId") if isinstance(buy_resp, dict) else None)
+				log.info("[Leg1] ASTER 市价买入回执: %s", buy_resp)
+			else:
+				get_journal().record("leg_timeout", venue="bp", leg=1, symbol=bp_symbol, order_id=order_id)
+				log.warning("[Leg1] 警告：BP 做空在 %s 秒后仍未成交，撤销所有挂单并跳过第二腿，直接开始下一轮。", max_wait_seconds)
+				# 撤销BP所有挂单
+				cancel_all_bp_orders(bp_orders, bp_symbol)
+				save_state(state, phase="idle")
+				return  # 直接返回，不执行第二腿
+		except Exception as e:
+			get_journal().record("error", leg=1, stage="leg", error=str(e))
+			log.warning("[Leg1] 异常: %s", e)
+			# 异常时也撤销所有挂单
 			cancel_all_bp_orders(bp_orders, bp_symbol)
-			return  # 直接返回，不执行第二腿
-	except Exception as e:
-		print(f"[Leg1] 异常: {e}")
-		# 异常时也撤销所有挂单
-		cancel_all_bp_orders(bp_orders, bp_symbol)
-		return  # 异常时也跳过第二腿
+			return  # 异常时也跳过第二腿
 
-		print(f"休眠 20 秒...")
-		time.sleep(20)
+			log.info("休眠 20 秒...")
+			time.sleep(20)
+	else:
+		log.info("[Cycle %s] 从第二腿继续（第一腿已在上次运行中成交并对冲）", cycle_count)
 
 
 	# ---------- 第二腿：BP 做多，ASTER 市价卖出对冲 ----------
@@ -367,13 +433,14 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 		long_raw = last * (Decimal("1") - offset_percent)
 		long_price = floor_to_increment(long_raw, price_increment)
 		long_price_str = format(long_price, f".{price_decimals}f")
-		print(f"[Leg2] BP 限价做多价: {long_price_str} (基于最新价 {last})，symbol={bp_symbol}")
+		log.info("[Leg2] BP 限价做多价: %s (基于最新价 %s)，symbol=%s", long_price_str, last, bp_symbol)
 
-		resp = place_bp_limit_order(bp_orders, bp_symbol, side="Bid", price_str=long_price_str, quantity=quantity)
-		print("[Leg2] BP 做多下单回执:", resp)
+		resp = place_bp_limit_order(bp_orders, bp_symbol, side="Bid", price_str=long_price_str, quantity=quantity, leg=2)
+		log.info("[Leg2] BP 做多下单回执: %s", resp)
 		order_id = extract_bp_order_id(resp)
 		if not order_id:
 			raise RuntimeError("无法解析 BP 订单ID")
+		save_state(state, cycle=cycle_count, phase="leg2_open", bp_order_id=order_id, quantity=quantity)
 
 		# 持续监控直到成交为止
 		filled = False
@@ -382,79 +449,90 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 		max_order_wait_seconds = order_wait_seconds  # 单个订单最大等待成交时间（从配置文件读取）
 		last_retry_time = monitor_start  # 上次重试时间
 		
-		print(f"[Leg2] 开始监控 BP 做多订单 {order_id}，将持续监控直到成交...")
+		log.info("[Leg2] 开始监控 BP 做多订单 %s，将持续监控直到成交...", order_id)
 		
-		while not filled:
-			elapsed = int(time.time() - monitor_start)
-			current_time = time.time()
+		with get_tracer().span("leg2.fill_detection", cat="hedge", order_id=order_id) as fill_span:
+			while not filled:
+				elapsed = int(time.time() - monitor_start)
+				current_time = time.time()
 			
-			# 检查是否超过最大等待时间
-			if elapsed >= max_wait_seconds:
-				print(f"[Leg2] 订单 {order_id} 已等待 {elapsed} 秒，超过最大等待时间 {max_wait_seconds} 秒，停止监控")
-				break
+				# 检查是否超过最大等待时间
+				if elapsed >= max_wait_seconds:
+					log.info("[Leg2] 订单 %s 已等待 %s 秒，超过最大等待时间 %s 秒，停止监控", order_id, elapsed, max_wait_seconds)
+					break
 			
-			# 使用新的状态检查函数
-			status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
+				# 使用新的状态检查函数
+				status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
 			
-			if status_result is True:
-				filled = True
-				print(f"[Leg2] BP 做多订单 {order_id} 已成交！总耗时 {elapsed} 秒，状态: {status_info}")
-				break
-			elif status_result is None:  # 404错误，可能已成交
-				print(f"[Leg2] 订单 {order_id} 查询返回404，可能已成交，尝试执行对冲...")
-				filled = True  # 假设已成交，执行对冲
-				break
+				if status_result is True:
+					filled = True
+					log.info("[Leg2] BP 做多订单 %s 已成交！总耗时 %s 秒，状态: %s", order_id, elapsed, status_info)
+					break
+				elif status_result is None:  # 404错误，可能已成交
+					log.info("[Leg2] 订单 %s 查询返回404，可能已成交，尝试执行对冲...", order_id)
+					filled = True  # 假设已成交，执行对冲
+					break
 			
-			# 每1秒输出一次监控日志
-			if elapsed % 1 == 0 and elapsed > 0:
-				print(f"[Leg2] 监控中... 已等待 {elapsed}s，订单 {order_id} 未成交")
+				# 每1秒输出一次监控日志
+				if elapsed % 1 == 0 and elapsed > 0:
+					log.debug("[Leg2] 监控中... 已等待 %ss，订单 %s 未成交", elapsed, order_id)
 			
-			# 检查是否需要重新挂单（基于等待时间）
-			order_wait_time = current_time - last_retry_time
-			if order_wait_time >= max_order_wait_seconds:
-				print(f"[Leg2] 订单已等待 {int(order_wait_time)} 秒，取消当前订单并重新挂单...")
-				try:
-					_ = cancel_bp_order(bp_orders, order_id, bp_symbol)
-					print(f"[Leg2] 订单 {order_id} 已取消")
-				except Exception as e:
-					print(f"[Leg2] 取消失败: {e}")
-					# 如果取消失败（可能是订单已成交），检查状态
-					status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
-					if status_result is None:  # 404错误，可能已成交
-						print(f"[Leg2] 取消失败但订单可能已成交，尝试执行对冲...")
-						filled = True
-						break
+				# 检查是否需要重新挂单（基于等待时间）
+				order_wait_time = current_time - last_retry_time
+				if order_wait_time >= max_order_wait_seconds:
+					log.info("[Leg2] 订单已等待 %s 秒，取消当前订单并重新挂单...", int(order_wait_time))
+					try:
+						_ = cancel_bp_order(bp_orders, order_id, bp_symbol)
+						log.info("[Leg2] 订单 %s 已取消", order_id)
+					except Exception as e:
+						log.warning("[Leg2] 取消失败: %s", e)
+						# 如果取消失败（可能是订单已成交），检查状态
+						status_result, status_info = check_bp_order_status_alternative(bp_orders, order_id, bp_symbol)
+						if status_result is None:  # 404错误，可能已成交
+							log.warning("[Leg2] 取消失败但订单可能已成交，尝试执行对冲...")
+							filled = True
+							break
 				
-				# 使用最新价重算 -0.2%
-				last = get_bp_last_price(bp_markets, bp_symbol)
-				long_raw = last * (Decimal("1") - offset_percent)
-				long_price = floor_to_increment(long_raw, price_increment)
-				long_price_str = format(long_price, f".{price_decimals}f")
-				print(f"[Leg2] 重新挂单，最新价: {last}，挂单价: {long_price_str}")
+					# 使用最新价重算 -0.2%
+					last = get_bp_last_price(bp_markets, bp_symbol)
+					long_raw = last * (Decimal("1") - offset_percent)
+					long_price = floor_to_increment(long_raw, price_increment)
+					long_price_str = format(long_price, f".{price_decimals}f")
+					log.info("[Leg2] 重新挂单，最新价: %s，挂单价: %s", last, long_price_str)
 				
-				resp = place_bp_limit_order(bp_orders, bp_symbol, side="Bid", price_str=long_price_str, quantity=quantity)
-				print("[Leg2] BP 重挂做多回执:", resp)
-				order_id = extract_bp_order_id(resp)
-				if not order_id:
-					raise RuntimeError("无法解析重挂后的 BP 订单ID")
+					resp = place_bp_limit_order(bp_orders, bp_symbol, side="Bid", price_str=long_price_str, quantity=quantity,
+												leg=2, reason="reprice")
+					log.info("[Leg2] BP 重挂做多回执: %s", resp)
+					order_id = extract_bp_order_id(resp)
+					if not order_id:
+						raise RuntimeError("无法解析重挂后的 BP 订单ID")
+					save_state(state, bp_order_id=order_id)
 				
-				last_retry_time = current_time  # 重置重试时间
-				print(f"[Leg2] 重挂完成，继续监控订单 {order_id}...")
+					last_retry_time = current_time  # 重置重试时间
+					log.info("[Leg2] 重挂完成，继续监控订单 %s...", order_id)
 			
-			time.sleep(1)
+				time.sleep(1)
+
+			fill_span.set(filled=filled, order_id=order_id)
 
 		if filled:
-			print("[Leg2] BP 做多已成交，ASTER 市价卖出对冲...")
-			sell_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=quantity, recv_window=recv_window)
-			print("[Leg2] ASTER 市价卖出回执:", sell_resp)
+			fill_ns = time.perf_counter_ns()
+			get_tracer().instant("leg2.fill_detected", cat="hedge", order_id=order_id)
+			log.info("[Leg2] BP 做多已成交，ASTER 市价卖出对冲...")
+			get_journal().record("fill", mono_ns=fill_ns, venue="bp", leg=2, symbol=bp_symbol, side="Bid",
+								 price=long_price_str, quantity=quantity, order_id=order_id)
+			sell_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=quantity, recv_window=recv_window, leg=2)
+			save_state(state, phase="done", aster_order_id=sell_resp.get("orderId") if isinstance(sell_resp, dict) else None)
+			log.info("[Leg2] ASTER 市价卖出回执: %s", sell_resp)
 		else:
-			print(f"[Leg2] 警告：BP 做多在 {max_wait_seconds} 秒后仍未成交，撤销所有挂单并平仓第一腿持仓。")
+			get_journal().record("leg_timeout", venue="bp", leg=2, symbol=bp_symbol, order_id=order_id)
+			log.warning("[Leg2] 警告：BP 做多在 %s 秒后仍未成交，撤销所有挂单并平仓第一腿持仓。", max_wait_seconds)
 			# 先撤销BP所有挂单
 			cancel_all_bp_orders(bp_orders, bp_symbol)
 			
 			try:
 				# 1. 先查询ASTER现货仓位
-				print("[Leg2] 查询ASTER现货仓位...")
+				log.info("[Leg2] 查询ASTER现货仓位...")
 				from aster_futures_dao.account import AccountDAO
 				aster_account = AccountDAO(aster_trade.client)
 				balances = aster_account.get_balance(recv_window)
@@ -465,19 +543,21 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 						if balance.get("asset") == aster_symbol.replace("USDT", ""):
 							aster_balance = float(balance.get("walletBalance", 0))
 							if aster_balance > 0:
-								print(f"[Leg2] 发现ASTER现货余额: {aster_balance}")
+								log.info("[Leg2] 发现ASTER现货余额: %s", aster_balance)
 								break
 				
 				if aster_balance > 0:
 					# 2. 平仓ASTER现货持仓
-					print(f"[Leg2] 开始平仓ASTER现货持仓: {aster_balance}...")
-					close_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=str(aster_balance), recv_window=recv_window)
-					print("[Leg2] ASTER现货平仓回执:", close_resp)
+					log.info("[Leg2] 开始平仓ASTER现货持仓: %s...", aster_balance)
+					close_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=str(aster_balance), recv_window=recv_window, leg=2, reason="unwind")
+					# 整个余额已卖出，重启对账的基准余额随之归零
+					save_state(state, aster_base_baseline="0")
+					log.info("[Leg2] ASTER现货平仓回执: %s", close_resp)
 				else:
-					print("[Leg2] 未发现ASTER现货余额，跳过平仓")
+					log.info("[Leg2] 未发现ASTER现货余额，跳过平仓")
 				
 				# 3. 查询BP仓位
-				print("[Leg2] 查询BP仓位...")
+				log.info("[Leg2] 查询BP仓位...")
 				from bp_dao.account import AccountDAO as BPAccountDAO
 				bp_account = BPAccountDAO(bp_orders.client)
 				bp_positions = bp_account.positions(bp_symbol)
@@ -489,19 +569,20 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 							position_amt = float(pos.get("size", 0))
 							if position_amt != 0:
 								bp_position_size = abs(position_amt)
-								print(f"[Leg2] 发现BP仓位: {position_amt}")
+								log.info("[Leg2] 发现BP仓位: %s", position_amt)
 								break
 				
 				if bp_position_size > 0:
 					# 4. 平仓BP持仓
-					print(f"[Leg2] 开始平仓BP持仓: {bp_position_size}...")
+					log.info("[Leg2] 开始平仓BP持仓: %s...", bp_position_size)
 					# 获取最新价格进行市价平仓
 					last = get_bp_last_price(bp_markets, bp_symbol)
 					close_price = last * Decimal("0.99") if last else Decimal("1")  # 稍微低于市价确保成交
 					close_price_str = format(close_price, f".{price_decimals}f")
 					
-					close_resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=close_price_str, quantity=str(bp_position_size))
-					print("[Leg2] BP平仓回执:", close_resp)
+					close_resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=close_price_str, quantity=str(bp_position_size),
+												  leg=2, reason="unwind")
+					log.info("[Leg2] BP平仓回执: %s", close_resp)
 					
 					# 检查平仓订单状态
 					if isinstance(close_resp, list) and len(close_resp) > 0:
@@ -509,19 +590,21 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 						if close_order_id:
 							close_status, _ = check_bp_order_status_alternative(bp_orders, close_order_id, bp_symbol)
 							if close_status:
-								print(f"[Leg2] BP平仓订单状态: {close_status}")
+								log.info("[Leg2] BP平仓订单状态: %s", close_status)
 					else:
-						print("[Leg2] 无法获取BP平仓订单ID，跳过状态检查")
+						log.info("[Leg2] 无法获取BP平仓订单ID，跳过状态检查")
 				else:
-					print("[Leg2] 未发现BP仓位，跳过平仓")
+					log.info("[Leg2] 未发现BP仓位，跳过平仓")
+				save_state(state, phase="done")
 					
 			except Exception as close_e:
-				print(f"[Leg2] 平仓操作失败: {close_e}")
+				log.warning("[Leg2] 平仓操作失败: %s", close_e)
 	except Exception as e:
-		print(f"[Leg2] 异常: {e}")
+		get_journal().record("error", leg=2, stage="leg", error=str(e))
+		log.warning("[Leg2] 异常: %s", e)
 		# 异常时也需要撤销所有挂单并尝试平仓
 		try:
-			print("[Leg2] 异常处理：撤销所有挂单并尝试平仓所有持仓...")
+			log.warning("[Leg2] 异常处理：撤销所有挂单并尝试平仓所有持仓...")
 			
 			# 先撤销BP所有挂单
 			cancel_all_bp_orders(bp_orders, bp_symbol)
@@ -536,9 +619,10 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 					if balance.get("asset") == aster_symbol.replace("USDT", ""):
 						aster_balance = float(balance.get("walletBalance", 0))
 						if aster_balance > 0:
-							print(f"[Leg2] 异常平仓ASTER现货余额: {aster_balance}")
-							close_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=str(aster_balance), recv_window=recv_window)
-							print("[Leg2] 异常ASTER现货平仓回执:", close_resp)
+							log.warning("[Leg2] 异常平仓ASTER现货余额: %s", aster_balance)
+							close_resp = hedge_on_aster(aster_trade, aster_symbol, side="SELL", quantity=str(aster_balance), recv_window=recv_window, leg=2, reason="unwind")
+							save_state(state, aster_base_baseline="0")
+							log.warning("[Leg2] 异常ASTER现货平仓回执: %s", close_resp)
 							break
 			
 			# 查询并平仓BP仓位
@@ -551,16 +635,18 @@ def execute_hedge_cycle(bp_markets, bp_orders, aster_trade, bp_symbol, aster_sym
 					if pos.get("symbol") == bp_symbol:
 						position_amt = float(pos.get("size", 0))
 						if position_amt != 0:
-							print(f"[Leg2] 异常平仓BP仓位: {position_amt}")
+							log.warning("[Leg2] 异常平仓BP仓位: %s", position_amt)
 							last = get_bp_last_price(bp_markets, bp_symbol)
 							close_price = last * Decimal("0.99") if last else Decimal("1")
 							close_price_str = format(close_price, f".{price_decimals}f")
-							close_resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=close_price_str, quantity=str(abs(position_amt)))
-							print("[Leg2] 异常BP平仓回执:", close_resp)
+							close_resp = place_bp_limit_order(bp_orders, bp_symbol, side="Ask", price_str=close_price_str, quantity=str(abs(position_amt)),
+															  leg=2, reason="unwind")
+							log.warning("[Leg2] 异常BP平仓回执: %s", close_resp)
 							break
+			save_state(state, phase="done")
 							
 		except Exception as close_e:
-			print(f"[Leg2] 异常平仓也失败: {close_e}")
+			log.warning("[Leg2] 异常平仓也失败: %s", close_e)
 
 
 def main():
@@ -568,11 +654,15 @@ def main():
 		print("用法: python scripts/hedge_bp_aster_loop.py config/hedge.yaml")
 		sys.exit(1)
 	cfg = load_config(sys.argv[1])
+	setup_logging(cfg.get("logging"))
 
 	bp_cfg = cfg["bp"]
 	aster_cfg = cfg["aster"]
 	trade_cfg = cfg.get("trade", {})
 
+	# 传输层：live（默认）/ record（录制）/ replay（离线回放），两个客户端共享同一个录制文件
+	transport = build_transport(cfg.get("transport"))
+
 	# BP
 	bp_client = BackpackClient(
 		api_public_key_b64=bp_cfg["api_public_key_b64"],
@@ -580,6 +670,7 @@ def main():
 		base_url=bp_cfg.get("base_url", "https://api.backpack.exchange"),
 		debug=bool(bp_cfg.get("debug", False)),
 		default_window_ms=int(bp_cfg.get("window", 5000)),
+		transport=transport,
 	)
 	bp_markets = MarketsDAO(bp_client)
 	bp_orders = OrderDAO(bp_client)
@@ -591,6 +682,7 @@ def main():
 		api_secret=aster_cfg["api_secret"],
 		base_url=aster_cfg.get("base_url", "https://fapi.asterdex.com"),
 		debug=bool(aster_cfg.get("debug", False)),
+		transport=transport,
 	)
 	aster_trade = TradeDAO(aster_client)
 	aster_symbol = aster_cfg.get("symbol", "ASTERUSDT")
@@ -609,6 +701,16 @@ def main():
 	order_wait_seconds = int(trade_cfg.get("max_order_wait_seconds", 10))  # 单个订单最大等待成交时间
 	monitor_timeout_seconds = int(trade_cfg.get("max_monitor_seconds", 300))  # 最大监控时间
 
+	# 延迟追踪配置（导出 Chrome trace / Perfetto JSON）
+	trace_cfg = cfg.get("trace") or {}
+	tracer = get_tracer()
+	tracer.enabled = bool(trace_cfg.get("enabled", False))
+	trace_output = str(trace_cfg.get("output", "logs/hedge_spot_trace.json"))
+
+	# 交易日志（可选）：下单、成交、对冲、平仓异步写入 SQLite / JSONL，供事后分析延迟和滑点
+	journal = set_journal(build_journal(cfg.get("journal"))).start()
+	atexit.register(journal.close)
+
 	# 确定符号与步进
 	try:
 		_ = bp_markets.market(bp_symbol)
@@ -616,39 +718,72 @@ def main():
 		want_perp = any(x in bp_symbol.upper() for x in ["PERP", "-PERP"])
 		actual = resolve_symbol(bp_markets, bp_symbol, base_hint="ASTER", want_perp=want_perp)
 		if actual != bp_symbol:
-			print(f"提示: 交易对 {bp_symbol} 无效，自动使用 {actual}")
+			log.info("提示: 交易对 %s 无效，自动使用 %s", bp_symbol, actual)
 			bp_symbol = actual
 
 	price_increment, price_decimals = get_bp_price_increment_and_decimals(bp_markets, bp_symbol, debug=bp_client.debug)
 
-	print("=" * 60)
-	print("开始循环对冲策略")
-	print("=" * 60)
+	# 状态快照与重启对账：Aster 一侧是现货，以基础资产余额相对基准余额的变化作为对冲仓位
+	recovery_cfg = cfg.get("recovery") or {}
+	state = None
+	start_leg, resume_quantity = 1, None
+	if recovery_cfg.get("enabled", True):
+		state = StateSnapshot(recovery_cfg.get("state_path", "logs/hedge_spot_state.json"),
+							  fsync=bool(recovery_cfg.get("fsync", True)), keep=("aster_base_baseline",))
+		reconciler = SpotReconciler(
+			bp_orders, BPAccountDAO(bp_client), aster_trade, AsterAccountDAO(aster_client), bp_symbol, aster_symbol,
+			snapshot=state, tolerance=Decimal(str(recovery_cfg.get("tolerance", 0))),
+			quantity_step=recovery_cfg.get("quantity_step"), recv_window=recv_window,
+			base_asset=recovery_cfg.get("base_asset"), log=log.info,
+		)
+		try:
+			result = reconciler.run(dry_run=bool(recovery_cfg.get("dry_run", False)))
+			journal.record("recovery", **{k: v for k, v in result.items() if k != "hedge_response"})
+			start_leg, resume_quantity = result["start_leg"], result["resume_quantity"]
+			log.info("[Recovery] 上次阶段 %s，BP 持仓 %s，Aster 余额变化 %s（基准 %s），撤单 %s 笔，补对冲 %s，耗时 %.0fms，从第%s腿开始",
+					 result["snapshot_phase"], result["bp_position"], result["aster_position"], result["aster_base_baseline"],
+					 len(result["cancel_bp"]) + len(result["cancel_aster"]), result["hedge"] or "无",
+					 result["elapsed_ms"], start_leg)
+		except Exception as e:
+			log.warning("[Recovery] 重启对账失败: %s，从第一腿开始", e)
+
+	log.info("开始循环对冲策略")
 	
 	cycle_count = 0
 	
 	while True:
 		cycle_count += 1
-		print(f"\n[Cycle {cycle_count}] 开始新一轮对冲策略")
+		log.info("[Cycle %s] 开始新一轮对冲策略", cycle_count)
 		
 		# 每轮开始时撤销所有挂单，确保干净的开始状态
-		print(f"[Cycle {cycle_count}] 撤销BP所有挂单，确保干净的开始状态...")
+		log.info("[Cycle %s] 撤销BP所有挂单，确保干净的开始状态...", cycle_count)
 		cancel_all_bp_orders(bp_orders, bp_symbol)
 		
 		# 显示当前资金费率时间信息
 		_, reason = should_stop_for_funding(stop_before_funding_minutes)
-		print(f"[Cycle {cycle_count}] {reason}")
-
-		# 执行对冲策略
-		execute_hedge_cycle(
-			bp_markets, bp_orders, aster_trade, bp_symbol, aster_symbol,
-			quantity, offset_percent, price_increment, price_decimals,
-			first_wait_seconds, recv_window, cycle_count,
-			order_wait_seconds, monitor_timeout_seconds
-		)
+		log.info("[Cycle %s] %s", cycle_count, reason)
+
+		# 执行对冲策略（每轮一个追踪ID）
+		trace_id = f"cycle-{cycle_count}-{int(time.time())}"
+		with tracer.trace(f"cycle {cycle_count}", trace_id=trace_id, cycle=cycle_count), journal.cycle(trace_id):
+			cycle_ns = time.perf_counter_ns()
+			journal.record("cycle_start", bp_symbol=bp_symbol, aster_symbol=aster_symbol, quantity=quantity,
+						   offset_percent=float(offset_percent))
+			execute_hedge_cycle(
+				bp_markets, bp_orders, aster_trade, bp_symbol, aster_symbol,
+				str(resume_quantity) if start_leg == 2 else quantity, offset_percent, price_increment, price_decimals,
+				first_wait_seconds, recv_window, cycle_count,
+				order_wait_seconds, monitor_timeout_seconds, start_leg=start_leg, state=state
+			)
+			start_leg, resume_quantity = 1, None
+			journal.record("cycle_end", duration_ms=(time.perf_counter_ns() - cycle_ns) / 1e6)
+		if tracer.enabled:
+			tracer.export_chrome_trace(trace_output)
+			breakdown = ", ".join(f"{k}={v:.1f}ms" for k, v in tracer.summary(trace_id).items() if k.startswith("hedge."))
+			log.info("[Cycle %s] 追踪已导出到 %s；%s", cycle_count, trace_output, breakdown)
 		
 		# 循环间隔
-		print(f"[Cycle {cycle_count}] 完成，等待 {cycle_sleep} 秒后开始下一轮...")
+		log.info("[Cycle %s] 完成，等待 %s 秒后开始下一轮...", cycle_count, cycle_sleep)
 		time.sleep(cycle_sleep)
 
 
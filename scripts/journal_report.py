@@ -0,0 +1,138 @@
+"""
+交易日志分析（common.journal）：每轮对冲的结果、检测到成交到发出对冲单的延迟、下单回执延迟、对冲价差
+
+用法:
+	python scripts/journal_report.py logs/journal.db
+	python scripts/journal_report.py logs/journal --cycles 20 --output logs/journal_report.json
+
+对冲价差 edge_bps：第一腿 (BP 卖价 - Aster 买入均价) / BP 卖价，第二腿 (Aster 卖出均价 - BP 买价) / BP 买价，
+单位 bp，正数表示对冲锁定了有利价差；Aster 均价取对冲回执的 avgPrice，回执没有时取之后查询到的订单状态。
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from common.journal import load_journal
+
+
+def percentiles(values: List[float]) -> Dict[str, Any]:
+	if not values:
+		return {"n": 0}
+	arr = np.asarray(values, dtype=float)
+	return {
+		"n": int(arr.size),
+		"mean": round(float(arr.mean()), 3),
+		"p50": round(float(np.percentile(arr, 50)), 3),
+		"p95": round(float(np.percentile(arr, 95)), 3),
+		"max": round(float(arr.max()), 3),
+	}
+
+
+def summarize_cycle(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+	"""单轮对冲的记录 -> 指标"""
+	fills = {r["leg"]: r for r in records if r["kind"] == "fill"}
+	hedges = {r["leg"]: r for r in records if r["kind"] == "hedge"}
+	avg_prices = {r["order_id"]: r["price"] for r in records if r["kind"] == "order_status" and r.get("price")}
+	out: Dict[str, Any] = {
+		"cycle": records[0]["cycle"],
+		"start_ns": records[0]["ts_ns"],
+		"reprices": sum(1 for r in records if r["kind"] == "order" and r.get("reason") == "reprice"),
+		"unwinds": sum(1 for r in records if r["kind"] == "unwind" or (r["kind"] == "order" and r.get("reason") == "unwind")),
+		"errors": [r.get("error") for r in records if r["kind"] == "error"],
+		"bp_ack_ms": [r["ack_ms"] for r in records if r["kind"] == "order" and r.get("venue") == "bp" and r.get("ack_ms") is not None],
+		"legs": {},
+	}
+	for r in records:
+		if r["kind"] == "cycle_end":
+			out["duration_ms"] = r.get("duration_ms")
+	for leg, fill in fills.items():
+		info: Dict[str, Any] = {"bp_price": fill["price"]}
+		hedge = hedges.get(leg)
+		if hedge is not None:
+			info["detect_to_hedge_ms"] = (hedge["mono_ns"] - fill["mono_ns"]) / 1e6
+			info["hedge_ack_ms"] = hedge.get("ack_ms")
+			avg = hedge["price"] or avg_prices.get(hedge["order_id"])
+			info["aster_price"] = avg
+			if avg and fill["price"]:
+				sign = 1.0 if leg == 1 else -1.0
+				info["edge_bps"] = sign * (fill["price"] - avg) / fill["price"] * 1e4
+		out["legs"][leg] = info
+	if len(hedges) == 2:
+		out["status"] = "completed"
+	elif any(r["kind"] == "leg_timeout" and r["leg"] == 1 for r in records):
+		out["status"] = "leg1_timeout"
+	elif any(r["kind"] == "leg_timeout" and r["leg"] == 2 for r in records):
+		out["status"] = "leg2_unwound"
+	elif out["errors"]:
+		out["status"] = "error"
+	else:
+		out["status"] = "incomplete"
+	return out
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	records = load_journal(args.path)
+	by_cycle: Dict[Any, List[Dict[str, Any]]] = {}
+	for r in records:
+		if r.get("cycle") is not None:
+			by_cycle.setdefault((r["run_id"], r["cycle"]), []).append(r)
+	cycles = sorted((summarize_cycle(rs) for rs in by_cycle.values()), key=lambda c: c["start_ns"])
+	legs = [leg for c in cycles for leg in c["legs"].values()]
+	statuses: Dict[str, int] = {}
+	for c in cycles:
+		statuses[c["status"]] = statuses.get(c["status"], 0) + 1
+	report = {
+		"records": len(records),
+		"cycles": len(cycles),
+		"status": statuses,
+		"detect_to_hedge_ms": percentiles([x["detect_to_hedge_ms"] for x in legs if "detect_to_hedge_ms" in x]),
+		"hedge_ack_ms": percentiles([x["hedge_ack_ms"] for x in legs if x.get("hedge_ack_ms") is not None]),
+		"bp_ack_ms": percentiles([v for c in cycles for v in c["bp_ack_ms"]]),
+		"edge_bps": percentiles([x["edge_bps"] for x in legs if "edge_bps" in x]),
+		"cycle_ms": percentiles([c["duration_ms"] for c in cycles if c.get("duration_ms") is not None]),
+		"reprices_per_cycle": round(sum(c["reprices"] for c in cycles) / len(cycles), 3) if cycles else 0.0,
+	}
+	print(f"记录 {report['records']} 条，对冲 {report['cycles']} 轮: " + "，".join(f"{k} {v}" for k, v in statuses.items()))
+	for name in ("detect_to_hedge_ms", "hedge_ack_ms", "bp_ack_ms", "edge_bps", "cycle_ms"):
+		st = report[name]
+		if st["n"]:
+			print(f"  {name:<18} n={st['n']:<5} mean={st['mean']:<10} p50={st['p50']:<10} p95={st['p95']:<10} max={st['max']}")
+	print(f"  每轮重挂 {report['reprices_per_cycle']} 次")
+	if args.cycles:
+		print("最近的对冲轮次:")
+		for c in cycles[-args.cycles:]:
+			legs_s = "  ".join(
+				f"L{leg}: {x.get('detect_to_hedge_ms', float('nan')):.3f}ms {x.get('edge_bps', float('nan')):+.2f}bp"
+				for leg, x in sorted(c["legs"].items()))
+			print(f"  {c['cycle']:<28} {c['status']:<13} 重挂 {c['reprices']}  {legs_s}")
+	report["cycle_details"] = cycles
+	return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="交易日志分析")
+	ap.add_argument("path", help="交易日志（SQLite 文件或 JSONL 分段目录）")
+	ap.add_argument("--cycles", type=int, default=10, help="打印最近 N 轮明细")
+	ap.add_argument("--output", help="报告 JSON 输出路径")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	report = run(args)
+	if args.output:
+		out = Path(args.output)
+		out.parent.mkdir(parents=True, exist_ok=True)
+		out.write_text(json.dumps(report, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+
+
+if __name__ == "__main__":
+	main()
@@ -11,6 +11,10 @@ import yaml
 
 from aster_dao.http import AsterClient
 from aster_dao.trade import TradeDAO
+from common.log import get_logger, setup_logging
+
+
+log = get_logger("hedge")
 
 
 def load_config(path: str) -> dict:
@@ -26,6 +30,7 @@ def main():
 		print("用法: python scripts/market_buy_sell.py config/trading.yaml")
 		sys.exit(1)
 	cfg = load_config(sys.argv[1])
+	setup_logging(cfg.get("logging"))
 
 	api_key = cfg["api_key"]
 	api_secret = cfg["api_secret"]
@@ -38,7 +43,7 @@ def main():
 	client = AsterClient(api_key=api_key, api_secret=api_secret, base_url=base_url, debug=debug)
 	trade = TradeDAO(client)
 
-	print(f"市价买入 {symbol} 数量 {quantity}...")
+	log.info("市价买入 %s 数量 %s...", symbol, quantity)
 	buy_resp = trade.place_order(
 		symbol=symbol,
 		side="BUY",
@@ -46,12 +51,12 @@ def main():
 		quantity=quantity,
 		recvWindow=recv_window,
 	)
-	print("买入回执:", buy_resp)
+	log.info("买入回执: %s", buy_resp)
 
-	print("等待 10 秒...")
+	log.info("等待 10 秒...")
 	time.sleep(10)
 
-	print(f"市价卖出 {symbol} 数量 {quantity}...")
+	log.info("市价卖出 %s 数量 %s...", symbol, quantity)
 	sell_resp = trade.place_order(
 		symbol=symbol,
 		side="SELL",
@@ -59,7 +64,7 @@ def main():
 		quantity=quantity,
 		recvWindow=recv_window,
 	)
-	print("卖出回执:", sell_resp)
+	log.info("卖出回执: %s", sell_resp)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+行情录制服务：订阅 Backpack 与 Aster 合约的 bookTicker / 成交 / 深度 / 标记价格，
+连同本地接收时间写入分段列式压缩文件（格式见 common.recorder）
+
+用法:
+	python scripts/record_market_data.py --out data/market
+	python scripts/record_market_data.py --config config/hedge_futures.yaml --all-market
+	python scripts/record_market_data.py --aster-ws ws://127.0.0.1:18081 --bp-ws ws://127.0.0.1:18081  # 模拟交易所
+
+交易对默认取配置文件中的 bp.symbol / aster.symbol；--all-market 额外录制 Aster 全市场 !bookTicker 与
+!markPrice@arr@1s。WS 连接按 --rotate-hours 先建后断地轮换，避免交易所 24 小时断线造成缺口。
+"""
+import argparse
+import asyncio
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import yaml
+
+from aster_futures_dao.async_ws import AsyncAsterFuturesWS
+from common.recorder import DEFAULT_CODEC, MarketRecorder
+from common.ws_manager import BackpackProtocol, WSConnectionManager
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+	if not path:
+		return {}
+	p = Path(path)
+	if not p.exists():
+		raise FileNotFoundError(f"配置文件不存在: {p}")
+	with p.open("r", encoding="utf-8") as f:
+		return yaml.safe_load(f) or {}
+
+
+def aster_streams(symbols: List[str], depth: str, all_market: bool) -> List[str]:
+	streams = []
+	for symbol in symbols:
+		sym = symbol.lower()
+		streams += [f"{sym}@bookTicker", f"{sym}@trade", f"{sym}@{depth}", f"{sym}@markPrice@1s"]
+	if all_market:
+		streams += ["!bookTicker", "!markPrice@arr@1s"]
+	return streams
+
+
+def bp_streams(symbols: List[str]) -> List[str]:
+	streams = []
+	for symbol in symbols:
+		streams += [f"bookTicker.{symbol}", f"trade.{symbol}", f"depth.{symbol}", f"markPrice.{symbol}"]
+	return streams
+
+
+def format_stats(metrics: Dict[str, Any], elapsed: float) -> str:
+	rate = metrics["received"] / elapsed if elapsed > 0 else 0.0
+	return (f"收到 {metrics['received']} 条（{rate:,.0f}/s） 待写 {metrics['pending']} 行 {metrics['rows']} "
+			f"块 {metrics['blocks']} 段 {metrics['segments']} 写入 {metrics['bytes_written'] / 1e6:.1f}MB "
+			f"压缩比 {metrics['compression_ratio']} 写线程 {metrics['write_seconds']:.1f}s "
+			f"丢弃 {metrics['dropped']} 错误 {metrics['errors']}")
+
+
+async def run(args: argparse.Namespace) -> None:
+	cfg = load_config(args.config)
+	aster_symbols = args.aster_symbols or [(cfg.get("aster") or {}).get("symbol", "ASTERUSDT")]
+	bp_symbols = args.bp_symbols or [(cfg.get("bp") or {}).get("symbol", "ASTER_USDC_PERP")]
+	rotate_after = args.rotate_hours * 3600 if args.rotate_hours > 0 else None
+
+	recorder = MarketRecorder(args.out, prefix=args.prefix, flush_interval=args.flush_interval,
+							  segment_seconds=args.segment_minutes * 60, segment_bytes=args.segment_mb << 20,
+							  codec=args.codec, on_error=lambda e: print(f"录制写入失败: {e!r}")).start()
+	managers: List[WSConnectionManager] = []
+	if aster_symbols != ["-"]:
+		aster = AsyncAsterFuturesWS(args.aster_ws, rotate_after=rotate_after)
+		await aster.subscribe_recorder(aster_streams(aster_symbols, args.aster_depth, args.all_market), recorder, "aster")
+		managers.append(aster)
+	if bp_symbols != ["-"]:
+		bp = WSConnectionManager(args.bp_ws.rstrip("/"), BackpackProtocol(), name="BackpackWS", rotate_after=rotate_after)
+		await bp.subscribe_recorder(bp_streams(bp_symbols), recorder, "bp")
+		managers.append(bp)
+	for mgr in managers:
+		await mgr.start(wait=False)
+	print(f"开始录制到 {Path(args.out).resolve()}：Aster {aster_symbols} Backpack {bp_symbols}"
+		  + ("（含 Aster 全市场流）" if args.all_market else ""))
+
+	stop = asyncio.Event()
+	loop = asyncio.get_running_loop()
+	for sig in (signal.SIGINT, signal.SIGTERM):
+		try:
+			loop.add_signal_handler(sig, stop.set)
+		except (NotImplementedError, RuntimeError):
+			pass
+	started = time.monotonic()
+	deadline = started + args.duration if args.duration > 0 else None
+	try:
+		while not stop.is_set():
+			timeout = args.stats_interval
+			if deadline is not None:
+				timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+			try:
+				await asyncio.wait_for(stop.wait(), timeout)
+			except asyncio.TimeoutError:
+				pass
+			print(format_stats(recorder.metrics(), time.monotonic() - started))
+			if deadline is not None and time.monotonic() >= deadline:
+				break
+	finally:
+		for mgr in managers:
+			await mgr.close()
+		await asyncio.to_thread(recorder.close)
+		print(format_stats(recorder.metrics(), time.monotonic() - started))
+		print(f"已写入 {len(recorder.segments)} 个段文件")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="Backpack / Aster 合约行情录制")
+	ap.add_argument("--config", help="对冲脚本配置（取 bp.symbol / aster.symbol）")
+	ap.add_argument("--out", default="data/market", help="输出目录")
+	ap.add_argument("--prefix", default="market", help="段文件名前缀")
+	ap.add_argument("--aster-ws", default="wss://fstream.asterdex.com")
+	ap.add_argument("--bp-ws", default="wss://ws.backpack.exchange")
+	ap.add_argument("--aster-symbols", nargs="*", help="Aster 合约交易对，- 表示不录制 Aster")
+	ap.add_argument("--bp-symbols", nargs="*", help="Backpack 交易对，- 表示不录制 Backpack")
+	ap.add_argument("--aster-depth", default="depth20@100ms", help="Aster 深度流（如 depth@100ms 为增量深度）")
+	ap.add_argument("--all-market", action="store_true", help="额外录制 Aster 全市场 !bookTicker 与 !markPrice@arr@1s")
+	ap.add_argument("--codec", default=DEFAULT_CODEC, help="压缩算法 none / zlib / zstd")
+	ap.add_argument("--flush-interval", type=float, default=1.0, help="后台写入间隔（秒）")
+	ap.add_argument("--segment-minutes", type=float, default=60.0, help="单个段文件的时长（分钟）")
+	ap.add_argument("--segment-mb", type=int, default=256, help="单个段文件的大小上限（MB）")
+	ap.add_argument("--rotate-hours", type=float, default=12.0, help="WS 连接轮换间隔（小时），0 表示不轮换")
+	ap.add_argument("--stats-interval", type=float, default=30.0, help="打印统计的间隔（秒）")
+	ap.add_argument("--duration", type=float, default=0.0, help="录制时长（秒），0 表示直到 Ctrl+C")
+	return ap.parse_args(argv)
+
+
+def main():
+	try:
+		asyncio.run(run(parse_args()))
+	except KeyboardInterrupt:
+		print("录制已停止")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,97 @@
+"""
+回放录制的行情（common.replay），用于复现某一段时间的行情、统计流量或对处理路径做性能剖析
+
+用法:
+	python scripts/replay_market_data.py data/market
+	python scripts/replay_market_data.py data/market --start 2026-10-19T07:30:00 --end 2026-10-19T07:45:00 --print 20
+	python scripts/replay_market_data.py data/market --symbol ASTERUSDT ASTER_USDC_PERP --typed --profile logs/replay.prof
+	python scripts/replay_market_data.py data/market --speed 60   # 60 倍速
+
+--start / --end 为 UTC 时间（ISO 格式）或 Unix 秒。
+"""
+import argparse
+import cProfile
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+from common.replay import ReplayEngine
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+	"""UTC ISO 时间或 Unix 秒 -> 纳秒"""
+	if not value:
+		return None
+	try:
+		return int(float(value) * 1e9)
+	except ValueError:
+		pass
+	dt = datetime.fromisoformat(value)
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=timezone.utc)
+	return int(dt.timestamp() * 1e9)
+
+
+def format_ns(ts_ns: Optional[int]) -> str:
+	if ts_ns is None:
+		return "-"
+	return datetime.fromtimestamp(ts_ns / 1e9, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def run(args: argparse.Namespace) -> None:
+	engine = ReplayEngine(args.path, start_ns=parse_time(args.start), end_ns=parse_time(args.end), venues=args.venue,
+						  streams=args.stream, symbols=args.symbol, kinds=args.kind, typed=args.typed, speed=args.speed)
+	print(f"回放 {len(engine.paths)} 个段文件，倍速 {args.speed or '不限'}")
+	printed = 0
+	profiler = cProfile.Profile() if args.profile else None
+	if profiler is not None:
+		profiler.enable()
+	try:
+		with engine:
+			for recv_ns, venue, stream, data in engine.events():
+				if printed < args.print:
+					print(f"{format_ns(recv_ns)} {venue:<5} {stream:<32} {data}")
+					printed += 1
+	finally:
+		if profiler is not None:
+			profiler.disable()
+			Path(args.profile).parent.mkdir(parents=True, exist_ok=True)
+			profiler.dump_stats(args.profile)
+			print(f"性能剖析已写入 {args.profile}（python -m pstats {args.profile}）")
+	m = engine.metrics()
+	print(f"事件 {m['events']} 条，数据跨度 {m['data_span_s']:.1f}s（{format_ns(engine.first_ns)} ~ {format_ns(engine.last_ns)}），"
+		  f"用时 {m['elapsed_s']:.2f}s，{m['events_per_sec']:,.0f} 条/秒，相当于 {m['speedup']}x 实时")
+	for stream, count in sorted(m["streams"].items(), key=lambda kv: -kv[1]):
+		print(f"  {stream:<32} {count}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="回放录制的行情")
+	ap.add_argument("path", help="段文件目录或单个 .seg 文件")
+	ap.add_argument("--start", help="开始时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--end", help="结束时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--venue", nargs="*", help="只回放这些交易所（aster / bp）")
+	ap.add_argument("--stream", nargs="*", help="只回放这些流")
+	ap.add_argument("--symbol", nargs="*", help="只回放这些交易对")
+	ap.add_argument("--kind", nargs="*", help="只回放这些类型（bookTicker / trade / depth / markPrice）")
+	ap.add_argument("--typed", action="store_true", help="解码为 common.ws_decode 事件对象")
+	ap.add_argument("--speed", type=float, default=0.0, help="回放倍速，0 表示尽快回放")
+	ap.add_argument("--print", type=int, default=0, help="打印前 N 条事件")
+	ap.add_argument("--profile", help="cProfile 输出文件")
+	return ap.parse_args(argv)
+
+
+def main():
+	try:
+		run(parse_args())
+	except KeyboardInterrupt:
+		print("回放已停止")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,90 @@
+import asyncio
+import secrets
+import sys
+from pathlib import Path
+
+# 保证可直接运行找到 mock_exchange
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import yaml
+
+from mock_exchange import MockExchange
+from mock_exchange.auth import generate_backpack_keypair
+
+
+def load_config(path: str) -> dict:
+	p = Path(path)
+	if not p.exists():
+		raise FileNotFoundError(f"配置文件不存在: {p}")
+	with p.open("r", encoding="utf-8") as f:
+		return yaml.safe_load(f) or {}
+
+
+def build_exchange(cfg: dict):
+	"""按配置创建模拟交易所，返回 (交易所, 凭证)；未配置的密钥随机生成"""
+	accounts = cfg.get("accounts") or {}
+	aster_acc = accounts.get("aster") or {}
+	bp_acc = accounts.get("bp") or {}
+
+	aster_key = aster_acc.get("api_key") or secrets.token_hex(32)
+	aster_secret = aster_acc.get("api_secret") or secrets.token_hex(32)
+	bp_public = bp_acc.get("api_public_key_b64")
+	bp_secret = bp_acc.get("api_secret_key_b64")
+	if not bp_public:
+		bp_public, bp_secret = generate_backpack_keypair()
+
+	ex = MockExchange(
+		host=cfg.get("host", "127.0.0.1"),
+		http_port=int(cfg.get("http_port", 0)),
+		ws_port=int(cfg.get("ws_port", 0)),
+		latency_ms=float(cfg.get("latency_ms", 0)),
+		jitter_ms=float(cfg.get("jitter_ms", 0)),
+		ws_latency_ms=cfg.get("ws_latency_ms"),
+		tick_interval=float(cfg.get("tick_interval", 0.2)),
+		timer_interval=float(cfg.get("timer_interval", 1.0)),
+		verify_signatures=bool(cfg.get("verify_signatures", True)),
+		aster_keys={aster_key: aster_secret},
+		bp_public_keys=[bp_public],
+		markets=cfg.get("markets"),
+		seed=cfg.get("seed"),
+		volatility_bps=float(cfg.get("volatility_bps", 3.0)),
+		basis_bps=float(cfg.get("basis_bps", 0.5)),
+	)
+	credentials = {
+		"aster": {"api_key": aster_key, "api_secret": aster_secret},
+		"bp": {"api_public_key_b64": bp_public, "api_secret_key_b64": bp_secret or "<配置中提供的私钥>"},
+	}
+	return ex, credentials
+
+
+async def run(ex: MockExchange, credentials: dict) -> None:
+	await ex.start()
+	print(f"模拟交易所已启动: REST {ex.http_url}  WS {ex.ws_url}")
+	print(f"  延迟 {ex.latency_ms}ms ± {ex.jitter_ms}ms，WS 推送延迟 {ex.ws_latency_ms}ms")
+	print("对冲脚本配置：")
+	print(f"  bp.base_url: \"{ex.http_url}\"")
+	print(f"  bp.api_public_key_b64: \"{credentials['bp']['api_public_key_b64']}\"")
+	print(f"  bp.api_secret_key_b64: \"{credentials['bp']['api_secret_key_b64']}\"")
+	print(f"  aster.base_url: \"{ex.http_url}\"")
+	print(f"  aster.api_key: \"{credentials['aster']['api_key']}\"")
+	print(f"  aster.api_secret: \"{credentials['aster']['api_secret']}\"")
+	print(f"统计: {ex.http_url}/mock/stats  事件: {ex.http_url}/mock/events?since=0")
+	try:
+		await asyncio.Event().wait()
+	finally:
+		await ex.stop()
+
+
+def main():
+	cfg = load_config(sys.argv[1]) if len(sys.argv) > 1 else {}
+	ex, credentials = build_exchange(cfg)
+	try:
+		asyncio.run(run(ex, credentials))
+	except KeyboardInterrupt:
+		print("模拟交易所已停止")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,188 @@
+"""
+交易历史增量同步到本地账本（common.ledger，SQLite WAL）
+
+用法:
+	python scripts/sync_history.py --config config/hedge_futures.yaml
+	python scripts/sync_history.py --config config/hedge_futures.yaml --bp-streams fills funding --aster-streams --since 2026-10-01 --report
+	python scripts/sync_history.py --config config/hedge_futures.yaml --bp-streams --aster-streams income trades
+
+每个数据流记录高水位（sync_state 表），重复运行只拉取新记录；首次运行从 --since 开始
+（不指定时 Backpack 拉取全部历史，Aster 回溯 90 天）。
+--report 打印本地库中的手续费、资金费、结算、已实现盈亏汇总，不访问交易所。
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+	sys.path.insert(0, str(ROOT))
+
+import yaml
+
+from aster_futures_dao.history import INCOME_TABLE, AccountHistorySync, income_totals
+from aster_futures_dao.http import AsterFuturesClient
+from bp_dao import BackpackClient, HistorySync
+from bp_dao.history import STREAMS as BP_STREAMS
+from common.ledger import LedgerStore
+from common.ratelimit import TokenBucket
+from common.transport import build_transport
+
+
+def load_config(path: Optional[str]) -> Dict[str, Any]:
+	if not path:
+		return {}
+	p = Path(path)
+	if not p.exists():
+		raise FileNotFoundError(f"配置文件不存在: {p}")
+	with p.open("r", encoding="utf-8") as f:
+		return yaml.safe_load(f) or {}
+
+
+def parse_time_ms(value: Optional[str]) -> Optional[int]:
+	"""UTC ISO 时间或 Unix 秒 -> 毫秒"""
+	if not value:
+		return None
+	try:
+		return int(float(value) * 1000)
+	except ValueError:
+		pass
+	dt = datetime.fromisoformat(value)
+	if dt.tzinfo is None:
+		dt = dt.replace(tzinfo=timezone.utc)
+	return int(dt.timestamp() * 1000)
+
+
+def fmt_ms(ms: Optional[int]) -> str:
+	if ms is None:
+		return "-"
+	return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def sync_bp(cfg: Dict[str, Any], store: LedgerStore, args: argparse.Namespace) -> List[Dict[str, Any]]:
+	bp_cfg = cfg.get("bp") or {}
+	client = BackpackClient(
+		api_public_key_b64=bp_cfg["api_public_key_b64"],
+		api_secret_key_b64=bp_cfg["api_secret_key_b64"],
+		base_url=bp_cfg.get("base_url", "https://api.backpack.exchange"),
+		debug=bool(bp_cfg.get("debug", False)),
+		default_window_ms=int(bp_cfg.get("window", 5000)),
+		transport=build_transport(cfg.get("transport")),
+	)
+	syncer = HistorySync(client, store)
+	symbol = args.symbol or (bp_cfg.get("symbol") if args.config_symbol else None)
+	results = []
+	for stream in args.bp_streams:
+		t0 = time.perf_counter()
+		result = syncer.sync(stream, symbol, since_ms=parse_time_ms(args.since))
+		result["seconds"] = round(time.perf_counter() - t0, 3)
+		results.append(result)
+		print(f"[{result['stream']}] {result['pages']} 页，{result['fetched']} 条，新增 {result['added']} 条，"
+			  f"高水位 {fmt_ms(result['hwm'])}，{result['seconds']:.2f}s")
+	return results
+
+
+def sync_aster(cfg: Dict[str, Any], store: LedgerStore, args: argparse.Namespace) -> List[Dict[str, Any]]:
+	aster_cfg = cfg.get("aster") or {}
+	client = AsterFuturesClient(
+		api_key=aster_cfg["api_key"],
+		api_secret=aster_cfg["api_secret"],
+		base_url=aster_cfg.get("base_url", "https://fapi.asterdex.com"),
+		debug=bool(aster_cfg.get("debug", False)),
+		transport=build_transport(cfg.get("transport")),
+	)
+	syncer = AccountHistorySync(client, store, limiter=TokenBucket.per_minute(args.weight_per_minute))
+	since_ms = parse_time_ms(args.since)
+	results = []
+	for stream in args.aster_streams:
+		t0 = time.perf_counter()
+		if stream == "income":
+			result = syncer.sync_income(since_ms=since_ms)
+		else:
+			result = syncer.sync_trades(args.aster_symbol or aster_cfg.get("symbol", "ASTERUSDT"), since_ms=since_ms)
+		result["seconds"] = round(time.perf_counter() - t0, 3)
+		results.append(result)
+		print(f"[{result['stream']}] {result['pages']} 页，{result['fetched']} 条，新增 {result['added']} 条，"
+			  f"高水位 {fmt_ms(result['hwm'])}，{result['seconds']:.2f}s")
+	return results
+
+
+def report(store: LedgerStore) -> Dict[str, Any]:
+	"""本地账本汇总（只读本地库）"""
+	out: Dict[str, Any] = {"streams": store.states()}
+	if "bp_fills" in store.tables():
+		rows = store.query(
+			"SELECT symbol, fee_symbol, count(*) AS n, sum(quantity) AS qty, sum(price * quantity) AS notional, "
+			"sum(fee) AS fee FROM bp_fills GROUP BY symbol, fee_symbol ORDER BY symbol"
+		)
+		out["bp_fills"] = [dict(r) for r in rows]
+		out["bp_funding"] = [dict(r) for r in store.query(
+			"SELECT symbol, count(*) AS n, sum(quantity) AS funding FROM bp_funding GROUP BY symbol ORDER BY symbol")]
+		out["bp_settlement"] = [dict(r) for r in store.query(
+			"SELECT source, count(*) AS n, sum(quantity) AS quantity FROM bp_settlement GROUP BY source ORDER BY source")]
+	if INCOME_TABLE in store.tables():
+		t0 = time.perf_counter()
+		out["aster_income"] = income_totals(store, income_types=["FUNDING_FEE", "COMMISSION", "REALIZED_PNL"])
+		out["aster_income_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+	print("== 同步状态 ==")
+	for stream, st in out["streams"].items():
+		print(f"  {stream:<28} 高水位 {fmt_ms(st['hwm'])}  累计新增 {st['rows']}")
+	for r in out.get("bp_fills", []):
+		print(f"  BP 成交 {r['symbol']}: {r['n']} 笔，成交额 {r['notional'] or 0:.4f}，手续费 {r['fee'] or 0:.6f} {r['fee_symbol']}")
+	for r in out.get("bp_funding", []):
+		print(f"  BP 资金费 {r['symbol']}: {r['n']} 次，合计 {r['funding'] or 0:.6f}")
+	for r in out.get("bp_settlement", []):
+		print(f"  BP 结算 {r['source']}: {r['n']} 次，合计 {r['quantity'] or 0:.6f}")
+	for r in out.get("aster_income", []):
+		print(f"  Aster {r['income_type']} {r['symbol'] or '-'}: {r['n']} 条，合计 {r['total'] or 0:.6f} {r['asset']}")
+	if "aster_income_ms" in out:
+		print(f"  Aster 资金流水汇总查询 {out['aster_income_ms']:.2f}ms")
+	return out
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+	cfg = load_config(args.config)
+	result: Dict[str, Any] = {}
+	with LedgerStore(args.db) as store:
+		if args.bp_streams:
+			result["bp"] = sync_bp(cfg, store, args)
+		if args.aster_streams:
+			result["aster"] = sync_aster(cfg, store, args)
+		if args.report:
+			result["report"] = report(store)
+	return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	ap = argparse.ArgumentParser(description="交易历史增量同步到本地账本")
+	ap.add_argument("--config", required=True, help="对冲脚本配置（取 bp / aster 的 API Key）")
+	ap.add_argument("--db", default="data/ledger.db", help="本地账本 SQLite 文件")
+	ap.add_argument("--bp-streams", nargs="*", default=list(BP_STREAMS), choices=list(BP_STREAMS),
+					help="要同步的 Backpack 数据流（传空列表跳过）")
+	ap.add_argument("--symbol", help="只同步该交易对（fills/orders/funding）")
+	ap.add_argument("--config-symbol", action="store_true", help="未指定 --symbol 时使用配置中的 bp.symbol")
+	ap.add_argument("--aster-streams", nargs="*", default=["income", "trades"], choices=["income", "trades"],
+					help="要同步的 Aster 合约数据流：income（资金流水）、trades（账户成交）（传空列表跳过）")
+	ap.add_argument("--aster-symbol", help="Aster 成交同步的交易对，默认 aster.symbol")
+	ap.add_argument("--weight-per-minute", type=float, default=600, help="Aster 请求权重额度（每分钟）")
+	ap.add_argument("--since", help="首次同步的起始时间（UTC ISO 或 Unix 秒）")
+	ap.add_argument("--report", action="store_true", help="同步后打印本地账本汇总")
+	ap.add_argument("--output", help="结果 JSON 输出路径")
+	return ap.parse_args(argv)
+
+
+def main():
+	args = parse_args()
+	result = run(args)
+	if args.output:
+		out = Path(args.output)
+		out.parent.mkdir(parents=True, exist_ok=True)
+		out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+	main()